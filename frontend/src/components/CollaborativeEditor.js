@@ -61,6 +61,14 @@ const CollaborativeEditor = ({
       }
     };
 
+    const handleDocumentResync = (data) => {
+      setValue(data.content);
+      lastValueRef.current = data.content;
+      if (onChange) {
+        onChange(data.content);
+      }
+    };
+
     const handleUserJoined = (data) => {
       setActiveUsers((prev) => {
         const exists = prev.find((u) => u.user_id === data.user_id);
@@ -114,6 +122,7 @@ const CollaborativeEditor = ({
     collaborationService.on('connected', handleConnected);
     collaborationService.on('disconnected', handleDisconnected);
     collaborationService.on('document_joined', handleDocumentJoined);
+    collaborationService.on('document_resync', handleDocumentResync);
     collaborationService.on('user_joined', handleUserJoined);
     collaborationService.on('user_left', handleUserLeft);
     collaborationService.on('remote_operation', handleRemoteOperation);
@@ -126,6 +135,7 @@ const CollaborativeEditor = ({
       collaborationService.off('connected', handleConnected);
       collaborationService.off('disconnected', handleDisconnected);
       collaborationService.off('document_joined', handleDocumentJoined);
+      collaborationService.off('document_resync', handleDocumentResync);
       collaborationService.off('user_joined', handleUserJoined);
       collaborationService.off('user_left', handleUserLeft);
       collaborationService.off('remote_operation', handleRemoteOperation);
@@ -177,7 +187,7 @@ const CollaborativeEditor = ({
 
       try {
         const currentValue = lastValueRef.current || '';
-        const newValue = collaborationService.applyOperation(currentValue, data.operation);
+        const newValue = collaborationService.applyOperations(currentValue, data.operations);
 
         setValue(newValue);
         lastValueRef.current = newValue;
@@ -165,7 +165,7 @@ const DocumentsByDate = ({ dateKey = null, onDocumentClick = null }) => {
                 </div>
 
                 <div className="document-content">
-                  <p>{truncateContent(doc.content || doc.markdown_content || '')}</p>
+                  <p>{truncateContent(doc.preview || doc.content || doc.markdown_content || '')}</p>
                 </div>
 
                 <div className="document-meta">
@@ -292,7 +292,7 @@ const SimpleDocumentsByDate = ({ dateKey = null, onDocumentClick = null }) => {
                     color: '#555',
                   }}
                 >
-                  {truncateContent(doc.content || doc.markdown_content || '')}
+                  {truncateContent(doc.preview || doc.content || doc.markdown_content || '')}
                 </p>
               </div>
 
@@ -6,6 +6,78 @@ const SOCKET_URL = process.env.REACT_APP_SOCKET_URL || window.location.origin;
 // Helper to get auth token
 const getAuthToken = () => localStorage.getItem('token');
 
+// Operational transform, mirroring app/services/operational_transform.py on the server.
+// Operations are split into insert/delete steps; transform(a, b) rebases two step lists
+// made against the same text so that a + b' == b + a', with b's inserts first on ties.
+const insertStep = (position, text) => ({ type: 'insert', position, text });
+const deleteStep = (position, length) => ({ type: 'delete', position, length });
+
+const toSteps = (operation) => {
+  const steps = [];
+  if (operation.type === 'delete' || operation.type === 'replace') {
+    steps.push(deleteStep(operation.position, operation.length));
+  }
+  if ((operation.type === 'insert' || operation.type === 'replace') && operation.text) {
+    steps.push(insertStep(operation.position, operation.text));
+  }
+  return steps;
+};
+
+const transformStep = (step, against, winsTies) => {
+  const { position } = step;
+  const start = against.position;
+
+  if (against.type === 'insert') {
+    const shift = against.text.length;
+    if (step.type === 'insert') {
+      if (position < start || (position === start && winsTies)) {
+        return [step];
+      }
+      return [insertStep(position + shift, step.text)];
+    }
+    const end = position + step.length;
+    if (start <= position) {
+      return [deleteStep(position + shift, step.length)];
+    }
+    if (start >= end) {
+      return [step];
+    }
+    return [deleteStep(position, start - position), deleteStep(position + shift, end - start)];
+  }
+
+  const removedEnd = start + against.length;
+  if (step.type === 'insert') {
+    if (position <= start) {
+      return [step];
+    }
+    return [insertStep(Math.max(start, position - against.length), step.text)];
+  }
+  const end = position + step.length;
+  const overlap = Math.max(0, Math.min(end, removedEnd) - Math.max(position, start));
+  if (overlap === step.length) {
+    return [];
+  }
+  const before = Math.max(0, Math.min(position, removedEnd) - start);
+  return [deleteStep(position - before, step.length - overlap)];
+};
+
+const transform = (a, b) => {
+  if (a.length === 0 || b.length === 0) {
+    return [a, b];
+  }
+  if (a.length === 1 && b.length === 1) {
+    return [transformStep(a[0], b[0], false), transformStep(b[0], a[0], true)];
+  }
+  if (a.length > 1) {
+    const [head, bHead] = transform(a.slice(0, 1), b);
+    const [tail, bRebased] = transform(a.slice(1), bHead);
+    return [[...head, ...tail], bRebased];
+  }
+  const [aHead, head] = transform(a, b.slice(0, 1));
+  const [aRebased, tail] = transform(aHead, b.slice(1));
+  return [aRebased, [...head, ...tail]];
+};
+
 class CollaborationService {
   constructor() {
     this.socket = null;
@@ -13,8 +85,17 @@ class CollaborationService {
     this.currentDocument = null;
     this.eventHandlers = {};
     this.userCursors = new Map();
-    this.operationQueue = [];
-    this.isApplyingOperation = false;
+    this.origin = null; // tags this socket's own entries in broadcast frames
+    this.resetRevision(0);
+  }
+
+  // Server revision this client's text is at, the steps sent and awaiting an ack,
+  // local steps made since, and entries that arrived ahead of their base revision
+  resetRevision(revision) {
+    this.revision = revision;
+    this.inflight = null;
+    this.buffered = [];
+    this.delivered = new Map();
   }
 
   connect() {
@@ -52,9 +133,21 @@ class CollaborationService {
     // Document collaboration events
     this.socket.on('document_joined', (data) => {
       // joined document
+      this.origin = data.origin;
+      this.resetRevision(data.revision);
       this.emit('document_joined', data);
     });
 
+    this.socket.on('document_resync', (data) => {
+      // Too far behind the server to rebase, or the batch in flight was rejected; restart from its snapshot
+      this.resetRevision(data.revision);
+      this.emit('document_resync', data);
+    });
+
+    this.socket.on('operation_ack', (data) => {
+      this.receive({ base_revision: data.revision - 1, revision: data.revision, ack: true });
+    });
+
     this.socket.on('user_joined', (data) => {
       // user joined
       this.emit('user_joined', data);
@@ -65,12 +158,12 @@ class CollaborationService {
       this.emit('user_left', data);
     });
 
-    this.socket.on('text_operation', (data) => {
-      this.handleRemoteOperation(data);
-    });
-
-    this.socket.on('cursor_update', (data) => {
-      this.handleCursorUpdate(data);
+    // Operations and cursor moves arrive batched, one frame per broadcast interval
+    this.socket.on('collaboration_frame', (frame) => {
+      frame.operations.forEach((entry) => this.receive(entry));
+      frame.cursors
+        .filter((cursor) => cursor.origin !== this.origin)
+        .forEach((cursor) => this.handleCursorUpdate(cursor));
     });
 
     this.socket.on('document_saved', (data) => {
@@ -127,9 +220,24 @@ class CollaborationService {
       return;
     }
 
+    const steps = toSteps(operation);
+    if (steps.length === 0) {
+      return;
+    }
+    // One batch in flight at a time; edits made meanwhile go out with the next ack
+    if (this.inflight) {
+      this.buffered.push(...steps);
+      return;
+    }
+    this.flush(documentId, steps);
+  }
+
+  flush(documentId, steps) {
+    this.inflight = steps;
     this.socket.emit('text_operation', {
       document_id: documentId,
-      operation: operation,
+      operations: steps,
+      revision: this.revision,
     });
   }
 
@@ -164,24 +272,41 @@ class CollaborationService {
     });
   }
 
-  handleRemoteOperation(data) {
-    if (this.isApplyingOperation) {
-      // Queue operation if we're currently applying one
-      this.operationQueue.push(data);
+  // Acks and frame entries are applied strictly in revision order. An entry covers the
+  // revisions after base_revision up to revision; typing runs arrive merged into one.
+  receive(entry) {
+    // Already known: own edits acknowledged earlier, or operations from before joining
+    if (entry.base_revision < this.revision) {
       return;
     }
+    if (!this.delivered.has(entry.base_revision)) {
+      this.delivered.set(entry.base_revision, entry);
+    }
+    while (this.delivered.has(this.revision)) {
+      const message = this.delivered.get(this.revision);
+      this.delivered.delete(this.revision);
+      this.revision = message.revision;
+
+      if (message.ack || message.origin === this.origin) {
+        this.inflight = null;
+        if (this.buffered.length > 0 && this.currentDocument) {
+          const steps = this.buffered;
+          this.buffered = [];
+          this.flush(this.currentDocument, steps);
+        }
+        continue;
+      }
 
-    this.isApplyingOperation = true;
-    this.emit('remote_operation', data);
-
-    // Process queued operations
-    setTimeout(() => {
-      this.isApplyingOperation = false;
-      if (this.operationQueue.length > 0) {
-        const nextOperation = this.operationQueue.shift();
-        this.handleRemoteOperation(nextOperation);
+      // Rebase the remote steps over local edits the server has not seen yet, and vice versa
+      let operations = message.operations;
+      if (this.inflight) {
+        [this.inflight, operations] = transform(this.inflight, operations);
+      }
+      if (this.buffered.length > 0) {
+        [this.buffered, operations] = transform(this.buffered, operations);
       }
-    }, 0);
+      this.emit('remote_operation', { ...message, operations });
+    }
   }
 
   handleCursorUpdate(data) {
@@ -253,54 +378,8 @@ class CollaborationService {
     }
   }
 
-  // Transform operation against another operation (basic OT)
-  transformOperation(op1, op2, _isOwnOperation = false) {
-    if (op1.type === 'insert' && op2.type === 'insert') {
-      if (op1.position <= op2.position) {
-        return {
-          ...op2,
-          position: op2.position + op1.text.length,
-        };
-      }
-      return op2;
-    }
-
-    if (op1.type === 'delete' && op2.type === 'insert') {
-      if (op1.position < op2.position) {
-        return {
-          ...op2,
-          position: Math.max(op1.position, op2.position - op1.length),
-        };
-      }
-      return op2;
-    }
-
-    if (op1.type === 'insert' && op2.type === 'delete') {
-      if (op1.position <= op2.position) {
-        return {
-          ...op2,
-          position: op2.position + op1.text.length,
-        };
-      }
-      return op2;
-    }
-
-    if (op1.type === 'delete' && op2.type === 'delete') {
-      if (op1.position < op2.position) {
-        return {
-          ...op2,
-          position: Math.max(op1.position, op2.position - op1.length),
-          length: op2.length,
-        };
-      } else if (op1.position >= op2.position + op2.length) {
-        return op2;
-      } else {
-        // Overlapping deletes - more complex case
-        return null; // Skip conflicting operation
-      }
-    }
-
-    return op2;
+  applyOperations(content, operations) {
+    return operations.reduce((text, operation) => this.applyOperation(text, operation), content);
   }
 
   // Event handling
@@ -118,9 +118,52 @@ def create_app():
     cache_type = os.getenv('CACHE_TYPE', 'SimpleCache')
     app.config['CACHE_TYPE'] = cache_type
     app.config['CACHE_DEFAULT_TIMEOUT'] = int(os.getenv('CACHE_DEFAULT_TIMEOUT', '300'))
+    # SimpleCache entry limit; incremental markdown rendering caches one entry per document block
+    app.config['CACHE_THRESHOLD'] = int(os.getenv('CACHE_THRESHOLD', '10000'))
     if cache_type == 'RedisCache':
         app.config['CACHE_REDIS_URL'] = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
 
+    # Markdown rendering: rendered HTML is cached by content hash; oversized documents render in worker processes
+    app.config['MARKDOWN_RENDER_OFFLOAD_CHARS'] = int(os.getenv('MARKDOWN_RENDER_OFFLOAD_CHARS', '200000'))
+    app.config['MARKDOWN_RENDER_TIMEOUT'] = float(os.getenv('MARKDOWN_RENDER_TIMEOUT', '5'))
+    app.config['MARKDOWN_RENDER_WORKERS'] = int(os.getenv('MARKDOWN_RENDER_WORKERS', '2'))
+
+    # OpenSearch (optional): connections open on first use, so startup never waits for the cluster
+    app.config['OPENSEARCH_ENABLED'] = os.getenv('OPENSEARCH_ENABLED', 'false').lower() == 'true'
+    app.config['OPENSEARCH'] = {
+        'host': os.getenv('OPENSEARCH_HOST', 'localhost'),
+        'port': int(os.getenv('OPENSEARCH_PORT', '9200')),
+        'use_ssl': os.getenv('OPENSEARCH_USE_SSL', 'false').lower() == 'true',
+        'username': os.getenv('OPENSEARCH_USERNAME'),
+        'password': os.getenv('OPENSEARCH_PASSWORD'),
+        # Keep-alive connections per worker process
+        'pool_maxsize': int(os.getenv('OPENSEARCH_POOL_SIZE', '10')),
+        'timeouts': {
+            'search': float(os.getenv('OPENSEARCH_SEARCH_TIMEOUT', '5')),
+            'index': float(os.getenv('OPENSEARCH_INDEX_TIMEOUT', '10')),
+            'bulk': float(os.getenv('OPENSEARCH_BULK_TIMEOUT', '60')),
+        },
+        'breaker_failure_threshold': int(os.getenv('OPENSEARCH_BREAKER_FAILURES', '5')),
+        'breaker_reset_timeout': float(os.getenv('OPENSEARCH_BREAKER_RESET_SECONDS', '30')),
+    }
+
+    # Dashboard statistics and tag suggestions are served from cached aggregations refreshed on this schedule
+    app.config['SEARCH_STATISTICS_INTERVAL'] = int(os.getenv('SEARCH_STATISTICS_INTERVAL', '30'))
+
+    # Collaborative editing: operations and cursor moves are broadcast to each room once per frame (0 = per event)
+    app.config['COLLABORATION_FRAME_MS'] = int(os.getenv('COLLABORATION_FRAME_MS', '50'))
+    # Sessions, presence and op logs live in a state backend (memory:// or a redis:// URL) shared by all workers.
+    # Each worker process owns the documents hashed to its index; with more than one worker, Socket.IO emits
+    # must go through a message queue (a redis:// URL) so rooms span workers.
+    app.config['COLLABORATION_STATE_URL'] = os.getenv('COLLABORATION_STATE_URL', 'memory://')
+    app.config['COLLABORATION_WORKERS'] = int(os.getenv('COLLABORATION_WORKERS', '1'))
+    app.config['COLLABORATION_WORKER_INDEX'] = int(os.getenv('COLLABORATION_WORKER_INDEX', '0'))
+    app.config['SOCKETIO_MESSAGE_QUEUE'] = os.getenv('SOCKETIO_MESSAGE_QUEUE')
+
+    # Search indexing: document writes record outbox rows; the indexer applies them to OpenSearch
+    app.config['SEARCH_OUTBOX_ENABLED'] = os.getenv('SEARCH_OUTBOX_ENABLED', 'false').lower() == 'true'
+    app.config['SEARCH_INDEXER_ENABLED'] = os.getenv('SEARCH_INDEXER_ENABLED', 'false').lower() == 'true'
+
     CORS(app, origins=cors_origins, supports_credentials=True)
     db.init_app(app)
     migrate.init_app(app, db)
@@ -137,7 +180,7 @@ def create_app():
             return is_token_revoked(jti)
         return False
     cache.init_app(app)
-    socketio.init_app(app, cors_allowed_origins=cors_origins)
+    socketio.init_app(app, cors_allowed_origins=cors_origins, message_queue=app.config['SOCKETIO_MESSAGE_QUEUE'])
 
     # Prometheus metrics (disabled during testing to avoid registry conflicts)
     metrics_enabled = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
@@ -289,11 +332,56 @@ def create_app():
     app.register_blueprint(agents_bp, url_prefix='/api')
 
     # Initialize collaboration service and register WebSocket events
-    from app.services.collaboration_service import init_collaboration_service
+    from app.services.collaboration_service import get_collaboration_service, init_collaboration_service
+    from app.services.collaboration_state import create_state_backend
     from app.routes.websocket_events import register_websocket_events
     
-    init_collaboration_service(socketio)
+    init_collaboration_service(
+        socketio,
+        app.config['COLLABORATION_FRAME_MS'] / 1000,
+        state=create_state_backend(app.config['COLLABORATION_STATE_URL']),
+        worker_index=app.config['COLLABORATION_WORKER_INDEX'],
+        worker_count=app.config['COLLABORATION_WORKERS']
+    )
     register_websocket_events(socketio)
+    if app.config['COLLABORATION_WORKERS'] > 1:
+        # Commands for documents this worker owns arrive from the other workers
+        get_collaboration_service().start_command_consumer(app)
+
+    # Drop cached collaboration permissions when a document's owner or visibility changes
+    from app.services.collaboration_service import register_collaboration_access_events
+    register_collaboration_access_events()
+
+    # Keep stored TF-IDF feature vectors in step with document writes
+    from app.services.tfidf_feature_store import register_feature_store_events
+    register_feature_store_events()
+
+    # Keep MinHash signatures and LSH buckets in step with document writes
+    from app.services.minhash_index import register_duplicate_index_events
+    register_duplicate_index_events()
+
+    # Keep the Korean n-gram search vector in step with document writes
+    from app.services.korean_search_index import register_korean_search_index_events
+    register_korean_search_index_events()
+
+    # Keep denormalized comment/version/rating counters in step with child writes
+    from app.services.document_counters import register_document_counter_cli, register_document_counter_events
+    register_document_counter_events()
+    register_document_counter_cli(app)
+
+    # OpenSearch client; searches fall back to PostgreSQL while its circuit breaker is open
+    if app.config['OPENSEARCH_ENABLED'] and flask_env not in ('testing', 'test'):
+        from app.services.opensearch_service import ensure_opensearch_indices, initialize_opensearch
+        if initialize_opensearch(app.config['OPENSEARCH']):
+            socketio.start_background_task(ensure_opensearch_indices)
+            from app.services.search_statistics import start_search_statistics
+            start_search_statistics(app)
+
+    # Record OpenSearch changes in the outbox with each document write; drain it in the background
+    from app.services.search_indexer import register_search_outbox_events, start_search_indexer
+    register_search_outbox_events()
+    if app.config['SEARCH_INDEXER_ENABLED'] and flask_env not in ('testing', 'test'):
+        start_search_indexer(app)
     
     # Add static route for serving images from backup/img directory
     @app.route('/img/<path:filename>')
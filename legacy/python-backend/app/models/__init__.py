@@ -8,6 +8,9 @@ from .attachment import Attachment
 from .notification import Notification
 from .workflow import DocumentWorkflow as Workflow, WorkflowTemplate as WorkflowStep
 from .category import Category
+from .feature_store import TfidfModelVersion, DocumentFeatureVector
+from .duplicate_index import DocumentMinHash, DocumentLshBand
+from .search_outbox import SearchOutbox, SearchReindexCheckpoint
 
 __all__ = [
     'Document',
@@ -22,5 +25,11 @@ __all__ = [
     'Notification',
     'Workflow',
     'WorkflowStep',
-    'Category'
+    'Category',
+    'TfidfModelVersion',
+    'DocumentFeatureVector',
+    'DocumentMinHash',
+    'DocumentLshBand',
+    'SearchOutbox',
+    'SearchReindexCheckpoint'
 ]
\ No newline at end of file
@@ -218,7 +218,9 @@ class Category(db.Model):
             result['children'] = [child.to_dict(_doc_counts=_doc_counts) for child in self.children]
 
         if include_documents:
-            result['documents'] = [doc.to_dict() for doc in self.documents.limit(100)]
+            from app.models.document import Document
+            documents = self.documents.options(*Document.profile_options('card')).limit(100)
+            result['documents'] = Document.profile_serializer('card')(documents)
 
         return result
     
@@ -1,7 +1,10 @@
 from app import db
 from app.utils.datetime_utils import utc_now
-import markdown
-import bleach
+from app.services.markdown_renderer import cached_render, is_pending, pending_html, render_markdown
+from sqlalchemy import DDL, event, inspect, text
+from sqlalchemy.orm import Session, joinedload, load_only, object_session, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from app.models.tag import document_tags
 
 
@@ -11,6 +14,37 @@ def escape_like_pattern(value: str) -> str:
         return value
     return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
 
+
+# Minimum word_similarity for fuzzy matches and "did you mean" suggestions
+FUZZY_SIMILARITY_THRESHOLD = 0.4
+_trigram_support = {}
+
+
+def _pg_trgm_available(ddl, target, bind, **kw):
+    """pg_trgm ships with PostgreSQL contrib; minimal server builds may lack it"""
+    return bind is not None and bind.exec_driver_sql(
+        "SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'"
+    ).first() is not None
+
+
+def trigram_supported(session=None) -> bool:
+    """Whether the database has pg_trgm installed (checked once per database)"""
+    bind = (session or db.session).get_bind()
+    if bind.dialect.name != 'postgresql':
+        return False
+    key = bind.url.render_as_string(hide_password=True)
+    if key not in _trigram_support:
+        _trigram_support[key] = (session or db.session).execute(
+            text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        ).first() is not None
+    return _trigram_support[key]
+
+
+def _use_similarity_threshold(threshold: float = FUZZY_SIMILARITY_THRESHOLD):
+    """Set the cut-off of the <% operator (default 0.6) for the current transaction"""
+    db.session.execute(text("SELECT set_config('pg_trgm.word_similarity_threshold', :threshold, true)"),
+                       {'threshold': str(threshold)})
+
 # Allowed HTML tags for sanitized markdown output
 ALLOWED_TAGS = [
     'p', 'br', 'strong', 'em', 'b', 'i', 'u', 's',
@@ -21,6 +55,8 @@ ALLOWED_TAGS = [
     'hr', 'div', 'span', 'sup', 'sub', 'mark'
 ]
 
+MARKDOWN_EXTENSIONS = ['tables', 'fenced_code', 'codehilite']
+
 ALLOWED_ATTRIBUTES = {
     'a': ['href', 'title', 'target', 'rel'],
     'img': ['src', 'alt', 'title', 'width', 'height'],
@@ -32,6 +68,25 @@ ALLOWED_ATTRIBUTES = {
     'th': ['colspan', 'rowspan']
 }
 
+# Characters of the body a list card previews
+PREVIEW_CHARS = 200
+
+# Query profiles for list endpoints: the columns a profile's serializer reads, and the
+# relationships it touches, loaded up front (many-to-one joined, collections selectin).
+# Every other column is deferred, so list pages never fetch document bodies.
+LIST_COLUMNS = ('id', 'title', 'author', 'created_at', 'updated_at', 'user_id', 'category_id',
+                'is_public', 'is_published', 'published_at')
+QUERY_PROFILES = {
+    # to_dict_lite: titles and tags
+    'list': {'columns': LIST_COLUMNS, 'joined': (), 'selectin': ('tags',), 'serializer': 'to_dict_lite'},
+    # to_dict_card: list plus preview, owner, category and the denormalized stats
+    'card': {'columns': LIST_COLUMNS + ('preview', 'comment_count', 'version_count', 'latest_version_number',
+                                        'rating_count', 'rating_sum'),
+             'joined': ('owner', 'category'), 'selectin': ('tags',), 'serializer': 'to_dict_card'},
+    # to_dict: everything a document page shows, bodies included
+    'full': {'columns': None, 'joined': ('owner', 'category'), 'selectin': ('tags',), 'serializer': 'to_dict'},
+}
+
 
 class Document(db.Model):
     __tablename__ = 'documents'
@@ -42,6 +97,15 @@ class Document(db.Model):
         db.Index('idx_documents_updated_at', 'updated_at'),
         db.Index('idx_documents_created_at', 'created_at'),
         db.Index('idx_documents_category_id', 'category_id'),
+        db.Index('idx_documents_search_vector', 'search_vector', postgresql_using='gin'),
+        db.Index('idx_documents_search_ngrams', 'search_ngrams', postgresql_using='gin'),
+        # Trigram indexes serve ILIKE '%q%' substring search and similarity matching
+        db.Index('idx_documents_title_trgm', 'title', postgresql_using='gin',
+                 postgresql_ops={'title': 'gin_trgm_ops'}).ddl_if(dialect='postgresql',
+                                                                  callable_=_pg_trgm_available),
+        db.Index('idx_documents_markdown_content_trgm', 'markdown_content', postgresql_using='gin',
+                 postgresql_ops={'markdown_content': 'gin_trgm_ops'}).ddl_if(dialect='postgresql',
+                                                                             callable_=_pg_trgm_available),
     )
 
     id = db.Column(db.Integer, primary_key=True)
@@ -51,13 +115,27 @@ class Document(db.Model):
     updated_at = db.Column(db.DateTime, default=utc_now, onupdate=utc_now)
     markdown_content = db.Column(db.Text, nullable=False)
     html_content = db.Column(db.Text)
-    search_vector = db.Column(db.Text)
+    # Weighted tsvector (title A, tags B, body C) maintained by PostgreSQL triggers,
+    # see SEARCH_VECTOR_DDL; deferred so regular loads never fetch it
+    search_vector = db.deferred(db.Column(db.Text().with_variant(TSVECTOR(), 'postgresql')))
+    # Character-bigram tsvector of documents containing Hangul, for Korean search;
+    # written with the document by app.services.korean_search_index
+    search_ngrams = db.deferred(db.Column(db.Text().with_variant(TSVECTOR(), 'postgresql')))
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
     category_id = db.Column(db.Integer, db.ForeignKey('categories.id'), nullable=True)
     is_public = db.Column(db.Boolean, default=True)
     is_published = db.Column(db.Boolean, default=False)
     published_at = db.Column(db.DateTime, nullable=True)
     document_metadata = db.Column(db.JSON, nullable=True)  # 확장 가능한 메타데이터 저장
+    # Denormalized counters, incremented with each comment, version and rating
+    # write by app.services.document_counters so reads never aggregate
+    comment_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    version_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    latest_version_number = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_sum = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Start of the body, cut in SQL so card lists don't fetch bodies; loaded by the 'card' profile
+    preview = db.column_property(db.func.substr(markdown_content, 1, PREVIEW_CHARS), deferred=True)
     
     # Relationships
     # Use 'selectin' for efficient batch loading when accessing tags
@@ -73,17 +151,35 @@ class Document(db.Model):
         self.html_content = self.convert_markdown_to_html()
     
     def convert_markdown_to_html(self):
-        """Convert markdown to sanitized HTML to prevent XSS attacks"""
-        raw_html = markdown.markdown(
-            self.markdown_content,
-            extensions=['tables', 'fenced_code', 'codehilite']
-        )
-        return bleach.clean(
-            raw_html,
-            tags=ALLOWED_TAGS,
-            attributes=ALLOWED_ATTRIBUTES,
-            strip=True
-        )
+        """Convert markdown to sanitized HTML to prevent XSS attacks.
+
+        Cached by content hash; after an edit only the changed blocks re-render.
+        A render that outlasts the request returns a pending placeholder, which
+        the worker replaces in the database when it finishes.
+        """
+        content = self.markdown_content
+
+        def store(rendered):
+            _store_finished_render(inspect(self).key, content, rendered)
+
+        return render_markdown(content, MARKDOWN_EXTENSIONS, ALLOWED_TAGS, ALLOWED_ATTRIBUTES, incremental=True,
+                               on_ready=store)
+
+    @property
+    def rendered_html(self):
+        """html_content, or the finished render if the save stored a pending placeholder"""
+        if is_pending(self.html_content):
+            return cached_render(self.markdown_content, MARKDOWN_EXTENSIONS, ALLOWED_TAGS,
+                                 ALLOWED_ATTRIBUTES) or self.html_content
+        return self.html_content
+
+    def resolved_html(self):
+        """rendered_html, waiting for a pending render instead of returning its placeholder"""
+        rendered = self.rendered_html
+        if is_pending(rendered):
+            rendered = render_markdown(self.markdown_content, MARKDOWN_EXTENSIONS, ALLOWED_TAGS,
+                                       ALLOWED_ATTRIBUTES, wait=True, incremental=True)
+        return rendered
     
     def update_content(self, title=None, markdown_content=None, author=None, create_version=True, change_summary=None, updated_by=None):
         # Check if content actually changed
@@ -126,55 +222,98 @@ class Document(db.Model):
     
     def get_version_count(self):
         """Get total number of versions for this document"""
-        from app.models.version import DocumentVersion
-        return DocumentVersion.query.filter_by(document_id=self.id).count()
+        return self.version_count or 0
     
     def get_latest_version_number(self):
         """Get the latest version number"""
-        from app.models.version import DocumentVersion
-        latest = DocumentVersion.query.filter_by(document_id=self.id)\
-            .order_by(DocumentVersion.version_number.desc()).first()
-        return latest.version_number if latest else 0
+        return self.latest_version_number or 0
     
     @classmethod
-    def search_documents(cls, query_text, page=1, per_page=10, user_id=None, include_private=False, tags=None):
-        base_query = cls.query
-        
-        # Filter by visibility
-        if not include_private:
-            base_query = base_query.filter(cls.is_public == True)
-        elif user_id:
-            # Include public documents and user's private documents
-            base_query = base_query.filter(
-                db.or_(cls.is_public == True, cls.user_id == user_id)
-            )
-        
-        # Filter by tags if provided
+    def search_documents(cls, query_text, page=1, per_page=10, user_id=None, include_private=False, tags=None,
+                         fuzzy=False):
+        """Paginated substring search over title and body, newest first (see search_query)"""
+        return cls.search_query(query_text, user_id, include_private, tags, fuzzy).paginate(
+            page=page, per_page=per_page, error_out=False
+        )
+
+    @classmethod
+    def search_query(cls, query_text, user_id=None, include_private=False, tags=None, fuzzy=False):
+        """Ordered query for search_documents.
+
+        ILIKE '%q%' is served by the trigram GIN indexes on PostgreSQL. With fuzzy,
+        titles similar to the query (pg_trgm word_similarity) also match and results
+        are ordered by that similarity; without pg_trgm fuzzy is ignored.
+        """
+        base_query = cls._visible_query(user_id, include_private)
+
+        # Filter by tags if provided: documents carrying every tag, in one grouped
+        # pass over document_tags (unknown slugs are ignored)
         if tags:
             from app.models.tag import Tag
             if isinstance(tags, str):
                 tags = [tags]
-            tag_objects = Tag.query.filter(Tag.slug.in_(tags)).all()
-            if tag_objects:
-                for tag in tag_objects:
-                    base_query = base_query.filter(cls.tags.contains(tag))
+            tag_ids = [tag_id for (tag_id,) in db.session.query(Tag.id).filter(Tag.slug.in_(set(tags)))]
+            if tag_ids:
+                tagged = db.select(document_tags.c.document_id)\
+                    .where(document_tags.c.tag_id.in_(tag_ids))\
+                    .group_by(document_tags.c.document_id)\
+                    .having(db.func.count() == len(tag_ids))
+                base_query = base_query.filter(cls.id.in_(tagged))
         
         if not query_text:
-            return base_query.order_by(cls.updated_at.desc()).paginate(
-                page=page, per_page=per_page, error_out=False
-            )
+            return base_query.order_by(cls.updated_at.desc())
         
-        # Use simple ILIKE search instead of full-text search for better compatibility
         query_escaped = escape_like_pattern(query_text)
-        search_query = base_query.filter(
-            db.or_(
-                cls.title.ilike(f'%{query_escaped}%'),
-                cls.markdown_content.ilike(f'%{query_escaped}%')
+        match = db.or_(
+            cls.title.ilike(f'%{query_escaped}%'),
+            cls.markdown_content.ilike(f'%{query_escaped}%')
+        )
+        if fuzzy and trigram_supported():
+            _use_similarity_threshold()
+            similarity = db.func.word_similarity(query_text, cls.title)
+            # <% is word_similarity above pg_trgm.word_similarity_threshold, served by the title index
+            return base_query.filter(db.or_(match, db.literal(query_text).op('<%')(cls.title)))\
+                .order_by(similarity.desc(), cls.updated_at.desc())
+        return base_query.filter(match).order_by(cls.updated_at.desc())
+
+    @classmethod
+    def _visible_query(cls, user_id=None, include_private=False):
+        base_query = cls.query
+        if not include_private:
+            base_query = base_query.filter(cls.is_public == True)
+        elif user_id:
+            # Include public documents and user's private documents
+            base_query = base_query.filter(
+                db.or_(cls.is_public == True, cls.user_id == user_id)
             )
-        ).order_by(cls.updated_at.desc())
-        
-        return search_query.paginate(page=page, per_page=per_page, error_out=False)
+        return base_query
+
+    @classmethod
+    def did_you_mean(cls, query_text, user_id=None, include_private=False, limit=5):
+        """Titles of visible documents most similar to query_text, for a search that found nothing.
+
+        Uses pg_trgm word similarity through the title trigram index; empty
+        without pg_trgm.
+        """
+        if not query_text or not trigram_supported():
+            return []
+        _use_similarity_threshold()
+        similarity = db.func.word_similarity(query_text, cls.title)
+        rows = cls._visible_query(user_id, include_private)\
+            .filter(db.literal(query_text).op('<%')(cls.title))\
+            .with_entities(cls.title)\
+            .group_by(cls.title)\
+            .order_by(db.func.max(similarity).desc(), cls.title)\
+            .limit(limit)\
+            .all()
+        return [title for (title,) in rows]
     
+    @classmethod
+    def fulltext_match(cls, query_text):
+        """Match condition and relevance rank of query_text against the stored search_vector"""
+        tsquery = db.func.plainto_tsquery('english', query_text)
+        return cls.search_vector.op('@@')(tsquery), db.func.ts_rank(cls.search_vector, tsquery)
+
     def add_tags(self, tag_names):
         """Add tags to document by name"""
         from app.models.tag import Tag
@@ -201,14 +340,58 @@ class Document(db.Model):
     
     def get_comment_count(self):
         """Get number of comments for this document"""
-        from app.models.comment import Comment
-        return Comment.query.filter_by(document_id=self.id, is_deleted=False).count()
+        return self.comment_count or 0
     
     def get_rating_stats(self):
-        """Get rating statistics for this document"""
-        from app.models.comment import Rating
-        return Rating.get_document_rating_stats(self.id)
+        """Get rating count and average for this document"""
+        count = self.rating_count or 0
+        return {
+            'average_rating': round(self.rating_sum / count, 2) if count else 0,
+            'total_ratings': count
+        }
     
+    @classmethod
+    def load_relations(cls, documents):
+        """Load owner and category of many documents in one query each, where not loaded yet"""
+        from app.models.category import Category
+        from app.models.user import User
+
+        for relation, model, key in (('owner', User, 'user_id'), ('category', Category, 'category_id')):
+            pending = [doc for doc in documents if relation in inspect(doc).unloaded]
+            wanted = {getattr(doc, key) for doc in pending} - {None}
+            related = {obj.id: obj for obj in model.query.filter(model.id.in_(wanted))} if wanted else {}
+            for doc in pending:
+                set_committed_value(doc, relation, related.get(getattr(doc, key)))
+
+    @classmethod
+    def profile_options(cls, profile, *extra_columns):
+        """Loader options for a query profile; extra_columns are loaded on top of the profile's own"""
+        spec = QUERY_PROFILES[profile]
+        options = [joinedload(getattr(cls, name)) for name in spec['joined']]
+        options += [selectinload(getattr(cls, name)) for name in spec['selectin']]
+        if spec['columns'] is not None:
+            options.append(load_only(*(getattr(cls, name) for name in spec['columns'] + extra_columns)))
+        return options
+
+    @classmethod
+    def profile_serializer(cls, profile):
+        """Page serializer bound to a query profile, for documents loaded with profile_options(profile)"""
+        spec = QUERY_PROFILES[profile]
+
+        def serialize(documents):
+            documents = list(documents)
+            if spec['joined']:
+                cls.load_relations(documents)
+            return [getattr(doc, spec['serializer'])() for doc in documents]
+        return serialize
+
+    @classmethod
+    def to_dict_batch(cls, documents, include_stats=True):
+        """to_dict for a list of documents in a fixed number of queries, not one set per document"""
+        documents = list(documents)
+        cls.load_relations(documents)
+        return [doc.to_dict(include_stats=include_stats) for doc in documents]
+
     def can_edit(self, user_id):
         """Check if user can edit this document.
 
@@ -249,13 +432,40 @@ class Document(db.Model):
             'tag_names': [tag.name for tag in self.tags],
         }
 
-    def to_dict(self, include_stats=True, stats=None):
-        """Full serialization with optional pre-computed stats.
+    def to_dict_card(self):
+        """List card serialization: to_dict_lite plus a body preview, tag chips, owner, category and stats.
+
+        Reads only the columns of the 'card' query profile.
+        """
+        result = self.to_dict_lite()
+        result.update({
+            'preview': self.preview,
+            'tags': [tag.to_dict_lite() for tag in self.tags],
+            'category': self._category_summary(),
+            'owner': self.owner.to_dict() if self.owner else None,
+            'comment_count': self.get_comment_count(),
+            'rating_stats': self.get_rating_stats(),
+            'version_count': self.get_version_count(),
+            'latest_version': self.get_latest_version_number(),
+        })
+        return result
+
+    def _category_summary(self):
+        if not self.category:
+            return None
+        return {
+            'id': self.category.id,
+            'name': self.category.name,
+            'slug': self.category.slug,
+            'color': self.category.color
+        }
+
+    def to_dict(self, include_stats=True):
+        """Full serialization.
 
         Args:
-            include_stats: If False, skip expensive stat queries
-            stats: Optional dict with pre-computed stats:
-                   {'comment_count': N, 'version_count': N, 'latest_version': N, 'rating_stats': {...}}
+            include_stats: If False, leave out comment, rating and version stats
+                (read from the denormalized counters, no extra queries)
         """
         result = {
             'id': self.id,
@@ -264,15 +474,10 @@ class Document(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
             'markdown_content': self.markdown_content,
-            'html_content': self.html_content,
+            'html_content': self.rendered_html,
             'user_id': self.user_id,
             'category_id': self.category_id,
-            'category': {
-                'id': self.category.id,
-                'name': self.category.name,
-                'slug': self.category.slug,
-                'color': self.category.color
-            } if self.category else None,
+            'category': self._category_summary(),
             'is_public': self.is_public,
             'is_published': self.is_published,
             'published_at': self.published_at.isoformat() if self.published_at else None,
@@ -283,17 +488,117 @@ class Document(db.Model):
         }
 
         if include_stats:
-            if stats:
-                # Use pre-computed stats
-                result['comment_count'] = stats.get('comment_count', 0)
-                result['rating_stats'] = stats.get('rating_stats', {'average': 0, 'count': 0})
-                result['version_count'] = stats.get('version_count', 0)
-                result['latest_version'] = stats.get('latest_version', 0)
-            else:
-                # Compute stats (expensive - avoid in list views)
-                result['comment_count'] = self.get_comment_count()
-                result['rating_stats'] = self.get_rating_stats()
-                result['version_count'] = self.get_version_count()
-                result['latest_version'] = self.get_latest_version_number()
-
-        return result
\ No newline at end of file
+            result['comment_count'] = self.get_comment_count()
+            result['rating_stats'] = self.get_rating_stats()
+            result['version_count'] = self.get_version_count()
+            result['latest_version'] = self.get_latest_version_number()
+
+        return result
+
+
+# PostgreSQL keeps documents.search_vector current on every write path, including
+# raw SQL and bulk inserts. Created with document_tags, the last table it reads.
+SEARCH_VECTOR_DDL = """
+CREATE OR REPLACE FUNCTION documents_search_vector(doc_id integer, doc_title text, doc_body text)
+RETURNS tsvector AS $$
+    SELECT setweight(to_tsvector('english', coalesce(doc_title, '')), 'A')
+        || setweight(to_tsvector('english', coalesce((
+               SELECT string_agg(t.name, ' ')
+               FROM document_tags dt JOIN tags t ON t.id = dt.tag_id
+               WHERE dt.document_id = doc_id), '')), 'B')
+        || setweight(to_tsvector('english', coalesce(doc_body, '')), 'C')
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION documents_search_vector_trigger() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := documents_search_vector(NEW.id, NEW.title, NEW.markdown_content);
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION document_tags_search_vector_trigger() RETURNS trigger AS $$
+BEGIN
+    UPDATE documents SET search_vector = documents_search_vector(id, title, markdown_content)
+    WHERE id = CASE WHEN TG_OP = 'DELETE' THEN OLD.document_id ELSE NEW.document_id END;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION tags_search_vector_trigger() RETURNS trigger AS $$
+BEGIN
+    UPDATE documents d SET search_vector = documents_search_vector(d.id, d.title, d.markdown_content)
+    FROM document_tags dt
+    WHERE dt.document_id = d.id AND dt.tag_id = NEW.id;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS documents_search_vector_update ON documents;
+CREATE TRIGGER documents_search_vector_update
+    BEFORE INSERT OR UPDATE OF title, markdown_content ON documents
+    FOR EACH ROW EXECUTE FUNCTION documents_search_vector_trigger();
+
+DROP TRIGGER IF EXISTS document_tags_search_vector_update ON document_tags;
+CREATE TRIGGER document_tags_search_vector_update
+    AFTER INSERT OR DELETE ON document_tags
+    FOR EACH ROW EXECUTE FUNCTION document_tags_search_vector_trigger();
+
+DROP TRIGGER IF EXISTS tags_search_vector_update ON tags;
+CREATE TRIGGER tags_search_vector_update
+    AFTER UPDATE OF name ON tags
+    FOR EACH ROW EXECUTE FUNCTION tags_search_vector_trigger();
+"""
+
+event.listen(document_tags, 'after_create', DDL(SEARCH_VECTOR_DDL).execute_if(dialect='postgresql'))
+
+# The trigram indexes need the extension before the table's indexes are created
+event.listen(Document.__table__, 'before_create',
+             DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql',
+                                                                      callable_=_pg_trgm_available))
+
+
+def _store_finished_render(identity, content, rendered):
+    """Overwrite the pending placeholder saved for content with its rendered HTML.
+
+    Called from the render worker's thread, so it uses its own connection. Only
+    committed rows still holding this content's placeholder match; a document
+    saved again since then is left alone.
+    """
+    table = Document.__table__
+    condition = table.c.html_content == pending_html(content)
+    if identity is not None:
+        condition &= table.c.id == identity[1][0]
+    with db.engine.begin() as connection:
+        connection.execute(table.update().where(condition).values(html_content=rendered))
+
+
+def _swap_in_finished_render(mapper, connection, target):
+    """A pending render that finished before the flush is stored directly"""
+    if is_pending(target.html_content):
+        target.html_content = target.rendered_html
+
+
+def _track_pending_render(mapper, connection, target):
+    """The worker cannot see rows before they commit; check again after the commit"""
+    if is_pending(target.html_content):
+        object_session(target).info.setdefault('pending_renders', []).append(
+            (inspect(target).key, target.markdown_content))
+
+
+def _store_renders_finished_before_commit(session):
+    for identity, content in session.info.pop('pending_renders', ()):
+        rendered = cached_render(content, MARKDOWN_EXTENSIONS, ALLOWED_TAGS, ALLOWED_ATTRIBUTES)
+        if rendered is not None:
+            _store_finished_render(identity, content, rendered)
+
+
+def _forget_pending_renders(session):
+    session.info.pop('pending_renders', None)
+
+
+for _event in ('before_insert', 'before_update'):
+    event.listen(Document, _event, _swap_in_finished_render)
+for _event in ('after_insert', 'after_update'):
+    event.listen(Document, _event, _track_pending_render)
+event.listen(Session, 'after_commit', _store_renders_finished_before_commit)
+event.listen(Session, 'after_rollback', _forget_pending_renders)
@@ -0,0 +1,40 @@
+from app import db
+from app.utils.datetime_utils import utc_now
+
+
+class DocumentMinHash(db.Model):
+    """MinHash signature of a document's word shingles, keyed by content hash"""
+    __tablename__ = 'document_minhashes'
+
+    document_id = db.Column(db.Integer, db.ForeignKey('documents.id'), primary_key=True)
+    content_hash = db.Column(db.String(64), nullable=False)  # SHA-256 of markdown_content
+    signature = db.Column(db.JSON, nullable=False)  # empty for content without word shingles
+    updated_at = db.Column(db.DateTime, default=utc_now, onupdate=utc_now)
+
+    document = db.relationship(
+        'Document',
+        backref=db.backref('minhash', uselist=False, cascade='all, delete-orphan')
+    )
+
+    def __repr__(self):
+        return f'<DocumentMinHash doc={self.document_id}>'
+
+
+class DocumentLshBand(db.Model):
+    """One LSH band bucket of a document signature; documents sharing a bucket are candidates"""
+    __tablename__ = 'document_lsh_bands'
+    __table_args__ = (
+        db.Index('idx_document_lsh_bands_bucket', 'band', 'bucket'),
+    )
+
+    document_id = db.Column(db.Integer, db.ForeignKey('documents.id'), primary_key=True)
+    band = db.Column(db.SmallInteger, primary_key=True)
+    bucket = db.Column(db.BigInteger, nullable=False)
+
+    document = db.relationship(
+        'Document',
+        backref=db.backref('lsh_bands', cascade='all, delete-orphan')
+    )
+
+    def __repr__(self):
+        return f'<DocumentLshBand doc={self.document_id} band={self.band}>'
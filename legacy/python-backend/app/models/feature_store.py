@@ -0,0 +1,60 @@
+from app import db
+from app.utils.datetime_utils import utc_now
+
+
+class TfidfModelVersion(db.Model):
+    """A corpus-wide TF-IDF vocabulary and IDF table.
+
+    Each explicit rebuild creates a new version; exactly one version is active
+    and every stored document vector records the version it was computed with.
+    """
+    __tablename__ = 'tfidf_model_versions'
+    __table_args__ = (
+        db.Index('idx_tfidf_model_versions_active', 'is_active'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, unique=True, nullable=False)
+    vocabulary = db.Column(db.JSON, nullable=False)  # term -> column index
+    idf = db.Column(db.JSON, nullable=False)  # column index -> idf weight
+    params = db.Column(db.JSON, nullable=False)  # vectorizer parameters used for the fit
+    document_count = db.Column(db.Integer, default=0)
+    is_active = db.Column(db.Boolean, default=False)
+    created_at = db.Column(db.DateTime, default=utc_now)
+
+    def to_dict(self):
+        return {
+            'version': self.version,
+            'vocabulary_size': len(self.vocabulary or {}),
+            'document_count': self.document_count,
+            'is_active': self.is_active,
+            'params': self.params,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+    def __repr__(self):
+        return f'<TfidfModelVersion v{self.version}>'
+
+
+class DocumentFeatureVector(db.Model):
+    """Sparse TF-IDF vector for one document, keyed by document id and content hash."""
+    __tablename__ = 'document_feature_vectors'
+    __table_args__ = (
+        db.Index('idx_document_feature_vectors_version', 'model_version'),
+    )
+
+    document_id = db.Column(db.Integer, db.ForeignKey('documents.id'), primary_key=True)
+    model_version = db.Column(db.Integer, nullable=False)
+    content_hash = db.Column(db.String(64), nullable=False)  # SHA-256 of markdown_content
+    indices = db.Column(db.JSON, nullable=False)
+    values = db.Column(db.JSON, nullable=False)
+    updated_at = db.Column(db.DateTime, default=utc_now, onupdate=utc_now)
+
+    # Deleting a document removes its vector through the ORM cascade
+    document = db.relationship(
+        'Document',
+        backref=db.backref('feature_vector', uselist=False, cascade='all, delete-orphan')
+    )
+
+    def __repr__(self):
+        return f'<DocumentFeatureVector doc={self.document_id} v{self.model_version}>'
@@ -0,0 +1,68 @@
+from app import db
+from app.utils.datetime_utils import utc_now
+
+
+class SearchOutbox(db.Model):
+    """A document change waiting to be pushed to the search index.
+
+    Written in the same transaction as the change itself; the background search
+    indexer deletes rows once the change has been applied to OpenSearch.
+    """
+    __tablename__ = 'search_outbox'
+    __table_args__ = (
+        db.Index('idx_search_outbox_available', 'available_at', 'id'),
+        db.Index('idx_search_outbox_document_id', 'document_id'),
+    )
+
+    OPERATION_UPSERT = 'upsert'
+    OPERATION_DELETE = 'delete'
+
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True)
+    # No foreign key: delete events must outlive the document they refer to
+    document_id = db.Column(db.Integer, nullable=False)
+    operation = db.Column(db.String(10), nullable=False)
+    created_at = db.Column(db.DateTime, default=utc_now, nullable=False)
+    # Earliest time the indexer may pick the row up again (pushed back on failure)
+    available_at = db.Column(db.DateTime, default=utc_now, nullable=False)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    last_error = db.Column(db.Text)
+
+    def __repr__(self):
+        return f'<SearchOutbox {self.operation} doc={self.document_id}>'
+
+
+class SearchReindexCheckpoint(db.Model):
+    """Progress of a full reindex; lets an interrupted run resume after the last committed batch"""
+    __tablename__ = 'search_reindex_checkpoints'
+
+    STATUS_RUNNING = 'running'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+
+    name = db.Column(db.String(100), primary_key=True)
+    index_name = db.Column(db.String(255), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default=STATUS_RUNNING)
+    last_document_id = db.Column(db.Integer, nullable=False, default=0)
+    documents_indexed = db.Column(db.Integer, nullable=False, default=0)
+    documents_failed = db.Column(db.Integer, nullable=False, default=0)
+    started_at = db.Column(db.DateTime, default=utc_now)
+    updated_at = db.Column(db.DateTime, default=utc_now, onupdate=utc_now)
+    completed_at = db.Column(db.DateTime, nullable=True)
+    report = db.Column(db.JSON, nullable=True)  # throughput / memory report of the last run
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'index_name': self.index_name,
+            'status': self.status,
+            'last_document_id': self.last_document_id,
+            'documents_indexed': self.documents_indexed,
+            'documents_failed': self.documents_failed,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'completed_at': self.completed_at.isoformat() if self.completed_at else None,
+            'report': self.report
+        }
+
+    def __repr__(self):
+        return f'<SearchReindexCheckpoint {self.name} @{self.last_document_id}>'
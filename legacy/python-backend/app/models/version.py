@@ -54,7 +54,8 @@ class DocumentVersion(db.Model):
             version_number=next_version,
             title=document.title,
             markdown_content=document.markdown_content,
-            html_content=document.html_content,
+            # Versions outlive the render cache, so never store a pending placeholder
+            html_content=document.resolved_html(),
             author=document.author,
             change_summary=change_summary,
             created_by=created_by or document.user_id
@@ -115,7 +116,8 @@ class DocumentVersion(db.Model):
 
         self.document.title = self.title
         self.document.markdown_content = self.markdown_content
-        self.document.html_content = self.html_content
+        # Re-render rather than copy: the stored HTML may predate the current renderer (usually a cache hit)
+        self.document.html_content = self.document.convert_markdown_to_html()
         self.document.author = self.author
         self.document.updated_at = utc_now()
     
@@ -289,7 +289,7 @@ def list_all_documents():
         per_page = min(100, max(1, request.args.get('per_page', 20, type=int)))
         search = request.args.get('search', '')
         
-        query = Document.query
+        query = Document.query.options(*Document.profile_options('card'))
         
         if search:
             search_escaped = escape_like(search)
@@ -298,22 +298,23 @@ def list_all_documents():
                 Document.markdown_content.ilike(f'%{search_escaped}%')
             )
         
-        def serialize_doc_with_owner(doc):
-            doc_data = doc.to_dict()
-            if doc.owner:
-                doc_data['owner'] = {
-                    'id': doc.owner.id,
-                    'username': doc.owner.username,
-                    'full_name': doc.owner.full_name
-                }
-            return doc_data
+        def serialize_docs_with_owner(docs):
+            docs_data = Document.profile_serializer('card')(docs)
+            for doc, doc_data in zip(docs, docs_data):
+                if doc.owner:
+                    doc_data['owner'] = {
+                        'id': doc.owner.id,
+                        'username': doc.owner.username,
+                        'full_name': doc.owner.full_name
+                    }
+            return docs_data
 
-        query = query.order_by(desc(Document.created_at))
         return paginate_query(
             query, page, per_page,
-            serializer_func=serialize_doc_with_owner,
+            page_serializer=serialize_docs_with_owner,
             items_key='documents',
-            extra_fields={'success': True}
+            extra_fields={'success': True},
+            sort_column=Document.created_at
         )
         
     except Exception as e:
@@ -433,6 +434,30 @@ def system_cleanup():
         db.session.rollback()
         return jsonify({'error': 'Internal server error'}), 500
 
+@admin_bp.route('/admin/documents/counters/repair', methods=['POST'])
+@jwt_required()
+@limiter.limit("5 per hour")
+def repair_document_counters():
+    """Recompute denormalized document counters and report drift"""
+    if not require_admin():
+        return jsonify({'error': 'Admin access required'}), 403
+
+    data = request.get_json(silent=True) or {}
+    batch_size = data.get('batch_size', 500)
+    dry_run = data.get('dry_run', False)
+    if not isinstance(batch_size, int) or batch_size < 1 or batch_size > 5000:
+        return jsonify({'error': 'batch_size must be an integer between 1 and 5000'}), 400
+    if not isinstance(dry_run, bool):
+        return jsonify({'error': 'dry_run must be a boolean'}), 400
+
+    _log_admin_access('admin/documents/counters/repair', f'dry_run={dry_run}')
+
+    from app.services import document_counters
+    result = document_counters.repair(batch_size=batch_size, dry_run=dry_run)
+    if 'error' in result:
+        return jsonify(result), 500
+    return jsonify({'success': True, 'repair': result})
+
 @admin_bp.route('/admin/tags/merge', methods=['POST'])
 @jwt_required()
 @limiter.limit("20 per minute")
@@ -410,11 +410,11 @@ def list_attachments():
         if document_id:
             query = query.filter_by(document_id=document_id)
 
-        query = query.order_by(Attachment.created_at.desc())
         return paginate_query(
             query, page, per_page,
             serializer_func=lambda a: a.to_dict(),
-            items_key='attachments'
+            items_key='attachments',
+            sort_column=Attachment.created_at
         )
         
     except Exception as e:
@@ -225,12 +225,12 @@ def get_category_documents(category_id):
         else:
             query = Document.query.filter_by(category_id=category_id, is_public=True)
 
-        query = query.order_by(Document.updated_at.desc())
         return paginate_query(
-            query, page, per_page,
-            serializer_func=lambda d: d.to_dict(),
+            query.options(*Document.profile_options('card')), page, per_page,
+            page_serializer=Document.profile_serializer('card'),
             items_key='documents',
-            extra_fields={'category': category.to_dict()}
+            extra_fields={'category': category.to_dict()},
+            sort_column=Document.updated_at
         )
 
     except Exception as e:
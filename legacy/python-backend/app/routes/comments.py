@@ -51,12 +51,13 @@ def get_comments(document_id):
             document_id=document_id,
             parent_id=None,
             is_deleted=False
-        ).order_by(Comment.created_at.desc())
+        )
 
         return paginate_query(
             query, page, per_page,
             serializer_func=lambda c: c.to_dict(),
-            items_key='comments'
+            items_key='comments',
+            sort_column=Comment.created_at
         )
 
     except Exception as e:
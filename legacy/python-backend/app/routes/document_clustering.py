@@ -3,14 +3,18 @@ Document Clustering API Routes
 Provides endpoints for document clustering and similarity detection
 """
 
-from flask import Blueprint, request, jsonify, Response
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from flask_jwt_extended import jwt_required
 from app.services.document_clustering_service import document_clustering_service
+from app.services.tfidf_feature_store import tfidf_feature_store
+from app.services.minhash_index import minhash_index
 from app.models.document import Document
-from app.utils.auth import get_optional_user_id
+from app.utils.auth import get_optional_user_id, admin_required
 from app.utils.constants import MAX_SIMILAR_DOCUMENTS
 from app import limiter
+import json
 import logging
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
@@ -31,7 +35,9 @@ def get_clustering_status() -> Response | tuple[Response, int]:
                 'document_clustering': document_clustering_service.sklearn_available,
                 'similarity_detection': document_clustering_service.sklearn_available,
                 'duplicate_detection': document_clustering_service.sklearn_available,
-                'cluster_insights': document_clustering_service.sklearn_available
+                'cluster_insights': document_clustering_service.sklearn_available,
+                'feature_store': tfidf_feature_store.is_available(),
+                'duplicate_index': minhash_index.is_complete()
             }
         }
         
@@ -341,18 +347,18 @@ def detect_duplicates() -> Response | tuple[Response, int]:
             else:
                 query = query.filter(Document.is_public == True)
 
-        documents = query.limit(max_documents).all()
-        
-        if len(documents) < 2:
+        if len(query.with_entities(Document.id).limit(2).all()) < 2:
             return jsonify({
                 'success': False,
                 'error': 'Minimum 2 documents required for duplicate detection'
             }), 400
         
-        # Detect duplicates
+        # Detect duplicates across the whole scope via the MinHash/LSH index;
+        # max_documents only bounds the pairwise fallback used before a backfill
         duplicate_results = document_clustering_service.detect_document_duplicates(
-            documents=documents,
-            similarity_threshold=similarity_threshold
+            similarity_threshold=similarity_threshold,
+            document_query=query,
+            max_documents=max_documents
         )
         
         if 'error' in duplicate_results:
@@ -384,64 +390,76 @@ def _filter_accessible_documents(documents: list[Document], user_id: int | None)
     return accessible_docs
 
 
-def _calculate_similarity_score(doc1: Document, doc2: Document) -> float:
-    """Calculate similarity score between two documents"""
-    similarity_result = document_clustering_service.find_similar_documents(
-        target_document=doc1,
-        candidate_documents=[doc2],
-        similarity_threshold=0.0,
-        max_results=1
-    )
-
-    if similarity_result.get('similar_documents'):
-        return similarity_result['similar_documents'][0]['similarity_score']
-
-    return 0.0
-
-
-def _build_similarity_row(
-    doc1_index: int,
-    accessible_docs: list[Document],
-    similarity_matrix: list[list[dict]],
-    similarity_threshold: float
-) -> list[dict]:
-    """Build a single row of the similarity matrix"""
-    similarity_row = []
-
-    for j, doc2 in enumerate(accessible_docs):
-        if doc1_index == j:
-            similarity_row.append({
-                'document_id': doc2.id,
-                'similarity_score': 1.0,
-                'is_self': True
-            })
-        elif doc1_index < j:
-            score = _calculate_similarity_score(accessible_docs[doc1_index], doc2)
-            similarity_row.append({
-                'document_id': doc2.id,
-                'similarity_score': score,
-                'is_similar': score >= similarity_threshold
-            })
-        else:
-            score = similarity_matrix[j][doc1_index]['similarity_score']
-            similarity_row.append({
-                'document_id': doc2.id,
-                'similarity_score': score,
-                'is_similar': score >= similarity_threshold
-            })
+# Rows per cosine-similarity block; bounds memory at SIMILARITY_BLOCK_SIZE x n
+SIMILARITY_BLOCK_SIZE = 128
+DEFAULT_SIMILARITY_TOP_K = 10
+MAX_SIMILARITY_TOP_K = 100
 
-    return similarity_row
 
+def _build_dense_rows(row_offset: int, block, accessible_docs: list[Document],
+                      similarity_threshold: float) -> list[list[dict]]:
+    """Build full similarity matrix rows for one block of the cosine matrix"""
+    document_ids = [doc.id for doc in accessible_docs]
+    rows = []
 
-def _build_similarity_matrix(accessible_docs: list[Document], similarity_threshold: float) -> list[list[dict]]:
-    """Build complete similarity matrix for all documents"""
-    similarity_matrix = []
+    for i, scores in enumerate(block.tolist()):
+        doc_index = row_offset + i
+        row = []
+        for j, score in enumerate(scores):
+            if j == doc_index:
+                row.append({
+                    'document_id': document_ids[j],
+                    'similarity_score': 1.0,
+                    'is_self': True
+                })
+            else:
+                row.append({
+                    'document_id': document_ids[j],
+                    'similarity_score': score,
+                    'is_similar': score >= similarity_threshold
+                })
+        rows.append(row)
+
+    return rows
+
+
+def _build_top_k_rows(row_offset: int, block, accessible_docs: list[Document],
+                      similarity_threshold: float, top_k: int) -> list[dict]:
+    """Build sparse rows holding only each document's top-k neighbors above the threshold"""
+    document_ids = [doc.id for doc in accessible_docs]
+    scores = np.array(block, dtype=float)
+    for i in range(scores.shape[0]):
+        scores[i, row_offset + i] = -np.inf  # never report a document as its own neighbor
+
+    k = min(top_k, len(document_ids) - 1)
+    candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+
+    rows = []
+    for i, candidate_indices in enumerate(candidates):
+        candidate_scores = scores[i, candidate_indices]
+        order = np.argsort(-candidate_scores)
+        rows.append({
+            'document_id': document_ids[row_offset + i],
+            'neighbors': [
+                {'document_id': document_ids[j], 'similarity_score': float(score)}
+                for j, score in zip(candidate_indices[order], candidate_scores[order])
+                if score >= similarity_threshold
+            ]
+        })
+
+    return rows
 
-    for i in range(len(accessible_docs)):
-        similarity_row = _build_similarity_row(i, accessible_docs, similarity_matrix, similarity_threshold)
-        similarity_matrix.append(similarity_row)
 
-    return similarity_matrix
+def _stream_similarity_rows(header: dict, similarity_blocks, build_rows):
+    """Yield the similarity response as newline-delimited JSON, one line per row block"""
+    yield json.dumps({'type': 'header', **header}) + '\n'
+    for row_offset, block in similarity_blocks:
+        yield json.dumps({
+            'type': 'rows',
+            'row_offset': row_offset,
+            'rows': build_rows(row_offset, block)
+        }) + '\n'
+    yield json.dumps({'type': 'end'}) + '\n'
 
 
 def _extract_document_metadata(documents: list[Document]) -> list[dict]:
@@ -476,6 +494,9 @@ def batch_similarity_analysis() -> Response | tuple[Response, int]:
         data = request.get_json() or {}
         document_ids = data.get('document_ids', [])
         similarity_threshold = data.get('threshold', 0.1)
+        output_mode = data.get('output', 'dense')
+        top_k = data.get('top_k', DEFAULT_SIMILARITY_TOP_K)
+        stream = data.get('stream', False) is True
 
         # SECURITY: Validate similarity_threshold range
         try:
@@ -489,12 +510,27 @@ def batch_similarity_analysis() -> Response | tuple[Response, int]:
                 'error': 'threshold must be between 0.0 and 1.0'
             }), 400
 
+        if output_mode not in ['dense', 'top_k']:
+            return jsonify({
+                'success': False,
+                'error': "output must be 'dense' or 'top_k'"
+            }), 400
+
+        if not isinstance(top_k, int) or top_k < 1 or top_k > MAX_SIMILARITY_TOP_K:
+            return jsonify({
+                'success': False,
+                'error': f'top_k must be an integer between 1 and {MAX_SIMILARITY_TOP_K}'
+            }), 400
+
         # SECURITY: Validate document_ids array size
+        # Dense output is n x n, so it keeps a tighter cap than the sparse top-k mode
         MAX_BATCH_DOCUMENTS = 100
-        if len(document_ids) > MAX_BATCH_DOCUMENTS:
+        MAX_TOP_K_BATCH_DOCUMENTS = 1000
+        max_documents = MAX_TOP_K_BATCH_DOCUMENTS if output_mode == 'top_k' else MAX_BATCH_DOCUMENTS
+        if len(document_ids) > max_documents:
             return jsonify({
                 'success': False,
-                'error': f'Maximum {MAX_BATCH_DOCUMENTS} documents allowed for batch analysis'
+                'error': f'Maximum {max_documents} documents allowed for batch analysis'
             }), 400
 
         if not document_ids or len(document_ids) < 2:
@@ -525,16 +561,42 @@ def batch_similarity_analysis() -> Response | tuple[Response, int]:
                 'error': 'Insufficient accessible documents'
             }), 403
 
-        similarity_matrix = _build_similarity_matrix(accessible_docs, similarity_threshold)
-        document_metadata = _extract_document_metadata(accessible_docs)
+        # Vectorize once; the matrix is produced block by block from one sparse product each
+        similarity_blocks = document_clustering_service.pairwise_similarity_blocks(
+            accessible_docs, block_size=SIMILARITY_BLOCK_SIZE
+        )
+        if output_mode == 'top_k':
+            def build_rows(row_offset, block):
+                return _build_top_k_rows(row_offset, block, accessible_docs, similarity_threshold, top_k)
+        else:
+            def build_rows(row_offset, block):
+                return _build_dense_rows(row_offset, block, accessible_docs, similarity_threshold)
+
+        summary = {
+            'documents': _extract_document_metadata(accessible_docs),
+            'threshold': similarity_threshold,
+            'output': output_mode,
+            'top_k': top_k if output_mode == 'top_k' else None,
+            'documents_analyzed': len(accessible_docs)
+        }
+
+        if stream:
+            return Response(
+                stream_with_context(_stream_similarity_rows(
+                    {'success': True, 'batch_similarity': summary}, similarity_blocks, build_rows
+                )),
+                mimetype='application/x-ndjson'
+            )
+
+        similarity_matrix = []
+        for row_offset, block in similarity_blocks:
+            similarity_matrix.extend(build_rows(row_offset, block))
 
         return jsonify({
             'success': True,
             'batch_similarity': {
-                'documents': document_metadata,
-                'similarity_matrix': similarity_matrix,
-                'threshold': similarity_threshold,
-                'documents_analyzed': len(accessible_docs)
+                **summary,
+                'similarity_matrix': similarity_matrix
             }
         })
 
@@ -663,4 +725,122 @@ def get_clustering_recommendations(document_id: int) -> Response | tuple[Respons
         return jsonify({
             'success': False,
             'error': 'Failed to generate clustering recommendations'
-        }), 500
\ No newline at end of file
+        }), 500
+
+@clustering_bp.route('/clustering/feature-store', methods=['GET'])
+@limiter.limit("30 per minute")
+@admin_required
+def get_feature_store_status() -> Response | tuple[Response, int]:
+    """
+    Get TF-IDF feature store versions and vector coverage (admin only)
+    """
+    try:
+        return jsonify({
+            'success': True,
+            'feature_store': tfidf_feature_store.get_status()
+        })
+
+    except Exception as e:
+        logger.error(f"Error getting feature store status: {e}")
+        return jsonify({
+            'success': False,
+            'error': 'Failed to get feature store status'
+        }), 500
+
+@clustering_bp.route('/clustering/feature-store/rebuild', methods=['POST'])
+@limiter.limit("5 per hour")
+@admin_required
+def rebuild_feature_store() -> Response | tuple[Response, int]:
+    """
+    Fit a new TF-IDF feature store version on the whole corpus (admin only)
+    """
+    try:
+        if not document_clustering_service.is_available():
+            return jsonify({
+                'success': False,
+                'error': 'Document clustering service is not available'
+            }), 503
+
+        data = request.get_json(silent=True) or {}
+        batch_size = data.get('batch_size', 500)
+        if not isinstance(batch_size, int) or batch_size < 1 or batch_size > 5000:
+            return jsonify({
+                'success': False,
+                'error': 'batch_size must be an integer between 1 and 5000'
+            }), 400
+
+        rebuild_results = tfidf_feature_store.rebuild(batch_size=batch_size)
+
+        if 'error' in rebuild_results:
+            return jsonify({
+                'success': False,
+                'error': rebuild_results['error']
+            }), 400
+
+        return jsonify({
+            'success': True,
+            'rebuild': rebuild_results
+        })
+
+    except Exception as e:
+        logger.error(f"Error rebuilding feature store: {e}")
+        return jsonify({
+            'success': False,
+            'error': 'Failed to rebuild feature store'
+        }), 500
+
+@clustering_bp.route('/clustering/duplicate-index', methods=['GET'])
+@limiter.limit("30 per minute")
+@admin_required
+def get_duplicate_index_status() -> Response | tuple[Response, int]:
+    """
+    Get MinHash/LSH duplicate index parameters and coverage (admin only)
+    """
+    try:
+        return jsonify({
+            'success': True,
+            'duplicate_index': minhash_index.get_status()
+        })
+
+    except Exception as e:
+        logger.error(f"Error getting duplicate index status: {e}")
+        return jsonify({
+            'success': False,
+            'error': 'Failed to get duplicate index status'
+        }), 500
+
+@clustering_bp.route('/clustering/duplicate-index/rebuild', methods=['POST'])
+@limiter.limit("5 per hour")
+@admin_required
+def rebuild_duplicate_index() -> Response | tuple[Response, int]:
+    """
+    Backfill missing or stale MinHash signatures (admin only)
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        batch_size = data.get('batch_size', 500)
+        if not isinstance(batch_size, int) or batch_size < 1 or batch_size > 5000:
+            return jsonify({
+                'success': False,
+                'error': 'batch_size must be an integer between 1 and 5000'
+            }), 400
+
+        rebuild_results = minhash_index.rebuild(batch_size=batch_size, full=bool(data.get('full', False)))
+
+        if 'error' in rebuild_results:
+            return jsonify({
+                'success': False,
+                'error': rebuild_results['error']
+            }), 400
+
+        return jsonify({
+            'success': True,
+            'rebuild': rebuild_results
+        })
+
+    except Exception as e:
+        logger.error(f"Error rebuilding duplicate index: {e}")
+        return jsonify({
+            'success': False,
+            'error': 'Failed to rebuild duplicate index'
+        }), 500
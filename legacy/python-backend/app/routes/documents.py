@@ -5,7 +5,7 @@ from pydantic import ValidationError
 from app import db, limiter
 from app.models.document import Document
 from app.utils.auth import get_current_user_id
-from app.utils.responses import get_or_404
+from app.utils.responses import build_pagination_response, get_or_404, InvalidCursorError
 from app.schemas.document import DocumentCreate, DocumentUpdate
 import bleach
 import logging
@@ -162,29 +162,38 @@ def list_documents():
         current_user_id = get_current_user_id()
 
         tags_filter = request.args.getlist('tags')
+        # Fuzzy: also match titles similar to the search (typos), most similar first
+        fuzzy = request.args.get('fuzzy', 'false').lower() == 'true'
+        visible_private = include_private and current_user_id is not None
 
-        pagination = Document.search_documents(
-            search, page, per_page,
+        query = Document.search_query(
+            search,
             user_id=current_user_id,
-            include_private=include_private and current_user_id is not None,
-            tags=tags_filter if tags_filter else None
-        )
-        # Use lite serialization for list views to avoid N+1 queries
-        documents = [doc.to_dict_lite() for doc in pagination.items]
-
-        return jsonify({
-            'documents': documents,
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total': pagination.total,
-                'pages': pagination.pages,
-                'has_next': pagination.has_next,
-                'has_prev': pagination.has_prev
-            },
-            'search_query': search,
-            'include_private': include_private and current_user_id is not None
-        })
+            include_private=visible_private,
+            tags=tags_filter if tags_filter else None,
+            fuzzy=fuzzy
+        ).options(*Document.profile_options('list'))
+        try:
+            response = build_pagination_response(
+                query, page, per_page,
+                # Lite serialization over the 'list' profile: no bodies, tags in one query
+                page_serializer=Document.profile_serializer('list'),
+                items_key='documents', wrap_pagination=True,
+                # Fuzzy results are ordered by similarity, so they page by number only
+                sort_column=None if fuzzy else Document.updated_at,
+                cursor=request.args.get('cursor') or None, count=request.args.get('count'),
+                extra_fields={'search_query': search, 'include_private': visible_private}
+            )
+        except InvalidCursorError as e:
+            return jsonify({'error': str(e)}), 400
+
+        # Nothing found: suggest similar titles
+        response['did_you_mean'] = []
+        if search and not response['documents'] and not response['pagination']['has_prev']:
+            response['did_you_mean'] = Document.did_you_mean(search, user_id=current_user_id,
+                                                             include_private=visible_private)
+
+        return jsonify(response)
 
     except Exception as e:
         logger.error("Error listing documents: %s", e)
@@ -1,12 +1,17 @@
 """Full-text search endpoints for documents."""
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required
-from sqlalchemy import func, text, or_
+from sqlalchemy import func, null, or_
 from app import db, limiter
 from app.models.document import Document
 from app.utils.auth import get_current_user_id
+from app.utils.constants import (
+    SEARCH_HEADLINE_MAX_CHARS, SEARCH_HEADLINE_MAX_WORDS,
+    SEARCH_HEADLINE_MIN_WORDS, SEARCH_HEADLINE_MAX_FRAGMENTS
+)
 import bleach
 import logging
+import math
 
 logger = logging.getLogger(__name__)
 
@@ -14,7 +19,7 @@ documents_search_bp = Blueprint('documents_search', __name__)
 
 
 def _build_search_query(query_text, current_user_id, include_private):
-    """Build PostgreSQL full-text search query"""
+    """Build PostgreSQL full-text search query yielding (document, rank) rows"""
     base_query = Document.query
 
     # SECURITY: Authorization logic for document visibility
@@ -33,55 +38,62 @@ def _build_search_query(query_text, current_user_id, include_private):
         # Fall back to public only to prevent authorization bypass
         base_query = base_query.filter(Document.is_public == True)
 
-    search_vector = func.to_tsvector('english',
-        func.coalesce(Document.title, '') + ' ' +
-        func.coalesce(Document.markdown_content, '')
-    )
-    search_query = func.plainto_tsquery('english', query_text)
-    rank = func.ts_rank(search_vector, search_query)
+    # Match and rank against the stored, GIN-indexed weighted vector
+    match, rank = Document.fulltext_match(query_text)
+    return base_query.filter(match), rank.label('relevance_score')
 
-    filtered_query = base_query.filter(search_vector.op('@@')(search_query))
-    ordered_query = filtered_query.order_by(rank.desc())
 
-    return ordered_query, rank
+def _headline_options(args):
+    """ts_headline fragment settings from request args, clamped to safe ranges"""
+    max_words = min(200, max(5, args.get('headline_max_words', SEARCH_HEADLINE_MAX_WORDS, type=int)))
+    min_words = min(max_words - 1, max(1, args.get('headline_min_words', SEARCH_HEADLINE_MIN_WORDS, type=int)))
+    max_fragments = min(10, max(0, args.get('headline_fragments', SEARCH_HEADLINE_MAX_FRAGMENTS, type=int)))
+    return (f'MaxWords={max_words}, MinWords={min_words}, MaxFragments={max_fragments}, '
+            'StartSel=<mark>, StopSel=</mark>')
 
 
-def _generate_search_headline(doc, query_text):
-    """Generate highlighted search snippet with XSS protection"""
-    # SECURITY: Only allow <mark> tags in highlight output to prevent XSS
-    HIGHLIGHT_ALLOWED_TAGS = ['mark']
+def _search_page_query(filtered_query, rank, query_text, page, per_page, headline_options=None):
+    """Query for one ranked page of (document, rank, headline) rows, run as a single statement.
 
-    headline_sql = text("""
-        SELECT ts_headline('english',
-            COALESCE(:content, ''),
-            plainto_tsquery('english', :query),
-            'MaxWords=50, MinWords=20, StartSel=<mark>, StopSel=</mark>'
+    The page is cut in a CTE first, so ts_headline only runs on the final page
+    of documents, over at most SEARCH_HEADLINE_MAX_CHARS of each body.
+    """
+    ranked = filtered_query.with_entities(Document.id.label('id'), rank)\
+        .order_by(rank.desc(), Document.id)\
+        .limit(per_page).offset((page - 1) * per_page)\
+        .cte('ranked')
+
+    if headline_options:
+        headline = func.ts_headline(
+            'english',
+            func.left(func.coalesce(Document.markdown_content, ''), SEARCH_HEADLINE_MAX_CHARS),
+            func.plainto_tsquery('english', query_text),
+            headline_options
         )
-    """)
-    try:
-        headline_result = db.session.execute(
-            headline_sql,
-            {'content': doc.markdown_content or '', 'query': query_text}
-        ).scalar()
-        # SECURITY: Sanitize output to only allow <mark> tags, preventing XSS
-        if headline_result:
-            return bleach.clean(headline_result, tags=HIGHLIGHT_ALLOWED_TAGS, strip=True)
-        return None
-    except Exception as e:
-        logger.debug("Headline generation failed: %s", e)
-        return None
+    else:
+        headline = null()
+
+    return db.session.query(Document, ranked.c.relevance_score, headline.label('headline'))\
+        .options(*Document.profile_options('list'))\
+        .join(ranked, Document.id == ranked.c.id)\
+        .order_by(ranked.c.relevance_score.desc(), Document.id)
+
 
+def _format_search_results(rows, include_highlight):
+    """Format (document, rank, headline) search rows"""
+    # SECURITY: Only allow <mark> tags in highlight output to prevent XSS
+    HIGHLIGHT_ALLOWED_TAGS = ['mark']
 
-def _format_search_results(pagination_items, rank, query_text, include_highlight):
-    """Format search results with optional highlighting"""
     results = []
-    for doc in pagination_items:
+    for doc, rank, headline in rows:
         # Use lite serialization for search results to avoid N+1 queries
         doc_dict = doc.to_dict_lite()
         doc_dict['relevance_score'] = float(rank) if rank else 0.0
 
         if include_highlight:
-            doc_dict['highlight'] = _generate_search_headline(doc, query_text)
+            # SECURITY: Sanitize output to only allow <mark> tags, preventing XSS
+            doc_dict['highlight'] = bleach.clean(headline, tags=HIGHLIGHT_ALLOWED_TAGS, strip=True) \
+                if headline else None
 
         results.append(doc_dict)
 
@@ -115,6 +127,21 @@ def search_documents_fulltext():
         type: boolean
         default: true
         description: Include search highlights
+      - name: headline_max_words
+        in: query
+        type: integer
+        default: 50
+        description: Longest highlight fragment in words (5-200)
+      - name: headline_min_words
+        in: query
+        type: integer
+        default: 20
+        description: Shortest highlight fragment in words
+      - name: headline_fragments
+        in: query
+        type: integer
+        default: 0
+        description: Number of highlight fragments (0 returns one headline; max 10)
     responses:
       200:
         description: Search results with relevance ranking
@@ -136,19 +163,24 @@ def search_documents_fulltext():
         if len(query_text) > MAX_SEARCH_QUERY_LENGTH:
             return jsonify({'error': f'Search query too long. Maximum {MAX_SEARCH_QUERY_LENGTH} characters'}), 400
 
-        ordered_query, rank = _build_search_query(query_text, current_user_id, include_private)
-        pagination = ordered_query.paginate(page=page, per_page=per_page, error_out=False)
-        results = _format_search_results(pagination.items, rank, query_text, include_highlight)
+        filtered_query, rank = _build_search_query(query_text, current_user_id, include_private)
+        total = filtered_query.with_entities(func.count(Document.id)).scalar()
+        rows = _search_page_query(
+            filtered_query, rank, query_text, page, per_page,
+            headline_options=_headline_options(request.args) if include_highlight else None
+        ).all()
+        results = _format_search_results(rows, include_highlight)
+        pages = math.ceil(total / per_page) if total else 0
 
         return jsonify({
             'documents': results,
             'pagination': {
                 'page': page,
                 'per_page': per_page,
-                'total': pagination.total,
-                'pages': pagination.pages,
-                'has_next': pagination.has_next,
-                'has_prev': pagination.has_prev
+                'total': total,
+                'pages': pages,
+                'has_next': page < pages,
+                'has_prev': page > 1
             },
             # SECURITY: Sanitize search query in response to prevent XSS reflection
             'search_query': bleach.clean(query_text, tags=[], strip=True),
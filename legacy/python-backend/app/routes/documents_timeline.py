@@ -72,13 +72,14 @@ def get_documents_by_date():
         if day is not None:
             filters.append(extract('day', Document.created_at) == day)
 
-        query = base_query.filter(and_(*filters)).order_by(Document.created_at.desc())
+        query = base_query.filter(and_(*filters)).options(*Document.profile_options('card'))
 
         return paginate_query(
             query, page, per_page,
-            serializer_func=lambda d: d.to_dict(),
+            page_serializer=Document.profile_serializer('card'),
             items_key='documents',
-            extra_fields={'date_key': date_key}
+            extra_fields={'date_key': date_key},
+            sort_column=Document.created_at
         )
 
     except Exception as e:
@@ -1,18 +1,24 @@
 from typing import Dict, Any, Optional
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
 from flask_jwt_extended import jwt_required, verify_jwt_in_request
 from app import db
 from app.models.document import Document
 from app.models.user import User
-from app.utils.auth import get_current_user_id
+from app.utils.auth import get_current_user_id, admin_required
 from app.utils.korean_text import korean_processor, process_korean_document
 from app.utils.validation import escape_like
 from app.services.opensearch_service import get_opensearch_service
+from app.services import korean_search_index
+from app.services.search_indexer import search_indexer
+from app.services import search_reindexer
+from app.services import search_index_manager
+from app.services.search_statistics import search_statistics, DEFAULT_MAX_AGE
 from app.middleware.security import rate_limit_api, rate_limit_search, validate_request_security, audit_log
 from marshmallow import Schema, fields, ValidationError
-from sqlalchemy import or_
+from sqlalchemy import or_, select
 from datetime import datetime, timezone
 import bleach
+import json
 
 korean_search_bp = Blueprint('korean_search', __name__)
 
@@ -25,6 +31,8 @@ class KoreanSearchSchema(Schema):
     date_to = fields.DateTime(allow_none=True)
     page = fields.Int(load_default=1, validate=lambda x: x > 0)
     per_page = fields.Int(load_default=20, validate=lambda x: 1 <= x <= 100)
+    # 이전 응답의 next_cursor (OpenSearch 검색에서 깊은 페이지 조회용)
+    cursor = fields.Str(allow_none=True, load_default=None, validate=lambda x: len(x) <= 4096)
     use_opensearch = fields.Bool(load_default=False)
 
 @korean_search_bp.route('/search/korean', methods=['POST'])
@@ -59,8 +67,9 @@ def korean_text_search():
 
     try:
         # OpenSearch 사용 여부 결정
+        # 서킷 브레이커가 열려 있으면 (클러스터 장애) 기다리지 않고 PostgreSQL로 검색
         opensearch_service = get_opensearch_service()
-        if use_opensearch and opensearch_service:
+        if use_opensearch and opensearch_service and opensearch_service.is_available():
             return _search_with_opensearch(validated_data, current_user_id)
         else:
             return _search_with_postgresql(validated_data, current_user_id)
@@ -69,12 +78,7 @@ def korean_text_search():
         current_app.logger.error("Korean search failed: %s", e)
         return jsonify({'error': 'Search failed'}), 500
 
-def _search_with_opensearch(search_params: dict, user_id: Optional[int] = None) -> Any:
-    """OpenSearch를 사용한 검색"""
-    opensearch_service = get_opensearch_service()
-    if not opensearch_service:
-        return jsonify({'error': 'OpenSearch service not available'}), 503
-
+def _opensearch_filters(search_params: dict) -> Dict[str, Any]:
     filters: Dict[str, Any] = {}
     if search_params.get('tags'):
         filters['tags'] = search_params['tags']
@@ -86,14 +90,27 @@ def _search_with_opensearch(search_params: dict, user_id: Optional[int] = None)
         filters['date_to'] = search_params['date_to'].isoformat()
     if search_params.get('language') != 'auto':
         filters['language'] = search_params['language']
+    return filters
+
+def _search_with_opensearch(search_params: dict, user_id: Optional[int] = None) -> Any:
+    """OpenSearch를 사용한 검색"""
+    opensearch_service = get_opensearch_service()
+    if not opensearch_service:
+        return jsonify({'error': 'OpenSearch service not available'}), 503
 
     results = opensearch_service.search_documents(
         query=search_params['query'],
-        filters=filters,
+        filters=_opensearch_filters(search_params),
         page=search_params['page'],
         per_page=search_params['per_page'],
-        user_id=user_id
+        user_id=user_id,
+        cursor=search_params.get('cursor')
     )
+    if results.get('error_code'):
+        return jsonify({'error': results['error']}), 400
+    if results.get('error'):
+        # 클러스터 오류: 빈 결과 대신 PostgreSQL 검색 결과를 돌려준다
+        return _search_with_postgresql(search_params, user_id)
     
     return jsonify({
         'documents': results['documents'],
@@ -101,12 +118,53 @@ def _search_with_opensearch(search_params: dict, user_id: Optional[int] = None)
             'page': results['page'],
             'per_page': results['per_page'],
             'total': results['total'],
-            'pages': results['pages']
+            'pages': results['pages'],
+            'next_cursor': results['next_cursor']
         },
         'search_engine': 'opensearch',
         'query_processed': True
     })
 
+@korean_search_bp.route('/search/korean/export', methods=['POST'])
+@rate_limit_search("10 per hour")
+@validate_request_security
+@audit_log("korean_search_export")
+def export_korean_search_results():
+    """검색 결과 전체를 NDJSON으로 스트리밍 (OpenSearch point-in-time 스냅샷 기준)"""
+    verify_jwt_in_request(optional=True)
+    current_user_id = get_current_user_id()
+
+    try:
+        validated_data = KoreanSearchSchema().load(request.get_json(silent=True) or {})
+    except ValidationError:
+        return jsonify({'error': 'Invalid request parameters'}), 400
+    if len(validated_data['query']) > MAX_SEARCH_QUERY_LENGTH:
+        return jsonify({'error': 'Query too long', 'max_length': MAX_SEARCH_QUERY_LENGTH}), 400
+
+    opensearch_service = get_opensearch_service()
+    if not opensearch_service:
+        return jsonify({'error': 'OpenSearch service not available'}), 503
+
+    results = opensearch_service.iter_search_results(
+        validated_data['query'], filters=_opensearch_filters(validated_data), user_id=current_user_id
+    )
+    return Response(stream_with_context(_stream_export_lines(validated_data['query'], results)),
+                    mimetype='application/x-ndjson')
+
+def _stream_export_lines(query: str, results):
+    """export 응답: header, 문서마다 한 줄, end"""
+    yield json.dumps({'type': 'header', 'query': query}, ensure_ascii=False) + '\n'
+    count = 0
+    try:
+        for document in results:
+            count += 1
+            yield json.dumps({'type': 'document', 'document': document}, ensure_ascii=False, default=str) + '\n'
+    except Exception as e:
+        current_app.logger.error("Search export failed after %d documents: %s", count, e)
+        yield json.dumps({'type': 'error', 'error': 'Export failed', 'count': count}) + '\n'
+        return
+    yield json.dumps({'type': 'end', 'count': count}) + '\n'
+
 def _search_with_postgresql(search_params: dict, user_id: Optional[int] = None) -> Any:
     """PostgreSQL을 사용한 한국어 검색"""
     query = search_params['query']
@@ -146,35 +204,43 @@ def _search_with_postgresql(search_params: dict, user_id: Optional[int] = None)
         base_query = base_query.filter(Document.updated_at <= search_params['date_to'])
     
     # 한국어 검색 수행
+    order_by = [Document.updated_at.desc()]
+    result_window = None
     if detected_language == 'korean':
         # 한국어 토큰 기반 검색
         query_tokens = korean_processor.tokenize(query)
-        # SECURITY: Limit tokens to prevent ReDoS via excessive ILIKE conditions
+        # SECURITY: Limit tokens to bound the size of the generated query
         MAX_SEARCH_TOKENS = 20
         if query_tokens:
             # Truncate to prevent performance degradation
             query_tokens = query_tokens[:MAX_SEARCH_TOKENS]
-            search_conditions = []
-            for token in query_tokens:
-                token_escaped = escape_like(token)
-                search_conditions.extend([
-                    Document.title.ilike(f"%{token_escaped}%"),
-                    Document.markdown_content.ilike(f"%{token_escaped}%")
-                ])
-
-            if search_conditions:
+            if korean_search_index.is_supported():
+                # GIN 인덱스를 사용하는 n-gram 검색, SQL에서 순위 계산
+                # 최신 일치 문서 RESULT_WINDOW개만 순위를 매겨 흔한 검색어도 빠르게 처리
+                match, rank = korean_search_index.ngram_match(query_tokens)
+                window = base_query.filter(match).with_entities(Document.id)\
+                    .order_by(Document.updated_at.desc())\
+                    .limit(korean_search_index.RESULT_WINDOW).subquery()
+                base_query = base_query.filter(Document.id.in_(select(window.c.id)))
+                order_by.insert(0, rank.desc())
+                result_window = korean_search_index.RESULT_WINDOW
+            else:
+                # tsvector가 없는 데이터베이스용 ILIKE 검색
+                search_conditions = []
+                for token in query_tokens:
+                    token_escaped = escape_like(token)
+                    search_conditions.extend([
+                        Document.title.ilike(f"%{token_escaped}%"),
+                        Document.markdown_content.ilike(f"%{token_escaped}%")
+                    ])
                 base_query = base_query.filter(or_(*search_conditions))
     else:
-        # 기본 PostgreSQL 전문 검색
-        from sqlalchemy import func
-        base_query = base_query.filter(
-            func.to_tsvector('english', Document.title + ' ' + Document.markdown_content).match(
-                func.plainto_tsquery('english', query)
-            )
-        )
+        # 기본 PostgreSQL 전문 검색 (저장된 search_vector 사용)
+        match, _ = Document.fulltext_match(query)
+        base_query = base_query.filter(match)
     
     # 페이지네이션 적용
-    paginated_results = base_query.order_by(Document.updated_at.desc()).paginate(
+    paginated_results = base_query.order_by(*order_by).paginate(
         page=page, per_page=per_page, error_out=False
     )
     
@@ -211,7 +277,8 @@ def _search_with_postgresql(search_params: dict, user_id: Optional[int] = None)
             'page': page,
             'per_page': per_page,
             'total': paginated_results.total,
-            'pages': paginated_results.pages
+            'pages': paginated_results.pages,
+            'total_capped': result_window is not None and paginated_results.total >= result_window
         },
         'search_engine': 'postgresql',
         'detected_language': detected_language
@@ -228,6 +295,22 @@ def _search_with_postgresql(search_params: dict, user_id: Optional[int] = None)
 MAX_SEARCH_QUERY_LENGTH = 500
 MAX_TAG_QUERY_LENGTH = 100
 
+@korean_search_bp.route('/search/korean/index/rebuild', methods=['POST'])
+@admin_required
+@rate_limit_api("5 per hour")
+@audit_log("rebuild_korean_search_index")
+def rebuild_korean_search_index():
+    """한국어 n-gram 검색 인덱스 재구성 (관리자 전용)"""
+    data = request.get_json(silent=True) or {}
+    batch_size = data.get('batch_size', 500)
+    if not isinstance(batch_size, int) or batch_size < 1 or batch_size > 5000:
+        return jsonify({'error': 'batch_size must be an integer between 1 and 5000'}), 400
+
+    result = korean_search_index.rebuild(batch_size=batch_size)
+    if 'error' in result:
+        return jsonify(result), 400
+    return jsonify({'success': True, 'rebuild': result})
+
 @korean_search_bp.route('/search/suggest-tags', methods=['GET'])
 @rate_limit_api("60 per minute")
 @validate_request_security
@@ -236,6 +319,8 @@ def suggest_korean_tags():
     verify_jwt_in_request(optional=True)
     query = request.args.get('q', '').strip()
     limit = min(request.args.get('limit', 10, type=int), 20)
+    # 허용하는 캐시 나이(초): 그 사이 인덱스가 바뀌었어도 이 시간 안에 계산된 결과면 그대로 쓴다
+    max_age = request.args.get('max_age', DEFAULT_MAX_AGE, type=int)
 
     if not query:
         return jsonify({'suggestions': []})
@@ -247,8 +332,9 @@ def suggest_korean_tags():
     try:
         # OpenSearch 사용 가능한 경우
         opensearch_service = get_opensearch_service()
-        if opensearch_service:
-            suggestions = opensearch_service.suggest_tags(query, limit)
+        if opensearch_service and opensearch_service.is_available():
+            # 캐시된 태그 목록에서 찾는다 (매 요청마다 집계하지 않음)
+            suggestions = search_statistics.suggest_tags(query, limit, max_age=max_age)
             return jsonify({
                 'suggestions': suggestions,
                 'source': 'opensearch'
@@ -362,12 +448,15 @@ def get_korean_search_statistics():
     """한국어 검색 통계"""
     verify_jwt_in_request(optional=True)
     current_user_id = get_current_user_id()
+    # 허용하는 캐시 나이(초): 그 사이 인덱스가 바뀌었어도 이 시간 안에 계산된 통계면 그대로 쓴다
+    max_age = request.args.get('max_age', DEFAULT_MAX_AGE, type=int)
     
     try:
-        # OpenSearch 통계 (사용 가능한 경우)
+        # OpenSearch 통계 (사용 가능한 경우): 인덱스 세대별로 캐시된 집계 결과
         opensearch_service = get_opensearch_service()
-        if opensearch_service:
-            stats = opensearch_service.get_document_statistics()
+        stats = search_statistics.get_statistics(current_user_id, max_age=max_age) \
+            if opensearch_service and opensearch_service.is_available() else None
+        if stats:
             stats['source'] = 'opensearch'
             return jsonify({'statistics': stats})
         
@@ -422,6 +511,103 @@ def get_korean_search_statistics():
         current_app.logger.error("Statistics query failed: %s", e)
         return jsonify({'error': 'Failed to get statistics'}), 500
 
+@korean_search_bp.route('/search/index/backlog', methods=['GET'])
+@admin_required
+@rate_limit_api("60 per minute")
+def get_search_index_backlog():
+    """OpenSearch 인덱싱 대기열 상태 (관리자 전용)"""
+    try:
+        backlog = search_indexer.get_backlog()
+        backlog['outbox_enabled'] = bool(current_app.config.get('SEARCH_OUTBOX_ENABLED'))
+        return jsonify({'success': True, 'backlog': backlog})
+    except Exception as e:
+        current_app.logger.error("Search index backlog query failed: %s", e)
+        return jsonify({'error': 'Failed to get search index backlog'}), 500
+
+@korean_search_bp.route('/search/index/reindex', methods=['POST'])
+@admin_required
+@rate_limit_api("5 per hour")
+@audit_log("reindex_search_documents")
+def start_search_reindex():
+    """OpenSearch 전체 재인덱싱을 백그라운드로 시작 (관리자 전용)
+
+    resume=true(기본값)이면 중단된 재인덱싱을 마지막 체크포인트부터 이어간다.
+    """
+    if get_opensearch_service() is None:
+        return jsonify({'error': 'OpenSearch is not configured'}), 503
+
+    data = request.get_json(silent=True) or {}
+    resume = data.get('resume', True)
+    batch_size = data.get('batch_size', search_reindexer.SearchReindexer.BATCH_SIZE)
+    if not isinstance(resume, bool):
+        return jsonify({'error': 'resume must be a boolean'}), 400
+    if not isinstance(batch_size, int) or batch_size < 1 or batch_size > 5000:
+        return jsonify({'error': 'batch_size must be an integer between 1 and 5000'}), 400
+
+    if not search_reindexer.start_reindex(current_app._get_current_object(), resume=resume, batch_size=batch_size):
+        return jsonify({'error': 'A reindex is already running'}), 409
+    return jsonify({'success': True, 'status': search_reindexer.get_reindex_status()}), 202
+
+@korean_search_bp.route('/search/index/reindex', methods=['GET'])
+@admin_required
+def get_search_reindex_status():
+    """재인덱싱 진행 상황과 마지막 실행 보고서 (관리자 전용)"""
+    return jsonify({'success': True, 'status': search_reindexer.get_reindex_status()})
+
+@korean_search_bp.route('/search/index/versions', methods=['GET'])
+@admin_required
+def get_search_index_versions():
+    """버전별 물리 인덱스, alias 연결 상태와 마지막 무중단 재구축 보고서 (관리자 전용)"""
+    if get_opensearch_service() is None:
+        return jsonify({'error': 'OpenSearch is not configured'}), 503
+    try:
+        versions = search_index_manager.search_index_manager.list_versions()
+        versions['last_rebuild'] = search_index_manager.search_index_manager.last_report
+        return jsonify({'success': True, **versions})
+    except Exception as e:
+        current_app.logger.error("Search index version listing failed: %s", e)
+        return jsonify({'error': 'Failed to list search index versions'}), 500
+
+@korean_search_bp.route('/search/index/versions', methods=['POST'])
+@admin_required
+@rate_limit_api("5 per hour")
+@audit_log("rebuild_search_index_version")
+def start_search_index_rebuild():
+    """새 버전 인덱스를 백그라운드로 구축하고 검증 후 alias를 교체 (관리자 전용)
+
+    재구축 중에도 검색은 기존 인덱스를 사용하며, 변경 사항은 두 인덱스에 모두 기록된다.
+    """
+    if get_opensearch_service() is None:
+        return jsonify({'error': 'OpenSearch is not configured'}), 503
+
+    data = request.get_json(silent=True) or {}
+    batch_size = data.get('batch_size', search_reindexer.SearchReindexer.BATCH_SIZE)
+    if not isinstance(batch_size, int) or batch_size < 1 or batch_size > 5000:
+        return jsonify({'error': 'batch_size must be an integer between 1 and 5000'}), 400
+
+    if not search_index_manager.start_rebuild(current_app._get_current_object(), batch_size=batch_size):
+        return jsonify({'error': 'A reindex is already running'}), 409
+    return jsonify({'success': True, 'message': 'Rebuild started'}), 202
+
+@korean_search_bp.route('/search/statistics/refresh', methods=['POST'])
+@admin_required
+@audit_log("refresh_search_statistics")
+def refresh_search_statistics():
+    """캐시된 검색 통계와 태그 목록을 새 세대로 즉시 재계산 (관리자 전용)"""
+    if get_opensearch_service() is None:
+        return jsonify({'error': 'OpenSearch is not configured'}), 503
+    result = search_statistics.refresh()
+    return jsonify({'success': True, 'refresh': result, 'metrics': search_statistics.get_metrics()})
+
+@korean_search_bp.route('/search/opensearch/metrics', methods=['GET'])
+@admin_required
+def get_opensearch_client_metrics():
+    """OpenSearch 연결 풀, 요청 지연 시간, 서킷 브레이커 상태 (관리자 전용)"""
+    opensearch_service = get_opensearch_service()
+    if opensearch_service is None:
+        return jsonify({'error': 'OpenSearch is not configured'}), 503
+    return jsonify({'success': True, 'metrics': opensearch_service.get_client_metrics()})
+
 @korean_search_bp.route('/search/health', methods=['GET'])
 @rate_limit_api("5 per minute")
 def get_search_health():
@@ -446,6 +632,7 @@ def get_search_health():
         opensearch_service = get_opensearch_service()
         if opensearch_service:
             opensearch_health = opensearch_service.health_check()
+            opensearch_health['circuit_breaker'] = opensearch_service.breaker.state
             health_info['opensearch'] = opensearch_health
         else:
             health_info['opensearch']['status'] = 'not_configured'
@@ -247,15 +247,8 @@ def _parse_org_file(parser, org_file):
     return org_doc
 
 
-def _create_document_from_org(org_doc, user_id, import_as_private, preserve_links):
+def _create_document_from_org(org_doc, markdown_content, user_id, import_as_private, preserve_links):
     """Create new document from org data"""
-    from app.utils.org_roam_parser import OrgRoamImporter
-    from app.utils.korean_text import process_korean_document
-
-    importer = OrgRoamImporter(db.session)
-    markdown_content = importer._convert_org_to_markdown(org_doc)
-    korean_processing = process_korean_document(org_doc['title'], markdown_content)
-
     document = Document(
         title=org_doc['title'],
         markdown_content=markdown_content,
@@ -276,7 +269,7 @@ def _create_document_from_org(org_doc, user_id, import_as_private, preserve_link
         'preserve_links': preserve_links
     }
 
-    return document, korean_processing
+    return document
 
 
 def _process_org_tags(document, org_doc, korean_processing, auto_tag):
@@ -308,12 +301,28 @@ def _import_org_files(org_files: list, user_id: int, import_as_private: bool,
     }
 
     try:
-        from app.utils.org_roam_parser import OrgRoamImporter
-        from app.utils.korean_text import process_korean_document
+        from app.utils.korean_text import process_korean_documents
 
+        importer = OrgRoamImporter(db.session)
+        pending = []
+        # 같은 업로드 안에서 먼저 나온 새 문서 (org-roam id 또는 제목 기준)
+        pending_new: Dict[Any, int] = {}
         for org_file in org_files:
             try:
                 org_doc = _parse_org_file(parser, org_file)
+                keys = [('title', org_doc['title'])]
+                if org_doc.get('id'):
+                    keys.insert(0, ('id', org_doc['id']))
+
+                earlier = next((pending_new[key] for key in keys if key in pending_new), None)
+                if earlier is not None:
+                    if not overwrite_existing:
+                        results['skipped'] += 1
+                    else:
+                        # 나중 파일의 내용으로 대체
+                        pending[earlier] = (org_file, org_doc, None,
+                                            importer._convert_org_to_markdown(org_doc))
+                    continue
 
                 existing_doc = None
                 if org_doc.get('id'):
@@ -331,10 +340,25 @@ def _import_org_files(org_files: list, user_id: int, import_as_private: bool,
                     results['skipped'] += 1
                     continue
 
-                importer = OrgRoamImporter(db.session)
                 markdown_content = importer._convert_org_to_markdown(org_doc)
-                korean_processing = process_korean_document(org_doc['title'], markdown_content)
+                if not existing_doc:
+                    for key in keys:
+                        pending_new[key] = len(pending)
+                pending.append((org_file, org_doc, existing_doc, markdown_content))
 
+            except Exception as e:
+                results['failed'] += 1
+                # SECURITY: Generic error message to user, detailed logging internally
+                results['errors'].append(f"Failed to import {os.path.basename(org_file)}")
+                current_app.logger.error(f"Import error for {org_file}: {e}")
+
+        # 한국어 처리는 배치로 한 번에 (문서당 형태소 분석 1회)
+        analyses = process_korean_documents(
+            (org_doc['title'], markdown_content) for _, org_doc, _, markdown_content in pending
+        )
+
+        for (org_file, org_doc, existing_doc, markdown_content), korean_processing in zip(pending, analyses):
+            try:
                 if existing_doc:
                     existing_doc.markdown_content = markdown_content
                     existing_doc.html_content = existing_doc.convert_markdown_to_html()
@@ -352,8 +376,8 @@ def _import_org_files(org_files: list, user_id: int, import_as_private: bool,
                     results['updated'] += 1
                     action = 'updated'
                 else:
-                    document, korean_processing = _create_document_from_org(
-                        org_doc, user_id, import_as_private, preserve_links
+                    document = _create_document_from_org(
+                        org_doc, markdown_content, user_id, import_as_private, preserve_links
                     )
                     db.session.add(document)
                     existing_doc = document
@@ -473,10 +497,13 @@ def get_org_roam_documents():
         base_query = Document.query.filter(
             Document.user_id == current_user_id,
             Document.document_metadata.has_key('org_roam_id')  # org-roam ID가 있는 문서
-        )
+        ).options(*Document.profile_options('card', 'document_metadata'))
         
-        def serialize_org_roam_doc(doc):
-            doc_dict = doc.to_dict()
+        def serialize_org_roam_docs(docs):
+            docs_data = Document.profile_serializer('card')(docs)
+            return [add_org_roam_info(doc, doc_dict) for doc, doc_dict in zip(docs, docs_data)]
+
+        def add_org_roam_info(doc, doc_dict):
             metadata = doc.document_metadata or {}
             doc_dict['org_roam_info'] = {
                 'org_roam_id': metadata.get('org_roam_id'),
@@ -490,11 +517,11 @@ def get_org_roam_documents():
             }
             return doc_dict
 
-        query = base_query.order_by(Document.updated_at.desc())
         return paginate_query(
-            query, page, per_page,
-            serializer_func=serialize_org_roam_doc,
-            items_key='documents'
+            base_query, page, per_page,
+            page_serializer=serialize_org_roam_docs,
+            items_key='documents',
+            sort_column=Document.updated_at
         )
         
     except Exception as e:
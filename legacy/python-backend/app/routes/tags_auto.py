@@ -157,6 +157,8 @@ def get_tagless_documents() -> Response | tuple[Response, int]:
             )
         else:
             query = query.filter(Document.is_public == True)
+        # Auto-tag detection reads the markdown body; the rendered HTML stays unloaded
+        query = query.options(*Document.profile_options('list', 'markdown_content'))
 
         def serialize_with_preview(doc):
             doc_dict = doc.to_dict_lite()
@@ -164,12 +166,12 @@ def get_tagless_documents() -> Response | tuple[Response, int]:
             doc_dict['preview_auto_tags'] = detect_auto_tags(content)
             return doc_dict
 
-        query = query.order_by(Document.created_at.desc())
         return paginate_query(
             query, page, per_page,
             serializer_func=serialize_with_preview,
             items_key='documents',
-            extra_fields={'include_private': include_private and current_user_id is not None}
+            extra_fields={'include_private': include_private and current_user_id is not None},
+            sort_column=Document.created_at
         )
 
     except Exception as e:
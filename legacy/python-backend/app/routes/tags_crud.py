@@ -7,7 +7,7 @@ from app.models.tag import Tag
 from app.models.document import Document
 from app.schemas.tag import TagCreate, TagUpdate
 from app.utils.auth import get_current_user_id
-from app.utils.responses import success_response, error_response
+from app.utils.responses import build_pagination_response, success_response, error_response, InvalidCursorError
 from app.utils.validation import format_validation_errors, escape_like
 import bleach
 import logging
@@ -135,27 +135,26 @@ def get_tag(slug: str) -> Response | tuple[Response, int]:
         current_user_id = get_current_user_id()
         include_private = request.args.get('include_private', 'false').lower() == 'true'
 
-        pagination = Document.search_documents(
-            '', page, per_page,
+        query = Document.search_query(
+            '',
             user_id=current_user_id,
             include_private=include_private and current_user_id is not None,
             tags=[slug]
-        )
-
-        documents = [doc.to_dict_lite() for doc in pagination.items]
+        ).options(*Document.profile_options('list'))
 
-        return success_response({
-            'tag': tag.to_dict(),
-            'documents': documents,
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total': pagination.total,
-                'pages': pagination.pages,
-                'has_next': pagination.has_next,
-                'has_prev': pagination.has_prev
-            }
-        })
+        try:
+            data = build_pagination_response(
+                query, page, per_page,
+                page_serializer=Document.profile_serializer('list'),
+                items_key='documents', wrap_pagination=True,
+                extra_fields={'tag': tag.to_dict()},
+                sort_column=Document.updated_at,
+                cursor=request.args.get('cursor') or None, count=request.args.get('count')
+            )
+        except InvalidCursorError as e:
+            return error_response(str(e), 400)
+
+        return success_response(data)
 
     except Exception as e:
         logger.error("Error getting tag %s: %s", slug, e)
@@ -71,12 +71,12 @@ def list_templates():
                 )
             )
         
-        query = query.order_by(DocumentTemplate.updated_at.desc())
         return paginate_query(
             query, page, per_page,
             serializer_func=lambda t: t.to_dict(include_content=include_content),
             items_key='templates',
-            extra_fields={'search_query': search, 'category': category}
+            extra_fields={'search_query': search, 'category': category},
+            sort_column=DocumentTemplate.updated_at
         )
         
     except Exception as e:
@@ -418,13 +418,13 @@ def get_my_templates():
         per_page = max(1, min(per_page, 100))
         include_content = request.args.get('include_content', 'false').lower() == 'true'
 
-        query = DocumentTemplate.query.filter_by(created_by=current_user_id)\
-            .order_by(DocumentTemplate.updated_at.desc())
+        query = DocumentTemplate.query.filter_by(created_by=current_user_id)
 
         return paginate_query(
             query, page, per_page,
             serializer_func=lambda t: t.to_dict(include_content=include_content),
-            items_key='templates'
+            items_key='templates',
+            sort_column=DocumentTemplate.updated_at
         )
 
     except Exception as e:
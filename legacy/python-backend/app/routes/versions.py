@@ -44,13 +44,13 @@ def get_document_versions(document_id):
         per_page = min(100, max(1, request.args.get('per_page', 20, type=int)))
         include_content = request.args.get('include_content', 'false').lower() == 'true'
         
-        query = DocumentVersion.query.filter_by(document_id=document_id)\
-            .order_by(DocumentVersion.version_number.desc())
+        query = DocumentVersion.query.filter_by(document_id=document_id)
 
         return paginate_query(
             query, page, per_page,
             serializer_func=lambda v: v.to_dict(include_content=include_content),
             items_key='versions',
+            sort_column=DocumentVersion.version_number,
             extra_fields={
                 'document': {
                     'id': document.id,
@@ -296,13 +296,13 @@ def get_document_snapshots(document_id):
         page = max(1, request.args.get('page', 1, type=int))
         per_page = min(100, max(1, request.args.get('per_page', 20, type=int)))
 
-        query = DocumentSnapshot.query.filter_by(document_id=document_id)\
-            .order_by(DocumentSnapshot.version_number.desc())
+        query = DocumentSnapshot.query.filter_by(document_id=document_id)
 
         return paginate_query(
             query, page, per_page,
             serializer_func=lambda s: s.to_dict(),
             items_key='snapshots',
+            sort_column=DocumentSnapshot.version_number,
             extra_fields={
                 'document': {
                     'id': document.id,
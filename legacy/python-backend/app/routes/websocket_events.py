@@ -4,10 +4,10 @@ WebSocket Event Handlers for Real-time Collaboration
 
 from flask import request
 from flask_socketio import emit
-from flask_jwt_extended import verify_jwt_in_request
+from flask_jwt_extended import get_jwt, verify_jwt_in_request
 from flask_jwt_extended.exceptions import NoAuthorizationError
 from jwt.exceptions import PyJWTError
-from app.services.collaboration_service import collaboration_service
+from app.services.collaboration_service import get_collaboration_service
 from app.utils.auth import get_current_user_id
 import logging
 
@@ -15,18 +15,31 @@ logger = logging.getLogger(__name__)
 
 
 def get_websocket_user_id():
-    """Get user_id from JWT in websocket context, None for anonymous users."""
+    """Get user_id from JWT in websocket context, None for anonymous users.
+
+    The token comes from the connection handshake, so it is verified once per
+    socket and cached by the collaboration service until it expires.
+    """
+    collaboration_service = get_collaboration_service()
+    identity = collaboration_service.cached_identity(request.sid)
+    if identity is not None:
+        return identity['user_id']
+
     try:
         verify_jwt_in_request()
-        return get_current_user_id()
+        user_id, claims = get_current_user_id(), get_jwt()
     except (NoAuthorizationError, PyJWTError):
-        return None  # Allow anonymous users
+        user_id, claims = None, {}  # Allow anonymous users
     except Exception as e:
         logger.debug("Unexpected error getting websocket user_id: %s", e)
         return None
+    collaboration_service.remember_identity(request.sid, user_id, claims)
+    return user_id
 
 def register_websocket_events(socketio):
     """Register WebSocket event handlers"""
+    # Looked up here, not at import: this module is imported before the service is created
+    collaboration_service = get_collaboration_service()
     
     @socketio.on('connect')
     def handle_connect():
@@ -117,9 +130,12 @@ def register_websocket_events(socketio):
                 return
 
             document_id = data.get('document_id')
-            operation = data.get('operation')
+            # Clients send the edits they buffered while awaiting an ack; a single operation is one edit
+            operations = data.get('operations')
+            if operations is None and data.get('operation'):
+                operations = [data.get('operation')]
 
-            if not document_id or not operation:
+            if not document_id or not operations:
                 emit('error', {'message': 'Document ID and operation required'})
                 return
 
@@ -141,9 +157,10 @@ def register_websocket_events(socketio):
 
             collaboration_service.handle_text_operation(
                 document_id=str(document_id),
-                operation=operation,
+                operations=operations,
                 user_id=user_id,
-                sid=request.sid
+                sid=request.sid,
+                revision=data.get('revision')
             )
             
         except Exception as e:
@@ -217,16 +234,13 @@ def register_websocket_events(socketio):
                 emit('error', {'message': 'Authentication required to save'})
                 return
 
-            success = collaboration_service.save_document(
+            # The document's owner saves it and replies with save_success or an error
+            collaboration_service.request_save(
                 document_id=str(document_id),
-                user_id=user_id
+                user_id=user_id,
+                sid=request.sid
             )
 
-            if success:
-                emit('save_success', {'message': 'Document saved'})
-            else:
-                emit('error', {'message': 'Failed to save document'})
-
         except Exception as e:
             logger.error(f"Error saving document: {e}")
             emit('error', {'message': 'Failed to save document'})
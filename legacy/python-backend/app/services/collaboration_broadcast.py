@@ -0,0 +1,134 @@
+"""
+Frame-based broadcast scheduler for collaborative editing.
+
+Operations and cursor moves are queued per room and sent as one
+`collaboration_frame` message per frame interval instead of one message per
+event. Within a frame, consecutive typing or backspacing from the same socket
+is merged into a single entry spanning its revisions, and only the latest
+cursor of each socket is sent. A frame interval of 0 sends every event as its
+own frame immediately.
+"""
+
+import logging
+import threading
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _coalesce(previous: List[Dict], steps: List[Dict]) -> Optional[List[Dict]]:
+    """One step equivalent to previous followed by steps, for runs of typing or backspacing"""
+    if len(previous) != 1 or len(steps) != 1:
+        return None
+    last, step = previous[0], steps[0]
+    if last['type'] == step['type'] == 'insert' and step['position'] == last['position'] + len(last['text']):
+        return [{'type': 'insert', 'position': last['position'], 'text': last['text'] + step['text']}]
+    if last['type'] == step['type'] == 'delete' and step['position'] + step['length'] == last['position']:
+        return [{'type': 'delete', 'position': step['position'], 'length': last['length'] + step['length']}]
+    return None
+
+
+class BroadcastScheduler:
+    """Accumulates room broadcasts and flushes them once per frame"""
+
+    def __init__(self, socketio, frame_interval: float = 0.05):
+        self.socketio = socketio
+        self.frame_interval = frame_interval
+        self._lock = threading.Lock()
+        self._operations: Dict[str, List[Dict]] = {}  # room -> op entries, as queued; clients order by revision
+        self._cursors: Dict[str, Dict[str, Dict]] = {}  # room -> {origin: latest cursor}
+        self._senders: Dict[str, set] = {}  # room -> sids with something in the pending frame
+        self._flusher_started = False
+
+    def queue_operation(self, room: str, sid: str, origin: str, user_id: int, revision: int,
+                        operations: List[Dict]) -> None:
+        """Queue committed steps; revision is the one they were committed at"""
+        with self._lock:
+            self._senders.setdefault(room, set()).add(sid)
+            entries = self._operations.setdefault(room, [])
+            last = entries[-1] if entries else None
+            merged = None
+            if last and last['origin'] == origin and last['revision'] == revision - 1:
+                merged = _coalesce(last['operations'], operations)
+            if merged is not None:
+                last['operations'] = merged
+                last['revision'] = revision
+            else:
+                entries.append({
+                    'base_revision': revision - 1,
+                    'revision': revision,
+                    'user_id': user_id,
+                    'origin': origin,
+                    'operations': operations
+                })
+        self._schedule(room)
+
+    def queue_cursor(self, room: str, sid: str, origin: str, cursor: Dict) -> None:
+        """Queue a socket's cursor; replaces any earlier one from it in this frame.
+
+        The cursor dict is read when the frame is sent, so position updates
+        made to it in place (as operations shift text) are picked up.
+        """
+        with self._lock:
+            self._senders.setdefault(room, set()).add(sid)
+            self._cursors.setdefault(room, {})[origin] = cursor
+        self._schedule(room)
+
+    def _schedule(self, room: str) -> None:
+        if self.frame_interval <= 0:
+            self.flush(room)
+            return
+        if not self._flusher_started:
+            with self._lock:
+                if self._flusher_started:
+                    return
+                self._flusher_started = True
+            self.socketio.start_background_task(self._run)
+
+    def _run(self) -> None:
+        """Flush every frame until a flush leaves nothing pending; the next queued event restarts it"""
+        while True:
+            self.socketio.sleep(self.frame_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing collaboration frames: {e}")
+            with self._lock:
+                if not self._operations and not self._cursors:
+                    self._flusher_started = False
+                    return
+
+    def flush(self, room: Optional[str] = None) -> None:
+        """Send pending frames, for one room or all of them"""
+        with self._lock:
+            rooms = [room] if room is not None else list(set(self._operations) | set(self._cursors))
+            frames = [(name, self._operations.pop(name, []), self._cursors.pop(name, {}),
+                       self._senders.pop(name, set())) for name in rooms]
+
+        for name, operations, cursors, senders in frames:
+            if not operations and not cursors:
+                continue
+            # A frame holding one socket's events only (a lone typist, every per-event frame) skips its echo
+            self.socketio.emit('collaboration_frame', {
+                'operations': operations,
+                'cursors': [
+                    {
+                        'origin': origin,
+                        'user_id': cursor['user_id'],
+                        'username': cursor['username'],
+                        'cursor_data': {
+                            'position': cursor['position'],
+                            'selection_start': cursor['selection_start'],
+                            'selection_end': cursor['selection_end']
+                        }
+                    }
+                    for origin, cursor in cursors.items()
+                ]
+            }, room=name, namespace='/', skip_sid=next(iter(senders)) if len(senders) == 1 else None)
+
+    def discard(self, room: str) -> None:
+        """Drop anything pending for a room that has emptied"""
+        with self._lock:
+            self._operations.pop(room, None)
+            self._cursors.pop(room, None)
+            self._senders.pop(room, None)
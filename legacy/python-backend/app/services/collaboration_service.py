@@ -3,24 +3,49 @@ Real-time Collaboration Service
 Manages WebSocket connections and document collaboration
 """
 
-from flask_socketio import SocketIO, emit, join_room, leave_room
+from flask_socketio import SocketIO
+from sqlalchemy import event, inspect as sa_inspect
 from app.models.document import Document
 from app.models.user import User
+from app.services.collaboration_broadcast import BroadcastScheduler
+from app.services.collaboration_state import CollaborationStateBackend, InMemoryStateBackend, shard_for
+from app.services.operational_transform import fits, to_primitives, transform
+from app.services.text_buffer import TextBuffer, map_position
 from app import db
 import logging
 import json
+import secrets
 import threading
 from collections import deque
 from datetime import datetime, timezone
-from typing import Dict, List, Optional, Deque
+from typing import Dict, List, Optional, Deque, Tuple
 import time
 import bleach
 
 logger = logging.getLogger(__name__)
 
+
+class StaleRevisionError(Exception):
+    """An operation's base revision has already dropped out of the kept history"""
+
+
 class CollaborationService:
-    # SECURITY: Limit operation queue size to prevent unbounded memory growth
+    """Collaborative editing sessions, sharded across workers by document.
+
+    Socket-level checks (identity, rate limits, input validation) run on the
+    worker holding the socket. Everything else about a document runs on the
+    worker that owns its shard, which keeps a replica of the session (text,
+    recent history, cursors, socket permissions) and is the only writer of
+    the document's log in the shared state backend; other workers forward
+    their commands for it through the backend's command queues.
+    """
+
+    # SECURITY: Limit operation history size to prevent unbounded memory growth
     MAX_OPERATION_QUEUE_SIZE = 1000
+    # Revisions between stored snapshots; kept below the shared log's length so a new owner can replay
+    SNAPSHOT_INTERVAL = 500
+    # Rebases retried when another worker appended to the log first
+    MAX_COMMIT_ATTEMPTS = 3
 
     # SECURITY: Rate limiting and connection limits
     MAX_CONNECTIONS_PER_USER = 5  # Maximum concurrent connections per user
@@ -28,19 +53,33 @@ class CollaborationService:
     CURSOR_UPDATE_THROTTLE_MS = 100  # Minimum ms between cursor updates
     MAX_ACTIVE_SESSIONS = 1000  # Maximum total active sessions
 
+    # Authorization and identity resolved once per socket; changes to the document's owner
+    # or visibility invalidate it, and this TTL bounds anything that slips past (seconds)
+    ACCESS_CACHE_TTL = 300
+
     # SECURITY: Cursor data validation limits
     MAX_CURSOR_POSITION = 10000000  # 10M character limit
     MAX_CURSOR_USERNAME_LENGTH = 100
 
-    def __init__(self, socketio: SocketIO):
+    def __init__(self, socketio: SocketIO, frame_interval: float = 0,
+                 state: Optional[CollaborationStateBackend] = None, worker_index: int = 0, worker_count: int = 1):
         self.socketio = socketio
+        # Room broadcasts of operations and cursors go out once per frame
+        self.broadcasts = BroadcastScheduler(socketio, frame_interval)
+        # Sessions, presence, op logs, revisions and connection counts, shared by all workers
+        self.state = state if state is not None else InMemoryStateBackend()
+        self.worker_index = worker_index
+        self.worker_count = worker_count
+        # Replicas of the sessions this worker owns
         self.active_sessions: Dict[str, Dict] = {}  # document_id -> session info
-        self.user_cursors: Dict[str, Dict] = {}  # document_id -> {user_id: cursor_info}
+        self.user_cursors: Dict[str, Dict] = {}  # document_id -> {sid: cursor_info}
         # SECURITY: Use bounded deque instead of unbounded list
-        self.operation_queue: Dict[str, Deque] = {}  # document_id -> deque of operations
-        # SECURITY: Track user connection counts and rate limits
-        self.user_connections: Dict[int, int] = {}  # user_id -> connection count
-        self.user_operation_counts: Dict[int, List[float]] = {}  # user_id -> list of operation timestamps
+        self.operation_queue: Dict[str, Deque] = {}  # document_id -> deque of recent log entries
+        # Sockets on this worker
+        self.socket_documents: Dict[str, set] = {}  # sid -> documents joined through this worker
+        # SECURITY: Track rate limits
+        self.user_rate_buckets: Dict[int, List[float]] = {}  # user_id -> [tokens, last refill time]
+        self.socket_identities: Dict[str, Dict] = {}  # sid -> verified JWT identity
         self.user_last_cursor_update: Dict[int, float] = {}  # user_id -> last cursor update timestamp
         # SECURITY: Threading lock for concurrent edit protection
         self._session_lock = threading.RLock()
@@ -67,27 +106,77 @@ class CollaborationService:
         logger.info(f"AUDIT_COLLABORATION: {json.dumps(log_entry)}")
 
     def _check_rate_limit(self, user_id: int) -> bool:
-        """SECURITY: Check if user has exceeded operation rate limit"""
-        current_time = time.time()
-        if user_id not in self.user_operation_counts:
-            self.user_operation_counts[user_id] = []
-
-        # Remove operations older than 1 minute
-        self.user_operation_counts[user_id] = [
-            t for t in self.user_operation_counts[user_id]
-            if current_time - t < 60
-        ]
-
-        if len(self.user_operation_counts[user_id]) >= self.OPERATION_RATE_LIMIT:
-            logger.warning(f"Rate limit exceeded for user {user_id}: {len(self.user_operation_counts[user_id])} ops/min")
+        """SECURITY: Token bucket allowing OPERATION_RATE_LIMIT operations per minute, refilled continuously"""
+        now = time.monotonic()
+        bucket = self.user_rate_buckets.get(user_id)
+        if bucket is None:
+            bucket = self.user_rate_buckets[user_id] = [float(self.OPERATION_RATE_LIMIT), now]
+
+        tokens = min(float(self.OPERATION_RATE_LIMIT),
+                     bucket[0] + (now - bucket[1]) * self.OPERATION_RATE_LIMIT / 60)
+        bucket[1] = now
+        if tokens < 1:
+            bucket[0] = tokens
+            logger.warning(f"Rate limit exceeded for user {user_id}: {self.OPERATION_RATE_LIMIT} ops/min")
             return False
 
-        self.user_operation_counts[user_id].append(current_time)
+        bucket[0] = tokens - 1
         return True
 
+    def cached_identity(self, sid: str) -> Optional[Dict]:
+        """Identity verified earlier on this socket, if it is still valid"""
+        identity = self.socket_identities.get(sid)
+        if identity is None:
+            return None
+        # SECURITY: Logout revokes the token immediately, not at the next verification
+        from app.routes.auth import is_token_revoked
+        if time.monotonic() - identity['verified_at'] >= self.ACCESS_CACHE_TTL or \
+                (identity['expires_at'] is not None and time.time() >= identity['expires_at']) or \
+                (identity['jti'] is not None and is_token_revoked(identity['jti'])):
+            self.socket_identities.pop(sid, None)
+            return None
+        return identity
+
+    def remember_identity(self, sid: str, user_id: Optional[int], claims: Dict) -> None:
+        """Cache the identity a socket's JWT resolved to, until it expires or the TTL passes"""
+        self.socket_identities[sid] = {
+            'user_id': user_id,
+            'jti': claims.get('jti'),
+            'expires_at': claims.get('exp'),
+            'verified_at': time.monotonic()
+        }
+
+    def _authorize_user(self, user_info: Dict, document: Optional[Document], user_id: int) -> None:
+        """Record what user_id may do in this document on its socket's session entry"""
+        user_info['can_edit'] = bool(document and document.can_edit(user_id))
+        user_info['access_checked_at'] = time.monotonic()
+
+    def _can_edit(self, document_id: str, user_info: Dict, user_id: int) -> bool:
+        """Edit permission cached on the socket's session entry, re-resolved when stale"""
+        if user_info['user_id'] != user_id:
+            return False
+        checked_at = user_info.get('access_checked_at')
+        if checked_at is None or time.monotonic() - checked_at >= self.ACCESS_CACHE_TTL:
+            document = db.session.get(Document, int(document_id), options=[
+                db.load_only(Document.user_id, Document.is_public), db.lazyload('*')
+            ])
+            self._authorize_user(user_info, document, user_id)
+        return user_info['can_edit']
+
+    def invalidate_document_access(self, document_id) -> None:
+        """Drop cached permissions for a document whose owner or visibility changed"""
+        self._route(str(document_id), {'kind': 'invalidate'})
+
+    def _invalidate(self, document_id: str) -> None:
+        session = self.active_sessions.get(document_id)
+        if session is None:
+            return
+        for user_info in list(session['users'].values()):
+            user_info['access_checked_at'] = None
+
     def _check_connection_limit(self, user_id: int) -> bool:
         """SECURITY: Check if user has exceeded connection limit"""
-        current_count = self.user_connections.get(user_id, 0)
+        current_count = self.state.connection_count(user_id)
         if current_count >= self.MAX_CONNECTIONS_PER_USER:
             logger.warning(f"Connection limit exceeded for user {user_id}: {current_count} connections")
             return False
@@ -95,14 +184,11 @@ class CollaborationService:
 
     def _increment_user_connections(self, user_id: int) -> None:
         """Track user connection count"""
-        self.user_connections[user_id] = self.user_connections.get(user_id, 0) + 1
+        self.state.adjust_connections(user_id, 1)
 
     def _decrement_user_connections(self, user_id: int) -> None:
         """Decrement user connection count"""
-        if user_id in self.user_connections:
-            self.user_connections[user_id] = max(0, self.user_connections[user_id] - 1)
-            if self.user_connections[user_id] == 0:
-                del self.user_connections[user_id]
+        self.state.adjust_connections(user_id, -1)
 
     def _should_throttle_cursor(self, user_id: int) -> bool:
         """SECURITY: Check if cursor update should be throttled"""
@@ -152,11 +238,70 @@ class CollaborationService:
     def handle_disconnect(self, sid):
         """Handle WebSocket disconnection"""
         logger.info(f"Client disconnected: {sid}")
-        
-        # Remove user from all document sessions
-        for document_id in list(self.active_sessions.keys()):
-            self.leave_document_session(document_id, sid)
-    
+        self.socket_identities.pop(sid, None)
+
+        # Remove user from the document sessions it joined through this worker
+        for document_id in self.socket_documents.pop(sid, set()):
+            self._route(document_id, {'kind': 'leave', 'sid': sid})
+
+    # Commands a worker runs for the documents it owns
+    COMMANDS = {
+        'join': '_join',
+        'leave': '_leave',
+        'operation': '_operate',
+        'resync': '_resync',
+        'cursor': '_move_cursor',
+        'save': '_save_requested',
+        'invalidate': '_invalidate',
+    }
+
+    def owns(self, document_id: str) -> bool:
+        """Whether this worker owns the document's shard"""
+        return shard_for(document_id, self.worker_count) == self.worker_index
+
+    def _route(self, document_id: str, command: Dict) -> None:
+        """Run a document command here if this worker owns the document, else queue it for the owner"""
+        command['document_id'] = document_id
+        if self.owns(document_id):
+            self._execute(command)
+        else:
+            self.state.push_command(shard_for(document_id, self.worker_count), command)
+
+    def _execute(self, command: Dict) -> None:
+        command = dict(command)
+        getattr(self, self.COMMANDS[command.pop('kind')])(**command)
+
+    def process_commands(self, timeout: float = 0, limit: Optional[int] = None) -> int:
+        """Run commands other workers forwarded to this one, until the queue is empty or limit is reached"""
+        processed = 0
+        while limit is None or processed < limit:
+            command = self.state.pop_command(self.worker_index, timeout if processed == 0 else 0)
+            if command is None:
+                break
+            try:
+                self._execute(command)
+            except Exception as e:
+                logger.error(f"Error running forwarded collaboration command: {e}")
+            processed += 1
+        return processed
+
+    def start_command_consumer(self, app) -> None:
+        """Run forwarded commands in a background task, for deployments with more than one worker"""
+        def consume():
+            while True:
+                try:
+                    with app.app_context():
+                        self.process_commands(timeout=1)
+                except Exception as e:
+                    logger.error(f"Error reading collaboration commands: {e}")
+                    self.socketio.sleep(1)
+
+        self.socketio.start_background_task(consume)
+
+    def _emit(self, event: str, data: Dict, to: str, skip_sid: Optional[str] = None) -> None:
+        """Emit to a socket or room on any worker (through the message queue when one is configured)"""
+        self.socketio.emit(event, data, to=to, namespace='/', skip_sid=skip_sid)
+
     def join_document_session(self, document_id: str, user_id: int, sid: str, verified_user_id: int = None):
         """Join a collaborative editing session for a document
 
@@ -169,56 +314,57 @@ class CollaborationService:
         try:
             # SECURITY: Always require verified_user_id to prevent impersonation
             if verified_user_id is None:
-                emit('error', {'message': 'Authentication required for collaboration'}, room=sid)  # type: ignore[call-arg]
+                self._emit('error', {'message': 'Authentication required for collaboration'}, sid)
                 logger.warning(f"WebSocket connection attempted without authentication: sid={sid}")
                 return
 
             # Verify user_id matches authenticated user to prevent impersonation
             if user_id != verified_user_id:
-                emit('error', {'message': 'User ID mismatch - authentication required'}, room=sid)  # type: ignore[call-arg]
+                self._emit('error', {'message': 'User ID mismatch - authentication required'}, sid)
                 logger.warning(f"WebSocket user ID mismatch: claimed={user_id}, verified={verified_user_id}")
                 return
 
+            self.socket_documents.setdefault(sid, set()).add(document_id)
+            self._route(document_id, {'kind': 'join', 'user_id': user_id, 'sid': sid})
+
+        except Exception as e:
+            logger.error(f"Error joining document session: {e}")
+            self._emit('error', {'message': 'Failed to join document session'}, sid)
+
+    def _join(self, document_id: str, user_id: int, sid: str):
+        try:
             # SECURITY: Check connection limit per user
             if not self._check_connection_limit(user_id):
-                emit('error', {'message': 'Connection limit exceeded'}, room=sid)  # type: ignore[call-arg]
+                self._emit('error', {'message': 'Connection limit exceeded'}, sid)
                 return
 
-            # SECURITY: Use session lock for thread-safe session management
-            with self._session_lock:
-                # SECURITY: Check total session limit
-                if len(self.active_sessions) >= self.MAX_ACTIVE_SESSIONS:
-                    emit('error', {'message': 'Server session limit reached'}, room=sid)  # type: ignore[call-arg]
-                    logger.warning(f"Max active sessions limit reached: {len(self.active_sessions)}")
-                    return
+            # SECURITY: Check total session limit
+            if document_id not in self.active_sessions and \
+                    self.state.session_count() >= self.MAX_ACTIVE_SESSIONS:
+                self._emit('error', {'message': 'Server session limit reached'}, sid)
+                logger.warning(f"Max active sessions limit reached: {self.state.session_count()}")
+                return
 
             # Verify document access
             document = Document.query.get_or_404(document_id)
             user = db.session.get(User, user_id) if user_id else None
 
             if not document.can_view(user_id):
-                emit('error', {'message': 'Access denied'}, room=sid)  # type: ignore[call-arg]
+                self._emit('error', {'message': 'Access denied'}, sid)
                 return
 
             # SECURITY: Use document-specific lock for initialization
             doc_lock = self._get_document_lock(document_id)
             with doc_lock:
                 # Initialize session if not exists
-                if document_id not in self.active_sessions:
-                    self.active_sessions[document_id] = {
-                        'users': {},
-                        'last_save': datetime.now(timezone.utc),
-                        'content': document.markdown_content,
-                        'version': 1,
-                        'last_editor_id': None  # SECURITY: Track actual editor
-                    }
-                    self.user_cursors[document_id] = {}
-                    # SECURITY: Bounded deque for operation queue
-                    self.operation_queue[document_id] = deque(maxlen=self.MAX_OPERATION_QUEUE_SIZE)
+                session = self._load_session(document_id, document.markdown_content)
+                if session is None:
+                    self._emit('error', {'message': 'Failed to join document session'}, sid)
+                    return
 
                 # Add user to session
                 room_name = f"document_{document_id}"
-                join_room(room_name, sid=sid)
+                self.socketio.server.enter_room(sid, room_name, namespace='/')
 
                 # SECURITY: Sanitize username for display
                 safe_username = bleach.clean(user.username if user else 'Anonymous')[:self.MAX_CURSOR_USERNAME_LENGTH]
@@ -227,35 +373,44 @@ class CollaborationService:
                     'user_id': user_id,
                     'username': safe_username,
                     'sid': sid,
-                    'joined_at': datetime.now(timezone.utc),
-                    'cursor_position': 0
+                    # Tags this socket's entries in broadcast frames so it can skip its own
+                    'origin': secrets.token_hex(8),
+                    'joined_at': datetime.now(timezone.utc).isoformat()
                 }
+                self.state.add_member(document_id, sid, user_info)
+                # Resolved once here; text operations reuse it until invalidated
+                self._authorize_user(user_info, document, user_id)
 
-                self.active_sessions[document_id]['users'][sid] = user_info
+                session['users'][sid] = user_info
 
                 # SECURITY: Track user connection count
                 self._increment_user_connections(user_id)
 
+                # Content and revision read together, so frames can be applied on top of them
+                cursors = self.user_cursors[document_id]
+                joined = {
+                    'document_id': document_id,
+                    'content': session['buffer'].text,
+                    'revision': session['revision'],
+                    'origin': user_info['origin'],
+                    'active_users': [
+                        {
+                            'username': u['username'],
+                            'user_id': u['user_id'],
+                            'cursor_position': cursors[other_sid]['position'] if other_sid in cursors else 0
+                        }
+                        for other_sid, u in session['users'].items()
+                    ]
+                }
+
             # Send current document state to new user
-            emit('document_joined', {
-                'document_id': document_id,
-                'content': self.active_sessions[document_id]['content'],
-                'version': self.active_sessions[document_id]['version'],
-                'active_users': [
-                    {
-                        'username': u['username'],
-                        'user_id': u['user_id'],
-                        'cursor_position': u.get('cursor_position', 0)
-                    }
-                    for u in self.active_sessions[document_id]['users'].values()
-                ]
-            }, room=sid)  # type: ignore[call-arg]  # type: ignore[call-arg]
+            self._emit('document_joined', joined, sid)
 
             # Notify other users
-            emit('user_joined', {
+            self._emit('user_joined', {
                 'user_id': user_id,
                 'username': safe_username
-            }, room=room_name, include_self=False)  # type: ignore[call-arg]
+            }, room_name, skip_sid=sid)
 
             # SECURITY: Audit log session join
             self._log_collaboration_operation('join_session', user_id, document_id)
@@ -264,18 +419,22 @@ class CollaborationService:
 
         except Exception as e:
             logger.error(f"Error joining document session: {e}")
-            emit('error', {'message': 'Failed to join document session'}, room=sid)  # type: ignore[call-arg]
+            self._emit('error', {'message': 'Failed to join document session'}, sid)
     
     def leave_document_session(self, document_id: str, sid: str):
         """Leave a collaborative editing session"""
+        self.socket_documents.get(sid, set()).discard(document_id)
+        self._route(document_id, {'kind': 'leave', 'sid': sid})
+
+    def _leave(self, document_id: str, sid: str):
         try:
             # SECURITY: Use document lock for thread-safe session management
             doc_lock = self._get_document_lock(document_id)
             with doc_lock:
-                if document_id not in self.active_sessions:
+                session = self._load_session(document_id)
+                if session is None:
                     return
 
-                session = self.active_sessions[document_id]
                 if sid not in session['users']:
                     return
 
@@ -287,16 +446,17 @@ class CollaborationService:
 
                 # Remove user from session
                 del session['users'][sid]
+                self.state.remove_member(document_id, sid)
                 if document_id in self.user_cursors and sid in self.user_cursors[document_id]:
                     del self.user_cursors[document_id][sid]
 
-            leave_room(room_name, sid=sid)
+            self.socketio.server.leave_room(sid, room_name, namespace='/')
 
             # Notify other users
-            emit('user_left', {
+            self._emit('user_left', {
                 'user_id': user_info['user_id'],
                 'username': user_info['username']
-            }, room=room_name)  # type: ignore[call-arg]
+            }, room_name)
 
             # SECURITY: Audit log session leave
             self._log_collaboration_operation('leave_session', user_info['user_id'], document_id)
@@ -310,82 +470,230 @@ class CollaborationService:
         except Exception as e:
             logger.error(f"Error leaving document session: {e}")
     
-    def handle_text_operation(self, document_id: str, operation: Dict, user_id: int, sid: str):
-        """Handle text editing operation"""
+    def handle_text_operation(self, document_id: str, operations: List[Dict], user_id: int, sid: str,
+                              revision: Optional[int] = None):
+        """Handle text operations, applied in order, made against the given server revision
+
+        Operations without a revision are taken to be against the latest one.
+        """
         try:
-            # SECURITY: Use document lock for thread-safe content modification
-            doc_lock = self._get_document_lock(document_id)
-            with doc_lock:
-                if document_id not in self.active_sessions:
-                    emit('error', {'message': 'Not in document session'}, room=sid)  # type: ignore[call-arg]
-                    return
+            if document_id not in self.socket_documents.get(sid, ()):
+                self._emit('error', {'message': 'Not in document session'}, sid)
+                return
 
-                session = self.active_sessions[document_id]
-                if sid not in session['users']:
-                    emit('error', {'message': 'Not in document session'}, room=sid)  # type: ignore[call-arg]
-                    return
+            # SECURITY: Check rate limit before processing operation
+            if not self._check_rate_limit(user_id):
+                self._reject_operation(document_id, sid, 'Rate limit exceeded. Please slow down.')
+                return
 
-                # SECURITY: Check rate limit before processing operation
-                if not self._check_rate_limit(user_id):
-                    emit('error', {'message': 'Rate limit exceeded. Please slow down.'}, room=sid)  # type: ignore[call-arg]
-                    return
+            # Validate operation
+            if not isinstance(operations, list) or not 0 < len(operations) <= self.MAX_OPERATIONS_PER_MESSAGE or \
+                    not all(self._validate_operation(operation) for operation in operations) or \
+                    (revision is not None and (not isinstance(revision, int) or revision < 0)):
+                self._reject_operation(document_id, sid, 'Invalid operation')
+                return
 
-                # Authorization check: verify user has edit permission
-                document = Document.query.get(document_id)
-                if not document or not document.can_edit(user_id):
-                    emit('error', {'message': 'Edit permission denied'}, room=sid)  # type: ignore[call-arg]
-                    logger.warning(f"Edit permission denied for user {user_id} on document {document_id}")
-                    return
+            steps = [step for operation in operations for step in to_primitives(operation)]
+            self._route(document_id, {'kind': 'operation', 'sid': sid, 'user_id': user_id,
+                                      'steps': steps, 'revision': revision})
 
-                # Validate operation
-                if not self._validate_operation(operation):
-                    emit('error', {'message': 'Invalid operation'}, room=sid)  # type: ignore[call-arg]
-                    return
+        except Exception as e:
+            logger.error(f"Error handling text operation: {e}")
+            self._reject_operation(document_id, sid, 'Failed to process operation')
 
-                # Apply operation to session content
-                new_content = self._apply_operation(session['content'], operation)
-                if new_content is None:
-                    emit('error', {'message': 'Failed to apply operation'}, room=sid)  # type: ignore[call-arg]
-                    return
+    def _reject_operation(self, document_id: str, sid: str, message: str) -> None:
+        """Report a rejected batch and have the owner resync the socket.
 
-                # Update session
-                session['content'] = new_content
-                session['version'] += 1
-                # SECURITY: Track the actual editor for correct attribution
-                session['last_editor_id'] = user_id
+        The client already applied the batch locally and holds it as in flight
+        until an ack; the resync replaces its text and revision so it can keep
+        editing.
+        """
+        self._emit('error', {'message': message}, sid)
+        self._route(document_id, {'kind': 'resync', 'sid': sid})
+
+    def _resync(self, document_id: str, sid: str) -> None:
+        session = self._load_session(document_id)
+        # SECURITY: Snapshots go only to sockets in the session
+        if session is None or sid not in session['users']:
+            return
+        snapshot = self._snapshot(document_id)
+        if snapshot:
+            self._emit('document_resync', snapshot, sid)
+
+    def _operate(self, document_id: str, sid: str, user_id: int, steps: List[Dict], revision: Optional[int]):
+        try:
+            session = self._load_session(document_id)
+            if session is None or sid not in session['users']:
+                self._emit('error', {'message': 'Not in document session'}, sid)
+                return
 
-                # Add to operation queue
-                operation_record = {
-                    'operation': operation,
-                    'user_id': user_id,
-                    'timestamp': datetime.now(timezone.utc),
-                    'version': session['version']
-                }
-                self.operation_queue[document_id].append(operation_record)
+            # Authorization check: verify user has edit permission
+            if not self._can_edit(document_id, session['users'][sid], user_id):
+                self._emit('error', {'message': 'Edit permission denied'}, sid)
+                self._resync(document_id, sid)
+                logger.warning(f"Edit permission denied for user {user_id} on document {document_id}")
+                return
+
+            try:
+                committed = self._commit_operation(document_id, steps, revision, user_id)
+            except StaleRevisionError:
+                # Too far behind to rebase: hand the client a fresh snapshot to restart from
+                self._resync(document_id, sid)
+                return
+            if committed is None:
+                self._emit('error', {'message': 'Failed to apply operation'}, sid)
+                self._resync(document_id, sid)
+                return
+            new_revision, operations = committed
+
+            # Acknowledge before queueing the broadcast, so the ack always reaches the sender first
+            self._emit('operation_ack', {'revision': new_revision}, sid)
 
             # Broadcast to other users (outside lock to prevent deadlock)
-            room_name = f"document_{document_id}"
-            emit('text_operation', {
-                'operation': operation,
-                'user_id': user_id,
-                'version': session['version']
-            }, room=room_name, include_self=False)  # type: ignore[call-arg]
+            self.broadcasts.queue_operation(f"document_{document_id}", sid, session['users'][sid]['origin'],
+                                            user_id, new_revision, operations)
 
             # Auto-save periodically (uses last_editor_id for correct attribution)
             self._auto_save_if_needed(document_id)
 
         except Exception as e:
             logger.error(f"Error handling text operation: {e}")
-            emit('error', {'message': 'Failed to process operation'}, room=sid)  # type: ignore[call-arg]
-    
+            self._emit('error', {'message': 'Failed to process operation'}, sid)
+            self._resync(document_id, sid)
+
+    def _commit_operation(self, document_id: str, operations: List[Dict], revision: Optional[int],
+                          user_id: int) -> Optional[Tuple[int, List[Dict]]]:
+        """Rebase steps made against revision onto the head, apply and log them
+
+        Returns (new revision, steps as applied), or None if the session is gone
+        or the steps do not fit the text they claim to be based on. Raises
+        StaleRevisionError when revision is older than the kept history.
+        Acks and broadcasts are sent after the lock is released and may reach a
+        client out of order; clients apply them by revision.
+        """
+        # SECURITY: Document lock covers only the transform-and-append critical section
+        with self._get_document_lock(document_id):
+            session = self.active_sessions.get(document_id)
+            if session is None:
+                return None
+            history = self.operation_queue[document_id]
+            for _ in range(self.MAX_COMMIT_ATTEMPTS):
+                head = session['revision']
+                base = head if revision is None else revision
+                if base > head:
+                    return None
+                if head - base > len(history):
+                    raise StaleRevisionError(base)
+
+                # History holds consecutive revisions, so the ops since `base` are its tail
+                rebased = operations
+                for index in range(len(history) - (head - base), len(history)):
+                    rebased, _ = transform(rebased, history[index]['operations'])
+
+                if not fits(rebased, len(session['buffer'])):
+                    return None
+
+                entry = {
+                    'operations': rebased,
+                    # SECURITY: Track the actual editor for correct attribution
+                    'user_id': user_id,
+                    'timestamp': datetime.now(timezone.utc).isoformat(),
+                    'revision': head + 1
+                }
+                if self.state.append_operation(document_id, head, entry):
+                    self._apply_entry(document_id, entry)
+                    if entry['revision'] % self.SNAPSHOT_INTERVAL == 0:
+                        self.state.store_snapshot(document_id, session['buffer'].text, entry['revision'])
+                    return head + 1, rebased
+
+                # Another worker appended first (ownership moved while it was busy): catch up and rebase again
+                logger.warning(f"Document {document_id} log moved past revision {head}, catching up")
+                if not self._sync_session(document_id):
+                    return None
+            return None
+
+    def _apply_entry(self, document_id: str, entry: Dict) -> None:
+        """Apply a logged entry to the owned session replica"""
+        session = self.active_sessions[document_id]
+        self._apply_operation(session['buffer'], entry['operations'])
+        self._map_cursors(document_id, entry['operations'])
+        self.operation_queue[document_id].append(entry)
+        session['revision'] = entry['revision']
+        session['last_editor_id'] = entry['user_id']
+
+    def _load_session(self, document_id: str, content: Optional[str] = None) -> Optional[Dict]:
+        """The replica of an owned session, loaded from shared state the first time it is needed
+
+        With content, a session that does not exist yet is started from it.
+        Loading also picks up sessions a previous owner left in shared state,
+        with their presence; permissions are then resolved again on first use.
+        """
+        with self._get_document_lock(document_id):
+            session = self.active_sessions.get(document_id)
+            if session is not None:
+                return session
+            if content is not None:
+                self.state.open_session(document_id, content)
+            snapshot = self.state.snapshot(document_id)
+            if snapshot is None:
+                return None
+
+            text, revision = snapshot
+            self.active_sessions[document_id] = session = {
+                'users': {
+                    sid: dict(member, can_edit=False, access_checked_at=None)
+                    for sid, member in self.state.members(document_id).items()
+                },
+                'last_save': datetime.now(timezone.utc),
+                # Edits apply to the rope; the string is materialized for saves and snapshots
+                'buffer': TextBuffer(text),
+                'revision': revision,
+                'last_editor_id': None  # SECURITY: Track actual editor
+            }
+            self.user_cursors[document_id] = {}
+            # SECURITY: Bounded history; clients further behind than this must resync
+            self.operation_queue[document_id] = deque(maxlen=self.MAX_OPERATION_QUEUE_SIZE)
+            if not self._sync_session(document_id):
+                logger.error(f"Shared log for document {document_id} no longer reaches its snapshot")
+                self._discard_session(document_id)
+                return None
+            return session
+
+    def _sync_session(self, document_id: str) -> bool:
+        """Bring an owned replica up to the head of the shared log, reloading from the snapshot if it fell behind"""
+        session = self.active_sessions[document_id]
+        entries = self.state.operations_since(document_id, session['revision'])
+        if entries is None:
+            snapshot = self.state.snapshot(document_id)
+            if snapshot is None:
+                return False
+            text, revision = snapshot
+            entries = self.state.operations_since(document_id, revision)
+            if entries is None:
+                return False
+            session['buffer'] = TextBuffer(text)
+            session['revision'] = revision
+            self.operation_queue[document_id].clear()
+        for entry in entries:
+            self._apply_entry(document_id, entry)
+        return True
+
+    def _snapshot(self, document_id: str) -> Optional[Dict]:
+        """Current text and revision, read together"""
+        with self._get_document_lock(document_id):
+            session = self.active_sessions.get(document_id)
+            if session is None:
+                return None
+            return {
+                'document_id': document_id,
+                'content': session['buffer'].text,
+                'revision': session['revision']
+            }
+
     def handle_cursor_update(self, document_id: str, cursor_data: Dict, user_id: int, sid: str):
         """Handle cursor position update"""
         try:
-            if document_id not in self.active_sessions:
-                return
-
-            session = self.active_sessions[document_id]
-            if sid not in session['users']:
+            if document_id not in self.socket_documents.get(sid, ()):
                 return
 
             # SECURITY: Throttle cursor updates to prevent DoS
@@ -398,60 +706,83 @@ class CollaborationService:
                 logger.warning(f"Invalid cursor data from user {user_id}")
                 return
 
-            # Update cursor position with validated data
-            session['users'][sid]['cursor_position'] = validated_cursor.get('position', 0)
+            self._route(document_id, {'kind': 'cursor', 'sid': sid, 'user_id': user_id, 'cursor': validated_cursor})
+
+        except Exception as e:
+            logger.error(f"Error handling cursor update: {e}")
+
+    def _move_cursor(self, document_id: str, sid: str, user_id: int, cursor: Dict):
+        try:
+            session = self._load_session(document_id)
+            if session is None or sid not in session['users']:
+                return
+
+            # Cursors reported against a longer, stale copy of the text stop at its end
+            content_length = len(session['buffer'])
+            for field in ('position', 'selection_start', 'selection_end'):
+                if cursor[field] is not None:
+                    cursor[field] = min(cursor[field], content_length)
 
             if document_id not in self.user_cursors:
                 self.user_cursors[document_id] = {}
 
-            self.user_cursors[document_id][sid] = {
+            cursor = {
                 'user_id': user_id,
                 'username': session['users'][sid]['username'],
-                'position': validated_cursor.get('position', 0),
-                'selection_start': validated_cursor.get('selection_start'),
-                'selection_end': validated_cursor.get('selection_end'),
+                'position': cursor.get('position', 0),
+                'selection_start': cursor.get('selection_start'),
+                'selection_end': cursor.get('selection_end'),
                 'timestamp': datetime.now(timezone.utc)
             }
+            self.user_cursors[document_id][sid] = cursor
 
-            # Broadcast to other users with validated data only
-            room_name = f"document_{document_id}"
-            emit('cursor_update', {
-                'user_id': user_id,
-                'username': session['users'][sid]['username'],
-                'cursor_data': validated_cursor  # SECURITY: Use validated data
-            }, room=room_name, include_self=False)  # type: ignore[call-arg]
+            # Broadcast to other users with validated data only; a newer move in the same frame replaces it
+            self.broadcasts.queue_cursor(f"document_{document_id}", sid, session['users'][sid]['origin'], cursor)
 
         except Exception as e:
             logger.error(f"Error handling cursor update: {e}")
-    
+
+    def request_save(self, document_id: str, user_id: int, sid: str) -> None:
+        """Save on behalf of a socket; the owner replies with save_success or an error"""
+        self._route(document_id, {'kind': 'save', 'user_id': user_id, 'sid': sid})
+
+    def _save_requested(self, document_id: str, user_id: int, sid: str) -> None:
+        if self.save_document(document_id, user_id):
+            self._emit('save_success', {'message': 'Document saved'}, sid)
+        else:
+            self._emit('error', {'message': 'Failed to save document'}, sid)
+
     def save_document(self, document_id: str, user_id: int):
-        """Manually save document"""
+        """Manually save an owned document"""
         try:
             # SECURITY: Use document lock for thread-safe save
             doc_lock = self._get_document_lock(document_id)
             with doc_lock:
-                if document_id not in self.active_sessions:
+                session = self._load_session(document_id)
+                if session is None:
                     return False
 
-                session = self.active_sessions[document_id]
                 document = db.session.get(Document, document_id)
 
                 if not document or not document.can_edit(user_id):
                     return False
 
                 # Update document content
-                document.markdown_content = session['content']
+                document.markdown_content = session['buffer'].text
+                document.html_content = document.convert_markdown_to_html()
                 document.updated_at = datetime.now(timezone.utc)
                 db.session.commit()
 
                 session['last_save'] = datetime.now(timezone.utc)
+                self.state.store_snapshot(document_id, document.markdown_content, session['revision'],
+                                          saved_at=session['last_save'].isoformat())
 
             # Notify all users (outside lock)
             room_name = f"document_{document_id}"
-            emit('document_saved', {
+            self._emit('document_saved', {
                 'saved_by': user_id,
                 'timestamp': datetime.now(timezone.utc).isoformat()
-            }, room=room_name)  # type: ignore[call-arg]
+            }, room_name)
 
             # SECURITY: Audit log document save
             self._log_collaboration_operation('save', user_id, document_id)
@@ -470,7 +801,8 @@ class CollaborationService:
             document_id: The document session to query
             requesting_user_id: The authenticated user making the request (required for authorization)
         """
-        if document_id not in self.active_sessions:
+        session = self.state.session(document_id)
+        if session is None:
             return None
 
         # SECURITY: Require authentication and authorization
@@ -490,23 +822,23 @@ class CollaborationService:
                 logger.warning(f"User {requesting_user_id} denied session info for document {document_id}")
                 return None
 
-        session = self.active_sessions[document_id]
         return {
             'document_id': document_id,
             'active_users': [
                 {
                     'user_id': u['user_id'],
                     'username': u['username'],
-                    'joined_at': u['joined_at'].isoformat()
+                    'joined_at': u['joined_at']
                 }
-                for u in session['users'].values()
+                for u in self.state.members(document_id).values()
             ],
-            'version': session['version'],
-            'last_save': session['last_save'].isoformat()
+            'revision': session['revision'],
+            'last_save': session['last_save']
         }
     
     # SECURITY: Limits for operation validation
     MAX_TEXT_LENGTH = 100000  # 100KB limit for single operation
+    MAX_OPERATIONS_PER_MESSAGE = 1000  # Edits a client buffered while awaiting an ack
     MAX_POSITION = 10000000  # 10MB document position limit
 
     def _validate_operation(self, operation: Dict) -> bool:
@@ -554,38 +886,27 @@ class CollaborationService:
 
         return False
     
-    def _apply_operation(self, content: str, operation: Dict) -> Optional[str]:
-        """Apply text operation to content"""
+    def _apply_operation(self, buffer: TextBuffer, operations: List[Dict]) -> bool:
+        """Apply insert/delete steps to the session buffer, all or nothing"""
         try:
-            operation_type = operation['type']
-            position = operation['position']
-            
-            if position < 0 or position > len(content):
-                return None
-            
-            if operation_type == 'insert':
-                text = str(operation['text'])
-                return content[:position] + text + content[position:]
-            
-            elif operation_type == 'delete':
-                length = operation['length']
-                if position + length > len(content):
-                    return None
-                return content[:position] + content[position + length:]
-            
-            elif operation_type == 'replace':
-                length = operation['length']
-                text = str(operation['text'])
-                if position + length > len(content):
-                    return None
-                return content[:position] + text + content[position + length:]
-            
-            return None
-            
+            if not fits(operations, len(buffer)):
+                return False
+            for operation in operations:
+                buffer.apply(operation)
+            return True
+
         except Exception as e:
             logger.error(f"Error applying operation: {e}")
-            return None
-    
+            return False
+
+    def _map_cursors(self, document_id: str, operations: List[Dict]) -> None:
+        """Shift known cursors and selections past applied steps"""
+        for operation in operations:
+            for cursor in self.user_cursors.get(document_id, {}).values():
+                for field in ('position', 'selection_start', 'selection_end'):
+                    if cursor.get(field) is not None:
+                        cursor[field] = map_position(cursor[field], operation)
+
     def _auto_save_if_needed(self, document_id: str):
         """Auto-save document if needed"""
         session = self.active_sessions[document_id]
@@ -603,8 +924,8 @@ class CollaborationService:
                     if self.save_document(document_id, user_info['user_id']):
                         break
     
-    def _cleanup_session(self, document_id: str):
-        """Clean up empty session"""
+    def _discard_session(self, document_id: str):
+        """Forget the local replica of a session"""
         with self._session_lock:
             if document_id in self.active_sessions:
                 del self.active_sessions[document_id]
@@ -612,16 +933,66 @@ class CollaborationService:
                 del self.user_cursors[document_id]
             if document_id in self.operation_queue:
                 del self.operation_queue[document_id]
+
+    def _cleanup_session(self, document_id: str):
+        """Clean up empty session"""
+        self.state.close_session(document_id)
+        self._discard_session(document_id)
+        with self._session_lock:
             # SECURITY: Clean up document lock
             if document_id in self._document_locks:
                 del self._document_locks[document_id]
+        self.broadcasts.discard(f"document_{document_id}")
 
         logger.info(f"Cleaned up session for document {document_id}")
 
 # Global collaboration service instance
 collaboration_service = None
 
-def init_collaboration_service(socketio: SocketIO):
+def init_collaboration_service(socketio: SocketIO, frame_interval: float = 0,
+                               state: Optional[CollaborationStateBackend] = None,
+                               worker_index: int = 0, worker_count: int = 1):
     """Initialize collaboration service with SocketIO instance"""
     global collaboration_service
-    collaboration_service = CollaborationService(socketio)
\ No newline at end of file
+    collaboration_service = CollaborationService(socketio, frame_interval, state, worker_index, worker_count)
+
+
+def get_collaboration_service() -> Optional[CollaborationService]:
+    """The service created by init_collaboration_service, looked up at call time"""
+    return collaboration_service
+
+
+# session.info key: documents whose owner or visibility changed in this transaction
+_ACCESS_CHANGED_KEY = 'collaboration_access_changed'
+ACCESS_ATTRIBUTES = ('user_id', 'is_public')
+
+
+def _record_access_changes(session, flush_context, instances):
+    changed = {
+        obj.id for obj in session.dirty
+        if isinstance(obj, Document) and any(sa_inspect(obj).attrs[name].history.has_changes()
+                                             for name in ACCESS_ATTRIBUTES)
+    }
+    changed.update(obj.id for obj in session.deleted if isinstance(obj, Document))
+    if changed:
+        session.info.setdefault(_ACCESS_CHANGED_KEY, set()).update(changed)
+
+
+def _invalidate_committed_access(session):
+    changed = session.info.pop(_ACCESS_CHANGED_KEY, None)
+    if changed and collaboration_service is not None:
+        for document_id in changed:
+            collaboration_service.invalidate_document_access(document_id)
+
+
+def _discard_access_changes(session):
+    session.info.pop(_ACCESS_CHANGED_KEY, None)
+
+
+def register_collaboration_access_events():
+    """Register the ORM hooks that drop cached collaboration permissions when document access changes"""
+    for name, listener in (('before_flush', _record_access_changes),
+                           ('after_commit', _invalidate_committed_access),
+                           ('after_rollback', _discard_access_changes)):
+        if not event.contains(db.session, name, listener):
+            event.listen(db.session, name, listener)
\ No newline at end of file
@@ -0,0 +1,388 @@
+"""
+Shared state for collaborative editing.
+
+Sessions, presence, the operation log and revision counters live behind a
+CollaborationStateBackend so that several worker processes can serve the same
+documents. Every document is owned by one shard (see shard_for); the owning
+worker is the only one that appends to the document's log, which keeps
+per-document ordering, and the other workers forward their commands for it to
+the owner's command queue.
+
+InMemoryStateBackend serves a single process. RedisStateBackend keeps the same
+state in any Redis-protocol server, appending with a revision check so a
+worker that lost ownership cannot write over the new owner.
+"""
+
+import json
+import queue
+import threading
+import zlib
+from abc import ABC, abstractmethod
+from collections import deque
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+# Log entries kept per document for workers catching up; must reach back past the latest snapshot
+DEFAULT_HISTORY_SIZE = 1000
+
+
+def shard_for(document_id: str, shards: int) -> int:
+    """The shard that owns a document, stable across processes"""
+    return zlib.crc32(str(document_id).encode()) % max(1, shards)
+
+
+class CollaborationStateBackend(ABC):
+    """Storage for collaboration state shared between workers"""
+
+    # Sessions
+
+    @abstractmethod
+    def open_session(self, document_id: str, content: str) -> bool:
+        """Start a session at revision 0 with content as its snapshot; False if one already exists"""
+
+    @abstractmethod
+    def session(self, document_id: str) -> Optional[Dict]:
+        """{'revision', 'last_save'} for an open session"""
+
+    @abstractmethod
+    def session_count(self) -> int:
+        pass
+
+    @abstractmethod
+    def close_session(self, document_id: str) -> None:
+        """Drop a session with its snapshot, log and presence"""
+
+    @abstractmethod
+    def snapshot(self, document_id: str) -> Optional[Tuple[str, int]]:
+        """(content, revision) of the latest stored snapshot"""
+
+    @abstractmethod
+    def store_snapshot(self, document_id: str, content: str, revision: int,
+                       saved_at: Optional[str] = None) -> None:
+        """Record content as of revision, and when it was saved to the database if it was"""
+
+    # Presence
+
+    @abstractmethod
+    def add_member(self, document_id: str, sid: str, member: Dict) -> None:
+        pass
+
+    @abstractmethod
+    def remove_member(self, document_id: str, sid: str) -> int:
+        """Remove a socket from a session, returning how many remain"""
+
+    @abstractmethod
+    def members(self, document_id: str) -> Dict[str, Dict]:
+        """sid -> member for every socket in a session, on any worker"""
+
+    @abstractmethod
+    def connection_count(self, user_id: int) -> int:
+        pass
+
+    @abstractmethod
+    def adjust_connections(self, user_id: int, delta: int) -> int:
+        pass
+
+    # Operation log and revisions
+
+    @abstractmethod
+    def revision(self, document_id: str) -> int:
+        pass
+
+    @abstractmethod
+    def append_operation(self, document_id: str, revision: int, entry: Dict) -> bool:
+        """Append entry as revision + 1 if the session is still at revision"""
+
+    @abstractmethod
+    def operations_since(self, document_id: str, revision: int) -> Optional[List[Dict]]:
+        """Log entries after revision up to the head; None if the log no longer reaches back that far"""
+
+    # Commands forwarded to document owners
+
+    @abstractmethod
+    def push_command(self, shard: int, command: Dict) -> None:
+        pass
+
+    @abstractmethod
+    def pop_command(self, shard: int, timeout: float = 0) -> Optional[Dict]:
+        """Next command for a shard, waiting up to timeout seconds (0 returns at once)"""
+
+
+class InMemoryStateBackend(CollaborationStateBackend):
+    """State held in this process, for a single worker"""
+
+    def __init__(self, history_size: int = DEFAULT_HISTORY_SIZE):
+        self.history_size = history_size
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, Dict] = {}
+        self._logs: Dict[str, deque] = {}
+        self._members: Dict[str, Dict[str, Dict]] = {}
+        self._connections: Dict[int, int] = {}
+        self._queues: Dict[int, queue.Queue] = {}
+
+    def open_session(self, document_id: str, content: str) -> bool:
+        with self._lock:
+            if document_id in self._sessions:
+                return False
+            self._sessions[document_id] = {
+                'revision': 0,
+                'snapshot': content,
+                'snapshot_revision': 0,
+                'last_save': datetime.now(timezone.utc).isoformat()
+            }
+            self._logs[document_id] = deque(maxlen=self.history_size)
+            self._members[document_id] = {}
+            return True
+
+    def session(self, document_id: str) -> Optional[Dict]:
+        with self._lock:
+            session = self._sessions.get(document_id)
+            if session is None:
+                return None
+            return {'revision': session['revision'], 'last_save': session['last_save']}
+
+    def session_count(self) -> int:
+        return len(self._sessions)
+
+    def close_session(self, document_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(document_id, None)
+            self._logs.pop(document_id, None)
+            self._members.pop(document_id, None)
+
+    def snapshot(self, document_id: str) -> Optional[Tuple[str, int]]:
+        with self._lock:
+            session = self._sessions.get(document_id)
+            if session is None:
+                return None
+            return session['snapshot'], session['snapshot_revision']
+
+    def store_snapshot(self, document_id: str, content: str, revision: int,
+                       saved_at: Optional[str] = None) -> None:
+        with self._lock:
+            session = self._sessions.get(document_id)
+            if session is None:
+                return
+            session['snapshot'] = content
+            session['snapshot_revision'] = revision
+            if saved_at is not None:
+                session['last_save'] = saved_at
+
+    def add_member(self, document_id: str, sid: str, member: Dict) -> None:
+        with self._lock:
+            self._members.setdefault(document_id, {})[sid] = dict(member)
+
+    def remove_member(self, document_id: str, sid: str) -> int:
+        with self._lock:
+            members = self._members.get(document_id, {})
+            members.pop(sid, None)
+            return len(members)
+
+    def members(self, document_id: str) -> Dict[str, Dict]:
+        with self._lock:
+            return {sid: dict(member) for sid, member in self._members.get(document_id, {}).items()}
+
+    def connection_count(self, user_id: int) -> int:
+        return self._connections.get(user_id, 0)
+
+    def adjust_connections(self, user_id: int, delta: int) -> int:
+        with self._lock:
+            count = max(0, self._connections.get(user_id, 0) + delta)
+            if count:
+                self._connections[user_id] = count
+            else:
+                self._connections.pop(user_id, None)
+            return count
+
+    def revision(self, document_id: str) -> int:
+        session = self._sessions.get(document_id)
+        return session['revision'] if session else 0
+
+    def append_operation(self, document_id: str, revision: int, entry: Dict) -> bool:
+        with self._lock:
+            session = self._sessions.get(document_id)
+            if session is None or session['revision'] != revision:
+                return False
+            self._logs[document_id].append(entry)
+            session['revision'] = revision + 1
+            return True
+
+    def operations_since(self, document_id: str, revision: int) -> Optional[List[Dict]]:
+        with self._lock:
+            session = self._sessions.get(document_id)
+            if session is None:
+                return None
+            missing = session['revision'] - revision
+            log = self._logs[document_id]
+            if missing > len(log):
+                return None
+            return list(log)[len(log) - missing:] if missing > 0 else []
+
+    def _queue(self, shard: int) -> queue.Queue:
+        with self._lock:
+            return self._queues.setdefault(shard, queue.Queue())
+
+    def push_command(self, shard: int, command: Dict) -> None:
+        self._queue(shard).put(command)
+
+    def pop_command(self, shard: int, timeout: float = 0) -> Optional[Dict]:
+        try:
+            return self._queue(shard).get(timeout=timeout) if timeout > 0 else self._queue(shard).get_nowait()
+        except queue.Empty:
+            return None
+
+
+class RedisStateBackend(CollaborationStateBackend):
+    """State shared through a Redis-protocol server.
+
+    The client must be created with decode_responses=True. Keys:
+    {prefix}sessions (set of document ids), {prefix}doc:<id> (hash: revision,
+    snapshot, snapshot_revision, last_save), {prefix}doc:<id>:log (list of JSON
+    entries, oldest first), {prefix}doc:<id>:members (hash sid -> JSON),
+    {prefix}connections (hash user_id -> count), {prefix}shard:<n> (list of
+    JSON commands).
+    """
+
+    def __init__(self, client, prefix: str = 'minky:collab:', history_size: int = DEFAULT_HISTORY_SIZE):
+        self.client = client
+        self.prefix = prefix
+        self.history_size = history_size
+
+    def _key(self, *parts) -> str:
+        return self.prefix + ':'.join(str(part) for part in parts)
+
+    def open_session(self, document_id: str, content: str) -> bool:
+        key = self._key('doc', document_id)
+
+        def create(pipe):
+            if pipe.exists(key):
+                return False
+            pipe.multi()
+            pipe.hset(key, mapping={
+                'revision': 0,
+                'snapshot': content,
+                'snapshot_revision': 0,
+                'last_save': datetime.now(timezone.utc).isoformat()
+            })
+            pipe.sadd(self._key('sessions'), document_id)
+            return True
+
+        return self.client.transaction(create, key, value_from_callable=True)
+
+    def session(self, document_id: str) -> Optional[Dict]:
+        revision, last_save = self.client.hmget(self._key('doc', document_id), 'revision', 'last_save')
+        if revision is None:
+            return None
+        return {'revision': int(revision), 'last_save': last_save}
+
+    def session_count(self) -> int:
+        return self.client.scard(self._key('sessions'))
+
+    def close_session(self, document_id: str) -> None:
+        pipe = self.client.pipeline()
+        pipe.delete(self._key('doc', document_id), self._key('doc', document_id, 'log'),
+                    self._key('doc', document_id, 'members'))
+        pipe.srem(self._key('sessions'), document_id)
+        pipe.execute()
+
+    def snapshot(self, document_id: str) -> Optional[Tuple[str, int]]:
+        content, revision = self.client.hmget(self._key('doc', document_id), 'snapshot', 'snapshot_revision')
+        if revision is None:
+            return None
+        return content, int(revision)
+
+    def store_snapshot(self, document_id: str, content: str, revision: int,
+                       saved_at: Optional[str] = None) -> None:
+        key = self._key('doc', document_id)
+        mapping = {'snapshot': content, 'snapshot_revision': revision}
+        if saved_at is not None:
+            mapping['last_save'] = saved_at
+
+        def store(pipe):
+            if not pipe.exists(key):
+                return
+            pipe.multi()
+            pipe.hset(key, mapping=mapping)
+
+        self.client.transaction(store, key)
+
+    def add_member(self, document_id: str, sid: str, member: Dict) -> None:
+        self.client.hset(self._key('doc', document_id, 'members'), sid, json.dumps(member))
+
+    def remove_member(self, document_id: str, sid: str) -> int:
+        key = self._key('doc', document_id, 'members')
+        pipe = self.client.pipeline()
+        pipe.hdel(key, sid)
+        pipe.hlen(key)
+        return pipe.execute()[1]
+
+    def members(self, document_id: str) -> Dict[str, Dict]:
+        return {sid: json.loads(member)
+                for sid, member in self.client.hgetall(self._key('doc', document_id, 'members')).items()}
+
+    def connection_count(self, user_id: int) -> int:
+        return int(self.client.hget(self._key('connections'), user_id) or 0)
+
+    def adjust_connections(self, user_id: int, delta: int) -> int:
+        key = self._key('connections')
+        count = self.client.hincrby(key, user_id, delta)
+        if count <= 0:
+            self.client.hdel(key, user_id)
+        return max(0, count)
+
+    def revision(self, document_id: str) -> int:
+        return int(self.client.hget(self._key('doc', document_id), 'revision') or 0)
+
+    def append_operation(self, document_id: str, revision: int, entry: Dict) -> bool:
+        key = self._key('doc', document_id)
+        log_key = self._key('doc', document_id, 'log')
+
+        def append(pipe):
+            current = pipe.hget(key, 'revision')
+            if current is None or int(current) != revision:
+                return False
+            pipe.multi()
+            pipe.rpush(log_key, json.dumps(entry))
+            pipe.ltrim(log_key, -self.history_size, -1)
+            pipe.hset(key, 'revision', revision + 1)
+            return True
+
+        return self.client.transaction(append, key, value_from_callable=True)
+
+    def operations_since(self, document_id: str, revision: int) -> Optional[List[Dict]]:
+        key = self._key('doc', document_id)
+        log_key = self._key('doc', document_id, 'log')
+
+        def read(pipe):
+            # Reads run immediately under WATCH; the empty transaction fails if the head moved meanwhile
+            head = pipe.hget(key, 'revision')
+            if head is None:
+                return None
+            missing = int(head) - revision
+            entries = pipe.lrange(log_key, -missing, -1) if missing > 0 else []
+            pipe.multi()
+            if len(entries) < missing:
+                return None
+            return [json.loads(entry) for entry in entries]
+
+        return self.client.transaction(read, key, value_from_callable=True)
+
+    def push_command(self, shard: int, command: Dict) -> None:
+        self.client.rpush(self._key('shard', shard), json.dumps(command))
+
+    def pop_command(self, shard: int, timeout: float = 0) -> Optional[Dict]:
+        key = self._key('shard', shard)
+        if timeout > 0:
+            popped = self.client.blpop([key], timeout=timeout)
+            command = popped[1] if popped else None
+        else:
+            command = self.client.lpop(key)
+        return json.loads(command) if command is not None else None
+
+
+def create_state_backend(url: Optional[str]) -> CollaborationStateBackend:
+    """Backend for a COLLABORATION_STATE_URL: memory:// (the default) or a redis:// URL"""
+    if not url or url.startswith('memory://'):
+        return InMemoryStateBackend()
+    import redis
+    return RedisStateBackend(redis.Redis.from_url(url, decode_responses=True))
@@ -4,18 +4,21 @@ Advanced document organization using machine learning clustering algorithms
 """
 
 import logging
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Dict, Iterator, List, Optional, Tuple, Any
 from datetime import datetime, timezone
 import numpy as np
 from collections import defaultdict, Counter
 from sklearn.metrics.pairwise import cosine_similarity
 from app.models.document import Document
+from app.services.tfidf_feature_store import tfidf_feature_store
+from app.services.minhash_index import minhash_index
 
 logger = logging.getLogger(__name__)
 
 class DocumentClusteringService:
-    def __init__(self):
+    def __init__(self, use_feature_store: bool = True):
         self.sklearn_available = self._check_sklearn()
+        self.use_feature_store = use_feature_store
         self.clustering_cache = {}
         self.similarity_cache = {}
         
@@ -59,6 +62,60 @@ class DocumentClusteringService:
     def is_available(self) -> bool:
         """Check if clustering service is available"""
         return bool(self.sklearn_available)
+
+    def _vectorize_documents(self, documents: List[Document]) -> Tuple[Any, Any, Optional[int]]:
+        """
+        Vectorize documents, preferring the persistent feature store
+
+        Falls back to fitting the request-local vectorizer when no feature store
+        model has been built yet.
+
+        Returns:
+            Tuple of (tfidf_matrix, feature_names, feature_store_version)
+        """
+        if self.use_feature_store:
+            features = tfidf_feature_store.get_matrix(documents)
+            if features is not None:
+                return features.matrix, features.feature_names, features.version
+
+        texts = [doc.markdown_content or '' for doc in documents]
+        try:
+            tfidf_matrix = self.vectorizer.fit_transform(texts)
+            return tfidf_matrix, self.vectorizer.get_feature_names_out(), None
+        except ValueError:
+            # min_df/max_df cannot be satisfied by very small document sets
+            from sklearn.feature_extraction.text import TfidfVectorizer
+            small_set_vectorizer = TfidfVectorizer(
+                max_features=500,
+                stop_words='english',
+                ngram_range=(1, 2)
+            )
+            tfidf_matrix = small_set_vectorizer.fit_transform(texts)
+            return tfidf_matrix, small_set_vectorizer.get_feature_names_out(), None
+
+    def pairwise_similarity_blocks(self, documents: List[Document],
+                                   block_size: int = 128) -> Iterator[Tuple[int, np.ndarray]]:
+        """
+        Compute the pairwise cosine similarity matrix in row blocks
+
+        Documents are vectorized once up front; each block is a single sparse
+        product against the whole matrix, so memory stays at block_size x n.
+
+        Args:
+            documents: Documents forming both the rows and columns of the matrix
+            block_size: Number of rows per yielded block
+
+        Returns:
+            Iterator of (row_offset, dense similarity block) tuples
+        """
+        tfidf_matrix, _, _ = self._vectorize_documents(documents)
+        n_docs = tfidf_matrix.shape[0]
+
+        def blocks() -> Iterator[Tuple[int, np.ndarray]]:
+            for start in range(0, n_docs, block_size):
+                yield start, cosine_similarity(tfidf_matrix[start:start + block_size], tfidf_matrix)
+
+        return blocks()
     
     def cluster_documents(self, documents: List[Document], method: str = 'kmeans', 
                          n_clusters: Optional[int] = None) -> Dict[str, Any]:
@@ -82,12 +139,14 @@ class DocumentClusteringService:
         try:
             # Prepare document texts
             doc_texts = []
+            content_docs = []
             doc_metadata = []
             
             for doc in documents:
                 content = doc.markdown_content or ''
                 if content.strip():
                     doc_texts.append(content)
+                    content_docs.append(doc)
                     doc_metadata.append({
                         'id': doc.id,
                         'title': doc.title,
@@ -101,7 +160,7 @@ class DocumentClusteringService:
                 return {'error': 'Insufficient documents with content'}
             
             # Vectorize documents
-            tfidf_matrix = self.vectorizer.fit_transform(doc_texts)
+            tfidf_matrix, feature_names, feature_store_version = self._vectorize_documents(content_docs)
             
             # Determine optimal number of clusters if not specified
             if not n_clusters:
@@ -122,7 +181,7 @@ class DocumentClusteringService:
             
             # Generate cluster insights
             cluster_insights = self._generate_cluster_insights(
-                clusters, tfidf_matrix, cluster_labels
+                clusters, tfidf_matrix, cluster_labels, feature_names
             )
             
             # Calculate cluster quality metrics
@@ -138,6 +197,7 @@ class DocumentClusteringService:
                 'cluster_insights': cluster_insights,
                 'quality_metrics': quality_metrics,
                 'cluster_info': cluster_info,
+                'feature_store_version': feature_store_version,
                 'generated_at': datetime.now(timezone.utc).isoformat()
             }
             
@@ -187,12 +247,14 @@ class DocumentClusteringService:
             
             # Prepare texts
             all_texts = [target_content]
+            all_docs = [target_document]
             candidate_metadata = []
             
             for doc in candidate_documents:
                 content = doc.markdown_content or ''
                 if content.strip():
                     all_texts.append(content)
+                    all_docs.append(doc)
                     candidate_metadata.append({
                         'id': doc.id,
                         'title': doc.title,
@@ -206,7 +268,7 @@ class DocumentClusteringService:
                 return {'similar_documents': []}
             
             # Vectorize texts
-            tfidf_matrix = self.vectorizer.fit_transform(all_texts)
+            tfidf_matrix, _, feature_store_version = self._vectorize_documents(all_docs)
             
             # Calculate similarities
             target_vector = tfidf_matrix[0:1]
@@ -244,6 +306,7 @@ class DocumentClusteringService:
                 'similarity_stats': similarity_stats,
                 'candidates_analyzed': len(candidate_documents),
                 'similarity_threshold': similarity_threshold,
+                'feature_store_version': feature_store_version,
                 'generated_at': datetime.now(timezone.utc).isoformat()
             }
             
@@ -254,17 +317,29 @@ class DocumentClusteringService:
             return {'error': f'Similarity detection failed: {str(e)}'}
     
     def detect_document_duplicates(self, documents: Optional[List[Document]] = None,
-                                 similarity_threshold: float = 0.8) -> Dict[str, Any]:
+                                 similarity_threshold: float = 0.8,
+                                 document_query=None, max_documents: int = 1000) -> Dict[str, Any]:
         """
         Detect potential duplicate documents
         
         Args:
             documents: Documents to check (None for all)
             similarity_threshold: Threshold for considering documents duplicates
+            document_query: Document query to check with the MinHash/LSH index; covers
+                every matching document once the index is complete
+            max_documents: Documents loaded from document_query when falling back to
+                the pairwise TF-IDF scan
             
         Returns:
             Dictionary with duplicate detection results
         """
+        if document_query is not None:
+            if minhash_index.is_complete():
+                return self._detect_duplicates_with_index(document_query, similarity_threshold)
+            logger.info("Duplicate index incomplete, falling back to pairwise scan")
+            if documents is None:
+                documents = document_query.limit(max_documents).all()
+
         if not self.sklearn_available:
             return {'error': 'Duplicate detection requires scikit-learn'}
         
@@ -272,7 +347,7 @@ class DocumentClusteringService:
             
             # Get documents to check
             if documents is None:
-                documents = Document.query.limit(1000).all()
+                documents = Document.query.limit(max_documents).all()
             
             if len(documents) < 2:
                 return {'duplicates': []}
@@ -338,12 +413,50 @@ class DocumentClusteringService:
             return {
                 'duplicates': duplicates,
                 'duplicate_stats': duplicate_stats,
+                'method': 'pairwise_tfidf',
                 'generated_at': datetime.now(timezone.utc).isoformat()
             }
             
         except Exception as e:
             logger.error(f"Duplicate detection error: {e}")
             return {'error': f'Duplicate detection failed: {str(e)}'}
+
+    def _detect_duplicates_with_index(self, document_query, similarity_threshold: float) -> Dict[str, Any]:
+        """Detect duplicates among LSH candidates, scored by exact shingle Jaccard similarity"""
+        try:
+            results = minhash_index.find_duplicates(document_query, similarity_threshold)
+
+            duplicates = [
+                {
+                    'document1': doc1_metadata,
+                    'document2': doc2_metadata,
+                    'similarity_score': float(score),
+                    'duplicate_type': self._classify_duplicate_type(doc1_metadata, doc2_metadata, score)
+                }
+                for doc1_metadata, doc2_metadata, score in results['pairs']
+            ]
+            duplicates.sort(key=lambda x: x['similarity_score'], reverse=True)  # type: ignore[arg-type, return-value]
+
+            duplicate_stats = {
+                'total_duplicates': len(duplicates),
+                'documents_analyzed': results['documents_indexed'],
+                'candidate_pairs': results['candidate_pairs'],
+                'candidates_truncated': results['candidates_truncated'],
+                'expected_recall': results['expected_recall'],
+                'avg_similarity': float(np.mean([d['similarity_score'] for d in duplicates])) if duplicates else 0,
+                'similarity_threshold': similarity_threshold
+            }
+
+            return {
+                'duplicates': duplicates,
+                'duplicate_stats': duplicate_stats,
+                'method': 'minhash_lsh',
+                'generated_at': datetime.now(timezone.utc).isoformat()
+            }
+
+        except Exception as e:
+            logger.error(f"Indexed duplicate detection error: {e}")
+            return {'error': f'Duplicate detection failed: {str(e)}'}
     
     def _determine_optimal_clusters(self, tfidf_matrix) -> int:
         """Determine optimal number of clusters using elbow method"""
@@ -478,10 +591,10 @@ class DocumentClusteringService:
         
         return dict(clusters)
     
-    def _generate_cluster_insights(self, clusters: Dict, tfidf_matrix, cluster_labels: np.ndarray) -> Dict:
+    def _generate_cluster_insights(self, clusters: Dict, tfidf_matrix, cluster_labels: np.ndarray,
+                                   feature_names) -> Dict:
         """Generate insights about each cluster"""
         insights = {}
-        feature_names = self.vectorizer.get_feature_names_out()
         
         for cluster_id, docs in clusters.items():
             # Get documents in this cluster
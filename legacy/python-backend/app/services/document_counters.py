@@ -0,0 +1,238 @@
+"""
+Document Counters
+Denormalized comment, version and rating counters on documents, updated with
+SQL increments in the same transaction as the comment, version or rating write
+so concurrent writers never lose an update and reads never aggregate.
+"""
+
+import json
+import logging
+import time
+from typing import Any, Dict
+
+import click
+from sqlalchemy import case, event, func, inspect as sa_inspect
+from sqlalchemy.orm import object_session
+
+from app import db
+from app.models.comment import Comment, Rating
+from app.models.document import Document
+from app.models.version import DocumentVersion
+
+logger = logging.getLogger(__name__)
+
+COUNTER_COLUMNS = ('comment_count', 'version_count', 'latest_version_number', 'rating_count', 'rating_sum')
+
+# session.info key: documents whose counters changed in SQL during the flush
+_STALE_KEY = 'document_counters_stale'
+
+documents = Document.__table__
+
+
+def _increment(connection, target, document_id, **deltas):
+    """UPDATE documents SET column = column + delta; atomic under concurrent writers"""
+    values = {name: documents.c[name] + delta for name, delta in deltas.items() if delta}
+    if not values:
+        return
+    connection.execute(documents.update().where(documents.c.id == document_id).values(**values))
+    _mark_stale(target, document_id)
+
+
+def _mark_stale(target, document_id):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_STALE_KEY, set()).add(document_id)
+
+
+def _old_value(target, attribute):
+    history = sa_inspect(target).attrs[attribute].history
+    return history.deleted[0] if history.deleted else getattr(target, attribute)
+
+
+# Comments: only comments that are not (soft-)deleted are counted
+
+def _comment_inserted(mapper, connection, target):
+    if not target.is_deleted:
+        _increment(connection, target, target.document_id, comment_count=1)
+
+
+def _comment_updated(mapper, connection, target):
+    was_deleted = bool(_old_value(target, 'is_deleted'))
+    if was_deleted != bool(target.is_deleted):
+        _increment(connection, target, target.document_id, comment_count=-1 if target.is_deleted else 1)
+
+
+def _comment_deleted(mapper, connection, target):
+    if not _old_value(target, 'is_deleted'):
+        _increment(connection, target, target.document_id, comment_count=-1)
+
+
+# Ratings: count and sum, from which the average follows
+
+def _rating_inserted(mapper, connection, target):
+    _increment(connection, target, target.document_id, rating_count=1, rating_sum=target.rating)
+
+
+def _rating_updated(mapper, connection, target):
+    _increment(connection, target, target.document_id, rating_sum=target.rating - _old_value(target, 'rating'))
+
+
+def _rating_deleted(mapper, connection, target):
+    _increment(connection, target, target.document_id, rating_count=-1, rating_sum=-_old_value(target, 'rating'))
+
+
+# Versions: count and the highest version number
+
+def _version_inserted(mapper, connection, target):
+    latest = documents.c.latest_version_number
+    connection.execute(documents.update().where(documents.c.id == target.document_id).values(
+        version_count=documents.c.version_count + 1,
+        latest_version_number=case((latest < target.version_number, target.version_number), else_=latest)
+    ))
+    _mark_stale(target, target.document_id)
+
+
+def _version_deleted(mapper, connection, target):
+    versions = DocumentVersion.__table__
+    remaining_latest = db.select(func.coalesce(func.max(versions.c.version_number), 0))\
+        .where(versions.c.document_id == target.document_id).scalar_subquery()
+    connection.execute(documents.update().where(documents.c.id == target.document_id).values(
+        version_count=documents.c.version_count - 1,
+        latest_version_number=remaining_latest
+    ))
+    _mark_stale(target, target.document_id)
+
+
+def _expire_stale_counters(session, flush_context):
+    """Reload changed counters on documents already in the session the next time they are read"""
+    stale = session.info.pop(_STALE_KEY, None)
+    if not stale:
+        return
+    for document_id in stale:
+        document = session.identity_map.get(sa_inspect(Document).identity_key_from_primary_key((document_id,)))
+        if document is not None and document not in session.deleted:
+            session.expire(document, list(COUNTER_COLUMNS))
+
+
+MAPPER_EVENTS = [
+    (Comment, 'after_insert', _comment_inserted),
+    (Comment, 'after_update', _comment_updated),
+    (Comment, 'after_delete', _comment_deleted),
+    (Rating, 'after_insert', _rating_inserted),
+    (Rating, 'after_update', _rating_updated),
+    (Rating, 'after_delete', _rating_deleted),
+    (DocumentVersion, 'after_insert', _version_inserted),
+    (DocumentVersion, 'after_delete', _version_deleted),
+]
+
+
+def register_document_counter_events():
+    """Register the ORM hooks that keep document counters in step with child writes"""
+    for model, name, listener in MAPPER_EVENTS:
+        if not event.contains(model, name, listener):
+            event.listen(model, name, listener)
+    if not event.contains(db.session, 'after_flush_postexec', _expire_stale_counters):
+        event.listen(db.session, 'after_flush_postexec', _expire_stale_counters)
+
+
+def _actual_counters(document_ids) -> Dict[int, Dict[str, int]]:
+    """Counters recomputed from the child tables for a batch of documents"""
+    actual = {document_id: dict.fromkeys(COUNTER_COLUMNS, 0) for document_id in document_ids}
+
+    comments = db.session.query(Comment.document_id, func.count(Comment.id))\
+        .filter(Comment.document_id.in_(document_ids), Comment.is_deleted == False)\
+        .group_by(Comment.document_id)
+    for document_id, count in comments:
+        actual[document_id]['comment_count'] = count
+
+    versions = db.session.query(DocumentVersion.document_id, func.count(DocumentVersion.id),
+                                func.max(DocumentVersion.version_number))\
+        .filter(DocumentVersion.document_id.in_(document_ids))\
+        .group_by(DocumentVersion.document_id)
+    for document_id, count, latest in versions:
+        actual[document_id].update(version_count=count, latest_version_number=latest or 0)
+
+    ratings = db.session.query(Rating.document_id, func.count(Rating.id), func.sum(Rating.rating))\
+        .filter(Rating.document_id.in_(document_ids))\
+        .group_by(Rating.document_id)
+    for document_id, count, total in ratings:
+        actual[document_id].update(rating_count=count, rating_sum=int(total or 0))
+
+    return actual
+
+
+def repair(batch_size: int = 500, dry_run: bool = False) -> Dict[str, Any]:
+    """Recompute every document's counters from the child tables, walking documents in id batches.
+
+    Reports how many documents had drifted, per counter, with a few examples.
+    With dry_run nothing is written.
+    """
+    started = time.perf_counter()
+    scanned = 0
+    repaired = 0
+    drift = dict.fromkeys(COUNTER_COLUMNS, 0)
+    examples = []
+    last_id = 0
+
+    try:
+        while True:
+            batch = db.session.query(Document.id, *(getattr(Document, name) for name in COUNTER_COLUMNS))\
+                .filter(Document.id > last_id).order_by(Document.id).limit(batch_size).all()
+            if not batch:
+                break
+            last_id = batch[-1][0]
+            scanned += len(batch)
+
+            actual = _actual_counters([row[0] for row in batch])
+            updates = []
+            for document_id, *stored in batch:
+                expected = actual[document_id]
+                changed = {name: (value, expected[name]) for name, value in zip(COUNTER_COLUMNS, stored)
+                           if value != expected[name]}
+                if not changed:
+                    continue
+                for name in changed:
+                    drift[name] += 1
+                if len(examples) < 20:
+                    examples.append({'document_id': document_id,
+                                     **{name: {'stored': old, 'actual': new} for name, (old, new) in changed.items()}})
+                updates.append({'doc_id': document_id, **{f'new_{name}': value for name, value in expected.items()}})
+
+            repaired += len(updates)
+            if updates and not dry_run:
+                db.session.execute(
+                    documents.update().where(documents.c.id == db.bindparam('doc_id'))
+                    .values({name: db.bindparam(f'new_{name}') for name in COUNTER_COLUMNS}),
+                    updates
+                )
+            db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Document counter repair failed: {e}")
+        return {'error': 'Document counter repair failed'}
+
+    duration = time.perf_counter() - started
+    logger.info(f"Document counters: {repaired} of {scanned} documents drifted"
+                f"{' (dry run)' if dry_run else ', repaired'} in {duration:.2f}s")
+
+    return {
+        'documents_scanned': scanned,
+        'documents_drifted': repaired,
+        'drift_by_counter': drift,
+        'examples': examples,
+        'dry_run': dry_run,
+        'duration_seconds': round(duration, 3)
+    }
+
+
+def register_document_counter_cli(app):
+    """flask repair-document-counters [--batch-size N] [--dry-run]"""
+    @app.cli.command('repair-document-counters')
+    @click.option('--batch-size', default=500, show_default=True, type=click.IntRange(1, 5000))
+    @click.option('--dry-run', is_flag=True, help='Report drift without writing')
+    def repair_document_counters(batch_size, dry_run):
+        """Recompute document comment/version/rating counters and report drift"""
+        result = repair(batch_size=batch_size, dry_run=dry_run)
+        click.echo(json.dumps(result, indent=2))
+        if 'error' in result:
+            raise SystemExit(1)
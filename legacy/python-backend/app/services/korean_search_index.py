@@ -0,0 +1,138 @@
+"""
+Korean Search Index
+Character-bigram tsvector (documents.search_ngrams) for documents containing
+Hangul, so Korean searches run against a GIN index instead of ILIKE scans.
+"""
+
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import bindparam, event, func
+from sqlalchemy import inspect as sa_inspect
+
+from app import db
+from app.models.document import Document
+from app.utils.korean_text import korean_processor
+
+logger = logging.getLogger(__name__)
+
+# Longest body prefix turned into n-grams; tsvector positions stop at 16383 anyway
+NGRAM_MAX_CHARS = 100000
+# Most recent matches that get ranked; bounds the cost of very common search terms
+RESULT_WINDOW = 2000
+
+
+def ngram_text(text: Optional[str]) -> str:
+    """Space-separated n-gram tokens, fed to to_tsvector('simple', ...)"""
+    return ' '.join(korean_processor.ngram_tokens((text or '')[:NGRAM_MAX_CHARS]))
+
+
+def _weighted_vector(title_ngrams, body_ngrams):
+    return func.setweight(func.to_tsvector('simple', title_ngrams), 'A').op('||')(
+        func.setweight(func.to_tsvector('simple', body_ngrams), 'C')
+    )
+
+
+def ngram_vector(title: Optional[str], content: Optional[str]):
+    """SQL expression for the weighted n-gram vector (title A, body C), or None without Hangul"""
+    if not (korean_processor.contains_hangul(title) or korean_processor.contains_hangul(content)):
+        return None
+    return _weighted_vector(ngram_text(title), ngram_text(content))
+
+
+def ngram_match(query_tokens: List[str]) -> Tuple[Any, Any]:
+    """Match condition and rank for query tokens against documents.search_ngrams.
+
+    Each token becomes a phrase of its n-grams (so it matches as a substring of a
+    word, like the ILIKE search it replaces); tokens are OR-ed and ts_rank puts
+    documents matching more of them first.
+    """
+    tsquery = None
+    for token in query_tokens:
+        phrase = func.phraseto_tsquery('simple', ngram_text(token))
+        tsquery = phrase if tsquery is None else tsquery.op('||')(phrase)
+    return Document.search_ngrams.op('@@')(tsquery), func.ts_rank(Document.search_ngrams, tsquery)
+
+
+def is_supported(session=None) -> bool:
+    """The n-gram index needs PostgreSQL text search"""
+    bind = (session or db.session).get_bind()
+    return bind.dialect.name == 'postgresql'
+
+
+def rebuild(batch_size: int = 500) -> Dict[str, Any]:
+    """Recompute search_ngrams for every document, walking the table in id batches"""
+    if not is_supported():
+        return {'error': 'Korean n-gram index requires PostgreSQL'}
+
+    documents = Document.__table__
+    update_statement = documents.update()\
+        .where(documents.c.id == bindparam('doc_id'))\
+        .values(search_ngrams=_weighted_vector(bindparam('title_ngrams'), bindparam('body_ngrams')))
+
+    started = time.perf_counter()
+    scanned = 0
+    indexed = 0
+    last_id = 0
+
+    try:
+        while True:
+            batch = db.session.query(Document.id, Document.title, Document.markdown_content)\
+                .filter(Document.id > last_id).order_by(Document.id).limit(batch_size).all()
+            if not batch:
+                break
+            last_id = batch[-1][0]
+            scanned += len(batch)
+
+            params = []
+            for doc_id, title, content in batch:
+                # Documents without Hangul get NULL: to_tsvector(NULL) propagates
+                if korean_processor.contains_hangul(title) or korean_processor.contains_hangul(content):
+                    params.append({'doc_id': doc_id, 'title_ngrams': ngram_text(title),
+                                   'body_ngrams': ngram_text(content)})
+                    indexed += 1
+                else:
+                    params.append({'doc_id': doc_id, 'title_ngrams': None, 'body_ngrams': None})
+            db.session.execute(update_statement, params)
+            db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Korean n-gram index rebuild failed: {e}")
+        return {'error': 'Korean n-gram index rebuild failed'}
+
+    duration = time.perf_counter() - started
+    logger.info(f"Rebuilt Korean n-gram index: {indexed} of {scanned} documents in {duration:.2f}s")
+
+    return {
+        'documents_scanned': scanned,
+        'documents_indexed': indexed,
+        'duration_seconds': round(duration, 3)
+    }
+
+
+def _search_fields_changed(document: Document) -> bool:
+    attrs = sa_inspect(document).attrs
+    return attrs.title.history.has_changes() or attrs.markdown_content.history.has_changes()
+
+
+def _refresh_ngrams_before_flush(session, flush_context, instances):
+    """Write the n-gram vector together with the document it belongs to"""
+    if not is_supported(session):
+        return
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, Document):
+            continue
+        if obj not in session.new and not _search_fields_changed(obj):
+            continue
+        try:
+            obj.search_ngrams = ngram_vector(obj.title, obj.markdown_content)
+        except Exception as e:
+            # Never fail a document write because its search tokens could not be built
+            logger.warning(f"Could not build Korean search tokens for document {obj.id}: {e}")
+
+
+def register_korean_search_index_events():
+    """Register the ORM hook that maintains search_ngrams on document create/update"""
+    if not event.contains(db.session, 'before_flush', _refresh_ngrams_before_flush):
+        event.listen(db.session, 'before_flush', _refresh_ngrams_before_flush)
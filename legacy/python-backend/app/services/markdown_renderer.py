@@ -0,0 +1,452 @@
+"""
+Markdown Renderer
+Markdown to sanitized HTML with a content-addressed render cache. Rendered HTML
+is stored in the app cache (Redis in multi-process deployments) under a hash of
+the markdown and the renderer configuration, so identical content renders once
+across every worker and repeated saves, exports and restores are cache hits.
+
+Incremental rendering splits a document into top-level blocks and caches each
+block's sanitized HTML the same way, so a one-paragraph edit of a large note
+renders one block and reassembles the rest from the cache. The output is
+byte-identical to a full render; documents whose blocks are not independent
+(reference-style links, footnotes, raw HTML) always render in full.
+
+Renders larger than MARKDOWN_RENDER_OFFLOAD_CHARS run in a process pool. The
+request thread waits at most MARKDOWN_RENDER_TIMEOUT seconds; past that it gets
+escaped plain text marked as pending while the worker finishes and fills the
+cache. Callers that store the output pass on_ready to overwrite the placeholder
+once the HTML is done; until then readers swap it in from the cache.
+
+Render time and cache results are exported as Prometheus metrics.
+"""
+
+import hashlib
+import html
+import json
+import logging
+import re
+import threading
+import time
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from multiprocessing import get_context
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import bleach
+import markdown
+import pygments
+from flask import current_app, has_app_context
+from markdown.extensions.fenced_code import FencedBlockPreprocessor
+from markdown.util import ETX, STX
+from prometheus_client import Counter, Histogram
+
+from app import cache
+from app.utils.constants import RENDER_CACHE_TTL
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever rendering changes in a way the extension/tag lists don't capture
+RENDERER_VERSION = 1
+
+CACHE_KEY = 'markdown_render:{digest}'
+BLOCK_CACHE_KEY = 'markdown_block:{digest}'
+
+# Pending output is escaped text inside tags every sanitizer profile allows
+PENDING_CLASS = 'markdown-render-pending'
+PENDING_PREFIX = f'<div class="{PENDING_CLASS}">'
+
+DEFAULT_OFFLOAD_CHARS = 200_000
+DEFAULT_TIMEOUT_SECONDS = 5.0
+DEFAULT_WORKERS = 2
+
+# Python-Markdown's tab_length; list and code indentation is measured in it
+TAB_LENGTH = 4
+
+# Definitions resolve across the whole document: reference links, footnotes, abbreviations
+_DEFINITION_RE = re.compile(r'^[ ]{0,3}\*?\[[^\]\n]*\]:', re.MULTILINE)
+# Raw HTML and autolinks; an unclosed tag in one block changes how the sanitizer parses the next
+_RAW_HTML_RE = re.compile(r'<[A-Za-z/!?]')
+# Blocks that continue the element before them: indented content, list items, block quotes
+_CONTINUATION_RE = re.compile(r'[ ]|[*+-][ ]|\d+\.[ ]|>')
+
+# A paragraph rendered after each block to capture the whitespace markdown leaves between blocks
+_BLOCK_END = 'minky-render-block-end'
+_BLOCK_END_HTML = f'<p>{_BLOCK_END}</p>'
+
+RENDER_SECONDS = Histogram(
+    'minky_markdown_render_seconds',
+    'Time spent rendering markdown to sanitized HTML (cache misses only)',
+    ['mode'],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+RENDER_REQUESTS = Counter(
+    'minky_markdown_render_requests_total',
+    'Markdown render requests by outcome',
+    ['result']
+)
+RENDER_BLOCKS = Counter(
+    'minky_markdown_render_blocks_total',
+    'Blocks of incrementally rendered documents, by whether the block cache had them',
+    ['result']
+)
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_local = threading.local()
+_inflight_lock = threading.Lock()
+# Offloaded renders in flight, by cache key, so concurrent saves of the same content share one job
+_inflight: Dict[str, Future] = {}
+
+
+def _config(name: str, default):
+    if has_app_context():
+        return current_app.config.get(name, default)
+    return default
+
+
+def _renderers(extensions: List[str], tags: List[str], attributes: Dict[str, List[str]]):
+    """This thread's Markdown instance and Cleaner for a configuration; neither is thread-safe,
+    and building them costs more than rendering a small block"""
+    renderers = getattr(_local, 'renderers', None)
+    if renderers is None:
+        renderers = _local.renderers = {}
+    key = (tuple(extensions), tuple(tags), tuple((name, tuple(values)) for name, values in attributes.items()))
+    if key not in renderers:
+        renderers[key] = (markdown.Markdown(extensions=list(extensions)),
+                          bleach.Cleaner(tags=tags, attributes=attributes, strip=True))
+    return renderers[key]
+
+
+def _render(text: str, extensions: List[str], tags: List[str], attributes: Dict[str, List[str]]) -> str:
+    """Markdown then bleach; runs in the request thread or in a pool worker"""
+    md, cleaner = _renderers(extensions, tags, attributes)
+    raw_html = md.reset().convert(text)
+    return cleaner.clean(raw_html)
+
+
+def _timed_render(text: str, extensions, tags, attributes):
+    """Full render job; reports its own duration since a pool caller only sees the wait"""
+    started = time.perf_counter()
+    rendered = _render(text, extensions, tags, attributes)
+    return rendered, time.perf_counter() - started
+
+
+def _render_block(block: str, extensions, tags, attributes) -> Optional[Tuple[str, str]]:
+    """A block's HTML and the whitespace a full render puts after it, or None if that can't be told"""
+    rendered = _render(f'{block}\n\n{_BLOCK_END}', extensions, tags, attributes)
+    if not rendered.endswith(_BLOCK_END_HTML):
+        return None
+    body = rendered[:-len(_BLOCK_END_HTML)]
+    block_html = body.rstrip()
+    if not block_html:
+        return None
+    return block_html, body[len(block_html):]
+
+
+def _timed_render_blocks(blocks: List[str], extensions, tags, attributes):
+    """Block render job"""
+    started = time.perf_counter()
+    parts = [_render_block(block, extensions, tags, attributes) for block in blocks]
+    return parts, time.perf_counter() - started
+
+
+def _assemble(parts: List[Optional[Tuple[str, str]]]) -> Optional[str]:
+    if not parts or any(part is None for part in parts):
+        return None
+    return ''.join(block_html + gap for block_html, gap in parts[:-1]) + parts[-1][0]
+
+
+def _normalize(text: str) -> str:
+    """Python-Markdown's NormalizeWhitespace preprocessor, so blocks split where its parser splits"""
+    text = text.replace('\r\n', '\n').replace('\r', '\n') + '\n\n'
+    text = text.expandtabs(TAB_LENGTH)
+    return re.sub(r'(?<=\n) +\n', '\n', text)
+
+
+def split_blocks(text: Optional[str]) -> Optional[List[str]]:
+    """Split markdown into blocks that render independently, or None when the document must render whole.
+
+    Blocks are runs of lines between blank lines; fenced code stays in one block
+    even across blank lines. A run that continues the element before it (indented
+    content, list items, block quotes) joins the previous block, as does anything
+    after indented code separated by more than one blank line or opening a fence,
+    since markdown appends those blank lines to the code.
+    """
+    if not text or not text.strip() or STX in text or ETX in text:
+        return None
+    source = _normalize(text)
+
+    fences = list(FencedBlockPreprocessor.FENCED_BLOCK_RE.finditer(source))
+    outside = []
+    position = 0
+    for fence in fences:
+        outside.append(source[position:fence.start()])
+        position = fence.end()
+    outside.append(source[position:])
+    outside = ''.join(outside)
+    if _DEFINITION_RE.search(outside) or _RAW_HTML_RE.search(outside):
+        return None
+
+    lines = source.split('\n')
+    # Line ranges of fenced code, which may contain blank lines
+    fence_lines = []
+    for fence in fences:
+        first = source.count('\n', 0, fence.start())
+        fence_lines.append((first, first + source.count('\n', fence.start(), fence.end())))
+
+    # Runs of non-blank lines, as (first line, last line, opens with a fence)
+    runs = []
+    index = 0
+    fence_index = 0
+    while index < len(lines):
+        if not lines[index]:
+            index += 1
+            continue
+        start = index
+        opens_fence = False
+        while index < len(lines) and lines[index]:
+            if fence_index < len(fence_lines) and fence_lines[fence_index][0] == index:
+                # A fence must stand alone between blank lines to be a block of its own
+                first, last = fence_lines[fence_index]
+                if index != start or (last + 1 < len(lines) and lines[last + 1]):
+                    return None
+                opens_fence = True
+                index = last
+                fence_index += 1
+            index += 1
+        runs.append((start, index - 1, opens_fence))
+
+    blocks = []
+    previous_end = None
+    previous_indented = False
+    for start, end, opens_fence in runs:
+        first_line = lines[start]
+        blank_lines = start - previous_end - 1 if previous_end is not None else 0
+        joins_previous = blocks and (
+            _CONTINUATION_RE.match(first_line) is not None
+            or (previous_indented and (blank_lines > 1 or opens_fence))
+        )
+        text_run = '\n'.join(lines[start:end + 1])
+        if joins_previous:
+            blocks[-1] += '\n' * (blank_lines + 1) + text_run
+        else:
+            blocks.append(text_run)
+        previous_indented = first_line.startswith(' ')
+        previous_end = end
+
+    return blocks
+
+
+def _fingerprint(extensions: Iterable[str], tags: Iterable[str], attributes: Dict[str, List[str]]):
+    """Hash state covering the renderer configuration; copy it and add the markdown for a key"""
+    fingerprint = json.dumps([
+        RENDERER_VERSION, markdown.__version__, bleach.__version__, pygments.__version__,
+        list(extensions), sorted(tags), {name: sorted(values) for name, values in attributes.items()}
+    ], sort_keys=True)
+    return hashlib.sha256(fingerprint.encode('utf-8') + b'\0')
+
+
+def _digest(fingerprint, text: str) -> str:
+    digest = fingerprint.copy()
+    digest.update(text.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def cache_key(text: str, extensions: Iterable[str], tags: Iterable[str], attributes: Dict[str, List[str]]) -> str:
+    """Key for the rendered HTML: the markdown plus everything that affects its rendering"""
+    return CACHE_KEY.format(digest=_digest(_fingerprint(extensions, tags, attributes), text))
+
+
+def _cache_get(key: str) -> Optional[str]:
+    if not has_app_context():
+        return None
+    try:
+        return cache.get(key)
+    except Exception as e:
+        logger.warning(f"Render cache read failed: {e}")
+        return None
+
+
+def _cache_set(key: str, rendered: str) -> None:
+    if not has_app_context():
+        return
+    try:
+        cache.set(key, rendered, timeout=_config('MARKDOWN_RENDER_CACHE_TTL', RENDER_CACHE_TTL))
+    except Exception as e:
+        logger.warning(f"Render cache write failed: {e}")
+
+
+def _block_keys(blocks: List[str], extensions, tags, attributes) -> Dict[str, str]:
+    fingerprint = _fingerprint(extensions, tags, attributes)
+    return {block: BLOCK_CACHE_KEY.format(digest=_digest(fingerprint, block)) for block in blocks}
+
+
+def _cached_blocks(keys: Dict[str, str]) -> Dict[str, Tuple[str, str]]:
+    if not has_app_context() or not keys:
+        return {}
+    blocks = list(keys)
+    try:
+        values = cache.get_many(*(keys[block] for block in blocks))
+    except Exception as e:
+        logger.warning(f"Render cache read failed: {e}")
+        return {}
+    return {block: tuple(value) for block, value in zip(blocks, values) if value is not None}
+
+
+def _cache_blocks(keys: Dict[str, str], parts: Dict[str, Optional[Tuple[str, str]]]) -> None:
+    if not has_app_context():
+        return
+    entries = {keys[block]: part for block, part in parts.items() if part is not None}
+    if not entries:
+        return
+    try:
+        cache.set_many(entries, timeout=_config('MARKDOWN_RENDER_CACHE_TTL', RENDER_CACHE_TTL))
+    except Exception as e:
+        logger.warning(f"Render cache write failed: {e}")
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: the pool starts inside threaded request workers, and a forked child
+            # could inherit a lock (logging, cache client) another thread was holding
+            _pool = ProcessPoolExecutor(max_workers=_config('MARKDOWN_RENDER_WORKERS', DEFAULT_WORKERS),
+                                        mp_context=get_context('spawn'))
+        return _pool
+
+
+def shutdown_pool() -> None:
+    """Stop the render workers; the next offloaded render starts a new pool"""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _submit(key: str, job: Callable, args: tuple, finish: Callable) -> Future:
+    """Start (or join) the pool job for key.
+
+    finish turns the job's result into HTML and caches it; it runs in the app
+    context when the job completes, whether or not anyone is still waiting.
+    """
+    app = current_app._get_current_object() if has_app_context() else None
+
+    with _inflight_lock:
+        rendered = _inflight.get(key)
+        if rendered is not None:
+            return rendered
+        rendered = Future()
+        _inflight[key] = rendered
+        pool_job = _get_pool().submit(job, *args)
+
+    def _finished(done: Future):
+        with _inflight_lock:
+            _inflight.pop(key, None)
+        if done.cancelled():
+            rendered.set_exception(CancelledError())
+            return
+        try:
+            result, seconds = done.result()
+            RENDER_SECONDS.labels(mode='worker').observe(seconds)
+            if app is not None:
+                with app.app_context():
+                    rendered.set_result(finish(result))
+            else:
+                rendered.set_result(finish(result))
+        except Exception as e:
+            logger.error(f"Markdown render worker failed: {e}")
+            rendered.set_exception(e)
+
+    pool_job.add_done_callback(_finished)
+    return rendered
+
+
+def pending_html(text: str) -> str:
+    """Stand-in for a render that did not finish in time: the escaped markdown"""
+    return f'{PENDING_PREFIX}<pre>{html.escape(text)}</pre></div>'
+
+
+def is_pending(rendered: Optional[str]) -> bool:
+    return bool(rendered) and rendered.startswith(PENDING_PREFIX)
+
+
+def render_markdown(text: Optional[str], extensions: Iterable[str], tags: Iterable[str],
+                    attributes: Dict[str, List[str]], wait: bool = False, incremental: bool = False,
+                    on_ready: Optional[Callable[[str], None]] = None) -> str:
+    """Render markdown to sanitized HTML through the render cache.
+
+    With incremental, only blocks missing from the block cache are rendered.
+    Renders over MARKDOWN_RENDER_OFFLOAD_CHARS run in the worker pool; unless
+    wait is set, one that runs past MARKDOWN_RENDER_TIMEOUT returns
+    pending_html(text) and finishes in the background, then calls on_ready with
+    the HTML in the app context.
+    """
+    text = text or ''
+    extensions, tags = list(extensions), list(tags)
+    key = cache_key(text, extensions, tags, attributes)
+
+    rendered = _cache_get(key)
+    if rendered is not None:
+        RENDER_REQUESTS.labels(result='hit').inc()
+        return rendered
+    RENDER_REQUESTS.labels(result='miss').inc()
+
+    blocks = split_blocks(text) if incremental else None
+    if blocks is None:
+        size = len(text)
+        job, args = _timed_render, (text, extensions, tags, attributes)
+
+        def finish(result):
+            _cache_set(key, result)
+            return result
+    else:
+        keys = _block_keys(blocks, extensions, tags, attributes)
+        cached = _cached_blocks(keys)
+        missing = [block for block in keys if block not in cached]
+        reused = sum(block in cached for block in blocks)
+        RENDER_BLOCKS.labels(result='hit').inc(reused)
+        RENDER_BLOCKS.labels(result='miss').inc(len(blocks) - reused)
+        size = sum(map(len, missing))
+        job, args = _timed_render_blocks, (missing, extensions, tags, attributes)
+
+        def finish(result):
+            fresh = dict(zip(missing, result))
+            _cache_blocks(keys, fresh)
+            assembled = _assemble([cached.get(block) or fresh[block] for block in blocks])
+            if assembled is None:
+                # A block's boundary could not be recovered; render the document whole
+                assembled = _render(text, extensions, tags, attributes)
+            _cache_set(key, assembled)
+            return assembled
+
+    if size < _config('MARKDOWN_RENDER_OFFLOAD_CHARS', DEFAULT_OFFLOAD_CHARS):
+        result, seconds = job(*args)
+        RENDER_SECONDS.labels(mode='inline').observe(seconds)
+        return finish(result)
+
+    timeout = None if wait else _config('MARKDOWN_RENDER_TIMEOUT', DEFAULT_TIMEOUT_SECONDS)
+    future = _submit(key, job, args, finish)
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        RENDER_REQUESTS.labels(result='timeout').inc()
+        logger.warning(f"Markdown render of {len(text)} characters exceeded {timeout}s; serving pending output")
+        if on_ready is not None:
+            future.add_done_callback(lambda done: _deliver(done, on_ready))
+        return pending_html(text)
+
+
+def _deliver(done: Future, on_ready: Callable[[str], None]) -> None:
+    if done.cancelled() or done.exception() is not None:
+        return
+    try:
+        on_ready(done.result())
+    except Exception as e:
+        logger.error(f"Storing finished markdown render failed: {e}")
+
+
+def cached_render(text: Optional[str], extensions: Iterable[str], tags: Iterable[str],
+                  attributes: Dict[str, List[str]]) -> Optional[str]:
+    """The cached HTML for text if some process has rendered it, without rendering"""
+    return _cache_get(cache_key(text or '', list(extensions), list(tags), attributes))
@@ -0,0 +1,323 @@
+"""
+MinHash/LSH Near-Duplicate Index
+Per-document MinHash signatures over word shingles, banded into LSH buckets so
+duplicate detection only compares documents that share a bucket instead of
+scanning every pair in the corpus.
+"""
+
+import hashlib
+import logging
+import re
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy import and_, event, select, true
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.orm import aliased
+
+from app import db
+from app.models.document import Document
+from app.models.duplicate_index import DocumentMinHash, DocumentLshBand
+from app.services.tfidf_feature_store import content_hash
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+_PRIME = (1 << 32) - 5  # largest prime below 2**32, keeps a*x + b inside uint64
+_SEED = 1
+
+
+def shingles(text: Optional[str], size: int = 3) -> Set[str]:
+    """Lower-cased word n-grams of a document; short texts yield a single shingle"""
+    tokens = _TOKEN_PATTERN.findall((text or '').lower())
+    if not tokens:
+        return set()
+    if len(tokens) <= size:
+        return {' '.join(tokens)}
+    return {' '.join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class MinHashIndex:
+    """MinHash signatures and LSH buckets stored next to each document.
+
+    With ``bands`` bands of ``rows`` rows, a pair with Jaccard similarity ``s``
+    becomes a candidate with probability ``1 - (1 - s**rows)**bands``; candidates
+    are then verified against their exact shingle Jaccard similarity.
+    """
+
+    NUM_PERM = 128
+    BANDS = 32
+    SHINGLE_SIZE = 3
+    HASH_CHUNK_SIZE = 2048  # shingles hashed per numpy pass, bounds memory for huge documents
+    MAX_CANDIDATE_PAIRS = 100000
+    VERIFY_CHUNK_SIZE = 500
+
+    def __init__(self, num_perm: int = NUM_PERM, bands: int = BANDS, shingle_size: int = SHINGLE_SIZE):
+        if num_perm % bands:
+            raise ValueError('num_perm must be a multiple of bands')
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+
+        rng = np.random.RandomState(_SEED)
+        self._a = rng.randint(1, _PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, _PRIME, size=num_perm, dtype=np.uint64)
+
+    def candidate_probability(self, similarity: float) -> float:
+        """Probability that a pair with the given Jaccard similarity shares a bucket"""
+        return 1.0 - (1.0 - similarity ** self.rows) ** self.bands
+
+    def signature(self, shingle_set: Set[str]) -> Optional[np.ndarray]:
+        """MinHash signature of a shingle set, or None for empty content"""
+        if not shingle_set:
+            return None
+
+        hashes = np.fromiter(
+            (zlib.crc32(s.encode('utf-8')) for s in shingle_set),
+            dtype=np.uint64, count=len(shingle_set)
+        )
+        signature = np.full(self.num_perm, _PRIME, dtype=np.uint64)
+        for start in range(0, len(hashes), self.HASH_CHUNK_SIZE):
+            chunk = hashes[start:start + self.HASH_CHUNK_SIZE]
+            permuted = (np.outer(self._a, chunk) + self._b[:, None]) % _PRIME
+            np.minimum(signature, permuted.min(axis=1), out=signature)
+        return signature
+
+    def band_buckets(self, signature: np.ndarray) -> List[int]:
+        """Stable signed 64-bit bucket key per band"""
+        buckets = []
+        for band in range(self.bands):
+            rows = signature[band * self.rows:(band + 1) * self.rows].astype('<u4').tobytes()
+            digest = hashlib.blake2b(rows, digest_size=8, person=band.to_bytes(2, 'little')).digest()
+            buckets.append(int.from_bytes(digest, 'little', signed=True))
+        return buckets
+
+    def refresh_document(self, document: Document) -> bool:
+        """Recompute a document's signature and buckets if its content changed.
+
+        Runs inside the caller's unit of work; index rows are committed with the document.
+        """
+        digest = content_hash(document.markdown_content)
+        current = document.minhash
+        if current is not None and current.content_hash == digest:
+            return False
+
+        signature = self.signature(shingles(document.markdown_content, self.shingle_size))
+        # Documents without shingles keep an empty signature so coverage counts them as indexed
+        stored = signature.tolist() if signature is not None else []
+        if current is None:
+            document.minhash = DocumentMinHash(content_hash=digest, signature=stored)
+        else:
+            current.content_hash = digest
+            current.signature = stored
+        if signature is None:
+            document.lsh_bands = []
+            return True
+
+        existing = {row.band: row for row in document.lsh_bands}
+        for band, bucket in enumerate(self.band_buckets(signature)):
+            if band in existing:
+                existing[band].bucket = bucket
+            else:
+                document.lsh_bands.append(DocumentLshBand(band=band, bucket=bucket))
+        return True
+
+    def _scope_filter(self, column, document_query):
+        if document_query is None:
+            return true()
+        scope = document_query.with_entities(Document.id).order_by(None).subquery()
+        return column.in_(select(scope.c.id))
+
+    def candidate_pairs(self, document_query=None) -> Tuple[List[Tuple[int, int]], bool]:
+        """Distinct document pairs sharing at least one bucket, restricted to a document query.
+
+        Returns the pairs and whether MAX_CANDIDATE_PAIRS truncated them.
+        """
+        left = aliased(DocumentLshBand)
+        right = aliased(DocumentLshBand)
+        rows = db.session.query(left.document_id, right.document_id).join(
+            right,
+            and_(
+                left.band == right.band,
+                left.bucket == right.bucket,
+                left.document_id < right.document_id
+            )
+        ).filter(
+            self._scope_filter(left.document_id, document_query),
+            self._scope_filter(right.document_id, document_query)
+        ).distinct().limit(self.MAX_CANDIDATE_PAIRS + 1).all()
+
+        truncated = len(rows) > self.MAX_CANDIDATE_PAIRS
+        return [tuple(row) for row in rows[:self.MAX_CANDIDATE_PAIRS]], truncated
+
+    def find_duplicates(self, document_query=None, similarity_threshold: float = 0.8) -> Dict[str, Any]:
+        """Verified near-duplicate pairs among the indexed documents of a query.
+
+        ``similarity_score`` is the exact Jaccard similarity of the two documents' shingle sets.
+        """
+        started = time.perf_counter()
+        pairs, truncated = self.candidate_pairs(document_query)
+
+        metadata: Dict[int, Dict[str, Any]] = {}
+        shingle_sets: Dict[int, Set[str]] = {}
+        candidate_ids = sorted({doc_id for pair in pairs for doc_id in pair})
+        for start in range(0, len(candidate_ids), self.VERIFY_CHUNK_SIZE):
+            chunk = candidate_ids[start:start + self.VERIFY_CHUNK_SIZE]
+            rows = db.session.query(
+                Document.id, Document.title, Document.author, Document.created_at, Document.markdown_content
+            ).filter(Document.id.in_(chunk))
+            for doc_id, title, author, created_at, content in rows:
+                shingle_sets[doc_id] = shingles(content, self.shingle_size)
+                metadata[doc_id] = {
+                    'id': doc_id,
+                    'title': title,
+                    'author': author,
+                    'created_at': created_at.isoformat() if created_at else None,
+                    'word_count': len((content or '').split())
+                }
+
+        verified = []
+        for first, second in pairs:
+            if first not in shingle_sets or second not in shingle_sets:
+                continue
+            score = jaccard(shingle_sets[first], shingle_sets[second])
+            if score >= similarity_threshold:
+                verified.append((metadata[first], metadata[second], score))
+
+        documents_indexed = db.session.query(db.func.count(DocumentMinHash.document_id)).filter(
+            self._scope_filter(DocumentMinHash.document_id, document_query)
+        ).scalar() or 0
+
+        return {
+            'pairs': verified,
+            'candidate_pairs': len(pairs),
+            'candidates_truncated': truncated,
+            'documents_indexed': documents_indexed,
+            'expected_recall': round(self.candidate_probability(similarity_threshold), 4),
+            'duration_seconds': round(time.perf_counter() - started, 4)
+        }
+
+    def get_coverage(self) -> Dict[str, int]:
+        """Documents with content versus documents holding a signature"""
+        with_content = Document.query.filter(
+            Document.markdown_content.isnot(None), Document.markdown_content != ''
+        ).count()
+        indexed = db.session.query(db.func.count(DocumentMinHash.document_id)).scalar() or 0
+        return {'documents_with_content': with_content, 'documents_indexed': indexed}
+
+    def is_complete(self) -> bool:
+        coverage = self.get_coverage()
+        return coverage['documents_indexed'] >= coverage['documents_with_content']
+
+    def rebuild(self, batch_size: int = 500, full: bool = False) -> Dict[str, Any]:
+        """Backfill signatures for documents that are missing or stale (all documents if full).
+
+        Walks the corpus in id order so memory stays bounded by batch_size.
+        """
+        started = time.perf_counter()
+        scanned = 0
+        updated = 0
+        last_id = 0
+
+        try:
+            while True:
+                batch = db.session.query(Document.id, Document.markdown_content)\
+                    .filter(Document.id > last_id).order_by(Document.id).limit(batch_size).all()
+                if not batch:
+                    break
+                last_id = batch[-1][0]
+                scanned += len(batch)
+
+                batch_ids = [doc_id for doc_id, _ in batch]
+                stored = dict(db.session.query(DocumentMinHash.document_id, DocumentMinHash.content_hash)
+                              .filter(DocumentMinHash.document_id.in_(batch_ids)))
+
+                signatures = []
+                stale_ids = []
+                for doc_id, content in batch:
+                    digest = content_hash(content)
+                    if not full and stored.get(doc_id) == digest:
+                        continue
+                    stale_ids.append(doc_id)
+                    signatures.append((doc_id, digest, self.signature(shingles(content, self.shingle_size))))
+
+                if not stale_ids:
+                    continue
+
+                DocumentLshBand.query.filter(DocumentLshBand.document_id.in_(stale_ids))\
+                    .delete(synchronize_session=False)
+                DocumentMinHash.query.filter(DocumentMinHash.document_id.in_(stale_ids))\
+                    .delete(synchronize_session=False)
+                db.session.bulk_insert_mappings(DocumentMinHash, [
+                    {'document_id': doc_id, 'content_hash': digest,
+                     'signature': signature.tolist() if signature is not None else []}
+                    for doc_id, digest, signature in signatures
+                ])
+                db.session.bulk_insert_mappings(DocumentLshBand, [
+                    {'document_id': doc_id, 'band': band, 'bucket': bucket}
+                    for doc_id, _, signature in signatures if signature is not None
+                    for band, bucket in enumerate(self.band_buckets(signature))
+                ])
+                db.session.commit()
+                updated += len(stale_ids)
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Duplicate index rebuild failed: {e}")
+            return {'error': 'Duplicate index rebuild failed'}
+
+        duration = time.perf_counter() - started
+        logger.info(f"Rebuilt duplicate index: {updated} of {scanned} documents in {duration:.2f}s")
+
+        return {
+            'documents_scanned': scanned,
+            'documents_updated': updated,
+            'duration_seconds': round(duration, 3)
+        }
+
+    def get_status(self) -> Dict[str, Any]:
+        coverage = self.get_coverage()
+        return {
+            **coverage,
+            'complete': coverage['documents_indexed'] >= coverage['documents_with_content'],
+            'num_perm': self.num_perm,
+            'bands': self.bands,
+            'rows_per_band': self.rows,
+            'shingle_size': self.shingle_size
+        }
+
+
+# Global duplicate index instance
+minhash_index = MinHashIndex()
+
+
+def _content_changed(document: Document) -> bool:
+    return sa_inspect(document).attrs.markdown_content.history.has_changes()
+
+
+def _refresh_minhash_before_flush(session, flush_context, instances):
+    """Keep signatures and buckets in step with document writes in the same transaction"""
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, Document):
+            continue
+        if obj not in session.new and not _content_changed(obj):
+            continue
+        try:
+            minhash_index.refresh_document(obj)
+        except Exception as e:
+            # Never fail a document write because its signature could not be computed
+            logger.warning(f"Could not refresh duplicate index for document {obj.id}: {e}")
+
+
+def register_duplicate_index_events():
+    """Register the ORM hook that maintains signatures on document create/update"""
+    if not event.contains(db.session, 'before_flush', _refresh_minhash_before_flush):
+        event.listen(db.session, 'before_flush', _refresh_minhash_before_flush)
@@ -0,0 +1,254 @@
+"""
+OpenSearch Client
+Connection layer for OpenSearchService: pooled keep-alive HTTP connections
+(urllib3) created on first use, per-operation timeouts, a circuit breaker that
+fails fast while the cluster is unhealthy, and metrics for pool usage, request
+latency and breaker state.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+from opensearchpy import OpenSearch, Transport, Urllib3HttpConnection
+from opensearchpy.exceptions import ConnectionError as OpenSearchConnectionError
+from opensearchpy.exceptions import ConnectionTimeout, TransportError
+
+logger = logging.getLogger(__name__)
+
+# Seconds per operation class; searches give up long before indexing does
+DEFAULT_TIMEOUTS = {
+    'search': 5.0,
+    'index': 10.0,
+    'bulk': 60.0,
+    'admin': 30.0,
+}
+DEFAULT_POOL_SIZE = 10
+LATENCY_SAMPLES = 1000
+
+
+class CircuitOpenError(OpenSearchConnectionError):
+    """Raised without touching the network while the circuit breaker is open"""
+
+    def __init__(self, retry_in: float):
+        super().__init__('N/A', f'circuit breaker open, retry in {retry_in:.1f}s', None)
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker.
+
+    Opens after failure_threshold failures in a row. While open every call is
+    rejected; after reset_timeout one probe call is let through (half-open),
+    which closes the breaker on success or opens it again on failure.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._counters = {'opened': 0, 'rejected': 0}
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._state == self.OPEN:
+                if self._clock() - self._opened_at < self.reset_timeout:
+                    self._counters['rejected'] += 1
+                    return False
+                self._state = self.HALF_OPEN
+            if self._state == self.HALF_OPEN:
+                if self._probe_in_flight:
+                    self._counters['rejected'] += 1
+                    return False
+                self._probe_in_flight = True
+            return True
+
+    def retry_in(self) -> float:
+        with self._lock:
+            return max(0.0, self.reset_timeout - (self._clock() - self._opened_at))
+
+    def record_success(self):
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info("OpenSearch circuit breaker closed")
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self._counters['opened'] += 1
+                    logger.warning(f"OpenSearch circuit breaker opened after {self._failures} failures")
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+
+    def snapshot(self) -> Dict[str, Any]:
+        state = self.state
+        with self._lock:
+            return {
+                'state': state,
+                'consecutive_failures': self._failures,
+                'failure_threshold': self.failure_threshold,
+                'reset_timeout_seconds': self.reset_timeout,
+                **self._counters
+            }
+
+
+class ClientMetrics:
+    """Request counts, errors and latency percentiles per operation class"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._operations: Dict[str, Dict[str, Any]] = {}
+
+    def record(self, operation: str, seconds: Optional[float], outcome: str = 'ok'):
+        with self._lock:
+            stats = self._operations.setdefault(operation, {
+                'requests': 0, 'errors': 0, 'timeouts': 0, 'rejected': 0,
+                'latencies': deque(maxlen=LATENCY_SAMPLES)
+            })
+            if outcome == 'rejected':
+                stats['rejected'] += 1
+                return
+            stats['requests'] += 1
+            stats['latencies'].append(seconds * 1000)
+            if outcome == 'timeout':
+                stats['timeouts'] += 1
+            if outcome != 'ok':
+                stats['errors'] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            operations = {name: (dict(stats), sorted(stats['latencies'])) for name, stats in self._operations.items()}
+
+        def pct(samples, p):
+            return round(samples[min(len(samples) - 1, int(p * len(samples)))], 2) if samples else None
+
+        return {
+            name: {
+                'requests': stats['requests'],
+                'errors': stats['errors'],
+                'timeouts': stats['timeouts'],
+                'rejected': stats['rejected'],
+                'latency_ms': {'p50': pct(samples, 0.50), 'p95': pct(samples, 0.95), 'p99': pct(samples, 0.99)}
+            }
+            for name, (stats, samples) in operations.items()
+        }
+
+
+def operation_for(method: str, url: str) -> str:
+    """Operation class of a request, for its timeout and metrics"""
+    path = url.split('?')[0]
+    if path.endswith('/_bulk'):
+        return 'bulk'
+    if any(part in path for part in ('/_search', '/_count', '/_mget', '/_msearch')):
+        return 'search'
+    if '/_doc/' in path or '/_update/' in path or '/_create/' in path:
+        return 'search' if method in ('GET', 'HEAD') else 'index'
+    return 'admin'
+
+
+def is_cluster_failure(error: TransportError) -> bool:
+    """Errors that say the cluster is unhealthy, as opposed to a bad request or a missing document"""
+    return isinstance(error, OpenSearchConnectionError) or \
+        (isinstance(error.status_code, int) and (error.status_code >= 500 or error.status_code == 429))
+
+
+class ResilientTransport(Transport):
+    """Transport that applies per-operation timeouts, the circuit breaker and metrics to every request.
+
+    breaker, metrics and timeouts are set by create_client after construction.
+    """
+
+    breaker: CircuitBreaker
+    metrics: ClientMetrics
+    timeouts: Dict[str, float]
+
+    def perform_request(self, method, url, params=None, body=None, timeout=None, ignore=(), headers=None):
+        operation = operation_for(method, url)
+        if timeout is None and not (params and ('request_timeout' in params or 'timeout' in params)):
+            timeout = self.timeouts.get(operation, self.timeouts['admin'])
+        if not self.breaker.allow():
+            self.metrics.record(operation, None, 'rejected')
+            raise CircuitOpenError(self.breaker.retry_in())
+
+        started = time.perf_counter()
+        try:
+            result = super().perform_request(method, url, params=params, body=body, timeout=timeout,
+                                             ignore=ignore, headers=headers)
+        except TransportError as e:
+            failure = is_cluster_failure(e)
+            if failure:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            outcome = 'timeout' if isinstance(e, ConnectionTimeout) else 'error'
+            self.metrics.record(operation, time.perf_counter() - started, outcome if failure else 'ok')
+            raise
+        except Exception:
+            # Serialization and other client-side errors: still settle the call, or a
+            # half-open probe would hold the breaker shut for good
+            self.breaker.record_failure()
+            self.metrics.record(operation, time.perf_counter() - started, 'error')
+            raise
+        self.breaker.record_success()
+        self.metrics.record(operation, time.perf_counter() - started)
+        return result
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """Connection pool usage across hosts (urllib3 pools open sockets on first use)"""
+        maxsize = in_use = created = requests = 0
+        for connection in self.connection_pool.connections:
+            pool = getattr(connection, 'pool', None)
+            if pool is None:
+                continue
+            maxsize += pool.pool.maxsize
+            in_use += pool.pool.maxsize - pool.pool.qsize()
+            created += pool.num_connections
+            requests += pool.num_requests
+        return {'maxsize': maxsize, 'in_use': in_use, 'connections_created': created, 'requests': requests}
+
+
+def create_client(host: str, port: int, http_auth=None, use_ssl: bool = False, verify_certs: bool = True,
+                  pool_maxsize: Optional[int] = None, timeouts: Optional[Dict[str, float]] = None,
+                  breaker: Optional[CircuitBreaker] = None, max_retries: int = 1) -> OpenSearch:
+    """OpenSearch client on the resilient transport; makes no request until first use"""
+    client = OpenSearch(
+        hosts=[{'host': host, 'port': port}],
+        http_auth=http_auth,
+        use_ssl=use_ssl,
+        verify_certs=verify_certs,
+        connection_class=Urllib3HttpConnection,
+        transport_class=ResilientTransport,
+        # One keep-alive pool per process: size it for the threads a worker runs
+        pool_maxsize=pool_maxsize or DEFAULT_POOL_SIZE,
+        # Timeouts are not retried: with a degraded cluster each retry would wait the full timeout again
+        max_retries=max_retries,
+        retry_on_timeout=False
+    )
+    client.transport.breaker = breaker or CircuitBreaker()
+    client.transport.metrics = ClientMetrics()
+    client.transport.timeouts = {**DEFAULT_TIMEOUTS, **(timeouts or {})}
+    return client
@@ -1,9 +1,12 @@
+import base64
+import hashlib
+import json
 import logging
 import re
-from typing import Dict, List, Optional, Any
-from opensearchpy import OpenSearch, RequestsHttpConnection
+from typing import Dict, Iterator, List, Optional, Any
 from opensearchpy.exceptions import NotFoundError
-from app.utils.korean_text import KoreanTextProcessor
+from app.services.opensearch_client import CircuitBreaker, create_client
+from app.utils.korean_text import korean_processor, process_korean_documents
 from app.services.opensearch_mappings import (
     get_document_index_settings,
     get_org_roam_index_settings
@@ -15,10 +18,14 @@ class OpenSearchService:
     """OpenSearch 기반 다국어 검색 서비스"""
     
     def __init__(self, host='localhost', port=9200, use_ssl=False,
-                 username=None, password=None, verify_certs=None):
+                 username=None, password=None, verify_certs=None,
+                 pool_maxsize=None, timeouts=None, breaker=None):
         """
         OpenSearch 클라이언트 초기화
 
+        클러스터에 요청을 보내지 않는다: 연결은 첫 요청 때 풀에서 만들어지므로
+        클러스터 상태와 관계없이 앱 시작이 지연되지 않는다.
+
         Args:
             host: OpenSearch 호스트
             port: OpenSearch 포트
@@ -26,9 +33,13 @@ class OpenSearchService:
             username: 인증 사용자명
             password: 인증 비밀번호
             verify_certs: SSL 인증서 검증 여부 (기본값: 환경변수 또는 True)
+            pool_maxsize: 프로세스(워커)당 keep-alive 연결 수
+            timeouts: 작업 종류별 타임아웃(초) {'search', 'index', 'bulk', 'admin'}
+            breaker: 서킷 브레이커 (기본값: 연속 5회 실패 시 30초간 차단)
         """
         import os
-        self.korean_processor = KoreanTextProcessor()
+        # 형태소 분석기는 초기화 비용이 커서 전역 인스턴스를 공유
+        self.korean_processor = korean_processor
 
         auth = None
         if username and password:
@@ -38,28 +49,47 @@ class OpenSearchService:
         if verify_certs is None:
             verify_certs = os.getenv('OPENSEARCH_VERIFY_CERTS', 'true').lower() == 'true'
 
-        self.client = OpenSearch(
-            hosts=[{'host': host, 'port': port}],
+        self.client = create_client(
+            host,
+            port,
             http_auth=auth,
             use_ssl=use_ssl,
             verify_certs=verify_certs,
-            connection_class=RequestsHttpConnection
+            pool_maxsize=pool_maxsize,
+            timeouts=timeouts,
+            breaker=breaker
         )
         
-        # 인덱스 설정
+        # 인덱스 설정: 문서는 버전별 물리 인덱스(minky_documents_v{N})에 두고
+        # 검색은 읽기 alias, 변경 반영은 쓰기 alias를 통해 한다 (SearchIndexManager 참고)
         self.document_index = 'minky_documents'
+        self.document_write_alias = 'minky_documents_write'
         self.org_roam_index = 'minky_org_roam'
-        
-        # 연결 테스트
-        try:
-            info = self.client.info()
-            logger.info(f"Connected to OpenSearch: {info['version']['number']}")
-        except Exception as e:
-            logger.error(f"Failed to connect to OpenSearch: {e}")
+
+    @property
+    def breaker(self):
+        return self.client.transport.breaker
+
+    def is_available(self) -> bool:
+        """서킷 브레이커가 열려 있지 않으면 True (False면 호출자는 PostgreSQL 검색으로 대체)"""
+        return self.breaker.state != self.breaker.OPEN
+
+    def get_client_metrics(self) -> Dict:
+        """연결 풀 사용량, 작업별 요청 지연 시간, 서킷 브레이커 상태"""
+        return {
+            'pool': self.client.transport.pool_stats(),
+            'requests': self.client.transport.metrics.snapshot(),
+            'breaker': self.breaker.snapshot(),
+            'timeouts': dict(self.client.transport.timeouts)
+        }
     
     def create_document_index(self):
-        """문서용 인덱스 생성 (한국어 분석기 포함)"""
+        """문서용 인덱스 생성 (한국어 분석기 포함)
+
+        첫 버전 물리 인덱스를 만들고 읽기/쓰기 alias를 연결한다.
+        """
         index_settings = get_document_index_settings()
+        physical_index = f"{self.document_index}_v1"
 
         try:
             if self.client.indices.exists(index=self.document_index):
@@ -67,15 +97,31 @@ class OpenSearchService:
                 return True
             
             response = self.client.indices.create(
-                index=self.document_index,
-                body=index_settings
+                index=physical_index,
+                body={
+                    **index_settings,
+                    'aliases': {
+                        self.document_index: {},
+                        self.document_write_alias: {'is_write_index': True}
+                    }
+                }
             )
-            logger.info(f"Created index {self.document_index}: {response}")
+            logger.info(f"Created index {physical_index} behind {self.document_index}: {response}")
             return True
             
         except Exception as e:
             logger.error(f"Failed to create index {self.document_index}: {e}")
             return False
+
+    def get_document_write_indices(self) -> List[str]:
+        """쓰기 alias가 가리키는 물리 인덱스 (재구축 중에는 현재 + 새 인덱스)
+
+        alias가 없는 기존 설치에서는 문서 인덱스 하나에 그대로 쓴다.
+        """
+        try:
+            return sorted(self.client.indices.get_alias(name=self.document_write_alias))
+        except NotFoundError:
+            return [self.document_index]
     
     def create_org_roam_index(self):
         """org-roam 문서용 특별 인덱스 생성"""
@@ -125,51 +171,25 @@ class OpenSearchService:
     # SECURITY: Pagination limits to prevent resource exhaustion
     MAX_PAGE_SIZE = 100
     MAX_PAGE_NUMBER = 1000
+    # 페이지 번호(from/size)는 얕은 페이지에만: 샤드마다 from + size개를 정렬해야 하므로
+    # 인덱스의 index.max_result_window를 넘는 깊이는 커서로만 조회한다
+    MAX_RESULT_WINDOW = 10000
+    # 커서가 사용하는 point-in-time 컨텍스트 유지 시간 (요청마다 연장)
+    CURSOR_KEEP_ALIVE = '2m'
+    EXPORT_BATCH_SIZE = 1000
+    # 문서 id가 마지막 정렬 기준이라 search_after 위치가 항상 하나로 정해진다
+    SEARCH_SORT = [
+        {"_score": {"order": "desc"}},
+        {"updated_at": {"order": "desc"}},
+        {"id": {"order": "desc"}}
+    ]
 
-    def search_documents(self, query: str, filters: Optional[Dict] = None,
-                        page: int = 1, per_page: int = 20,
-                        user_id: Optional[int] = None) -> Dict:
-        """문서 검색 (한국어 지원)"""
-
-        # SECURITY: Validate and bound pagination parameters
-        if not isinstance(page, int) or page < 1:
-            page = 1
-        page = min(page, self.MAX_PAGE_NUMBER)
-
-        if not isinstance(per_page, int) or per_page < 1:
-            per_page = 20
-        per_page = min(per_page, self.MAX_PAGE_SIZE)
-
-        # 검색 쿼리 구성
+    def _build_search_query(self, query: str, filters: Optional[Dict] = None,
+                            user_id: Optional[int] = None) -> Dict[str, Any]:
+        """검색어, 접근 권한, 추가 필터로 bool 쿼리 구성"""
         must_clauses: List[Dict[str, Any]] = []
         filter_clauses: List[Dict[str, Any]] = []
 
-        search_body: Dict[str, Any] = {
-            "from": (page - 1) * per_page,
-            "size": per_page,
-            "query": {
-                "bool": {
-                    "must": must_clauses,
-                    "filter": filter_clauses
-                }
-            },
-            "highlight": {
-                "fields": {
-                    "title": {"pre_tags": ["<mark>"], "post_tags": ["</mark>"]},
-                    "content": {
-                        "pre_tags": ["<mark>"],
-                        "post_tags": ["</mark>"],
-                        "fragment_size": 150,
-                        "number_of_fragments": 3
-                    }
-                }
-            },
-            "sort": [
-                {"_score": {"order": "desc"}},
-                {"updated_at": {"order": "desc"}}
-            ]
-        }
-        
         # 텍스트 검색
         if query:
             # 언어 감지
@@ -254,11 +274,121 @@ class OpenSearchService:
                     "range": {"updated_at": date_range}
                 })
         
+        return {
+            "bool": {
+                "must": must_clauses,
+                "filter": filter_clauses
+            }
+        }
+
+    @staticmethod
+    def _cursor_fingerprint(query: str, filters: Optional[Dict], user_id: Optional[int], per_page: int) -> str:
+        # 커서는 같은 검색 조건(사용자 포함)에서만 유효
+        key = json.dumps([query, filters or {}, user_id, per_page], sort_keys=True, default=str)
+        return hashlib.sha256(key.encode('utf-8')).hexdigest()[:16]
+
+    @staticmethod
+    def encode_cursor(state: Dict[str, Any]) -> str:
+        return base64.urlsafe_b64encode(json.dumps(state, separators=(',', ':')).encode('utf-8')).decode('ascii')
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> Optional[Dict[str, Any]]:
+        """불투명 커서 해석; 형식이 맞지 않으면 None"""
         try:
-            response = self.client.search(
-                index=self.document_index,
-                body=search_body
-            )
+            state = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        except (ValueError, UnicodeError):
+            return None
+        if not isinstance(state, dict) or not isinstance(state.get('after'), list) \
+                or not isinstance(state.get('fp'), str) or not isinstance(state.get('pit'), (str, type(None))):
+            return None
+        return state
+
+    def _open_pit(self) -> str:
+        return self.client.create_pit(index=self.document_index, keep_alive=self.CURSOR_KEEP_ALIVE)['pit_id']
+
+    def _close_pit(self, pit_id: str):
+        try:
+            self.client.delete_pit(body={'pit_id': [pit_id]})
+        except Exception as e:
+            # 만료되면 클러스터가 알아서 정리하므로 경고만 남긴다
+            logger.warning(f"Failed to close point-in-time context: {e}")
+
+    def _search_after_page(self, search_body: Dict[str, Any], pit_id: str, after: Optional[List]):
+        """PIT 컨텍스트에서 search_after로 한 페이지 조회 -> (응답, 다음 요청에 쓸 PIT id)
+
+        컨텍스트가 만료되었으면 새로 열고 같은 위치부터 계속한다.
+        """
+        body = dict(search_body, pit={'id': pit_id, 'keep_alive': self.CURSOR_KEEP_ALIVE})
+        if after is not None:
+            body['search_after'] = after
+        try:
+            response = self.client.search(body=body)
+        except NotFoundError:
+            logger.info("Point-in-time context expired; reopening at the cursor position")
+            pit_id = self._open_pit()
+            body['pit'] = {'id': pit_id, 'keep_alive': self.CURSOR_KEEP_ALIVE}
+            response = self.client.search(body=body)
+        return response, response.get('pit_id', pit_id)
+
+    def search_documents(self, query: str, filters: Optional[Dict] = None,
+                        page: int = 1, per_page: int = 20,
+                        user_id: Optional[int] = None, cursor: Optional[str] = None) -> Dict:
+        """문서 검색 (한국어 지원)
+
+        페이지 번호(from/size)는 얕은 페이지용이다. 결과가 더 있으면 응답의 next_cursor를
+        cursor로 넘겨 다음 페이지를 받는다: point-in-time 컨텍스트와 search_after를 사용하므로
+        깊이에 상관없이 비용이 같고, 탐색 중 인덱스가 바뀌어도 결과가 중복되거나 빠지지 않는다.
+        """
+
+        # SECURITY: Validate and bound pagination parameters
+        if not isinstance(page, int) or page < 1:
+            page = 1
+        page = min(page, self.MAX_PAGE_NUMBER)
+
+        if not isinstance(per_page, int) or per_page < 1:
+            per_page = 20
+        per_page = min(per_page, self.MAX_PAGE_SIZE)
+
+        fingerprint = self._cursor_fingerprint(query, filters, user_id, per_page)
+        state = None
+        if cursor is not None:
+            state = self.decode_cursor(cursor)
+            if state is None or state['fp'] != fingerprint:
+                return self._search_error(None, per_page, 'Invalid cursor.', 'invalid_cursor')
+        elif page * per_page > self.MAX_RESULT_WINDOW:
+            return self._search_error(page, per_page, 'Page too deep; use the cursor from a previous page.',
+                                      'page_too_deep')
+
+        # 검색 쿼리 구성
+        search_body: Dict[str, Any] = {
+            "size": per_page,
+            "query": self._build_search_query(query, filters, user_id),
+            "highlight": {
+                "fields": {
+                    "title": {"pre_tags": ["<mark>"], "post_tags": ["</mark>"]},
+                    "content": {
+                        "pre_tags": ["<mark>"],
+                        "post_tags": ["</mark>"],
+                        "fragment_size": 150,
+                        "number_of_fragments": 3
+                    }
+                }
+            },
+            "sort": self.SEARCH_SORT
+        }
+
+        try:
+            if state is None:
+                search_body['from'] = (page - 1) * per_page
+                response = self.client.search(
+                    index=self.document_index,
+                    body=search_body
+                )
+                pit_id = None
+            else:
+                # 첫 커서 요청에서 PIT를 열고, 이후에는 커서에 담긴 PIT를 이어서 사용
+                response, pit_id = self._search_after_page(search_body, state['pit'] or self._open_pit(),
+                                                           state['after'])
             
             # 결과 처리
             hits = response['hits']
@@ -273,27 +403,70 @@ class OpenSearchService:
                     doc['highlights'] = hit['highlight']
                 
                 documents.append(doc)
+
+            next_cursor = None
+            if len(hits['hits']) == per_page:
+                next_cursor = self.encode_cursor({'pit': pit_id, 'after': hits['hits'][-1]['sort'], 'fp': fingerprint})
+            elif pit_id:
+                self._close_pit(pit_id)
             
             return {
                 'documents': documents,
                 'total': hits['total']['value'],
-                'page': page,
+                'page': page if state is None else None,
                 'per_page': per_page,
-                'pages': (hits['total']['value'] + per_page - 1) // per_page
+                'pages': (hits['total']['value'] + per_page - 1) // per_page,
+                'next_cursor': next_cursor
             }
             
         except Exception as e:
             # SECURITY: Log detailed error but return generic message
             logger.error(f"Search failed: {e}", exc_info=True)
-            return {
-                'documents': [],
-                'total': 0,
-                'page': page,
-                'per_page': per_page,
-                'pages': 0,
-                'error': 'Search failed. Please try again later.'
-            }
-    
+            return self._search_error(page if state is None else None, per_page, 'Search failed. Please try again later.')
+
+    @staticmethod
+    def _search_error(page: Optional[int], per_page: int, message: str, error_code: Optional[str] = None) -> Dict:
+        # error_code가 있으면 요청 자체의 문제 (잘못된 커서, 너무 깊은 페이지)
+        result = {
+            'documents': [],
+            'total': 0,
+            'page': page,
+            'per_page': per_page,
+            'pages': 0,
+            'next_cursor': None,
+            'error': message
+        }
+        if error_code:
+            result['error_code'] = error_code
+        return result
+
+    def iter_search_results(self, query: str, filters: Optional[Dict] = None, user_id: Optional[int] = None,
+                            batch_size: Optional[int] = None) -> Iterator[Dict]:
+        """전체 검색 결과를 순회하는 export용 제너레이터 (scroll 대체)
+
+        하나의 point-in-time 스냅샷에서 search_after로 batch_size개씩 읽으며,
+        순회가 끝나거나 중단되면 컨텍스트를 닫는다.
+        """
+        search_body: Dict[str, Any] = {
+            "size": min(batch_size or self.EXPORT_BATCH_SIZE, self.MAX_RESULT_WINDOW),
+            "query": self._build_search_query(query, filters, user_id),
+            "sort": self.SEARCH_SORT,
+            "track_total_hits": False
+        }
+        pit_id = self._open_pit()
+        try:
+            after = None
+            while True:
+                response, pit_id = self._search_after_page(search_body, pit_id, after)
+                hits = response['hits']['hits']
+                for hit in hits:
+                    yield hit['_source']
+                if len(hits) < search_body['size']:
+                    return
+                after = hits[-1]['sort']
+        finally:
+            self._close_pit(pit_id)
+
     # SECURITY: Maximum limit for tag suggestions
     MAX_TAG_SUGGESTIONS = 50
 
@@ -335,7 +508,26 @@ class OpenSearchService:
         except Exception as e:
             logger.error(f"Tag suggestion failed: {e}")
             return []
-    
+
+    def get_tag_vocabulary(self, size: int = 5000) -> Optional[Dict[str, Any]]:
+        """상위 size개 태그와 문서 수 (문서 수 내림차순, 같으면 태그순: suggest_tags 결과 순서와 같다)
+
+        complete가 False면 size개보다 태그가 많아 일부가 빠진 것이다. 실패하면 None.
+        """
+        try:
+            response = self.client.search(
+                index=self.document_index,
+                body={"size": 0, "aggs": {"tags": {"terms": {"field": "tags", "size": size}}}}
+            )
+            aggregation = response['aggregations']['tags']
+            return {
+                'tags': [(bucket['key'], bucket['doc_count']) for bucket in aggregation['buckets']],
+                'complete': aggregation.get('sum_other_doc_count', 0) == 0
+            }
+        except Exception as e:
+            logger.error(f"Tag vocabulary query failed: {e}")
+            return None
+
     def get_document_statistics(self, user_id: Optional[int] = None) -> Dict:
         """문서 통계 정보 (with access control)
 
@@ -417,51 +609,86 @@ class OpenSearchService:
             logger.error(f"Failed to delete document {document_id}: {e}")
             return False
     
-    def bulk_index_documents(self, documents: List[Dict]) -> Dict:
-        """문서 일괄 인덱싱"""
-        from opensearchpy.helpers import bulk
-        
-        actions = []
+    # 한국어 처리 단위 문서 수와 bulk 요청 최대 크기 (메모리 사용량을 배치 단위로 제한)
+    BULK_ANALYSIS_BATCH = 200
+    BULK_MAX_CHUNK_BYTES = 5 * 1024 * 1024
+
+    def _analyzed_actions(self, documents: List[Dict], write_indices: List[str]):
+        from app.services.search_indexer import external_version
+
+        # 한국어 처리 (배치 단위 형태소 분석)
+        with_content = [doc for doc in documents if doc.get('content')]
+        analyses = process_korean_documents(
+            ((doc.get('title', ''), doc['content']) for doc in with_content), workers=1
+        )
+        for doc, korean_processing in zip(with_content, analyses):
+            doc.update(korean_processing)
+
         for doc in documents:
-            # 한국어 처리
-            if doc.get('content'):
-                from app.utils.korean_text import process_korean_document
-                korean_processing = process_korean_document(
-                    doc.get('title', ''),
-                    doc.get('content', '')
-                )
-                doc.update(korean_processing)
-            
-            action = {
-                "_index": self.document_index,
-                "_id": doc.get('id'),
-                "_source": doc
-            }
-            actions.append(action)
-        
+            version = external_version(doc.get('updated_at'))
+            # 재구축 중에는 쓰기 alias의 모든 인덱스에 기록; 버전으로 늦게 도착한 이전 내용은 무시된다
+            for index_name in write_indices:
+                action = {
+                    "_index": index_name,
+                    "_id": doc.get('id'),
+                    "_source": doc
+                }
+                if version is not None:
+                    action.update(version=version, version_type='external_gte')
+                yield action
+
+    def bulk_index_documents(self, documents: List[Dict]) -> Dict:
+        """문서 일괄 인덱싱
+
+        배치 단위로 한국어 처리한 문서를 스트리밍으로 전송하며, 요청 크기는 바이트 기준으로 나눈다.
+        전체 재인덱싱은 SearchReindexer(app.services.search_reindexer)를 사용한다.
+        """
+        from opensearchpy.helpers import streaming_bulk
+
+        def actions(write_indices):
+            for start in range(0, len(documents), self.BULK_ANALYSIS_BATCH):
+                yield from self._analyzed_actions(documents[start:start + self.BULK_ANALYSIS_BATCH], write_indices)
+
+        # 문서 id -> 성공한 인덱스 수 (재구축 중에는 문서마다 쓰기 인덱스 수만큼 결과가 나온다)
+        succeeded: Dict[str, int] = {}
+        failed_items = []
+        write_indices = [self.document_index]
+
+        def success_count():
+            return sum(1 for count in succeeded.values() if count == len(write_indices))
+
         try:
-            success_count, failed_items = bulk(
+            write_indices = self.get_document_write_indices()
+            for ok, item in streaming_bulk(
                 self.client,
-                actions,
-                chunk_size=100,
+                actions(write_indices),
+                chunk_size=500,
+                max_chunk_bytes=self.BULK_MAX_CHUNK_BYTES,
+                raise_on_error=False,
                 request_timeout=60
-            )
-            
+            ):
+                result = next(iter(item.values()))
+                # 409: 같은 문서의 더 새로운 버전이 이미 인덱스에 있음
+                if ok or result.get('status') == 409:
+                    succeeded[str(result['_id'])] = succeeded.get(str(result['_id']), 0) + 1
+                else:
+                    failed_items.append(item)
+
             return {
-                'success_count': success_count,
+                'success_count': success_count(),
                 'failed_count': len(failed_items),
                 'failed_items': failed_items
             }
-            
+
         except Exception as e:
             # SECURITY: Log detailed error but return generic message
             logger.error(f"Bulk indexing failed: {e}", exc_info=True)
             return {
-                'success_count': 0,
-                'failed_count': len(documents),
+                'success_count': success_count(),
+                'failed_count': len(documents) - success_count(),
                 'error': 'Indexing failed. Please try again later.'
             }
-    
+
     def health_check(self) -> Dict:
         """OpenSearch 클러스터 상태 확인"""
         try:
@@ -492,7 +719,11 @@ class OpenSearchService:
 opensearch_service = None
 
 def initialize_opensearch(config: Dict):
-    """OpenSearch 서비스 초기화"""
+    """OpenSearch 서비스 초기화
+
+    클러스터에 접속하지 않으므로 즉시 반환한다. 인덱스 생성은 ensure_opensearch_indices로
+    (앱에서는 백그라운드 작업으로) 따로 실행한다.
+    """
     global opensearch_service
 
     try:
@@ -515,13 +746,15 @@ def initialize_opensearch(config: Dict):
             use_ssl=use_ssl,
             username=username,
             password=password,
-            verify_certs=config.get('verify_certs')
+            verify_certs=config.get('verify_certs'),
+            pool_maxsize=config.get('pool_maxsize'),
+            timeouts=config.get('timeouts'),
+            breaker=CircuitBreaker(
+                failure_threshold=config.get('breaker_failure_threshold', 5),
+                reset_timeout=config.get('breaker_reset_timeout', 30.0)
+            )
         )
         
-        # 인덱스 생성
-        opensearch_service.create_document_index()
-        opensearch_service.create_org_roam_index()
-        
         logger.info("OpenSearch service initialized successfully")
         return True
         
@@ -529,6 +762,12 @@ def initialize_opensearch(config: Dict):
         logger.error(f"Failed to initialize OpenSearch service: {e}")
         return False
 
+def ensure_opensearch_indices() -> bool:
+    """문서/org-roam 인덱스가 없으면 생성 (클러스터가 응답하지 않으면 False)"""
+    if opensearch_service is None:
+        return False
+    return opensearch_service.create_document_index() and opensearch_service.create_org_roam_index()
+
 def get_opensearch_service() -> Optional[OpenSearchService]:
     """OpenSearch 서비스 인스턴스 반환"""
     return opensearch_service
\ No newline at end of file
@@ -0,0 +1,94 @@
+"""
+Operational transform for collaborative text edits.
+
+Client operations (insert, delete, replace) are normalized to primitive insert
+and delete steps applied in order. transform(a, b) takes two step lists made
+against the same text and returns (a', b') with a + b' == b + a', so an
+operation made against an old revision can be rebased onto everything the
+server applied since. On ties, the steps in b (already applied on the server)
+keep their place and a's inserts land after them.
+"""
+
+from typing import Dict, List, Tuple
+
+Operation = Dict
+Operations = List[Operation]
+
+
+def insert(position: int, text: str) -> Operation:
+    return {'type': 'insert', 'position': position, 'text': text}
+
+
+def delete(position: int, length: int) -> Operation:
+    return {'type': 'delete', 'position': position, 'length': length}
+
+
+def to_primitives(operation: Operation) -> Operations:
+    """Split a validated client operation into insert/delete steps, dropping no-ops"""
+    steps = []
+    if operation['type'] in ('delete', 'replace'):
+        steps.append(delete(operation['position'], operation['length']))
+    if operation['type'] in ('insert', 'replace') and operation['text']:
+        steps.append(insert(operation['position'], str(operation['text'])))
+    return steps
+
+
+def _transform_step(step: Operation, against: Operation, wins_ties: bool) -> Operations:
+    """Rebase one step over another applied to the same text"""
+    position = step['position']
+    start = against['position']
+
+    if against['type'] == 'insert':
+        shift = len(against['text'])
+        if step['type'] == 'insert':
+            if position < start or (position == start and wins_ties):
+                return [step]
+            return [insert(position + shift, step['text'])]
+        end = position + step['length']
+        if start <= position:
+            return [delete(position + shift, step['length'])]
+        if start >= end:
+            return [step]
+        # The insert landed inside the deleted range: delete around it
+        return [delete(position, start - position), delete(position + shift, end - start)]
+
+    removed_end = start + against['length']
+    if step['type'] == 'insert':
+        if position <= start:
+            return [step]
+        return [insert(max(start, position - against['length']), step['text'])]
+    end = position + step['length']
+    overlap = max(0, min(end, removed_end) - max(position, start))
+    if overlap == step['length']:
+        return []
+    before = max(0, min(position, removed_end) - start)
+    return [delete(position - before, step['length'] - overlap)]
+
+
+def transform(a: Operations, b: Operations) -> Tuple[Operations, Operations]:
+    """Rebase concurrent step lists over each other: a + b' == b + a'"""
+    if not a or not b:
+        return a, b
+    if len(a) == 1 and len(b) == 1:
+        return _transform_step(a[0], b[0], False), _transform_step(b[0], a[0], True)
+    if len(a) > 1:
+        head, b_rebased = transform(a[:1], b)
+        tail, b_rebased = transform(a[1:], b_rebased)
+        return head + tail, b_rebased
+    a_rebased, head = transform(a, b[:1])
+    a_rebased, tail = transform(a_rebased, b[1:])
+    return a_rebased, head + tail
+
+
+def fits(steps: Operations, length: int) -> bool:
+    """Whether every step stays inside the text as the earlier steps change its length"""
+    for step in steps:
+        if step['type'] == 'insert':
+            if step['position'] > length:
+                return False
+            length += len(step['text'])
+        else:
+            if step['position'] + step['length'] > length:
+                return False
+            length -= step['length']
+    return True
@@ -0,0 +1,247 @@
+"""
+Search Index Manager
+Zero-downtime rebuilds of the OpenSearch document index. Documents live in
+versioned physical indices (minky_documents_v{N}): searches go through the read
+alias and live changes through the write alias. A rebuild creates the next
+version, adds it to the write alias so live changes reach both indices, fills it
+with the streaming reindexer, verifies it against the database, swaps both
+aliases in a single request and drops old versions beyond the retention limit.
+"""
+
+import logging
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+from opensearchpy.exceptions import NotFoundError
+from sqlalchemy import func
+
+from app import db
+from app.models.document import Document
+from app.models.search_outbox import SearchOutbox
+from app.services.opensearch_mappings import get_document_index_settings
+from app.services.opensearch_service import get_opensearch_service
+from app.services.search_indexer import document_payload
+from app.services.search_reindexer import SearchReindexer, start_exclusive_task
+from app.services.search_statistics import bump_generation
+from app.utils.datetime_utils import utc_now
+
+logger = logging.getLogger(__name__)
+
+
+class SearchIndexManager:
+    # Physical versions kept after a swap (the live one included), for rollback
+    KEEP_VERSIONS = 2
+    VERIFY_SAMPLE_SIZE = 100
+    # Source fields compared between the database and the rebuilt index
+    VERIFY_FIELDS = ('title', 'content', 'tags', 'user_id', 'is_public', 'is_published', 'updated_at')
+
+    def __init__(self, service=None, keep_versions: Optional[int] = None, sample_size: Optional[int] = None):
+        self._service = service
+        self.keep_versions = max(1, keep_versions or self.KEEP_VERSIONS)
+        self.sample_size = sample_size or self.VERIFY_SAMPLE_SIZE
+        self.last_report: Optional[Dict[str, Any]] = None
+
+    def _get_service(self):
+        return self._service or get_opensearch_service()
+
+    @staticmethod
+    def _version_of(service, index_name: str) -> Optional[int]:
+        match = re.fullmatch(rf'{re.escape(service.document_index)}_v(\d+)', index_name)
+        return int(match.group(1)) if match else None
+
+    @staticmethod
+    def _alias_targets(service, alias: str) -> Dict[str, Dict[str, Any]]:
+        """{physical index: alias options} for an alias, empty if it does not exist"""
+        try:
+            response = service.client.indices.get_alias(name=alias)
+        except NotFoundError:
+            return {}
+        return {index: info['aliases'][alias] for index, info in response.items()}
+
+    def _physical_indices(self, service) -> Dict[str, Dict[str, Any]]:
+        """Versioned indices by name, with the aliases each one carries"""
+        response = service.client.indices.get(index=f'{service.document_index}_v*')
+        return {index: info for index, info in response.items() if self._version_of(service, index) is not None}
+
+    def _legacy_index(self, service) -> bool:
+        """True while the read alias name is still a concrete index from before versioning"""
+        return not self._alias_targets(service, service.document_index) \
+            and bool(service.client.indices.exists(index=service.document_index))
+
+    def list_versions(self) -> Dict[str, Any]:
+        service = self._get_service()
+        if service is None:
+            return {'error': 'OpenSearch is not configured'}
+
+        read_targets = self._alias_targets(service, service.document_index)
+        write_targets = self._alias_targets(service, service.document_write_alias)
+        versions = []
+        for index in self._physical_indices(service):
+            versions.append({
+                'index': index,
+                'version': self._version_of(service, index),
+                'documents': service.client.count(index=index)['count'],
+                'read': index in read_targets,
+                'write': index in write_targets,
+                'is_write_index': bool(write_targets.get(index, {}).get('is_write_index'))
+            })
+        versions.sort(key=lambda version: version['version'], reverse=True)
+        return {
+            'read_alias': service.document_index,
+            'write_alias': service.document_write_alias,
+            'legacy_index': not read_targets and self._legacy_index(service),
+            'versions': versions
+        }
+
+    def prepare(self, service) -> str:
+        """Create the next version and add it to the write alias, so live changes reach it from now on"""
+        existing = [self._version_of(service, index) for index in self._physical_indices(service)]
+        new_index = f'{service.document_index}_v{max(existing, default=0) + 1}'
+        service.client.indices.create(index=new_index, body=get_document_index_settings())
+
+        actions = [{'add': {'index': new_index, 'alias': service.document_write_alias, 'is_write_index': False}}]
+        if not self._alias_targets(service, service.document_write_alias):
+            # Nothing wrote through the alias yet: the current index (an alias target, or
+            # a concrete index from before versioning) becomes its write index
+            current = list(self._alias_targets(service, service.document_index))
+            if not current and service.client.indices.exists(index=service.document_index):
+                current = [service.document_index]
+            if current:
+                actions.extend({'add': {'index': index, 'alias': service.document_write_alias, 'is_write_index': True}}
+                               for index in current)
+            else:
+                actions[0]['add']['is_write_index'] = True
+        service.client.indices.update_aliases(body={'actions': actions})
+        logger.info(f"Created {new_index}; live changes are now written to it as well")
+        return new_index
+
+    def verify(self, service, index_name: str) -> Dict[str, Any]:
+        """Compare a built index with the database: document count and a random sample of sources.
+
+        Documents with changes still waiting in the search outbox are in flight for
+        every index, so they are tolerated in the count and left out of the sample.
+        """
+        service.client.indices.refresh(index=index_name)
+        in_flight = {doc_id for (doc_id,) in db.session.query(SearchOutbox.document_id).distinct()}
+        expected = db.session.query(func.count(Document.id)).scalar()
+        actual = service.client.count(index=index_name)['count']
+
+        sample = [document for document in Document.query.order_by(func.random()).limit(self.sample_size)
+                  if document.id not in in_flight]
+        hits = service.client.mget(index=index_name, body={'ids': [document.id for document in sample]})['docs'] \
+            if sample else []
+        mismatches = []
+        for document, hit in zip(sample, hits):
+            if not hit.get('found'):
+                mismatches.append({'id': document.id, 'fields': ['missing']})
+                continue
+            expected_source = document_payload(document)
+            fields = [field for field in self.VERIFY_FIELDS
+                      if self._comparable(hit['_source'].get(field)) != self._comparable(expected_source[field])]
+            if fields:
+                mismatches.append({'id': document.id, 'fields': fields})
+
+        return {
+            'ok': abs(actual - expected) <= len(in_flight) and not mismatches,
+            'expected_documents': expected,
+            'indexed_documents': actual,
+            'in_flight_documents': len(in_flight),
+            'sampled': len(sample),
+            'mismatches': mismatches[:20]
+        }
+
+    @staticmethod
+    def _comparable(value):
+        return sorted(value) if isinstance(value, list) else value
+
+    def swap(self, service, new_index: str) -> List[str]:
+        """Point both aliases at new_index in one atomic request; returns the indices it replaced"""
+        read_targets = self._alias_targets(service, service.document_index)
+        write_targets = self._alias_targets(service, service.document_write_alias)
+        legacy = not read_targets and self._legacy_index(service)
+
+        actions = [
+            {'add': {'index': new_index, 'alias': service.document_index}},
+            {'add': {'index': new_index, 'alias': service.document_write_alias, 'is_write_index': True}}
+        ]
+        actions.extend({'remove': {'index': index, 'alias': service.document_index}}
+                       for index in read_targets if index != new_index)
+        actions.extend({'remove': {'index': index, 'alias': service.document_write_alias}}
+                       for index in write_targets if index not in (new_index, service.document_index))
+        if legacy:
+            # A concrete index still holds the alias name; it can only go in the same request
+            actions.append({'remove_index': {'index': service.document_index}})
+        service.client.indices.update_aliases(body={'actions': actions})
+
+        replaced = sorted({*read_targets, *write_targets} - {new_index}) or ([service.document_index] if legacy else [])
+        logger.info(f"Search aliases now point at {new_index} (was {', '.join(replaced) or 'nothing'})")
+        return replaced
+
+    def apply_retention(self, service) -> List[str]:
+        """Delete versions beyond the newest keep_versions that no alias points at"""
+        indices = self._physical_indices(service)
+        by_version = sorted(indices, key=lambda index: self._version_of(service, index), reverse=True)
+        expired = [index for index in by_version[self.keep_versions:] if not indices[index].get('aliases')]
+        for index in expired:
+            service.client.indices.delete(index=index)
+        if expired:
+            logger.info(f"Deleted old search indices: {', '.join(expired)}")
+        return expired
+
+    def abort(self, service, new_index: str):
+        """Drop a version that failed to build or verify; deleting it also drops its aliases"""
+        try:
+            service.client.indices.delete(index=new_index)
+        except NotFoundError:
+            pass
+
+    def rebuild(self, batch_size: Optional[int] = None, workers: Optional[int] = None) -> Dict[str, Any]:
+        """Build, verify and switch to a new index version without interrupting searches.
+
+        The live index keeps serving reads and receiving writes until the swap. A
+        failed build or verification drops the new version and leaves the live one
+        untouched; a rebuild does not resume, it starts over with a fresh version.
+        """
+        service = self._get_service()
+        if service is None:
+            return {'error': 'OpenSearch is not configured'}
+
+        started = time.perf_counter()
+        new_index = self.prepare(service)
+        report: Dict[str, Any] = {'index_name': new_index, 'status': 'building', 'started_at': utc_now().isoformat()}
+        self.last_report = report
+        try:
+            report['reindex'] = SearchReindexer(service=service, batch_size=batch_size, workers=workers)\
+                .run(name=f'rebuild-{new_index}', resume=False, index_name=new_index)
+            if not report['reindex'].get('completed'):
+                report['status'] = 'failed'
+            else:
+                report['status'] = 'verifying'
+                report['verification'] = self.verify(service, new_index)
+                if not report['verification']['ok']:
+                    report['status'] = 'verification_failed'
+                else:
+                    report['replaced_indices'] = self.swap(service, new_index)
+                    report['deleted_indices'] = self.apply_retention(service)
+                    report['status'] = 'completed'
+                    bump_generation()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Search index rebuild into {new_index} failed: {e}")
+            report['status'] = 'failed'
+            report['error'] = 'Rebuild failed; the live index was left unchanged'
+
+        if report['status'] != 'completed':
+            self.abort(service, new_index)
+            logger.warning(f"Search index rebuild {report['status']}; dropped {new_index}")
+        report['duration_seconds'] = round(time.perf_counter() - started, 3)
+        return report
+
+
+search_index_manager = SearchIndexManager()
+
+
+def start_rebuild(app, **kwargs) -> bool:
+    """Run a rebuild as a Socket.IO background task; False if a reindex or rebuild is already running here"""
+    return start_exclusive_task(app, lambda: search_index_manager.rebuild(**kwargs))
@@ -0,0 +1,344 @@
+"""
+Search Indexer
+Transactional outbox for OpenSearch: document writes record a search_outbox row
+in their own transaction, and a background indexer drains the outbox in bulk
+batches, so a slow or unavailable cluster never touches the write path.
+"""
+
+import logging
+import random
+import threading
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Union
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, func
+
+from app import db, socketio
+from app.models.document import Document
+from app.models.search_outbox import SearchOutbox
+from app.services.opensearch_service import get_opensearch_service
+from app.services.search_statistics import bump_generation
+from app.utils.datetime_utils import utc_now
+from app.utils.korean_text import process_korean_documents
+
+logger = logging.getLogger(__name__)
+
+
+def _as_utc(value):
+    # DateTime columns come back naive; they are written as UTC
+    return value.replace(tzinfo=timezone.utc) if value is not None and value.tzinfo is None else value
+
+
+def external_version(value: Union[datetime, str, None]) -> Optional[int]:
+    """OpenSearch external version for a document timestamp (microseconds since the epoch).
+
+    Every writer sends it with version_type=external_gte, so when the incremental
+    indexer and a rebuild write the same document, an older copy arriving late is
+    rejected with 409 instead of overwriting a newer one.
+    """
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    value = _as_utc(value)
+    return int(value.timestamp()) * 1_000_000 + value.microsecond
+
+
+def document_payload(document: Document) -> Dict[str, Any]:
+    """OpenSearch source for a document (before Korean processing)"""
+    return {
+        'id': document.id,
+        'title': document.title,
+        'content': document.markdown_content,
+        'author': document.author,
+        'tags': [tag.name for tag in document.tags],
+        'user_id': document.user_id,
+        'is_public': document.is_public,
+        'is_published': document.is_published,
+        'created_at': document.created_at.isoformat() if document.created_at else None,
+        'updated_at': document.updated_at.isoformat() if document.updated_at else None,
+        'published_at': document.published_at.isoformat() if document.published_at else None,
+        'metadata': document.document_metadata or {}
+    }
+
+
+def build_index_payloads(documents: List[Document]) -> List[Dict[str, Any]]:
+    """Payloads with Korean processing applied, one analyzer pass per document"""
+    payloads = [document_payload(document) for document in documents]
+    with_content = [payload for payload in payloads if payload['content']]
+    # Serial: batches here are small and the analyzer in this process is already warm
+    analyses = process_korean_documents(
+        ((payload['title'] or '', payload['content']) for payload in with_content), workers=1
+    )
+    for payload, korean_processing in zip(with_content, analyses):
+        payload.update(korean_processing)
+    return payloads
+
+
+class SearchIndexer:
+    BATCH_SIZE = 500
+    # Rows that failed this many times stay in the outbox but are no longer retried
+    MAX_ATTEMPTS = 10
+    BASE_BACKOFF_SECONDS = 2.0
+    MAX_BACKOFF_SECONDS = 600.0
+    # Sleep between polls when the outbox is empty
+    IDLE_INTERVAL_SECONDS = 2.0
+    # Recent index lag samples kept for the percentiles
+    LAG_SAMPLES = 1000
+
+    def __init__(self, service=None):
+        self._service = service
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._lag_samples: deque = deque(maxlen=self.LAG_SAMPLES)
+        self._counters = {
+            'batches': 0,
+            'changes_applied': 0,
+            'changes_coalesced': 0,
+            'documents_indexed': 0,
+            'documents_deleted': 0,
+            'documents_failed': 0,
+        }
+        self._last_batch_at = None
+        self._last_error: Optional[str] = None
+
+    def _get_service(self):
+        return self._service or get_opensearch_service()
+
+    def backoff_seconds(self, attempts: int) -> float:
+        """Exponential backoff with jitter for a row that has failed `attempts` times"""
+        delay = min(self.MAX_BACKOFF_SECONDS, self.BASE_BACKOFF_SECONDS * 2 ** (attempts - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    def drain_once(self, batch_size: Optional[int] = None) -> Dict[str, Any]:
+        """Apply one batch of pending outbox rows to OpenSearch.
+
+        Rows for the same document are coalesced into a single index or delete
+        action reflecting the document's current state. Failed documents are
+        pushed back with exponential backoff; successful rows are deleted.
+        """
+        service = self._get_service()
+        if service is None:
+            return {'error': 'OpenSearch is not configured'}
+
+        now = utc_now()
+        rows = SearchOutbox.query\
+            .filter(SearchOutbox.available_at <= now, SearchOutbox.attempts < self.MAX_ATTEMPTS)\
+            .order_by(SearchOutbox.id)\
+            .limit(batch_size or self.BATCH_SIZE)\
+            .with_for_update(skip_locked=True)\
+            .all()
+        if not rows:
+            db.session.commit()
+            return {'changes': 0, 'documents': 0}
+
+        # Coalesce: the newest row decides between index and delete
+        rows_by_document: Dict[int, List[SearchOutbox]] = {}
+        for row in rows:
+            rows_by_document.setdefault(row.document_id, []).append(row)
+        upsert_ids = [doc_id for doc_id, doc_rows in rows_by_document.items()
+                      if doc_rows[-1].operation == SearchOutbox.OPERATION_UPSERT]
+
+        documents = Document.query.filter(Document.id.in_(upsert_ids)).all() if upsert_ids else []
+        indexed_ids = {document.id for document in documents}
+        # Deleted documents, and upserts whose document is already gone; versioned by the time
+        # of the delete so a rebuild that read the document earlier cannot bring it back
+        deletes = {doc_id: external_version(doc_rows[-1].created_at)
+                   for doc_id, doc_rows in rows_by_document.items() if doc_id not in indexed_ids}
+
+        failures = self._bulk(service, build_index_payloads(documents), deletes)
+
+        finished_at = utc_now()
+        succeeded_rows = []
+        for doc_id, doc_rows in rows_by_document.items():
+            if doc_id in failures:
+                for row in doc_rows:
+                    row.attempts += 1
+                    row.last_error = failures[doc_id][:1000]
+                    row.available_at = finished_at + timedelta(seconds=self.backoff_seconds(row.attempts))
+            else:
+                succeeded_rows.extend(doc_rows)
+                lag = (finished_at - _as_utc(doc_rows[0].created_at)).total_seconds()
+                self._lag_samples.append(max(lag, 0.0))
+
+        if succeeded_rows:
+            SearchOutbox.query.filter(SearchOutbox.id.in_([row.id for row in succeeded_rows]))\
+                .delete(synchronize_session=False)
+        db.session.commit()
+        if succeeded_rows:
+            bump_generation()  # cached search statistics are now out of date
+
+        deleted_ids = set(rows_by_document) - indexed_ids
+        with self._lock:
+            self._counters['batches'] += 1
+            self._counters['changes_applied'] += len(succeeded_rows)
+            self._counters['changes_coalesced'] += len(rows) - len(rows_by_document)
+            self._counters['documents_indexed'] += len(indexed_ids - failures.keys())
+            self._counters['documents_deleted'] += len(deleted_ids - failures.keys())
+            self._counters['documents_failed'] += len(failures)
+            self._last_batch_at = finished_at
+            if failures:
+                self._last_error = next(iter(failures.values()))[:1000]
+
+        if failures:
+            logger.warning(f"Search indexer: {len(failures)} of {len(rows_by_document)} documents failed, will retry")
+
+        return {
+            'changes': len(rows),
+            'documents': len(rows_by_document),
+            'failed': len(failures),
+            'duration_seconds': round((finished_at - now).total_seconds(), 3)
+        }
+
+    def _bulk(self, service, payloads: List[Dict[str, Any]], deletes: Dict[int, Optional[int]]) -> Dict[int, str]:
+        """Apply index and delete actions with helpers.streaming_bulk; returns {document_id: error} for failures.
+
+        Actions go to every index behind the write alias, which during a rebuild
+        is the live index and the one being built.
+        """
+        from opensearchpy.helpers import streaming_bulk
+
+        def versioned(action, version):
+            if version is not None:
+                action.update(version=version, version_type='external_gte')
+            return action
+
+        failures: Dict[int, str] = {}
+        try:
+            write_indices = service.get_document_write_indices()
+            actions = [versioned({'_op_type': 'index', '_index': index_name, '_id': payload['id'], '_source': payload},
+                                 external_version(payload['updated_at']))
+                       for payload in payloads for index_name in write_indices]
+            actions.extend(versioned({'_op_type': 'delete', '_index': index_name, '_id': doc_id}, version)
+                           for doc_id, version in deletes.items() for index_name in write_indices)
+            for ok, item in streaming_bulk(service.client, actions, chunk_size=self.BATCH_SIZE,
+                                           raise_on_error=False, max_retries=0, request_timeout=60):
+                op_type, result = next(iter(item.items()))
+                # Deleting a document the index never had is fine, and so is a 409:
+                # the index already holds a newer version of the document
+                if not ok and result.get('status') != 409 and not (op_type == 'delete' and result.get('status') == 404):
+                    failures[int(result['_id'])] = str(result.get('error') or result.get('status'))
+        except Exception as e:
+            logger.error(f"Search indexer bulk request failed: {e}")
+            return {doc_id: str(e) for doc_id in [payload['id'] for payload in payloads] + list(deletes)}
+        return failures
+
+    def drain(self, max_batches: Optional[int] = None) -> Dict[str, Any]:
+        """Drain batches until the outbox has nothing ready (or max_batches is reached)"""
+        totals = {'batches': 0, 'changes': 0, 'documents': 0, 'failed': 0}
+        while max_batches is None or totals['batches'] < max_batches:
+            result = self.drain_once()
+            if 'error' in result:
+                return {**totals, 'error': result['error']}
+            if not result['changes']:
+                break
+            totals['batches'] += 1
+            for key in ('changes', 'documents', 'failed'):
+                totals[key] += result[key]
+            if result['failed'] == result['documents']:
+                break  # everything is backing off; let the next poll pick it up
+        return totals
+
+    def run(self, app):
+        """Poll and drain until stop() is called; meant for a background task"""
+        self._stop.clear()
+        with app.app_context():
+            while not self._stop.is_set():
+                result: Dict[str, Any] = {}
+                try:
+                    result = self.drain_once()
+                except Exception as e:
+                    db.session.rollback()
+                    logger.error(f"Search indexer batch failed: {e}")
+                finally:
+                    db.session.remove()
+                if not result.get('changes'):
+                    socketio.sleep(self.IDLE_INTERVAL_SECONDS)
+
+    def stop(self):
+        self._stop.set()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            samples = sorted(self._lag_samples)
+            metrics: Dict[str, Any] = dict(self._counters)
+            metrics['last_batch_at'] = self._last_batch_at.isoformat() if self._last_batch_at else None
+            metrics['last_error'] = self._last_error
+
+        def pct(p: float) -> Optional[float]:
+            if not samples:
+                return None
+            return round(samples[min(len(samples) - 1, int(p * len(samples)))], 3)
+
+        metrics['lag_seconds'] = {
+            'samples': len(samples),
+            'p50': pct(0.50),
+            'p95': pct(0.95),
+            'max': round(samples[-1], 3) if samples else None
+        }
+        return metrics
+
+    def get_backlog(self) -> Dict[str, Any]:
+        """Pending outbox size and the age of the oldest pending change"""
+        retryable = SearchOutbox.attempts < self.MAX_ATTEMPTS
+        pending_changes, pending_documents, oldest = db.session.query(
+            func.count(SearchOutbox.id),
+            func.count(func.distinct(SearchOutbox.document_id)),
+            func.min(SearchOutbox.created_at)
+        ).filter(retryable).one()
+        failed_changes = db.session.query(func.count(SearchOutbox.id)).filter(~retryable).scalar()
+
+        oldest = _as_utc(oldest)
+        return {
+            'pending_changes': pending_changes,
+            'pending_documents': pending_documents,
+            'failed_changes': failed_changes,
+            'oldest_pending_at': oldest.isoformat() if oldest else None,
+            'oldest_pending_age_seconds': round((utc_now() - oldest).total_seconds(), 3) if oldest else 0.0,
+            'indexer': self.get_metrics()
+        }
+
+
+search_indexer = SearchIndexer()
+
+
+def outbox_enabled() -> bool:
+    return has_app_context() and bool(current_app.config.get('SEARCH_OUTBOX_ENABLED'))
+
+
+def _enqueue_document_changes(session, flush_context):
+    """Record an outbox row for every document written in this flush, in the same transaction"""
+    if not outbox_enabled():
+        return
+
+    changes = []
+    for obj in session.new:
+        if isinstance(obj, Document):
+            changes.append((obj.id, SearchOutbox.OPERATION_UPSERT))
+    for obj in session.dirty:
+        if isinstance(obj, Document) and session.is_modified(obj):
+            changes.append((obj.id, SearchOutbox.OPERATION_UPSERT))
+    for obj in session.deleted:
+        if isinstance(obj, Document):
+            changes.append((obj.id, SearchOutbox.OPERATION_DELETE))
+
+    if changes:
+        now = utc_now()
+        session.connection().execute(SearchOutbox.__table__.insert(), [
+            {'document_id': doc_id, 'operation': operation, 'created_at': now, 'available_at': now, 'attempts': 0}
+            for doc_id, operation in changes
+        ])
+
+
+def register_search_outbox_events():
+    """Register the ORM hook that writes search_outbox rows on document create/update/delete"""
+    if not event.contains(db.session, 'after_flush', _enqueue_document_changes):
+        event.listen(db.session, 'after_flush', _enqueue_document_changes)
+
+
+def start_search_indexer(app):
+    """Run the outbox indexer as a Socket.IO background task for the life of the process"""
+    logger.info("Starting background search indexer")
+    return socketio.start_background_task(search_indexer.run, app)
@@ -0,0 +1,277 @@
+"""
+Search Reindexer
+Streaming full reindex of documents into OpenSearch with bounded memory:
+keyset-ordered batches from the database, Korean analysis in a process pool
+(overlapping with indexing of the previous batch), parallel_bulk with chunks
+sized by payload bytes, and a checkpoint after every batch so an interrupted
+run resumes where it stopped.
+"""
+
+import json
+import logging
+import os
+import resource
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app import db, socketio
+from app.models.document import Document
+from app.models.search_outbox import SearchOutbox, SearchReindexCheckpoint
+from app.services.opensearch_service import get_opensearch_service
+from app.services.search_indexer import document_payload, external_version
+from app.utils.datetime_utils import utc_now
+from app.utils.korean_text import (
+    MAX_ANALYSIS_WORKERS, create_analysis_pool, korean_processor, map_korean_documents
+)
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+
+def current_rss_bytes() -> int:
+    """Resident set size of this process (falls back to the lifetime peak off Linux)"""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class SearchReindexer:
+    BATCH_SIZE = 500
+    # Bulk request size target; the document count per chunk follows from the payload sizes
+    TARGET_CHUNK_BYTES = 5 * MB
+    MIN_CHUNK_BYTES = 256 * 1024
+    MIN_CHUNK_DOCS = 10
+    MAX_CHUNK_DOCS = 2000
+    THREAD_COUNT = 2
+    # Statuses that mean "send less per request", not "this document is bad"
+    THROTTLE_STATUSES = (413, 429)
+
+    def __init__(self, service=None, batch_size: Optional[int] = None, workers: Optional[int] = None,
+                 thread_count: Optional[int] = None, target_chunk_bytes: Optional[int] = None):
+        self._service = service
+        self.batch_size = batch_size or self.BATCH_SIZE
+        self.workers = workers if workers is not None else min(os.cpu_count() or 1, MAX_ANALYSIS_WORKERS)
+        self.thread_count = thread_count or self.THREAD_COUNT
+        self.target_chunk_bytes = target_chunk_bytes or self.TARGET_CHUNK_BYTES
+
+    def _get_service(self):
+        return self._service or get_opensearch_service()
+
+    def _read_batches(self, after_id: int) -> Iterator[List[Dict[str, Any]]]:
+        """Document payloads in id order, one keyset batch at a time"""
+        last_id = after_id
+        while True:
+            documents = Document.query.filter(Document.id > last_id)\
+                .order_by(Document.id).limit(self.batch_size).all()
+            if not documents:
+                return
+            last_id = documents[-1].id
+            yield [document_payload(document) for document in documents]
+
+    def _start_analysis(self, pool, payloads: List[Dict[str, Any]]):
+        """Submit a batch for Korean analysis; the returned callable collects the results"""
+        pending = [payload for payload in payloads if payload['content']]
+        texts = [(payload['title'] or '', payload['content']) for payload in pending]
+        if pool is not None:
+            results = map_korean_documents(pool, texts)
+        else:
+            results = None
+
+        def collect():
+            analyses = results if results is not None else (korean_processor.analyze(*text) for text in texts)
+            for payload, korean_processing in zip(pending, analyses):
+                payload.update(korean_processing)
+            return payloads
+
+        return collect
+
+    def _chunk_size(self, sources: List[str]) -> int:
+        average = sum(len(source) for source in sources) / len(sources)
+        return int(max(self.MIN_CHUNK_DOCS, min(self.MAX_CHUNK_DOCS, self.target_chunk_bytes // max(average, 1))))
+
+    def _send(self, service, index_name: str, items: List[Tuple[int, str, Optional[int]]]) -> Dict[int, Any]:
+        """parallel_bulk over pre-serialized sources; returns {document_id: status or error} for failures"""
+        from opensearchpy.helpers import parallel_bulk
+
+        def actions():
+            for doc_id, source, version in items:
+                action = {'_index': index_name, '_id': doc_id, '_source': source}
+                if version is not None:
+                    action.update(version=version, version_type='external_gte')
+                yield action
+
+        failures: Dict[int, Any] = {}
+        for ok, item in parallel_bulk(service.client, actions(), thread_count=self.thread_count,
+                                      chunk_size=self._chunk_size([source for _, source, _ in items]),
+                                      max_chunk_bytes=self.target_chunk_bytes, queue_size=self.thread_count,
+                                      raise_on_error=False, raise_on_exception=False, request_timeout=120):
+            result = next(iter(item.values()))
+            # 409: the incremental indexer already wrote a newer version of this document
+            if not ok and result.get('status') != 409:
+                failures[int(result['_id'])] = result.get('status') or result.get('error')
+        return failures
+
+    def _index_batch(self, service, index_name: str, payloads: List[Dict[str, Any]]) -> Tuple[int, List[int]]:
+        """Index one batch; returns (bytes sent, ids that still failed after one throttled retry)"""
+        # Serialized once: the client passes str sources through, and the byte sizes drive chunking
+        items = [(payload['id'], json.dumps(payload, ensure_ascii=False, default=str),
+                  external_version(payload['updated_at'])) for payload in payloads]
+        sent_bytes = sum(len(source.encode('utf-8')) for _, source, _ in items)
+
+        failures = self._send(service, index_name, items)
+        throttled = [doc_id for doc_id, status in failures.items()
+                     if status in self.THROTTLE_STATUSES or not isinstance(status, int)]
+        if throttled:
+            # Cluster pushed back (or the request failed): smaller chunks from now on, retry once
+            self.target_chunk_bytes = max(self.MIN_CHUNK_BYTES, self.target_chunk_bytes // 2)
+            logger.warning(f"Reindex throttled, chunk target now {self.target_chunk_bytes // 1024} KiB")
+            retry = set(throttled)
+            for doc_id in retry:
+                failures.pop(doc_id)
+            failures.update(self._send(service, index_name, [item for item in items if item[0] in retry]))
+
+        return sent_bytes, list(failures)
+
+    def run(self, name: str = 'documents', resume: bool = True, index_name: Optional[str] = None,
+            max_batches: Optional[int] = None) -> Dict[str, Any]:
+        """Reindex every document, checkpointing after each batch.
+
+        With resume=True an unfinished checkpoint of the same name continues after
+        its last committed document. Documents that still fail are queued in the
+        search outbox for the incremental indexer. Returns the run report.
+        """
+        service = self._get_service()
+        if service is None:
+            return {'error': 'OpenSearch is not configured'}
+        index_name = index_name or service.document_index
+
+        checkpoint = db.session.get(SearchReindexCheckpoint, name)
+        resumed_from = 0
+        if checkpoint and resume and checkpoint.status != SearchReindexCheckpoint.STATUS_COMPLETED \
+                and checkpoint.index_name == index_name:
+            resumed_from = checkpoint.last_document_id
+        else:
+            if checkpoint is None:
+                checkpoint = SearchReindexCheckpoint(name=name)
+                db.session.add(checkpoint)
+            checkpoint.index_name = index_name
+            checkpoint.last_document_id = 0
+            checkpoint.documents_indexed = 0
+            checkpoint.documents_failed = 0
+            checkpoint.started_at = utc_now()
+        checkpoint.status = SearchReindexCheckpoint.STATUS_RUNNING
+        checkpoint.completed_at = None
+        db.session.commit()
+
+        started = time.perf_counter()
+        rss_start = peak_rss = current_rss_bytes()
+        totals = {'batches': 0, 'documents': 0, 'failed': 0, 'bytes': 0}
+        pool = create_analysis_pool(self.workers) if self.workers > 1 else None
+
+        try:
+            batches = self._read_batches(resumed_from)
+            batch = next(batches, None)
+            analysis = self._start_analysis(pool, batch) if batch else None
+            while batch and (max_batches is None or totals['batches'] < max_batches):
+                payloads = analysis()
+                # Submit the next batch to the pool before indexing this one, so the two overlap
+                batch = next(batches, None)
+                analysis = self._start_analysis(pool, batch) if batch else None
+
+                sent_bytes, failed_ids = self._index_batch(service, index_name, payloads)
+                if failed_ids:
+                    now = utc_now()
+                    db.session.execute(SearchOutbox.__table__.insert(), [
+                        {'document_id': doc_id, 'operation': SearchOutbox.OPERATION_UPSERT,
+                         'created_at': now, 'available_at': now, 'attempts': 0}
+                        for doc_id in failed_ids
+                    ])
+
+                totals['batches'] += 1
+                totals['documents'] += len(payloads) - len(failed_ids)
+                totals['failed'] += len(failed_ids)
+                totals['bytes'] += sent_bytes
+                checkpoint.last_document_id = payloads[-1]['id']
+                checkpoint.documents_indexed += len(payloads) - len(failed_ids)
+                checkpoint.documents_failed += len(failed_ids)
+                db.session.commit()
+                peak_rss = max(peak_rss, current_rss_bytes())
+
+            if batch is None:
+                checkpoint.status = SearchReindexCheckpoint.STATUS_COMPLETED
+                checkpoint.completed_at = utc_now()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Reindex '{name}' failed after document {checkpoint.last_document_id}: {e}")
+            checkpoint.status = SearchReindexCheckpoint.STATUS_FAILED
+            totals['error'] = 'Reindex failed; run again with resume to continue'
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+
+        duration = time.perf_counter() - started
+        report = {
+            'index_name': index_name,
+            'resumed_from_document_id': resumed_from,
+            'last_document_id': checkpoint.last_document_id,
+            'completed': checkpoint.status == SearchReindexCheckpoint.STATUS_COMPLETED,
+            'batches': totals['batches'],
+            'documents_indexed': totals['documents'],
+            'documents_failed': totals['failed'],
+            'duration_seconds': round(duration, 3),
+            'docs_per_sec': round(totals['documents'] / duration, 1) if duration else None,
+            'mb_per_sec': round(totals['bytes'] / MB / duration, 2) if duration else None,
+            'bytes_sent': totals['bytes'],
+            'rss_start_mb': round(rss_start / MB, 1),
+            'peak_rss_mb': round(peak_rss / MB, 1),
+            'final_chunk_target_kb': self.target_chunk_bytes // 1024,
+            'analysis_workers': self.workers if pool is not None else 1
+        }
+        if 'error' in totals:
+            report['error'] = totals['error']
+        checkpoint.report = report
+        db.session.commit()
+
+        logger.info(f"Reindex '{name}': {totals['documents']} documents in {duration:.1f}s, "
+                    f"peak RSS {report['peak_rss_mb']} MB")
+        return report
+
+
+_reindex_lock = threading.Lock()
+
+
+def get_reindex_status(name: str = 'documents') -> Optional[Dict[str, Any]]:
+    checkpoint = db.session.get(SearchReindexCheckpoint, name)
+    return checkpoint.to_dict() if checkpoint else None
+
+
+def start_exclusive_task(app, target) -> bool:
+    """Run target() in an app context as a Socket.IO background task.
+
+    Reindexes and rebuilds share one lock; False if one is already running in this process.
+    """
+    if not _reindex_lock.acquire(blocking=False):
+        return False
+
+    def task():
+        try:
+            with app.app_context():
+                try:
+                    target()
+                finally:
+                    db.session.remove()
+        finally:
+            _reindex_lock.release()
+
+    socketio.start_background_task(task)
+    return True
+
+
+def start_reindex(app, **kwargs) -> bool:
+    """Run a reindex as a Socket.IO background task; False if one is already running here"""
+    batch_size = kwargs.pop('batch_size', None)
+    return start_exclusive_task(app, lambda: SearchReindexer(batch_size=batch_size).run(**kwargs))
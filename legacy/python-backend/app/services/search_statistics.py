@@ -0,0 +1,208 @@
+"""
+Search Statistics
+Precomputed OpenSearch aggregations for dashboards. Document statistics and the
+tag vocabulary behind tag suggestions are computed on a schedule or when the
+index changes, stored in the app cache with the index generation they were
+computed at, and served from there instead of aggregating on every request.
+
+The generation is a counter in the cache that the outbox indexer and index
+rebuilds bump. A cached result is fresh while its generation is current;
+callers pass max_age to also accept a result from an older generation computed
+less than that many seconds ago. Nothing is kept longer than STATS_CACHE_TTL,
+which covers index writes that bypass the generation. Only an admin refresh
+forces recomputation.
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from app import cache, socketio
+from app.services.opensearch_service import get_opensearch_service
+from app.utils.constants import STATS_CACHE_TTL
+
+logger = logging.getLogger(__name__)
+
+GENERATION_KEY = 'search_stats:generation'
+STATISTICS_KEY = 'search_stats:statistics:{scope}'
+TAG_VOCABULARY_KEY = 'search_stats:tag_vocabulary'
+
+# Staleness dashboards accept by default when the index has changed since the last computation
+DEFAULT_MAX_AGE = 60
+REFRESH_INTERVAL_SECONDS = 30
+TAG_VOCABULARY_SIZE = 5000
+
+
+def current_generation() -> int:
+    return cache.get(GENERATION_KEY) or 0
+
+
+def bump_generation() -> int:
+    """Mark cached statistics as out of date; called after every change to the search index.
+
+    Not atomic across workers: two concurrent bumps may store the same number,
+    which is harmless as both bumps read it after their change was indexed.
+    """
+    try:
+        generation = current_generation() + 1
+        cache.set(GENERATION_KEY, generation, timeout=0)
+        return generation
+    except Exception as e:
+        logger.warning(f"Could not bump search statistics generation: {e}")
+        return 0
+
+
+class SearchStatistics:
+    """Cache of statistics and tag-vocabulary aggregations, keyed by access scope and index generation"""
+
+    def __init__(self, service=None, clock: Callable[[], float] = time.time):
+        self._service = service
+        self._clock = clock
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self._stop = threading.Event()
+        self._counters = {'hits': 0, 'stale_hits': 0, 'computations': 0, 'failures': 0}
+        self._counter_lock = threading.Lock()
+
+    def _get_service(self):
+        return self._service or get_opensearch_service()
+
+    def _count(self, counter: str):
+        with self._counter_lock:
+            self._counters[counter] += 1
+
+    def _lock_for(self, key: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _is_fresh(self, entry: Optional[Dict[str, Any]], generation: int, max_age: float) -> bool:
+        if entry is None:
+            return False
+        return entry['generation'] == generation or self._clock() - entry['computed_at'] < max_age
+
+    def _cached(self, key: str, compute: Callable[[], Any], max_age: float, force: bool = False):
+        """Cached entry for key, recomputed when it is neither current nor within max_age.
+
+        One computation per key at a time in this process: concurrent callers wait
+        for it and then read the stored result. If the computation fails an
+        existing entry is served however old it is; None means nothing to serve.
+        """
+        max_age = max(0.0, min(max_age, STATS_CACHE_TTL))
+        generation = current_generation()
+        entry = cache.get(key)
+        if not force and self._is_fresh(entry, generation, max_age):
+            self._count('hits' if entry['generation'] == generation else 'stale_hits')
+            return entry
+
+        with self._lock_for(key):
+            entry = cache.get(key)
+            generation = current_generation()
+            if not force and self._is_fresh(entry, generation, max_age):
+                self._count('hits' if entry['generation'] == generation else 'stale_hits')
+                return entry
+
+            value = compute()
+            if not value:
+                self._count('failures')
+                return entry
+            self._count('computations')
+            entry = {'generation': generation, 'computed_at': self._clock(), 'value': value}
+            cache.set(key, entry, timeout=STATS_CACHE_TTL)
+            return entry
+
+    def _describe(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'generation': entry['generation'],
+            'current_generation': current_generation(),
+            'age_seconds': round(self._clock() - entry['computed_at'], 3)
+        }
+
+    def _statistics(self, service, user_id: Optional[int], max_age: float, force: bool = False):
+        scope = 'public' if user_id is None else f'user:{user_id}'
+        return self._cached(STATISTICS_KEY.format(scope=scope),
+                            lambda: service.get_document_statistics(user_id=user_id), max_age, force)
+
+    def _tag_vocabulary(self, service, max_age: float, force: bool = False):
+        return self._cached(TAG_VOCABULARY_KEY,
+                            lambda: service.get_tag_vocabulary(TAG_VOCABULARY_SIZE), max_age, force)
+
+    def get_statistics(self, user_id: Optional[int] = None,
+                       max_age: float = DEFAULT_MAX_AGE) -> Optional[Dict[str, Any]]:
+        """Document statistics for the user's access scope (public documents for None)"""
+        service = self._get_service()
+        if service is None:
+            return None
+        entry = self._statistics(service, user_id, max_age)
+        if entry is None:
+            return None
+        return {**entry['value'], 'cache': self._describe(entry)}
+
+    def suggest_tags(self, query: str, limit: int = 10, max_age: float = DEFAULT_MAX_AGE) -> List[str]:
+        """Tags containing query, most used first, matched against the cached tag vocabulary.
+
+        Falls back to the live aggregation when the vocabulary is unavailable, or
+        when it was truncated and did not yield limit matches.
+        """
+        service = self._get_service()
+        if service is None:
+            return []
+        limit = max(1, min(limit, service.MAX_TAG_SUGGESTIONS))
+        entry = self._tag_vocabulary(service, max_age)
+        if entry is None:
+            return service.suggest_tags(query, limit)
+
+        vocabulary = entry['value']
+        suggestions = [tag for tag, _ in vocabulary['tags'] if query in tag][:limit]
+        if len(suggestions) < limit and not vocabulary['complete']:
+            return service.suggest_tags(query, limit)
+        return suggestions
+
+    def refresh(self) -> Dict[str, Any]:
+        """Admin refresh: start a new generation and recompute public statistics and the tag vocabulary now"""
+        generation = bump_generation()
+        service = self._get_service()
+        entries = {
+            'statistics': self._statistics(service, None, 0, force=True) if service else None,
+            'tag_vocabulary': self._tag_vocabulary(service, 0, force=True) if service else None
+        }
+        return {
+            'generation': generation,
+            # False when the recomputation failed and the previous result is still served
+            **{name: entry is not None and entry['generation'] == generation for name, entry in entries.items()}
+        }
+
+    def refresh_stale(self) -> bool:
+        """Scheduled refresh: recompute the shared results if the index changed since they were computed"""
+        service = self._get_service()
+        if service is None:
+            return False
+        return self._statistics(service, None, 0) is not None and self._tag_vocabulary(service, 0) is not None
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._counter_lock:
+            return {**self._counters, 'generation': current_generation()}
+
+    def run(self, app, interval: float = REFRESH_INTERVAL_SECONDS):
+        """Refresh on a schedule until stop() is called; meant for a background task"""
+        self._stop.clear()
+        with app.app_context():
+            while not self._stop.is_set():
+                try:
+                    self.refresh_stale()
+                except Exception as e:
+                    logger.error(f"Search statistics refresh failed: {e}")
+                socketio.sleep(interval)
+
+    def stop(self):
+        self._stop.set()
+
+
+search_statistics = SearchStatistics()
+
+
+def start_search_statistics(app):
+    """Keep the shared statistics warm as a Socket.IO background task for the life of the process"""
+    logger.info("Starting background search statistics refresh")
+    return socketio.start_background_task(search_statistics.run, app,
+                                          app.config.get('SEARCH_STATISTICS_INTERVAL', REFRESH_INTERVAL_SECONDS))
@@ -0,0 +1,198 @@
+"""
+Rope buffer for collaborative session content.
+
+Text is held as chunks in a treap ordered by position, so inserts and deletes
+touch O(log n) nodes instead of copying the whole document. Keystroke-sized
+edits inside a chunk rewrite only that chunk; larger edits split and merge the
+tree. The full string is materialized on demand and cached until the next edit.
+"""
+
+import random
+from typing import Dict, List, Optional, Tuple
+
+# Upper bound for a chunk grown by in-place edits; larger inserts become new nodes
+MAX_CHUNK = 2048
+
+_priorities = random.Random()
+
+
+class _Node:
+    __slots__ = ('text', 'priority', 'left', 'right', 'size')
+
+    def __init__(self, text: str, priority: Optional[float] = None):
+        self.text = text
+        self.priority = _priorities.random() if priority is None else priority
+        self.left: Optional['_Node'] = None
+        self.right: Optional['_Node'] = None
+        self.size = len(text)
+
+
+def _size(node: Optional[_Node]) -> int:
+    return node.size if node else 0
+
+
+def _update(node: _Node) -> _Node:
+    node.size = len(node.text) + _size(node.left) + _size(node.right)
+    return node
+
+
+def _merge(a: Optional[_Node], b: Optional[_Node]) -> Optional[_Node]:
+    if a is None:
+        return b
+    if b is None:
+        return a
+    if a.priority >= b.priority:
+        a.right = _merge(a.right, b)
+        return _update(a)
+    b.left = _merge(a, b.left)
+    return _update(b)
+
+
+def _split(node: Optional[_Node], position: int) -> Tuple[Optional[_Node], Optional[_Node]]:
+    """Split into (first position characters, the rest)"""
+    if node is None:
+        return None, None
+    left_size = _size(node.left)
+    if position <= left_size:
+        head, node.left = _split(node.left, position)
+        return head, _update(node)
+    offset = position - left_size
+    if offset >= len(node.text):
+        node.right, tail = _split(node.right, offset - len(node.text))
+        return _update(node), tail
+    # Cut inside this chunk; the tail keeps the priority so both halves stay valid treaps
+    tail = _Node(node.text[offset:], node.priority)
+    tail.right = node.right
+    node.text = node.text[:offset]
+    node.right = None
+    return _update(node), _update(tail)
+
+
+def _build(text: str) -> Optional[_Node]:
+    root = None
+    for start in range(0, len(text), MAX_CHUNK):
+        root = _merge(root, _Node(text[start:start + MAX_CHUNK]))
+    return root
+
+
+class TextBuffer:
+    """Mutable document text with O(log n) insert and delete"""
+
+    def __init__(self, text: str = ''):
+        self._root = _build(text or '')
+        self._text: Optional[str] = text or ''
+
+    def __len__(self) -> int:
+        return _size(self._root)
+
+    def __str__(self) -> str:
+        return self.text
+
+    @property
+    def text(self) -> str:
+        """The whole document, materialized once per edit"""
+        if self._text is None:
+            chunks: List[str] = []
+            stack: List[_Node] = []
+            node = self._root
+            while stack or node:
+                while node:
+                    stack.append(node)
+                    node = node.left
+                node = stack.pop()
+                chunks.append(node.text)
+                node = node.right
+            self._text = ''.join(chunks)
+        return self._text
+
+    def _path_to(self, position: int, end: int) -> Optional[Tuple[List[_Node], int]]:
+        """Nodes from the root to the chunk holding [position, end], and the offset in it"""
+        path = []
+        node = self._root
+        while node:
+            path.append(node)
+            left_size = _size(node.left)
+            # Inserts at a chunk boundary extend the chunk before it, where typing continues
+            if position < left_size or (position == end == left_size and node.left):
+                node = node.left
+                continue
+            offset = position - left_size
+            if end - left_size <= len(node.text):
+                return path, offset
+            if offset < len(node.text):
+                return None
+            position -= left_size + len(node.text)
+            end -= left_size + len(node.text)
+            node = node.right
+        return None
+
+    def insert(self, position: int, text: str) -> None:
+        if not 0 <= position <= len(self):
+            raise IndexError(f'insert position {position} outside document of length {len(self)}')
+        if not text:
+            return
+        self._text = None
+        found = self._path_to(position, position) if len(text) < MAX_CHUNK else None
+        if found:
+            path, offset = found
+            chunk = path[-1]
+            if len(chunk.text) + len(text) <= MAX_CHUNK:
+                chunk.text = chunk.text[:offset] + text + chunk.text[offset:]
+                for node in path:
+                    node.size += len(text)
+                return
+        head, tail = _split(self._root, position)
+        self._root = _merge(_merge(head, _build(text)), tail)
+
+    def delete(self, position: int, length: int) -> None:
+        if position < 0 or length < 0 or position + length > len(self):
+            raise IndexError(f'delete range {position}+{length} outside document of length {len(self)}')
+        if not length:
+            return
+        self._text = None
+        found = self._path_to(position, position + length)
+        if found:
+            path, offset = found
+            chunk = path[-1]
+            if len(chunk.text) > length:
+                chunk.text = chunk.text[:offset] + chunk.text[offset + length:]
+                for node in path:
+                    node.size -= length
+                return
+        head, rest = _split(self._root, position)
+        _, tail = _split(rest, length)
+        self._root = _merge(head, tail)
+
+    def replace(self, position: int, length: int, text: str) -> None:
+        self.delete(position, length)
+        self.insert(position, text)
+
+    def apply(self, operation: Dict) -> bool:
+        """Apply a validated insert/delete/replace operation; False if it falls outside the text"""
+        operation_type = operation['type']
+        position = operation['position']
+        length = operation.get('length', 0)
+        if position > len(self) or (operation_type != 'insert' and position + length > len(self)):
+            return False
+        if operation_type == 'insert':
+            self.insert(position, str(operation['text']))
+        elif operation_type == 'delete':
+            self.delete(position, length)
+        elif operation_type == 'replace':
+            self.replace(position, length, str(operation['text']))
+        else:
+            return False
+        return True
+
+
+def map_position(position: int, operation: Dict) -> int:
+    """Where a position lands once operation is applied; text inserted at the position goes after it"""
+    start = operation['position']
+    removed = operation.get('length', 0) if operation['type'] != 'insert' else 0
+    inserted = len(operation.get('text', '')) if operation['type'] != 'delete' else 0
+    if position <= start:
+        return position
+    if position < start + removed:
+        # Inside the removed range: collapse to the start of the edit
+        return start
+    return position - removed + inserted
@@ -0,0 +1,393 @@
+"""
+TF-IDF Feature Store
+Persistent corpus-wide vocabulary/IDF statistics and per-document sparse vectors,
+shared by the similarity, clustering and recommendation endpoints so they no
+longer refit a vectorizer on every request.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy import event, inspect as sa_inspect
+
+from app import db
+from app.models.document import Document
+from app.models.feature_store import TfidfModelVersion, DocumentFeatureVector
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(text: Optional[str]) -> str:
+    """SHA-256 of document content, used to detect stale vectors"""
+    return hashlib.sha256((text or '').encode('utf-8')).hexdigest()
+
+
+@dataclass
+class FeatureMatrix:
+    """Vectors for an ordered list of documents"""
+    matrix: Any  # scipy.sparse.csr_matrix, one row per document
+    feature_names: np.ndarray
+    version: int
+    stored_count: int  # rows served from the store
+    computed_count: int  # rows transformed on the fly (missing or stale)
+
+
+class _LoadedModel:
+    """A model version materialized into a transformer that never refits"""
+
+    def __init__(self, model_version: TfidfModelVersion):
+        from sklearn.feature_extraction.text import CountVectorizer
+
+        params = model_version.params or {}
+        self.version = model_version.version
+        self.vocabulary = {term: int(idx) for term, idx in model_version.vocabulary.items()}
+        self.idf = sparse.diags(np.asarray(model_version.idf, dtype=np.float64))
+        self.counter = CountVectorizer(
+            vocabulary=self.vocabulary,
+            stop_words=params.get('stop_words'),
+            ngram_range=tuple(params.get('ngram_range', (1, 1)))
+        )
+
+        names = [''] * len(self.vocabulary)
+        for term, idx in self.vocabulary.items():
+            names[idx] = term
+        self.feature_names = np.asarray(names, dtype=object)
+
+    def transform(self, texts: List[str]):
+        """Same weighting as TfidfVectorizer: raw counts * idf, then L2 normalization"""
+        from sklearn.preprocessing import normalize
+
+        counts = self.counter.transform(texts).astype(np.float64)
+        return normalize((counts @ self.idf).tocsr(), norm='l2')
+
+
+class TfidfFeatureStore:
+    DEFAULT_PARAMS: Dict[str, Any] = {
+        'max_features': 5000,
+        'stop_words': 'english',
+        'ngram_range': [1, 2],
+        'min_df': 2,
+        'max_df': 0.8
+    }
+
+    # How often the active version is re-read, so rebuilds in another worker are picked up
+    MODEL_CHECK_INTERVAL = 30.0
+    # Number of model versions kept after a rebuild (including the new one)
+    RETAINED_VERSIONS = 3
+    # Keeps IN (...) lists well below database parameter limits
+    QUERY_CHUNK_SIZE = 500
+    # Parsed vectors kept in process; a vector is a pure function of (version, content hash)
+    VECTOR_CACHE_SIZE = 20000
+
+    def __init__(self, params: Optional[Dict[str, Any]] = None):
+        self.params = dict(params or self.DEFAULT_PARAMS)
+        self._model: Optional[_LoadedModel] = None
+        self._checked_at = 0.0
+        self._engine_id: Optional[int] = None
+        self._lock = threading.Lock()
+        self._vector_cache: 'OrderedDict[Tuple[int, str], Tuple[np.ndarray, np.ndarray]]' = OrderedDict()
+
+    def invalidate(self):
+        """Drop the cached model and vectors so the next access re-reads the active version"""
+        with self._lock:
+            self._model = None
+            self._checked_at = 0.0
+            self._vector_cache.clear()
+
+    def get_active_model(self) -> Optional[_LoadedModel]:
+        """Return the active model, re-checking the database at most every MODEL_CHECK_INTERVAL"""
+        engine_id = id(db.engine)
+        now = time.monotonic()
+        if engine_id == self._engine_id and now - self._checked_at < self.MODEL_CHECK_INTERVAL:
+            return self._model
+
+        with self._lock:
+            try:
+                # Use the session's connection so a missing table never poisons the transaction
+                if not sa_inspect(db.session.connection()).has_table(TfidfModelVersion.__tablename__):
+                    self._model = None
+                else:
+                    active_version = db.session.query(TfidfModelVersion.version)\
+                        .filter(TfidfModelVersion.is_active == True)\
+                        .order_by(TfidfModelVersion.version.desc()).limit(1).scalar()
+                    if active_version is None:
+                        self._model = None
+                    elif self._model is None or self._model.version != active_version or engine_id != self._engine_id:
+                        model_version = TfidfModelVersion.query.filter_by(version=active_version).first()
+                        self._model = _LoadedModel(model_version)
+                        logger.info(f"Loaded TF-IDF feature store model v{active_version}")
+            except Exception as e:
+                logger.warning(f"Could not load TF-IDF feature store model: {e}")
+                self._model = None
+
+            self._engine_id = engine_id
+            self._checked_at = now
+            return self._model
+
+    def is_available(self) -> bool:
+        return self.get_active_model() is not None
+
+    def refresh_document(self, document: Document) -> bool:
+        """Recompute a document's vector with the active model if its content changed.
+
+        Runs inside the caller's unit of work; the vector row is committed with the document.
+        """
+        model = self.get_active_model()
+        if model is None:
+            return False
+
+        digest = content_hash(document.markdown_content)
+        current = document.feature_vector
+        if current is not None and current.content_hash == digest and current.model_version == model.version:
+            return False
+
+        row = model.transform([document.markdown_content or ''])
+        indices = row.indices.tolist()
+        values = np.round(row.data, 6).tolist()
+
+        if current is None:
+            document.feature_vector = DocumentFeatureVector(
+                model_version=model.version,
+                content_hash=digest,
+                indices=indices,
+                values=values
+            )
+        else:
+            current.model_version = model.version
+            current.content_hash = digest
+            current.indices = indices
+            current.values = values
+        return True
+
+    def get_matrix(self, documents: List[Document]) -> Optional[FeatureMatrix]:
+        """Load vectors for documents in order, transforming any missing or stale ones.
+
+        Returns None when no model has been built yet.
+        """
+        model = self.get_active_model()
+        if model is None:
+            return None
+
+        hashes = [content_hash(doc.markdown_content) for doc in documents]
+        rows: List[Optional[Tuple[np.ndarray, np.ndarray]]] = [
+            self._cache_get((model.version, digest)) for digest in hashes
+        ]
+
+        uncached_ids = [doc.id for doc, row in zip(documents, rows) if row is None and doc.id is not None]
+        stored = self._load_vectors(uncached_ids, model.version) if uncached_ids else {}
+
+        stored_count = 0
+        stale_positions: List[int] = []
+        for position, doc in enumerate(documents):
+            if rows[position] is not None:
+                stored_count += 1
+                continue
+            entry = stored.get(doc.id)
+            if entry is not None and entry[0] == hashes[position]:
+                rows[position] = (np.asarray(entry[1], dtype=np.int32), np.asarray(entry[2], dtype=np.float64))
+                self._cache_put((model.version, hashes[position]), rows[position])
+                stored_count += 1
+            else:
+                stale_positions.append(position)
+
+        if stale_positions:
+            computed = model.transform([documents[position].markdown_content or '' for position in stale_positions])
+            for k, position in enumerate(stale_positions):
+                start, end = computed.indptr[k], computed.indptr[k + 1]
+                rows[position] = (computed.indices[start:end], computed.data[start:end])
+                self._cache_put((model.version, hashes[position]), rows[position])
+
+        lengths = [len(row[0]) for row in rows]  # type: ignore[index]
+        indptr = np.concatenate(([0], np.cumsum(lengths)))
+        indices = np.concatenate([row[0] for row in rows]) if rows else np.empty(0, dtype=np.int32)  # type: ignore[index]
+        data = np.concatenate([row[1] for row in rows]) if rows else np.empty(0)  # type: ignore[index]
+
+        matrix = sparse.csr_matrix(
+            (data.astype(np.float64), indices.astype(np.int32), indptr),
+            shape=(len(documents), len(model.feature_names))
+        )
+        return FeatureMatrix(
+            matrix=matrix,
+            feature_names=model.feature_names,
+            version=model.version,
+            stored_count=stored_count,
+            computed_count=len(stale_positions)
+        )
+
+    def _cache_get(self, key: Tuple[int, str]) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        with self._lock:
+            row = self._vector_cache.get(key)
+            if row is not None:
+                self._vector_cache.move_to_end(key)
+            return row
+
+    def _cache_put(self, key: Tuple[int, str], row: Tuple[np.ndarray, np.ndarray]):
+        with self._lock:
+            self._vector_cache[key] = row
+            self._vector_cache.move_to_end(key)
+            while len(self._vector_cache) > self.VECTOR_CACHE_SIZE:
+                self._vector_cache.popitem(last=False)
+
+    def _load_vectors(self, document_ids: List[int], version: int) -> Dict[int, Tuple[str, List[int], List[float]]]:
+        """Fetch stored vectors for the given version in chunked IN queries"""
+        vectors: Dict[int, Tuple[str, List[int], List[float]]] = {}
+        for start in range(0, len(document_ids), self.QUERY_CHUNK_SIZE):
+            chunk = document_ids[start:start + self.QUERY_CHUNK_SIZE]
+            rows = db.session.query(
+                DocumentFeatureVector.document_id,
+                DocumentFeatureVector.content_hash,
+                DocumentFeatureVector.indices,
+                DocumentFeatureVector.values
+            ).filter(
+                DocumentFeatureVector.model_version == version,
+                DocumentFeatureVector.document_id.in_(chunk)
+            ).all()
+            for document_id, digest, row_indices, row_values in rows:
+                vectors[document_id] = (digest, row_indices, row_values)
+        return vectors
+
+    def rebuild(self, batch_size: int = 500) -> Dict[str, Any]:
+        """Fit a new model version on the whole corpus and rewrite every document vector.
+
+        The previous version stays active until all vectors are written, so readers
+        never see a half-built store; documents written meanwhile are transformed on
+        read until their next save.
+        """
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        started = time.perf_counter()
+        document_ids: List[int] = []
+        hashes: List[str] = []
+
+        def corpus():
+            rows = db.session.query(Document.id, Document.markdown_content)\
+                .order_by(Document.id).yield_per(batch_size)
+            for document_id, content in rows:
+                document_ids.append(document_id)
+                hashes.append(content_hash(content))
+                yield content or ''
+
+        vectorizer = TfidfVectorizer(
+            max_features=self.params.get('max_features'),
+            stop_words=self.params.get('stop_words'),
+            ngram_range=tuple(self.params.get('ngram_range', (1, 1))),
+            min_df=self.params.get('min_df', 1),
+            max_df=self.params.get('max_df', 1.0)
+        )
+
+        try:
+            matrix = vectorizer.fit_transform(corpus()).tocsr()
+        except ValueError as e:
+            logger.error(f"Feature store rebuild failed: {e}")
+            return {'error': f'Feature store rebuild failed: {str(e)}'}
+
+        try:
+            latest = db.session.query(db.func.max(TfidfModelVersion.version)).scalar() or 0
+            version = latest + 1
+            model_version = TfidfModelVersion(
+                version=version,
+                vocabulary={term: int(idx) for term, idx in vectorizer.vocabulary_.items()},
+                idf=np.round(vectorizer.idf_, 8).tolist(),
+                params=self.params,
+                document_count=len(document_ids),
+                is_active=False
+            )
+            db.session.add(model_version)
+            db.session.commit()
+
+            for start in range(0, len(document_ids), batch_size):
+                batch_ids = document_ids[start:start + batch_size]
+                DocumentFeatureVector.query.filter(
+                    DocumentFeatureVector.document_id.in_(batch_ids)
+                ).delete(synchronize_session=False)
+
+                mappings = []
+                for offset, document_id in enumerate(batch_ids):
+                    row = start + offset
+                    row_start, row_end = matrix.indptr[row], matrix.indptr[row + 1]
+                    mappings.append({
+                        'document_id': document_id,
+                        'model_version': version,
+                        'content_hash': hashes[row],
+                        'indices': matrix.indices[row_start:row_end].tolist(),
+                        'values': np.round(matrix.data[row_start:row_end], 6).tolist()
+                    })
+                db.session.bulk_insert_mappings(DocumentFeatureVector, mappings)
+                db.session.commit()
+
+            # Swap the active version, then apply the retention policy
+            TfidfModelVersion.query.filter(TfidfModelVersion.version != version)\
+                .update({'is_active': False}, synchronize_session=False)
+            model_version.is_active = True
+            TfidfModelVersion.query.filter(
+                TfidfModelVersion.version <= version - self.RETAINED_VERSIONS
+            ).delete(synchronize_session=False)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Feature store rebuild failed while writing vectors: {e}")
+            return {'error': 'Feature store rebuild failed while writing vectors'}
+
+        self.invalidate()
+        duration = time.perf_counter() - started
+        logger.info(f"Rebuilt TF-IDF feature store v{version}: {len(document_ids)} documents in {duration:.2f}s")
+
+        return {
+            'version': version,
+            'documents_indexed': len(document_ids),
+            'vocabulary_size': len(vectorizer.vocabulary_),
+            'duration_seconds': round(duration, 3)
+        }
+
+    def get_status(self) -> Dict[str, Any]:
+        """Summarize stored versions and vector coverage"""
+        versions = TfidfModelVersion.query.order_by(TfidfModelVersion.version.desc()).all()
+        active = next((v for v in versions if v.is_active), None)
+        total_documents = Document.query.count()
+        current_vectors = DocumentFeatureVector.query.filter_by(
+            model_version=active.version
+        ).count() if active else 0
+
+        return {
+            'available': active is not None,
+            'active_version': active.version if active else None,
+            'versions': [v.to_dict() for v in versions],
+            'documents_total': total_documents,
+            'vectors_current': current_vectors,
+            'coverage': round(current_vectors / total_documents, 4) if total_documents else 0.0
+        }
+
+
+# Global feature store instance
+tfidf_feature_store = TfidfFeatureStore()
+
+
+def _content_changed(document: Document) -> bool:
+    return sa_inspect(document).attrs.markdown_content.history.has_changes()
+
+
+def _refresh_vectors_before_flush(session, flush_context, instances):
+    """Keep stored vectors in step with document writes in the same transaction"""
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, Document):
+            continue
+        if obj not in session.new and not _content_changed(obj):
+            continue
+        try:
+            tfidf_feature_store.refresh_document(obj)
+        except Exception as e:
+            # Never fail a document write because its vector could not be computed
+            logger.warning(f"Could not refresh feature vector for document {obj.id}: {e}")
+
+
+def register_feature_store_events():
+    """Register the ORM hook that maintains vectors on document create/update"""
+    if not event.contains(db.session, 'before_flush', _refresh_vectors_before_flush):
+        event.listen(db.session, 'before_flush', _refresh_vectors_before_flush)
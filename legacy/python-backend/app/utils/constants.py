@@ -15,6 +15,12 @@ MAX_SIMILAR_DOCUMENTS = 100
 MAX_RATING_STATS_LIMIT = 10000
 MAX_COMMENT_REPLIES = 100
 
+# Search highlighting (ts_headline)
+SEARCH_HEADLINE_MAX_CHARS = 20000  # body prefix fed to ts_headline per result
+SEARCH_HEADLINE_MAX_WORDS = 50
+SEARCH_HEADLINE_MIN_WORDS = 20
+SEARCH_HEADLINE_MAX_FRAGMENTS = 0  # 0 = one headline, not fragments
+
 # File size limits (in bytes)
 MAX_BACKUP_SIZE_MB = 10
 MAX_UPLOAD_SIZE_MB = 50
@@ -27,3 +33,4 @@ MAX_TAG_NAME_LENGTH = 50
 # Cache TTL (in seconds)
 DEFAULT_CACHE_TTL = 300  # 5 minutes
 STATS_CACHE_TTL = 600    # 10 minutes
+RENDER_CACHE_TTL = 86400  # 1 day; rendered HTML is keyed by content so never stale
@@ -5,14 +5,14 @@ import logging
 import html
 import secrets
 from datetime import datetime, timezone
-import markdown
-import bleach
 # from weasyprint import HTML, CSS  # Commented out due to system dependencies
 from docx import Document as DocxDocument
 from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
 import zipfile
 import json
 
+from app.services.markdown_renderer import render_markdown
+
 logger = logging.getLogger(__name__)
 
 # SECURITY: Maximum document size for export (10MB)
@@ -34,6 +34,8 @@ ALLOWED_TAGS = [
     'sup', 'sub',
 ]
 
+EXPORT_MARKDOWN_EXTENSIONS = ['codehilite', 'fenced_code', 'tables', 'toc']
+
 ALLOWED_ATTRIBUTES = {
     '*': ['class', 'id'],
     'a': ['href', 'title', 'rel'],
@@ -154,16 +156,13 @@ class DocumentExporter:
 
     def _convert_markdown_to_html(self) -> str:
         """Convert markdown content to HTML with XSS protection"""
-        raw_html = markdown.markdown(
-            self.document.markdown_content or '',
-            extensions=['codehilite', 'fenced_code', 'tables', 'toc']
-        )
-        # SECURITY: Sanitize HTML to prevent XSS attacks
-        return bleach.clean(
-            raw_html,
-            tags=ALLOWED_TAGS,
-            attributes=ALLOWED_ATTRIBUTES,
-            strip=True
+        # SECURITY: Sanitize HTML to prevent XSS attacks; exports wait for oversized renders
+        return render_markdown(
+            self.document.markdown_content,
+            EXPORT_MARKDOWN_EXTENSIONS,
+            ALLOWED_TAGS,
+            ALLOWED_ATTRIBUTES,
+            wait=True
         )
 
     def _generate_document_metadata_html(self) -> str:
@@ -1,11 +1,33 @@
 import re
+import os
+import hashlib
+import threading
 import unicodedata
-from typing import List, Dict, Any
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
 from konlpy.tag import Mecab, Kkma, Komoran
 import logging
 
 logger = logging.getLogger(__name__)
 
+# 불용어 (조사, 접속사 등)
+STOPWORDS = frozenset({
+    '이', '그', '저', '것', '수', '등', '및', '또는', '그리고', '하지만',
+    '때문', '위해', '통해', '대해', '관해', '에서', '에게', '에게서',
+    '으로', '로서', '로써', '에서도', '마저', '조차', '까지', '부터',
+    '의해', '에', '을', '를', '이', '가', '은', '는', '과', '와',
+    '도', '만', '뿐', '이나', '나', '든지', '거나'
+})
+
+# 키워드로 추출할 품사 (명사, 형용사, 동사 어간, 일반 부사)
+KEYWORD_POS_TAGS = frozenset({'NNG', 'NNP', 'NNB', 'VA', 'VV', 'MAG'})
+TAG_POS_TAGS = frozenset({'NNG', 'NNP'})
+
+# 형태소 분석 결과 캐시 크기 (분석기 인스턴스별, 내용 해시 기준)
+MORPHEME_CACHE_SIZE = 1024
+
 class KoreanTextProcessor:
     """한국어 텍스트 처리를 위한 유틸리티 클래스"""
     
@@ -18,6 +40,9 @@ class KoreanTextProcessor:
         """
         self.analyzer_name = analyzer
         self.analyzer = None
+        self._morpheme_cache: "OrderedDict[bytes, Tuple[Tuple[str, str], ...]]" = OrderedDict()
+        # 요청 스레드가 분석기를 공유하므로 캐시 조회/갱신은 잠금 안에서 (분석 자체는 잠금 밖)
+        self._morpheme_cache_lock = threading.Lock()
         self._initialize_analyzer()
     
     def _initialize_analyzer(self):
@@ -57,91 +82,119 @@ class KoreanTextProcessor:
         
         return text.strip()
     
+    def _morphemes(self, text: str) -> Optional[Tuple[Tuple[str, str], ...]]:
+        """정규화된 텍스트의 형태소 분석 결과 (word, pos), 내용 해시로 캐시
+
+        분석기가 없거나 분석에 실패하면 None을 반환한다.
+        """
+        if self.analyzer is None:
+            return None
+
+        normalized_text = self.normalize_text(text)
+        key = hashlib.blake2b(normalized_text.encode('utf-8'), digest_size=16).digest()
+        with self._morpheme_cache_lock:
+            cached = self._morpheme_cache.get(key)
+            if cached is not None:
+                self._morpheme_cache.move_to_end(key)
+                return cached
+
+        try:
+            morphemes = tuple(self.analyzer.pos(normalized_text))
+        except Exception as e:
+            logger.error(f"Morphological analysis failed: {e}")
+            return None
+
+        with self._morpheme_cache_lock:
+            self._morpheme_cache[key] = morphemes
+            if len(self._morpheme_cache) > MORPHEME_CACHE_SIZE:
+                self._morpheme_cache.popitem(last=False)
+        return morphemes
+
+    def _tokens_from(self, text: str, morphemes) -> List[str]:
+        if morphemes is None:
+            # 기본 토큰화 (공백 기준)
+            return [token for token in self.normalize_text(text).split() if len(token) > 1]
+        # 길이가 1인 토큰과 조사, 어미 등 제외
+        return [word for word, _ in morphemes if len(word) > 1 and self._is_meaningful_token(word)]
+
+    def _keywords_from(self, morphemes, min_length: int = 2, max_keywords: int = 50) -> List[Dict[str, Any]]:
+        if not morphemes:
+            return []
+
+        keyword_counts: Dict[str, Dict[str, Any]] = {}
+        for word, pos in morphemes:
+            # 명사, 형용사, 동사 어간만 키워드로 추출
+            if len(word) >= min_length and pos in KEYWORD_POS_TAGS and self._is_meaningful_token(word):
+                if word in keyword_counts:
+                    keyword_counts[word]['count'] += 1
+                else:
+                    keyword_counts[word] = {'word': word, 'pos': pos, 'count': 1}
+
+        # 빈도순으로 정렬
+        keywords = sorted(keyword_counts.values(), key=lambda x: x['count'], reverse=True)
+        return keywords[:max_keywords]
+
+    @staticmethod
+    def _tags_from(keywords: List[Dict[str, Any]], max_tags: int = 10) -> List[str]:
+        # 명사 우선으로 태그 선별
+        tags = []
+        for keyword in keywords[:max_tags * 2]:
+            if keyword['pos'] in TAG_POS_TAGS and keyword['count'] >= 2:
+                tags.append(keyword['word'])
+                if len(tags) >= max_tags:
+                    break
+        return tags
+
     def tokenize(self, text: str) -> List[str]:
         """텍스트를 토큰으로 분리"""
         if not text:
             return []
-        
-        normalized_text = self.normalize_text(text)
-        
-        if self.analyzer is None:
-            # 기본 토큰화 (공백 기준)
-            return [token for token in normalized_text.split() if len(token) > 1]
-        
-        try:
-            # 형태소 분석을 통한 토큰화
-            tokens = self.analyzer.morphs(normalized_text)
-            # 길이가 1인 토큰과 조사, 어미 등 제외
-            meaningful_tokens = []
-            
-            for token in tokens:
-                if len(token) > 1 and self._is_meaningful_token(token):
-                    meaningful_tokens.append(token)
-            
-            return meaningful_tokens
-        except Exception as e:
-            logger.error(f"Tokenization failed: {e}")
-            # Fallback to simple tokenization
-            return [token for token in normalized_text.split() if len(token) > 1]
-    
+        return self._tokens_from(text, self._morphemes(text))
+
+    _HANGUL_RUN = re.compile(r'[\u3130-\u318F\uAC00-\uD7AF]+|[^\W\u3130-\u318F\uAC00-\uD7AF]+')
+
+    def ngram_tokens(self, text: str, n: int = 2) -> List[str]:
+        """인덱스용 n-gram 토큰 생성
+
+        한글 구간은 글자 n-gram으로, 그 외 구간은 소문자 단어 그대로 분리한다.
+        같은 단어의 n-gram은 연속된 위치에 놓이므로 구문(<->) 검색으로 부분 문자열을 찾을 수 있다.
+        """
+        if not text:
+            return []
+
+        tokens = []
+        for run in self._HANGUL_RUN.findall(self.normalize_text(text).lower()):
+            if not self.contains_hangul(run):
+                tokens.append(run)
+            elif len(run) <= n:
+                tokens.append(run)
+            else:
+                tokens.extend(run[i:i + n] for i in range(len(run) - n + 1))
+        return tokens
+
+    @staticmethod
+    def contains_hangul(text: str) -> bool:
+        return bool(text) and re.search(r'[\u3130-\u318F\uAC00-\uD7AF]', text) is not None
+
     def extract_keywords(self, text: str, min_length: int = 2, max_keywords: int = 50) -> List[Dict[str, Any]]:
         """키워드 추출 (품사 태깅 포함)"""
         if not text or self.analyzer is None:
             return []
-        
-        try:
-            normalized_text = self.normalize_text(text)
-            pos_tags = self.analyzer.pos(normalized_text)
-            
-            keywords: List[Dict[str, Any]] = []
-            keyword_counts: Dict[str, Dict[str, Any]] = {}
-            
-            for word, pos in pos_tags:
-                # 명사, 형용사, 동사 어간만 키워드로 추출
-                if (len(word) >= min_length and 
-                    pos in ['NNG', 'NNP', 'NNB', 'VA', 'VV', 'MAG'] and
-                    self._is_meaningful_token(word)):
-                    
-                    if word in keyword_counts:
-                        keyword_counts[word]['count'] += 1
-                    else:
-                        keyword_counts[word] = {
-                            'word': word,
-                            'pos': pos,
-                            'count': 1
-                        }
-            
-            # 빈도순으로 정렬
-            keywords = sorted(keyword_counts.values(), 
-                            key=lambda x: x['count'], reverse=True)
-            
-            return keywords[:max_keywords]
-            
-        except Exception as e:
-            logger.error(f"Keyword extraction failed: {e}")
-            return []
-    
+        return self._keywords_from(self._morphemes(text), min_length, max_keywords)
+
     def _is_meaningful_token(self, token: str) -> bool:
         """의미있는 토큰인지 판단"""
         # 숫자만 있는 토큰 제외
         if token.isdigit():
             return False
-        
+
         # 특수문자만 있는 토큰 제외
         if re.match(r'^[^\w\u3130-\u318F\uAC00-\uD7AF]+$', token):
             return False
-        
+
         # 불용어 제외
-        stopwords = {
-            '이', '그', '저', '것', '수', '등', '및', '또는', '그리고', '하지만',
-            '때문', '위해', '통해', '대해', '관해', '에서', '에게', '에게서',
-            '으로', '로서', '로써', '에서도', '마저', '조차', '까지', '부터',
-            '의해', '에', '을', '를', '이', '가', '은', '는', '과', '와',
-            '도', '만', '뿐', '이나', '나', '든지', '거나'
-        }
-        
-        return token not in stopwords
-    
+        return token not in STOPWORDS
+
     def create_search_vector(self, title: str, content: str) -> str:
         """검색용 벡터 생성"""
         # 제목에 가중치 부여
@@ -195,17 +248,27 @@ class KoreanTextProcessor:
     def extract_tags_from_korean_text(self, text: str, max_tags: int = 10) -> List[str]:
         """한국어 텍스트에서 자동 태그 추출"""
         keywords = self.extract_keywords(text, min_length=2, max_keywords=max_tags * 2)
-        
-        # 명사 우선으로 태그 선별
-        tags = []
-        for keyword in keywords:
-            if keyword['pos'] in ['NNG', 'NNP'] and keyword['count'] >= 2:
-                tags.append(keyword['word'])
-                if len(tags) >= max_tags:
-                    break
-        
-        return tags
-    
+        return self._tags_from(keywords, max_tags)
+
+    def analyze(self, title: str, content: str) -> Dict[str, Any]:
+        """문서 통합 처리: 제목과 본문을 각각 한 번만 형태소 분석하고 모든 결과를 도출"""
+        title_morphemes = self._morphemes(title) if title else None
+        content_morphemes = self._morphemes(content) if content else None
+
+        title_tokens = self._tokens_from(title, title_morphemes) if title else []
+        content_tokens = self._tokens_from(content, content_morphemes) if content else []
+        keywords = self._keywords_from(content_morphemes)
+
+        return {
+            'language': self.detect_language(content),
+            # 제목의 토큰은 3번 반복하여 가중치 부여
+            'search_vector': ' '.join(title_tokens * 3 + content_tokens),
+            'keywords': keywords,
+            'auto_tags': self._tags_from(keywords),
+            'title_tokens': title_tokens,
+            'content_tokens': content_tokens
+        }
+
     @staticmethod
     def detect_language(text: str) -> str:
         """텍스트의 언어 감지 (한국어/영어/기타)"""
@@ -235,16 +298,60 @@ korean_processor = KoreanTextProcessor()
 
 def process_korean_document(title: str, content: str) -> Dict[str, Any]:
     """한국어 문서 처리 통합 함수"""
-    result = {
-        'language': korean_processor.detect_language(content),
-        'search_vector': korean_processor.create_search_vector(title, content),
-        'keywords': korean_processor.extract_keywords(content),
-        'auto_tags': korean_processor.extract_tags_from_korean_text(content),
-        'title_tokens': korean_processor.tokenize(title),
-        'content_tokens': korean_processor.tokenize(content)
-    }
-    
-    return result
+    return korean_processor.analyze(title, content)
+
+# 프로세스 풀을 사용할 최소 배치 크기 (작은 배치는 워커 기동 비용이 더 크다)
+PARALLEL_BATCH_THRESHOLD = 64
+MAX_ANALYSIS_WORKERS = 4
+
+_worker_processor: Optional[KoreanTextProcessor] = None
+
+def _initialize_worker(analyzer_name: str):
+    """워커 프로세스마다 분석기를 한 번만 초기화"""
+    global _worker_processor
+    if korean_processor.analyzer_name == analyzer_name:
+        _worker_processor = korean_processor
+    else:
+        _worker_processor = KoreanTextProcessor(analyzer_name)
+
+def _analyze_in_worker(document: Tuple[str, str]) -> Dict[str, Any]:
+    return _worker_processor.analyze(*document)
+
+def create_analysis_pool(workers: int) -> ProcessPoolExecutor:
+    """형태소 분석용 프로세스 풀 (워커마다 분석기 1개)
+
+    spawn: JVM 기반 분석기(Kkma, Komoran)는 fork 후 사용할 수 없다.
+    """
+    return ProcessPoolExecutor(max_workers=workers, mp_context=get_context('spawn'),
+                               initializer=_initialize_worker,
+                               initargs=(korean_processor.analyzer_name,))
+
+def map_korean_documents(executor: ProcessPoolExecutor, documents: List[Tuple[str, str]],
+                         chunk_size: int = 16) -> Iterator[Dict[str, Any]]:
+    """풀에 작업을 바로 제출하고 결과는 입력 순서대로 꺼내는 반복자를 반환
+
+    호출자는 결과를 기다리는 동안 다른 일(예: 이전 배치 인덱싱)을 할 수 있다.
+    """
+    return executor.map(_analyze_in_worker, documents, chunksize=chunk_size)
+
+def process_korean_documents(documents: Iterable[Tuple[str, str]], workers: Optional[int] = None,
+                             chunk_size: int = 16) -> List[Dict[str, Any]]:
+    """(title, content) 목록을 일괄 처리, 결과는 입력 순서대로 반환
+
+    큰 배치는 프로세스 풀로 나누어 처리하며, 각 워커는 자체 분석기를 사용한다.
+    """
+    documents = [(title or '', content or '') for title, content in documents]
+    if workers is None:
+        workers = min(os.cpu_count() or 1, MAX_ANALYSIS_WORKERS)
+
+    if workers > 1 and len(documents) >= PARALLEL_BATCH_THRESHOLD:
+        try:
+            with create_analysis_pool(workers) as executor:
+                return list(map_korean_documents(executor, documents, chunk_size))
+        except Exception as e:
+            logger.warning(f"Parallel Korean analysis failed, processing serially: {e}")
+
+    return [korean_processor.analyze(title, content) for title, content in documents]
 
 def search_korean_text(documents: List[Dict], query: str, max_results: int = 20) -> List[Dict]:
     """한국어 텍스트 검색"""
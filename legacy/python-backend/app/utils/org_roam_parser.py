@@ -314,7 +314,7 @@ class OrgRoamImporter:
                             import_as_private: bool = True) -> Dict[str, Any]:
         """디렉토리에서 org-roam 문서들을 임포트"""
         from app.models.document import Document
-        from app.utils.korean_text import process_korean_document
+        from app.utils.korean_text import process_korean_documents
 
         results: Dict[str, Any] = {
             'imported': 0,
@@ -326,28 +326,37 @@ class OrgRoamImporter:
         try:
             # org 파일들 파싱
             org_documents = self.parser.parse_org_roam_directory(directory_path)
-            
+
+            pending = []
+            pending_titles = set()
             for org_doc in org_documents:
                 try:
                     # 이미 존재하는 문서인지 확인 (파일명 기준)
                     existing_doc = Document.query.filter_by(
-                        title=org_doc['title'], 
+                        title=org_doc['title'],
                         user_id=user_id
                     ).first()
-                    
-                    if existing_doc:
+
+                    if existing_doc or org_doc['title'] in pending_titles:
                         results['skipped'] += 1
                         continue
-                    
+
                     # 마크다운으로 변환
-                    markdown_content = self._convert_org_to_markdown(org_doc)
-                    
-                    # 한국어 처리
-                    korean_processing = process_korean_document(
-                        org_doc['title'], 
-                        markdown_content
-                    )
-                    
+                    pending.append((org_doc, self._convert_org_to_markdown(org_doc)))
+                    pending_titles.add(org_doc['title'])
+
+                except Exception as e:
+                    logger.error(f"Failed to import {org_doc.get('filename', 'unknown')}: {e}")
+                    results['failed'] += 1
+                    results['errors'].append(str(e))
+
+            # 한국어 처리 (배치 단위, 문서당 형태소 분석 1회)
+            analyses = process_korean_documents(
+                (org_doc['title'], markdown_content) for org_doc, markdown_content in pending
+            )
+
+            for (org_doc, markdown_content), korean_processing in zip(pending, analyses):
+                try:
                     # Document 생성
                     document = Document(
                         title=org_doc['title'],
@@ -12,10 +12,12 @@ def create_performance_indexes():
     Should be run after initial migration.
     """
     try:
-        # Full-text search index
+        # Full-text search index on the stored weighted vector; the old expression
+        # index only matched one exact to_tsvector() call
+        db.session.execute(text("DROP INDEX IF EXISTS idx_documents_search"))
         db.session.execute(text("""
-            CREATE INDEX IF NOT EXISTS idx_documents_search
-            ON documents USING gin(to_tsvector('english', title || ' ' || markdown_content))
+            CREATE INDEX IF NOT EXISTS idx_documents_search_vector
+            ON documents USING gin(search_vector)
         """))
 
         # User-related indexes
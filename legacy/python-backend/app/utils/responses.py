@@ -3,13 +3,101 @@ Response utility functions for Minky API
 Provides standardized response building patterns to reduce code duplication.
 """
 
-from flask import jsonify, url_for, abort
+import base64
+import json
+import operator
+from datetime import datetime
+
+from flask import jsonify, url_for, abort, request
+from sqlalchemy import and_, inspect, or_, tuple_
 from app import db
 
+# How the total of a paginated listing is computed: COUNT(*), the PostgreSQL
+# planner's row estimate, or not at all
+COUNT_MODES = ('exact', 'approx', 'none')
+
+
+class InvalidCursorError(ValueError):
+    """A pagination cursor that is malformed or belongs to another listing"""
+
 
-def build_pagination_response(query, page, per_page, serializer_func,
+def encode_cursor(sort_column, values):
+    """Opaque cursor for the position after a row with the given sort key values"""
+    state = {'k': sort_column.key, 'v': [v.isoformat() if isinstance(v, datetime) else v for v in values]}
+    return base64.urlsafe_b64encode(json.dumps(state, separators=(',', ':')).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor, key_columns):
+    """Sort key values stored in a cursor, converted to the python types of key_columns.
+
+    The sort value may be None (a row with a NULL sort key); the primary key may not.
+    """
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (ValueError, UnicodeError):
+        raise InvalidCursorError('Malformed cursor')
+    if not isinstance(state, dict) or state.get('k') != key_columns[0].key \
+            or not isinstance(state.get('v'), list) or len(state['v']) != len(key_columns):
+        raise InvalidCursorError('Cursor does not belong to this listing')
+
+    values = []
+    for column, value in zip(key_columns, state['v']):
+        if value is None and column is key_columns[0]:
+            values.append(None)
+            continue
+        python_type = column.type.python_type
+        try:
+            if python_type is datetime and isinstance(value, str):
+                value = datetime.fromisoformat(value)
+        except ValueError:
+            raise InvalidCursorError('Malformed cursor')
+        if not isinstance(value, python_type) or isinstance(value, bool):
+            raise InvalidCursorError('Malformed cursor')
+        values.append(value)
+    return values
+
+
+def estimate_count(query):
+    """Row count estimated by the PostgreSQL planner (table statistics); exact COUNT elsewhere"""
+    count_query = query.order_by(None)
+    bind = db.session.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return count_query.count()
+    compiled = count_query.statement.compile(dialect=bind.dialect, compile_kwargs={'render_postcompile': True})
+    plan = db.session.connection().exec_driver_sql(f'EXPLAIN (FORMAT JSON) {compiled}', compiled.params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def _count_rows(query, count):
+    if count == 'exact':
+        return query.order_by(None).count()
+    if count == 'approx':
+        return estimate_count(query)
+    return None
+
+
+def _after_cursor(key_columns, values, descending):
+    """Rows past the cursor's row in the listing's order, where NULL sort keys rank above every value"""
+    sort_column, primary_key = key_columns
+    value, last_id = values
+    beyond = operator.lt if descending else operator.gt
+    last_id = db.literal(last_id, type_=primary_key.type)
+    if value is None:
+        # Among the NULL keys, ordered by id; descending listings continue with the non-NULL keys
+        past_null = and_(sort_column.is_(None), beyond(primary_key, last_id))
+        return or_(past_null, sort_column.isnot(None)) if descending else past_null
+    # A row comparison with a NULL key is never true, so NULL rows need their own term
+    past_value = beyond(tuple_(sort_column, primary_key), tuple_(db.literal(value, type_=sort_column.type), last_id))
+    return past_value if descending else or_(past_value, sort_column.is_(None))
+
+
+def build_pagination_response(query, page, per_page, serializer_func=None,
                                items_key='items', wrap_pagination=False,
-                               endpoint=None, extra_fields=None, **endpoint_kwargs):
+                               endpoint=None, extra_fields=None, sort_column=None,
+                               descending=True, cursor=None, count=None, page_serializer=None,
+                               **endpoint_kwargs):
     """
     Build a standardized pagination response from a SQLAlchemy query.
 
@@ -22,11 +110,28 @@ def build_pagination_response(query, page, per_page, serializer_func,
         wrap_pagination: If True, wrap pagination metadata in 'pagination' object (for backward compat)
         endpoint: Optional Flask endpoint name for URL generation
         extra_fields: Optional dict of additional fields to include in response
+        sort_column: Optional column to order by, with the primary key as tie-breaker.
+            Enables cursor (keyset) pagination and adds 'next_cursor' to the metadata
+        descending: Sort direction for sort_column
+        cursor: Optional 'next_cursor' of a previous page; replaces page when given
+        count: How to compute 'total' (see COUNT_MODES); 'exact' for page numbers
+            and 'none' for cursors unless specified
+        page_serializer: Optional function serializing the whole page at once
+            (items -> list of dicts), e.g. Document.to_dict_batch; replaces serializer_func
         endpoint_kwargs: Additional kwargs for url_for()
 
     Returns:
         dict: Standardized pagination response
 
+    Raises:
+        InvalidCursorError: If cursor is malformed or no sort_column is given
+
+    Pages are fetched with LIMIT per_page + 1, so has_next never needs the count.
+    With a cursor the page starts right after the cursor's row: an index range
+    scan whose cost does not grow with depth, unlike OFFSET. Rows with a NULL
+    sort key come first when descending and last when ascending, the order a
+    PostgreSQL btree index returns them in.
+
     Example:
         # Simple usage
         return build_pagination_response(
@@ -43,27 +148,62 @@ def build_pagination_response(query, page, per_page, serializer_func,
             extra_fields={'search_query': search}
         )
     """
-    # Execute pagination
-    paginated = query.paginate(page=page, per_page=per_page, error_out=False)
+    page = max(page or 1, 1)
+    per_page = max(per_page, 1)
+    if count not in COUNT_MODES:
+        count = 'exact' if cursor is None else 'none'
+
+    key_columns = None
+    if sort_column is not None:
+        primary_key = inspect(query.column_descriptions[0]['entity']).primary_key[0]
+        key_columns = (sort_column, primary_key)
+        if descending:
+            query = query.order_by(None).order_by(sort_column.desc().nulls_first(), primary_key.desc())
+        else:
+            query = query.order_by(None).order_by(sort_column.asc().nulls_last(), primary_key.asc())
+    if cursor is not None:
+        if key_columns is None:
+            raise InvalidCursorError('This listing does not support cursors')
+        after = _after_cursor(key_columns, decode_cursor(cursor, key_columns), descending)
+    total = _count_rows(query, count)
+
+    # Execute pagination, one row past the page to learn whether another follows
+    if cursor is not None:
+        query = query.filter(after)
+        rows = query.limit(per_page + 1).all()
+        page = None
+    else:
+        rows = query.limit(per_page + 1).offset((page - 1) * per_page).all()
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
 
     # Serialize items
-    items = [serializer_func(item) for item in paginated.items]
+    if page_serializer is not None:
+        items = page_serializer(rows)
+    else:
+        items = [serializer_func(item) for item in rows]
 
     # Build pagination metadata
     pagination_data = {
         'page': page,
         'per_page': per_page,
-        'total': paginated.total,
-        'pages': paginated.pages,
-        'has_next': paginated.has_next,
-        'has_prev': paginated.has_prev
+        'total': total,
+        'pages': -(-total // per_page) if total is not None else None,
+        'has_next': has_next,
+        'has_prev': cursor is not None or page > 1
     }
+    if count == 'approx':
+        pagination_data['total_estimated'] = True
+    if key_columns is not None:
+        last = rows[-1] if has_next else None
+        pagination_data['next_cursor'] = encode_cursor(
+            sort_column, [getattr(last, column.key) for column in key_columns]) if last is not None else None
 
     # Add navigation URLs if endpoint provided
-    if endpoint:
-        if paginated.has_next:
+    if endpoint and page is not None:
+        if has_next:
             pagination_data['next_url'] = url_for(endpoint, page=page + 1, per_page=per_page, **endpoint_kwargs)
-        if paginated.has_prev:
+        if page > 1:
             pagination_data['prev_url'] = url_for(endpoint, page=page - 1, per_page=per_page, **endpoint_kwargs)
 
     # Build response based on structure preference
@@ -82,10 +222,14 @@ def build_pagination_response(query, page, per_page, serializer_func,
     return response
 
 
-def paginate_query(query, page, per_page, serializer_func, items_key='items', extra_fields=None):
+def paginate_query(query, page, per_page, serializer_func=None, items_key='items', extra_fields=None,
+                   sort_column=None, descending=True, page_serializer=None):
     """
     Simplified pagination helper that returns a Flask response.
 
+    The request's 'cursor' and 'count' arguments select cursor pagination and
+    the total mode (see build_pagination_response); cursors need sort_column.
+
     Args:
         query: SQLAlchemy query object
         page: Current page number
@@ -93,15 +237,23 @@ def paginate_query(query, page, per_page, serializer_func, items_key='items', ex
         serializer_func: Function to serialize each item
         items_key: Key name for items list
         extra_fields: Additional fields to include
+        sort_column: Column the listing is ordered by (primary key breaks ties)
+        descending: Sort direction for sort_column
+        page_serializer: Function serializing the whole page at once (replaces serializer_func)
 
     Returns:
-        Flask JSON response
+        Flask JSON response, or a 400 error response for an invalid cursor
     """
-    response = build_pagination_response(
-        query, page, per_page, serializer_func,
-        items_key=items_key, wrap_pagination=True,
-        extra_fields=extra_fields
-    )
+    try:
+        response = build_pagination_response(
+            query, page, per_page, serializer_func,
+            items_key=items_key, wrap_pagination=True,
+            extra_fields=extra_fields, sort_column=sort_column, descending=descending,
+            cursor=request.args.get('cursor') or None, count=request.args.get('count'),
+            page_serializer=page_serializer
+        )
+    except InvalidCursorError as e:
+        return error_response(str(e), 400)
     return jsonify(response)
 
 
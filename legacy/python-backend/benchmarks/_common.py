@@ -0,0 +1,104 @@
+"""
+Shared helpers for the benchmark scripts.
+
+Benchmarks run against an in-memory SQLite database by default; set
+BENCH_DATABASE_URL to point them at a PostgreSQL instance instead.
+"""
+import os
+import random
+import secrets
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+os.environ.setdefault('FLASK_ENV', 'testing')
+os.environ.setdefault('SECRET_KEY', f'bench-{secrets.token_hex(32)}')
+os.environ.setdefault('JWT_SECRET_KEY', f'bench-{secrets.token_hex(32)}')
+os.environ['DATABASE_URL'] = os.getenv('BENCH_DATABASE_URL', 'sqlite:///:memory:')
+
+TOPICS = {
+    'python': ['python', 'function', 'class', 'decorator', 'generator', 'module', 'package', 'pytest'],
+    'database': ['postgres', 'index', 'query', 'planner', 'vacuum', 'transaction', 'replica', 'schema'],
+    'search': ['opensearch', 'analyzer', 'token', 'shard', 'relevance', 'mapping', 'alias', 'highlight'],
+    'cooking': ['recipe', 'garlic', 'tomato', 'pasta', 'oven', 'flour', 'sauce', 'onion'],
+    'travel': ['flight', 'hotel', 'museum', 'train', 'beach', 'passport', 'mountain', 'city'],
+}
+FILLER = ['the', 'notes', 'about', 'today', 'really', 'useful', 'details', 'later', 'review', 'idea']
+
+
+def create_benchmark_app():
+    """Create an app with a fresh schema, pushed into an application context"""
+    from app import create_app, db
+
+    app = create_app()
+    app.config['TESTING'] = True
+    ctx = app.app_context()
+    ctx.push()
+    db.create_all()
+    return app, ctx
+
+
+def synthetic_documents(count: int, words: int = 200, seed: int = 42) -> List[Tuple[str, str]]:
+    """Generate (title, markdown) pairs drawn from a handful of topics"""
+    rng = random.Random(seed)
+    topic_names = list(TOPICS)
+    documents = []
+    for i in range(count):
+        topic = topic_names[i % len(topic_names)]
+        vocabulary = TOPICS[topic] + FILLER
+        body = ' '.join(rng.choice(vocabulary) for _ in range(words))
+        documents.append((f'{topic.title()} note {i}', f'# {topic.title()} note {i}\n\n{body}'))
+    return documents
+
+
+def insert_documents(documents: List[Tuple[str, str]], batch_size: int = 1000) -> None:
+    """Bulk insert documents, skipping markdown rendering and ORM hooks"""
+    from app import db
+    from app.models.document import Document
+
+    for start in range(0, len(documents), batch_size):
+        db.session.bulk_insert_mappings(Document, [
+            {'title': title, 'markdown_content': content, 'html_content': '', 'is_public': True}
+            for title, content in documents[start:start + batch_size]
+        ])
+        db.session.commit()
+
+
+def measure(fn: Callable[[], object], repeat: int) -> List[float]:
+    """Run fn repeat times and return wall-clock durations in milliseconds"""
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        durations.append((time.perf_counter() - started) * 1000)
+    return durations
+
+
+def summarize(durations: List[float]) -> Dict[str, float]:
+    ordered = sorted(durations)
+
+    def pct(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(round(p * (len(ordered) - 1))))]
+
+    return {
+        'p50_ms': round(statistics.median(ordered), 2),
+        'p99_ms': round(pct(0.99), 2),
+        'mean_ms': round(statistics.fmean(ordered), 2),
+        'max_ms': round(ordered[-1], 2),
+    }
+
+
+def print_table(title: str, rows: List[Dict[str, object]]) -> None:
+    print(f'\n{title}')
+    if not rows:
+        return
+    columns = list(rows[0])
+    widths = {c: max(len(str(c)), *(len(str(r[c])) for r in rows)) for c in columns}
+    print('  '.join(str(c).ljust(widths[c]) for c in columns))
+    for row in rows:
+        print('  '.join(str(row[c]).ljust(widths[c]) for c in columns))
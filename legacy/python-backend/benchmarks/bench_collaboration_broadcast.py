@@ -0,0 +1,111 @@
+"""
+Broadcast traffic for a room of collaborators, per-event messages against
+frames. Each simulated tick is 10ms; every client types or backspaces a
+character or moves its cursor with some probability each tick, and the harness
+counts what each socket receives. In frame mode the room is flushed every
+--frame-ms, as the background flusher would.
+
+    python benchmarks/bench_collaboration_broadcast.py --seconds 5
+"""
+import argparse
+import json
+import random
+
+from _common import create_benchmark_app, print_table
+
+TICK_MS = 10
+
+
+def run(app, clients: int, seconds: float, frame_ms: int, seed: int = 7):
+    from flask_jwt_extended import create_access_token
+
+    from app import db, socketio
+    from app.models.document import Document
+    from app.models.user import User
+    from app.services.collaboration_service import get_collaboration_service
+
+    service = get_collaboration_service()
+    service.OPERATION_RATE_LIMIT = 1_000_000
+    service.CURSOR_UPDATE_THROTTLE_MS = 0
+    service.MAX_CONNECTIONS_PER_USER = clients
+    service.broadcasts.frame_interval = frame_ms / 1000
+    # Frames are flushed on the simulated clock below rather than by the background task
+    service.broadcasts._schedule = (lambda room: None) if frame_ms else service.broadcasts.flush
+
+    user = User(username=f'bench{seed}{clients}{frame_ms}', email=f'bench{seed}{clients}{frame_ms}@example.com',
+                password='BenchPassword123!')
+    db.session.add(user)
+    db.session.flush()
+    document = Document(title='Shared', markdown_content='x' * 1000, user_id=user.id)
+    db.session.add(document)
+    db.session.commit()
+    headers = {'Authorization': f'Bearer {create_access_token(identity=str(user.id))}'}
+
+    sockets = [socketio.test_client(app, headers=headers) for _ in range(clients)]
+    for socket in sockets:
+        socket.emit('join_document', {'document_id': document.id})
+    for socket in sockets:
+        socket.get_received()
+
+    rng = random.Random(seed)
+    length = 1000
+    received = bytes_received = 0
+    ticks = int(seconds * 1000 / TICK_MS)
+    for tick in range(1, ticks + 1):
+        for socket in sockets:
+            roll = rng.random()
+            position = rng.randint(0, length)
+            if roll < 0.15:
+                operation = {'type': 'insert', 'position': position, 'text': rng.choice('abc ')}
+                length += 1
+            elif roll < 0.2 and position > 0:
+                operation = {'type': 'delete', 'position': position - 1, 'length': 1}
+                length -= 1
+            elif roll < 0.35:
+                socket.emit('cursor_update', {'document_id': document.id, 'cursor_data': {'position': position}})
+                continue
+            else:
+                continue
+            socket.emit('text_operation', {'document_id': document.id, 'operation': operation})
+        if frame_ms and tick % (frame_ms // TICK_MS) == 0:
+            service.broadcasts.flush()
+        for socket in sockets:
+            for message in socket.get_received():
+                if message['name'] == 'operation_ack':
+                    continue
+                received += 1
+                bytes_received += len(json.dumps(message['args']))
+
+    for socket in sockets:
+        socket.disconnect()
+    return received / seconds / clients, bytes_received / seconds / clients
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--seconds', type=float, default=5, help='simulated session length')
+    parser.add_argument('--frame-ms', type=int, default=50, help='frame interval, a multiple of 10')
+    args = parser.parse_args()
+
+    app, ctx = create_benchmark_app()
+    rows = []
+    try:
+        for clients in (2, 5, 10, 20):
+            event_messages, event_bytes = run(app, clients, args.seconds, frame_ms=0)
+            frame_messages, frame_bytes = run(app, clients, args.seconds, frame_ms=args.frame_ms)
+            rows.append({
+                'clients': clients,
+                'per-event msgs/s': round(event_messages, 1),
+                'frame msgs/s': round(frame_messages, 1),
+                'per-event bytes/s': round(event_bytes),
+                'frame bytes/s': round(frame_bytes),
+            })
+    finally:
+        ctx.pop()
+
+    print_table(f'Broadcast traffic per client, {args.seconds}s simulated, {args.frame_ms}ms frames '
+                f'(acks excluded)', rows)
+
+
+if __name__ == '__main__':
+    main()
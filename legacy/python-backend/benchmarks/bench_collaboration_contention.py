@@ -0,0 +1,76 @@
+"""
+Throughput of concurrent editors on one document. Each thread is a client
+sending keystrokes against the last revision it was acknowledged at, so every
+commit is rebased over whatever the other threads committed meanwhile.
+
+The per-operation request work (permission lookup, validation) is simulated
+with a sleep and run either outside the document lock, as handle_text_operation
+now does, or inside it, as the whole handler used to.
+
+    python benchmarks/bench_collaboration_contention.py --ops 2000 --work-ms 0.2
+"""
+import argparse
+import random
+import threading
+import time
+
+from _common import print_table
+
+
+def run(clients: int, ops_per_client: int, work_ms: float, whole_handler_locked: bool):
+    from app.services.collaboration_service import CollaborationService
+
+    service = CollaborationService(socketio=None)
+    service._load_session('1', 'x' * 10_000)
+    lock = service._get_document_lock('1')
+    rebased_over = []
+
+    def client(seed):
+        rng = random.Random(seed)
+        revision = 0
+        for _ in range(ops_per_client):
+            position = rng.randint(0, 1000)
+            steps = ([{'type': 'insert', 'position': position, 'text': rng.choice('abc ')}]
+                     if rng.random() < 0.8 else [{'type': 'delete', 'position': position, 'length': 1}])
+            base = revision
+            if whole_handler_locked:
+                with lock:
+                    time.sleep(work_ms / 1000)
+                    revision, _ = service._commit_operation('1', steps, base, user_id=seed)
+            else:
+                time.sleep(work_ms / 1000)
+                revision, _ = service._commit_operation('1', steps, base, user_id=seed)
+            rebased_over.append(revision - 1 - base)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return clients * ops_per_client / elapsed, sum(rebased_over) / len(rebased_over)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--ops', type=int, default=2000, help='operations per client')
+    parser.add_argument('--work-ms', type=float, default=0.2, help='simulated per-operation request work')
+    args = parser.parse_args()
+
+    rows = []
+    for clients in (1, 2, 4, 8, 16):
+        locked_rate, _ = run(clients, args.ops, args.work_ms, whole_handler_locked=True)
+        rate, rebased = run(clients, args.ops, args.work_ms, whole_handler_locked=False)
+        rows.append({
+            'clients': clients,
+            'whole handler locked ops/s': round(locked_rate),
+            'commit locked ops/s': round(rate),
+            'ops rebased over': round(rebased, 1),
+        })
+
+    print_table(f'Concurrent editors on one document, {args.ops} ops each, {args.work_ms}ms request work', rows)
+
+
+if __name__ == '__main__':
+    main()
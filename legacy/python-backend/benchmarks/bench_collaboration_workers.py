@@ -0,0 +1,151 @@
+"""
+Throughput of collaborative editing sharded across worker processes. The
+documents are spread over 1, 2 and 4 workers by shard_for; the harness plays
+the part of the socket-facing workers and queues every operation for the
+owning worker in the shared state backend, then releases the workers and
+measures how long the owners take to commit them all.
+
+Per-operation request work on the owner (permission checks, emitting acks and
+frames) is simulated with a sleep, as in bench_collaboration_contention.py.
+State lives in an in-process fakeredis server over TCP unless BENCH_REDIS_URL
+points at a real Redis; the fake server is single-threaded Python and becomes
+the limit before the workers do when --work-ms is small.
+
+    python benchmarks/bench_collaboration_workers.py --ops 4000 --documents 16 --work-ms 1
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import socket
+import threading
+import time
+
+from _common import print_table
+
+
+class NullSocketIO:
+    """Emits go nowhere; the harness measures commits, not delivery"""
+
+    def __init__(self):
+        self.server = self
+
+    def emit(self, *args, **kwargs):
+        pass
+
+    def enter_room(self, *args, **kwargs):
+        pass
+
+
+def start_fake_redis():
+    """A fakeredis server on a local port, answering without Nagle delays as Redis does"""
+    from fakeredis import TcpFakeServer
+
+    class NoDelayServer(TcpFakeServer):
+        def get_request(self):
+            connection, address = super().get_request()
+            connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            return connection, address
+
+    server = NoDelayServer(('127.0.0.1', 0))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def connect(url):
+    import redis
+
+    from app.services.collaboration_state import RedisStateBackend
+    return RedisStateBackend(redis.Redis.from_url(url, decode_responses=True))
+
+
+def worker(url, index, workers, documents, work_ms, ready, go):
+    from app.services.collaboration_service import CollaborationService
+
+    service = CollaborationService(NullSocketIO(), state=connect(url), worker_index=index, worker_count=workers)
+    service.ACCESS_CACHE_TTL = float('inf')
+    for document_id in documents:
+        if service.owns(document_id):
+            session = service._load_session(document_id, 'x' * 1000)
+            # One editor per document, joined and authorized already
+            session['users']['sid'] = {'user_id': 1, 'username': 'bench', 'sid': 'sid', 'origin': 'bench',
+                                       'can_edit': True, 'access_checked_at': time.monotonic()}
+
+    # No database in the harness: the 30-second auto-save stays out of the measurement
+    service._auto_save_if_needed = lambda document_id: None
+    operate = service._operate
+
+    def simulated_operate(**command):
+        time.sleep(work_ms / 1000)
+        operate(**command)
+
+    service._operate = simulated_operate
+    ready.set()
+    go.wait()
+    # Everything was queued before the start signal: drain this worker's queue and exit
+    service.process_commands()
+
+
+def run(url, workers: int, documents: int, ops: int, work_ms: float) -> float:
+    from app.services.collaboration_state import shard_for
+
+    state = connect(url)
+    state.client.flushdb()
+    document_ids = [str(i) for i in range(1, documents + 1)]
+    context = multiprocessing.get_context('fork')
+    go = context.Event()
+    readies = [context.Event() for _ in range(workers)]
+    processes = [context.Process(target=worker, args=(url, index, workers, document_ids, work_ms, readies[index], go))
+                 for index in range(workers)]
+    for process in processes:
+        process.start()
+    for ready in readies:
+        ready.wait()
+
+    rng = random.Random(workers)
+    for i in range(ops):
+        document_id = document_ids[i % documents]
+        state.push_command(shard_for(document_id, workers), {
+            'kind': 'operation', 'document_id': document_id, 'sid': 'sid', 'user_id': 1, 'revision': None,
+            'steps': [{'type': 'insert', 'position': rng.randint(0, 1000), 'text': rng.choice('abc ')}]
+        })
+    started = time.perf_counter()
+    go.set()
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - started
+
+    assert sum(state.revision(document_id) for document_id in document_ids) == ops
+    return ops / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--ops', type=int, default=4000, help='operations in total')
+    parser.add_argument('--documents', type=int, default=16)
+    parser.add_argument('--work-ms', type=float, default=1.0, help='simulated per-operation request work')
+    args = parser.parse_args()
+
+    url = os.getenv('BENCH_REDIS_URL')
+    server = None
+    if not url:
+        server = start_fake_redis()
+        url = f'redis://127.0.0.1:{server.server_address[1]}/0'
+
+    rows = []
+    try:
+        for workers in (1, 2, 4):
+            rate = run(url, workers, args.documents, args.ops, args.work_ms)
+            rows.append({'workers': workers, 'ops/s': round(rate), 'speedup': round(rate / rows[0]['ops/s'], 2)
+                         if rows else 1.0})
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    print_table(f'{args.ops} operations over {args.documents} documents, {args.work_ms}ms request work, '
+                f'{"Redis" if os.getenv("BENCH_REDIS_URL") else "fakeredis over TCP"}', rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""
+Document.search_documents at scale: substring search with and without the
+pg_trgm GIN indexes, tag filters as one EXISTS per tag against the grouped
+IN ... HAVING count = n, and fuzzy title search. Prints the plan's access path
+for each query. Requires PostgreSQL:
+
+    BENCH_DATABASE_URL=postgresql+psycopg2://localhost/bench \
+        python benchmarks/bench_document_search.py --documents 100000
+
+Without pg_trgm on the server the "with trigram indexes" rows are skipped.
+"""
+import argparse
+import os
+import random
+import sys
+
+from _common import create_benchmark_app, insert_documents, measure, print_table, summarize, synthetic_documents
+
+TAGS = [f'tag-{i}' for i in range(200)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--documents', type=int, default=100000)
+    parser.add_argument('--tags-per-document', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=10, help='runs per query')
+    parser.add_argument('--per-page', type=int, default=20)
+    args = parser.parse_args()
+
+    if not os.getenv('BENCH_DATABASE_URL', '').startswith('postgresql'):
+        sys.exit('Set BENCH_DATABASE_URL to a PostgreSQL database')
+
+    create_benchmark_app()
+    from sqlalchemy import text
+    from app import db
+    from app.models.document import Document, trigram_supported
+    from app.models.tag import Tag, document_tags
+
+    try:
+        documents = synthetic_documents(args.documents, words=120)
+        # A few rare words to search for
+        rng = random.Random(3)
+        for i in rng.sample(range(len(documents)), 50):
+            title, body = documents[i]
+            documents[i] = (f'{title} zeppelin', body)
+        insert_documents(documents)
+
+        db.session.execute(Tag.__table__.insert(), [{'name': name, 'slug': name} for name in TAGS])
+        tag_ids = [tag_id for (tag_id,) in db.session.query(Tag.id).order_by(Tag.id)]
+        # Skewed so the first tags are common and most are rare
+        weights = [1 / (rank + 1) for rank in range(len(tag_ids))]
+        doc_ids = [doc_id for (doc_id,) in db.session.query(Document.id)]
+        for start in range(0, len(doc_ids), 5000):
+            rows = []
+            for doc_id in doc_ids[start:start + 5000]:
+                for tag_id in set(rng.choices(tag_ids, weights=weights, k=args.tags_per_document)):
+                    rows.append({'document_id': doc_id, 'tag_id': tag_id})
+            db.session.execute(document_tags.insert(), rows)
+        db.session.commit()
+        db.session.execute(text('ANALYZE'))
+        db.session.commit()
+
+        def per_tag_exists(tags):
+            # The previous implementation: one contains() (EXISTS) per tag
+            query = Document.query.filter(Document.is_public == True)
+            for tag in Tag.query.filter(Tag.slug.in_(tags)).all():
+                query = query.filter(Document.tags.contains(tag))
+            return query.order_by(Document.updated_at.desc())
+
+        def access_path(query):
+            compiled = query.limit(args.per_page).statement.compile(dialect=db.engine.dialect,
+                                                                     compile_kwargs={'render_postcompile': True})
+            plan = [row[0] for row in db.session.connection().exec_driver_sql(f'EXPLAIN {compiled}', compiled.params)]
+            for marker in ('idx_documents_title_trgm', 'idx_documents_markdown_content_trgm', 'Seq Scan on documents',
+                           'Index Scan Backward using idx_documents_updated_at'):
+                if any(marker in line for line in plan):
+                    return marker.replace('idx_documents_', '')
+            return plan[0].split('(')[0].strip()
+
+        def run(query):
+            query.limit(args.per_page).all()
+            return query.count()
+
+        searches = {
+            'rare word': ('zeppelin', None, False),
+            'common word': ('python', None, False),
+            'typo, fuzzy': ('zepelin', None, True),
+            '2 common tags': ('', TAGS[:2], False),
+            '3 tags incl. rare': ('', [TAGS[0], TAGS[1], TAGS[150]], False),
+            'word + 2 tags': ('garlic', TAGS[:2], False),
+        }
+
+        def measure_all(label):
+            rows = []
+            for name, (query_text, tags, fuzzy) in searches.items():
+                if fuzzy and not trigram_supported():
+                    continue
+                query = Document.search_query(query_text, tags=tags, fuzzy=fuzzy)
+                matches = query.count()
+                rows.append({'query': name, 'indexes': label, 'mode': 'search_query', 'matches': matches,
+                             'access': access_path(query), **summarize(measure(lambda: run(query), args.requests))})
+                if tags:
+                    old = per_tag_exists(tags)
+                    rows.append({'query': name, 'indexes': label, 'mode': 'EXISTS per tag', 'matches': matches,
+                                 'access': access_path(old), **summarize(measure(lambda: run(old), args.requests))})
+            return rows
+
+        has_trigram = trigram_supported()
+        if has_trigram:
+            db.session.execute(text('DROP INDEX idx_documents_title_trgm'))
+            db.session.execute(text('DROP INDEX idx_documents_markdown_content_trgm'))
+        rows = measure_all('none')
+        db.session.rollback()
+        if has_trigram:
+            rows += measure_all('trigram')
+
+        print_table(f'Document.search_documents, {args.documents} documents, '
+                    f'{args.tags_per_document} tags each, first {args.per_page} + count', rows)
+        if not has_trigram:
+            print('\npg_trgm is not available on this server; trigram rows skipped')
+    finally:
+        db.session.rollback()
+        db.drop_all()
+
+
+if __name__ == '__main__':
+    main()
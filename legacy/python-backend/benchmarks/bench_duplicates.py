@@ -0,0 +1,95 @@
+"""
+Recall and runtime of duplicate detection: pairwise TF-IDF scan versus the MinHash/LSH index.
+
+The corpus has planted near-duplicates (copies with a few words edited). Recall
+is the share of planted pairs reported. The pairwise scan only sees the first
+--sample documents, as the route did before the index; the index covers the
+whole corpus.
+
+    python benchmarks/bench_duplicates.py --sizes 1000,10000,100000
+"""
+import argparse
+import random
+import time
+
+from _common import create_benchmark_app, insert_documents, print_table
+
+
+def planted_corpus(count, duplicate_rate, edit_rate, seed=7):
+    """Random documents where duplicate_rate of them are lightly edited copies of another"""
+    rng = random.Random(seed)
+    vocabulary = [f'w{i}' for i in range(5000)]
+    documents = []
+    planted = set()
+    for i in range(count):
+        if documents and rng.random() < duplicate_rate:
+            source = rng.randrange(len(documents))
+            tokens = documents[source][1].split()
+            for _ in range(max(1, int(len(tokens) * edit_rate))):
+                tokens[rng.randrange(len(tokens))] = rng.choice(vocabulary)
+            planted.add((source + 1, i + 1))  # ids follow insertion order
+            documents.append((f'Copy {i}', ' '.join(tokens)))
+        else:
+            documents.append((f'Note {i}', ' '.join(rng.choice(vocabulary) for _ in range(200))))
+    return documents, planted
+
+
+def recall(found, planted):
+    return round(len(found & planted) / len(planted), 4) if planted else 1.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', default='1000,10000')
+    parser.add_argument('--sample', type=int, default=1000, help='documents seen by the pairwise scan')
+    parser.add_argument('--threshold', type=float, default=0.8)
+    parser.add_argument('--duplicate-rate', type=float, default=0.05)
+    parser.add_argument('--edit-rate', type=float, default=0.02)
+    args = parser.parse_args()
+
+    rows = []
+    for size in [int(s) for s in args.sizes.split(',')]:
+        app, ctx = create_benchmark_app()
+        from app import db
+        from app.models.document import Document
+        from app.services.document_clustering_service import DocumentClusteringService
+        from app.services.minhash_index import minhash_index
+
+        documents, planted = planted_corpus(size, args.duplicate_rate, args.edit_rate)
+        insert_documents(documents)
+        service = DocumentClusteringService(use_feature_store=False)
+
+        started = time.perf_counter()
+        sample = Document.query.order_by(Document.id).limit(args.sample).all()
+        dense = service.detect_document_duplicates(documents=sample, similarity_threshold=args.threshold)
+        dense_seconds = time.perf_counter() - started
+        dense_found = {(d['document1']['id'], d['document2']['id']) for d in dense['duplicates']}
+
+        started = time.perf_counter()
+        minhash_index.rebuild(batch_size=1000)
+        build_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        indexed = service.detect_document_duplicates(similarity_threshold=args.threshold,
+                                                     document_query=Document.query)
+        indexed_seconds = time.perf_counter() - started
+        indexed_found = {(d['document1']['id'], d['document2']['id']) for d in indexed['duplicates']}
+
+        rows.append({'documents': size, 'planted': len(planted), 'method': f'pairwise ({len(sample)} sample)',
+                     'recall': recall(dense_found, planted), 'build_s': '-',
+                     'query_s': round(dense_seconds, 3), 'candidates': '-'})
+        rows.append({'documents': size, 'planted': len(planted), 'method': 'minhash/lsh',
+                     'recall': recall(indexed_found, planted), 'build_s': round(build_seconds, 3),
+                     'query_s': round(indexed_seconds, 3),
+                     'candidates': indexed['duplicate_stats']['candidate_pairs']})
+
+        db.session.remove()
+        db.drop_all()
+        ctx.pop()
+
+    print_table(f'Duplicate detection at threshold {args.threshold}, '
+                f'{args.edit_rate:.0%} of words edited in planted copies', rows)
+
+
+if __name__ == '__main__':
+    main()
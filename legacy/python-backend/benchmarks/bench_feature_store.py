@@ -0,0 +1,58 @@
+"""
+Per-request latency of /clustering/similar before and after the TF-IDF feature store.
+
+"before" refits a TfidfVectorizer on every call, "after" loads stored vectors.
+
+    python benchmarks/bench_feature_store.py --documents 10000 --requests 10
+"""
+import argparse
+import time
+
+from _common import create_benchmark_app, insert_documents, measure, print_table, summarize, synthetic_documents
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--documents', type=int, default=10000)
+    parser.add_argument('--candidates', type=int, default=1000, help='candidate limit used by the route')
+    parser.add_argument('--requests', type=int, default=10)
+    args = parser.parse_args()
+
+    create_benchmark_app()
+    from app import db
+    from app.models.document import Document
+    from app.services.document_clustering_service import DocumentClusteringService
+    from app.services.tfidf_feature_store import tfidf_feature_store
+
+    insert_documents(synthetic_documents(args.documents))
+    target_ids = [doc_id for (doc_id,) in Document.query.with_entities(Document.id).limit(args.requests).all()]
+
+    def similar_request(service, target_id):
+        target = db.session.get(Document, target_id)
+        candidates = Document.query.filter(Document.id != target_id).limit(args.candidates).all()
+        return service.find_similar_documents(target, candidates, max_results=10)
+
+    def run(service):
+        ids = iter(target_ids * 2)
+        return measure(lambda: similar_request(service, next(ids)), args.requests)
+
+    refit = run(DocumentClusteringService(use_feature_store=False))
+
+    started = time.perf_counter()
+    rebuild = tfidf_feature_store.rebuild()
+    rebuild_seconds = time.perf_counter() - started
+    stored = run(DocumentClusteringService(use_feature_store=True))
+
+    print_table(
+        f'find_similar_documents, {args.documents} documents, {args.candidates} candidates per request',
+        [
+            {'mode': 'refit per request', **summarize(refit)},
+            {'mode': 'feature store', **summarize(stored)},
+        ]
+    )
+    print(f"\nOne-off rebuild: v{rebuild.get('version')} over {rebuild.get('documents_indexed')} documents "
+          f"in {rebuild_seconds:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
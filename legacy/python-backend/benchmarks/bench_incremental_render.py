@@ -0,0 +1,75 @@
+"""
+Save latency for single-line edits of a large markdown note: a full render of
+the edited document (what every save did before), an incremental render with
+nothing cached (a first save), and an incremental render that reuses cached
+HTML for the blocks the edit did not touch. Each run edits a different line so
+the whole-document cache never answers.
+
+    python benchmarks/bench_incremental_render.py --sections 400
+"""
+import argparse
+import random
+
+from _common import create_benchmark_app, measure, print_table, summarize
+
+SECTION = '''## Section {i}
+
+Paragraph {i} explains the setup with *emphasis*, `inline code` and a
+[link](https://example.com/{i}). It runs on for a second line.
+
+- first point about {i}
+- second point
+
+```python
+def handler_{i}(request):
+    return {{"section": {i}}}
+```
+
+| key | value |
+|-----|-------|
+| id  | {i}   |
+'''
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sections', type=int, default=400, help='sections in the note (about 500 bytes each)')
+    parser.add_argument('--requests', type=int, default=10, help='runs per measurement')
+    args = parser.parse_args()
+
+    app, _ = create_benchmark_app()
+    app.config['MARKDOWN_RENDER_OFFLOAD_CHARS'] = 10 ** 9  # measure rendering, not the worker pool
+    from app import cache
+    from app.models.document import ALLOWED_ATTRIBUTES, ALLOWED_TAGS, MARKDOWN_EXTENSIONS
+    from app.services import markdown_renderer
+
+    note = '\n'.join(SECTION.format(i=i) for i in range(args.sections))
+    rng = random.Random(7)
+
+    def edited():
+        section = rng.randrange(args.sections)
+        return note.replace(f'Paragraph {section} explains', f'Paragraph {section} (rev {rng.random()}) explains')
+
+    def render(content, incremental):
+        return markdown_renderer.render_markdown(content, MARKDOWN_EXTENSIONS, ALLOWED_TAGS, ALLOWED_ATTRIBUTES,
+                                                 incremental=incremental)
+
+    content = edited()
+    assert render(content, True) == markdown_renderer._render(content, MARKDOWN_EXTENSIONS, ALLOWED_TAGS,
+                                                               ALLOWED_ATTRIBUTES)
+    blocks = len(markdown_renderer.split_blocks(note))
+    def cold():
+        cache.clear()
+        return render(edited(), True)
+
+    rows = [
+        {'mode': 'full render', **summarize(measure(lambda: render(edited(), False), args.requests))},
+        {'mode': 'incremental, empty cache', **summarize(measure(cold, args.requests))},
+        {'mode': 'incremental, one-line edit', **summarize(measure(lambda: render(edited(), True), args.requests))},
+    ]
+
+    print_table(f'Save render, {len(note) // 1024}KB note, {blocks} blocks', rows)
+
+
+if __name__ == '__main__':
+    main()
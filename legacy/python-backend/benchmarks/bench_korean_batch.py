@@ -0,0 +1,68 @@
+"""
+Korean document processing throughput (docs/sec).
+
+Compares the old per-output path (a morphological pass for every output, no
+cache) with the single-pass analyzer and the process-pool batch API, on a
+synthetic Korean corpus. Uses whichever konlpy analyzer is installed; without
+one the processor falls back to whitespace tokenization and the numbers only
+reflect the non-analyzer work.
+
+    python benchmarks/bench_korean_batch.py --documents 2000 --workers 4
+"""
+import argparse
+import time
+
+import _common  # noqa: F401  (puts the backend on sys.path)
+from bench_korean_search import korean_corpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--documents', type=int, default=2000)
+    parser.add_argument('--words', type=int, default=300, help='words per document')
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    from app.utils import korean_text
+    from app.utils.korean_text import korean_processor, process_korean_documents
+
+    documents, _ = korean_corpus(args.documents, words=args.words)
+    processor = korean_processor
+
+    def per_output(title, content):
+        # The former process_korean_document: one analyzer pass per output
+        return {
+            'language': processor.detect_language(content),
+            'search_vector': processor.create_search_vector(title, content),
+            'keywords': processor.extract_keywords(content),
+            'auto_tags': processor.extract_tags_from_korean_text(content),
+            'title_tokens': processor.tokenize(title),
+            'content_tokens': processor.tokenize(content)
+        }
+
+    def run(name, fn):
+        processor._morpheme_cache.clear()
+        started = time.perf_counter()
+        fn()
+        seconds = time.perf_counter() - started
+        return {'mode': name, 'seconds': round(seconds, 2), 'docs_per_sec': round(len(documents) / seconds, 1)}
+
+    cache_size = korean_text.MORPHEME_CACHE_SIZE
+    korean_text.MORPHEME_CACHE_SIZE = 0
+    rows = [run('per-output passes, no cache', lambda: [per_output(t, c) for t, c in documents])]
+    korean_text.MORPHEME_CACHE_SIZE = cache_size
+
+    rows.append(run('single pass, serial', lambda: process_korean_documents(documents, workers=1)))
+    rows.append(run('single pass, repeated content (cache)',
+                    lambda: [processor.analyze(t, c) for t, c in documents[:len(documents) // 10] * 10]))
+    for workers in sorted({2, args.workers}):
+        rows.append(run(f'process pool, {workers} workers',
+                        lambda: process_korean_documents(documents, workers=workers)))
+
+    analyzer = type(processor.analyzer).__name__ if processor.analyzer else 'none (whitespace fallback)'
+    _common.print_table(f'Korean document processing, {args.documents} documents x {args.words} words, '
+                        f'analyzer: {analyzer}', rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+Korean search latency: ILIKE OR chains versus the character-bigram GIN index.
+
+Runs the /search/korean query shape (filter, order, first page, total count)
+over synthetic Korean documents. Requires PostgreSQL:
+
+    BENCH_DATABASE_URL=postgresql+psycopg2://localhost/bench \
+        python benchmarks/bench_korean_search.py --documents 100000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+from _common import create_benchmark_app, insert_documents, measure, print_table, summarize
+
+SYLLABLES = '가나다라마바사아자차카타파하거너더러머버서어저처커터퍼허고노도로모보소오조초코토포호구누두루무부수우주추'
+
+
+def korean_corpus(count, words=150, vocabulary_size=5000, seed=11):
+    rng = random.Random(seed)
+    vocabulary = sorted({''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+                         for _ in range(vocabulary_size)})
+    # Zipf-like skew so some words are common and most are rare
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    documents = []
+    for i in range(count):
+        body = ' '.join(rng.choices(vocabulary, weights=weights, k=words))
+        documents.append((f'{rng.choice(vocabulary)} 문서 {i}', body))
+    return documents, vocabulary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--documents', type=int, default=100000)
+    parser.add_argument('--requests', type=int, default=10, help='runs per query')
+    parser.add_argument('--per-page', type=int, default=20)
+    args = parser.parse_args()
+
+    if not os.getenv('BENCH_DATABASE_URL', '').startswith('postgresql'):
+        sys.exit('Set BENCH_DATABASE_URL to a PostgreSQL database')
+
+    create_benchmark_app()
+    from sqlalchemy import or_, select, text
+    from app import db
+    from app.models.document import Document
+    from app.services import korean_search_index
+    from app.utils.validation import escape_like
+
+    documents, vocabulary = korean_corpus(args.documents)
+    insert_documents(documents)
+    started = time.perf_counter()
+    rebuild = korean_search_index.rebuild(batch_size=1000)
+    rebuild_seconds = time.perf_counter() - started
+    db.session.execute(text('ANALYZE documents'))
+    db.session.commit()
+
+    # 'matches' is the reachable total, capped at RESULT_WINDOW for the index
+    queries = {
+        'common word': [vocabulary[0]],
+        'rare word': [vocabulary[-1]],
+        'two words': [vocabulary[3], vocabulary[200]],
+        'five words': vocabulary[1000:1005],
+    }
+
+    def ilike_search(tokens):
+        conditions = []
+        for token in tokens:
+            escaped = escape_like(token)
+            conditions.extend([Document.title.ilike(f'%{escaped}%'),
+                               Document.markdown_content.ilike(f'%{escaped}%')])
+        query = Document.query.filter(Document.is_public == True, or_(*conditions))
+        query.order_by(Document.updated_at.desc()).limit(args.per_page).all()
+        return query.count()
+
+    def ngram_search(tokens):
+        match, rank = korean_search_index.ngram_match(tokens)
+        base = Document.query.filter(Document.is_public == True)
+        window = base.filter(match).with_entities(Document.id).order_by(Document.updated_at.desc())\
+            .limit(korean_search_index.RESULT_WINDOW).subquery()
+        query = base.filter(Document.id.in_(select(window.c.id)))
+        query.order_by(rank.desc(), Document.updated_at.desc()).limit(args.per_page).all()
+        return query.count()
+
+    rows = []
+    for name, tokens in queries.items():
+        matches = ngram_search(tokens)
+        for mode, search in (('ILIKE OR chain', ilike_search), ('bigram GIN index', ngram_search)):
+            durations = measure(lambda: search(tokens), args.requests)
+            rows.append({'query': name, 'matches': matches, 'mode': mode, **summarize(durations)})
+
+    print_table(f'/search/korean query shape, {args.documents} documents', rows)
+    print(f"\nOne-off rebuild: {rebuild.get('documents_indexed')} documents in {rebuild_seconds:.1f}s")
+
+    db.session.remove()
+    db.drop_all()
+
+
+if __name__ == '__main__':
+    main()
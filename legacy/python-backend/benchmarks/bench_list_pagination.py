@@ -0,0 +1,84 @@
+"""
+Latency of a document list page at page 1 and page 10,000: OFFSET page numbers
+with an exact COUNT (the previous behaviour), page numbers with the planner's
+estimate, and keyset cursors, through build_pagination_response.
+
+The cursor for a deep page is the next_cursor of the page before it, built here
+from that page's last row instead of walking 10,000 pages. Runs on SQLite by
+default; set BENCH_DATABASE_URL for PostgreSQL, where count=approx is served
+from table statistics.
+
+    python benchmarks/bench_list_pagination.py --per-page 20 --pages 10000
+"""
+import argparse
+from datetime import datetime, timedelta
+
+from _common import create_benchmark_app, measure, print_table, summarize
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--per-page', type=int, default=20)
+    parser.add_argument('--pages', type=int, default=10000, help='deepest page; sets the document count')
+    parser.add_argument('--requests', type=int, default=20, help='runs per measurement')
+    args = parser.parse_args()
+
+    app, _ = create_benchmark_app()
+    from sqlalchemy import text
+    from app import db
+    from app.models.document import Document
+    from app.utils.responses import build_pagination_response, encode_cursor
+
+    total = args.per_page * args.pages + args.per_page // 2
+    base = datetime(2024, 1, 1)
+    try:
+        for start in range(0, total, 5000):
+            db.session.execute(Document.__table__.insert(), [
+                # Three documents per second so updated_at has ties for the id tie-breaker
+                {'title': f'Note {i}', 'markdown_content': f'# Note {i}\n\nbody', 'html_content': '',
+                 'is_public': True, 'created_at': base, 'updated_at': base + timedelta(seconds=i // 3)}
+                for i in range(start, min(start + 5000, total))
+            ])
+            db.session.commit()
+        if db.engine.dialect.name == 'postgresql':
+            db.session.execute(text('ANALYZE documents'))
+            db.session.commit()
+
+        query = Document.query.filter(Document.is_public == True)
+
+        def cursor_before(page):
+            # next_cursor of page - 1: the last row of that page
+            last = query.order_by(Document.updated_at.desc(), Document.id.desc())\
+                .offset((page - 1) * args.per_page - 1).first()
+            return encode_cursor(Document.updated_at, [last.updated_at, last.id])
+
+        def fetch(page, count, cursor=None):
+            return build_pagination_response(query, page, args.per_page, serializer_func=lambda d: d.id,
+                                             wrap_pagination=True, sort_column=Document.updated_at,
+                                             cursor=cursor, count=count)
+
+        rows = []
+        with app.test_request_context():
+            for page in (1, args.pages):
+                cursor = cursor_before(page) if page > 1 else None
+                expected = fetch(page, 'none')['items']
+                modes = {
+                    'page number, exact count': lambda: fetch(page, 'exact'),
+                    'page number, approx count': lambda: fetch(page, 'approx'),
+                    'page number, no count': lambda: fetch(page, 'none'),
+                }
+                if cursor:
+                    assert fetch(None, 'none', cursor)['items'] == expected
+                    modes['cursor, no count'] = lambda: fetch(None, 'none', cursor)
+                for mode, fn in modes.items():
+                    rows.append({'page': page, 'mode': mode, **summarize(measure(fn, args.requests))})
+
+        print_table(f'List page latency, {total} documents, {args.per_page} per page ({db.engine.dialect.name})',
+                    rows)
+    finally:
+        db.session.rollback()
+        db.drop_all()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Save-path markdown rendering for a large technical note with many code blocks:
+an uncached render (unique content each run, the previous behaviour on every
+save), a render-cache hit for identical content, and the request-thread wait
+when the render is offloaded to the worker pool.
+
+Uses the app's configured cache (SimpleCache unless CACHE_TYPE is set), so with
+CACHE_TYPE=RedisCache the hit column includes the Redis round trip.
+
+    python benchmarks/bench_markdown_render.py --blocks 200
+"""
+import argparse
+
+from _common import create_benchmark_app, measure, print_table, summarize
+
+CODE_BLOCK = '''
+## Step {i}
+
+Some explanation of step {i} with `inline code` and a [link](https://example.com/{i}).
+
+```python
+def step_{i}(values):
+    total = 0
+    for value in values:
+        if value % {m} == 0:
+            total += value * {i}
+    return total
+```
+
+| metric | value |
+|--------|-------|
+| step   | {i}   |
+'''
+
+
+def technical_note(blocks: int, salt: str = '') -> str:
+    return f'# Runbook {salt}\n' + ''.join(CODE_BLOCK.format(i=i, m=i % 7 + 2) for i in range(blocks))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--blocks', type=int, default=200, help='code blocks in the note')
+    parser.add_argument('--requests', type=int, default=10, help='runs per measurement')
+    args = parser.parse_args()
+
+    app, _ = create_benchmark_app()
+    from app.models.document import ALLOWED_ATTRIBUTES, ALLOWED_TAGS, MARKDOWN_EXTENSIONS
+    from app.services import markdown_renderer
+
+    def render(content, wait=False):
+        return markdown_renderer.render_markdown(content, MARKDOWN_EXTENSIONS, ALLOWED_TAGS,
+                                                 ALLOWED_ATTRIBUTES, wait=wait)
+
+    note = technical_note(args.blocks)
+    runs = iter(range(10 ** 9))
+    rows = []
+    try:
+        rows.append({'mode': 'uncached render',
+                     **summarize(measure(lambda: render(technical_note(args.blocks, str(next(runs)))),
+                                         args.requests))})
+        render(note)
+        rows.append({'mode': 'cache hit', **summarize(measure(lambda: render(note), args.requests))})
+
+        app.config['MARKDOWN_RENDER_OFFLOAD_CHARS'] = 1
+        render(technical_note(1, 'warm-up'), wait=True)  # start the worker processes
+        rows.append({'mode': 'worker pool, uncached',
+                     **summarize(measure(lambda: render(technical_note(args.blocks, str(next(runs))), wait=True),
+                                         args.requests))})
+        app.config['MARKDOWN_RENDER_TIMEOUT'] = 0.05
+        rows.append({'mode': 'worker pool, 50ms timeout',
+                     **summarize(measure(lambda: render(technical_note(args.blocks, str(next(runs)))),
+                                         args.requests))})
+    finally:
+        markdown_renderer.shutdown_pool()
+
+    print_table(f'Markdown render, {len(note) // 1024}KB note with {args.blocks} code blocks', rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""
+Latency of OpenSearch result pages by depth: from/size page numbers against
+point-in-time + search_after cursors, from page 1 to page 1000.
+
+Page numbers stop at index.max_result_window (from + size <= 10000); cursor
+pages are timed while walking the whole result set. The OpenSearch endpoint is
+the test fake in its own process unless --opensearch-port is given; like a
+shard, the fake keeps a from + size priority queue for page numbers.
+
+    python benchmarks/bench_search_pagination.py --documents 25000 --per-page 20
+"""
+import argparse
+import multiprocessing
+import sys
+import time
+from datetime import datetime, timedelta
+
+from _common import BACKEND_DIR, create_benchmark_app, print_table, summarize
+
+
+def serve_fake(port_pipe):
+    sys.path.insert(0, BACKEND_DIR)
+    from tests.fake_opensearch import FakeOpenSearch
+    fake = FakeOpenSearch()
+    port_pipe.send(fake.port)
+    fake.thread.join()
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - started) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--documents', type=int, default=25000)
+    parser.add_argument('--per-page', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=5, help='runs per page-number measurement')
+    parser.add_argument('--opensearch-host', default='127.0.0.1')
+    parser.add_argument('--opensearch-port', type=int)
+    args = parser.parse_args()
+
+    fake = None
+    if args.opensearch_port is None:
+        receiver, sender = multiprocessing.Pipe(duplex=False)
+        fake = multiprocessing.Process(target=serve_fake, args=(sender,), daemon=True)
+        fake.start()
+        args.opensearch_port = receiver.recv()
+
+    create_benchmark_app()
+    from opensearchpy.helpers import bulk
+    from app.services.opensearch_service import OpenSearchService
+
+    service = OpenSearchService(host=args.opensearch_host, port=args.opensearch_port)
+    service.create_document_index()
+    base = datetime(2024, 1, 1)
+    bulk(service.client, ({'_index': service.document_index, '_id': i, '_source': {
+        'id': i, 'title': f'문서 {i}', 'content': '검색 성능 측정용 문서', 'is_public': True,
+        'updated_at': (base + timedelta(seconds=i // 3)).isoformat()
+    }} for i in range(1, args.documents + 1)), chunk_size=1000, refresh=True)
+
+    checkpoints = [page for page in (1, 10, 100, 250, 500, 1000) if page * args.per_page <= args.documents]
+    rows = {page: {'page': page} for page in checkpoints}
+
+    for page in checkpoints:
+        if page * args.per_page > service.MAX_RESULT_WINDOW:
+            rows[page]['page_number_p50_ms'] = 'refused'
+            continue
+        durations = [timed(lambda: service.search_documents('문서', page=page, per_page=args.per_page))[1]
+                     for _ in range(args.repeat)]
+        rows[page]['page_number_p50_ms'] = summarize(durations)['p50_ms']
+
+    cursor_times = {}
+    result, elapsed = timed(lambda: service.search_documents('문서', per_page=args.per_page))
+    cursor_times[1] = elapsed
+    page = 1
+    while result['next_cursor'] and page < checkpoints[-1]:
+        page += 1
+        cursor = result['next_cursor']
+        result, cursor_times[page] = timed(
+            lambda: service.search_documents('문서', per_page=args.per_page, cursor=cursor))
+    for page in checkpoints:
+        # Median of the cursor pages around the checkpoint, to smooth single-request noise
+        window = [cursor_times[p] for p in range(max(1, page - 2), page + 3) if p in cursor_times]
+        rows[page]['cursor_p50_ms'] = summarize(window)['p50_ms']
+
+    print_table(f'Result page latency by depth, {args.documents} documents, {args.per_page} per page',
+                list(rows.values()))
+
+    if fake:
+        fake.terminate()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""
+Search latency while a zero-downtime index rebuild runs, against the same
+searches on an idle index. Also counts searches that failed or came back empty,
+which would mean readers saw a missing or half-built index.
+
+The rebuild runs in a separate process, as it would in a worker; searches go
+through the read alias from this one. The OpenSearch endpoint is the test fake
+in its own process unless --opensearch-port is given. The fake applies one
+request at a time and everything shares the machine's CPUs, so a real cluster
+only does better.
+
+    python benchmarks/bench_search_rebuild.py --documents 5000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+if not os.getenv('BENCH_DATABASE_URL'):
+    os.environ['BENCH_DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.gettempdir(), 'bench_search_rebuild.db')}"
+
+from _common import BACKEND_DIR, create_benchmark_app, insert_documents, print_table, summarize  # noqa: E402
+from bench_korean_search import korean_corpus  # noqa: E402
+
+
+def run_rebuild(args):
+    create_benchmark_app()
+    from app.services.opensearch_service import OpenSearchService
+    from app.services.search_index_manager import SearchIndexManager
+
+    service = OpenSearchService(host=args.opensearch_host, port=args.opensearch_port)
+    report = SearchIndexManager(service=service).rebuild(batch_size=args.batch_size, workers=1)
+    print(json.dumps({key: report.get(key) for key in ('status', 'index_name', 'duration_seconds')}))
+
+
+def serve_fake(port_pipe):
+    sys.path.insert(0, BACKEND_DIR)
+    from tests.fake_opensearch import FakeOpenSearch
+    fake = FakeOpenSearch()
+    port_pipe.send(fake.port)
+    fake.thread.join()
+
+
+def search_loop(service, keep_going, queries):
+    durations, failures, empty = [], 0, 0
+    while keep_going(len(durations)):
+        query = queries[len(durations) % len(queries)]
+        started = time.perf_counter()
+        result = service.search_documents(query, per_page=20)
+        durations.append((time.perf_counter() - started) * 1000)
+        failures += 'error' in result
+        empty += not result['documents']
+    return durations, failures, empty
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--documents', type=int, default=5000)
+    parser.add_argument('--words', type=int, default=200, help='words per document')
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--idle-searches', type=int, default=300)
+    parser.add_argument('--opensearch-host', default='127.0.0.1')
+    parser.add_argument('--opensearch-port', type=int)
+    parser.add_argument('--rebuild', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.rebuild:
+        return run_rebuild(args)
+
+    fake = None
+    if args.opensearch_port is None:
+        import multiprocessing
+        receiver, sender = multiprocessing.Pipe(duplex=False)
+        fake = multiprocessing.Process(target=serve_fake, args=(sender,), daemon=True)
+        fake.start()
+        args.opensearch_port = receiver.recv()
+
+    create_benchmark_app()
+    from app import db
+    from app.services.opensearch_service import OpenSearchService
+    from app.services.search_reindexer import SearchReindexer
+
+    documents, _ = korean_corpus(args.documents, words=args.words)
+    insert_documents(documents)
+    db.session.remove()
+
+    service = OpenSearchService(host=args.opensearch_host, port=args.opensearch_port)
+    service.create_document_index()
+    SearchReindexer(service=service, workers=1).run(name='bench-initial', resume=False)
+    queries = [title.split()[0] for title, _ in documents[:50]]
+
+    idle = search_loop(service, lambda done: done < args.idle_searches, queries)
+
+    command = [sys.executable, __file__, '--rebuild', '--batch-size', str(args.batch_size),
+               '--opensearch-host', args.opensearch_host, '--opensearch-port', str(args.opensearch_port)]
+    rebuild = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    during = search_loop(service, lambda done: rebuild.poll() is None, queries)
+    outcome = json.loads(rebuild.stdout.read().strip().splitlines()[-1])
+
+    rows = []
+    for phase, (durations, failures, empty) in (('idle', idle), ('during rebuild', during)):
+        rows.append({'phase': phase, 'searches': len(durations), 'failed': failures, 'empty': empty,
+                     **summarize(durations)})
+    print_table(f"Search latency, {args.documents} documents; rebuild {outcome['status']} "
+                f"into {outcome['index_name']} in {outcome['duration_seconds']}s", rows)
+
+    db.drop_all()
+    if fake:
+        fake.terminate()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""
+Full OpenSearch reindex: the old build-everything-then-bulk path versus the
+streaming SearchReindexer. Reports docs/sec and peak RSS per run.
+
+Each mode runs in its own process so peak RSS is not shared. Documents live in
+BENCH_DATABASE_URL (default: a temporary SQLite file); the OpenSearch endpoint
+is an in-process fake unless --opensearch-port is given.
+
+    python benchmarks/bench_search_reindex.py --documents 20000 --workers 4
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+if not os.getenv('BENCH_DATABASE_URL'):
+    os.environ['BENCH_DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.gettempdir(), 'bench_search_reindex.db')}"
+
+from _common import BACKEND_DIR, create_benchmark_app, insert_documents, print_table  # noqa: E402
+from bench_korean_search import korean_corpus  # noqa: E402
+
+
+def run_mode(args):
+    import threading
+    import time
+    create_benchmark_app()
+    from app.models.document import Document
+    from app.services.opensearch_service import OpenSearchService
+    from app.services.search_indexer import document_payload
+    from app.services.search_reindexer import SearchReindexer, current_rss_bytes
+    from app.utils.korean_text import korean_processor
+
+    service = OpenSearchService(host=args.opensearch_host, port=args.opensearch_port)
+    rss_start = current_rss_bytes()
+    # Sampled rather than ru_maxrss, which Linux carries over from the parent across exec
+    peak = [rss_start]
+    done = threading.Event()
+
+    def sample():
+        while not done.wait(0.05):
+            peak[0] = max(peak[0], current_rss_bytes())
+
+    threading.Thread(target=sample, daemon=True).start()
+    started = time.perf_counter()
+
+    if args.mode == 'legacy':
+        from opensearchpy.helpers import bulk
+        payloads = [document_payload(document) for document in Document.query.order_by(Document.id).all()]
+        for payload in payloads:
+            payload.update(korean_processor.analyze(payload['title'], payload['content']))
+        actions = [{'_index': service.document_index, '_id': p['id'], '_source': p} for p in payloads]
+        indexed, _ = bulk(service.client, actions, chunk_size=100, request_timeout=60)
+    else:
+        report = SearchReindexer(service=service, batch_size=args.batch_size, workers=args.workers).run(
+            name=f'bench-{os.getpid()}', resume=False)
+        indexed = report['documents_indexed']
+
+    seconds = time.perf_counter() - started
+    done.set()
+    print(json.dumps({
+        'mode': args.mode if args.mode == 'legacy' else f'streaming, {args.workers} analysis workers',
+        'documents': indexed,
+        'seconds': round(seconds, 2),
+        'docs_per_sec': round(indexed / seconds, 1),
+        'rss_start_mb': round(rss_start / 1024 / 1024, 1),
+        'peak_rss_mb': round(max(peak[0], current_rss_bytes()) / 1024 / 1024, 1),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--documents', type=int, default=20000)
+    parser.add_argument('--words', type=int, default=400, help='words per document')
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--workers', type=int, default=min(os.cpu_count() or 1, 4))
+    parser.add_argument('--opensearch-host', default='127.0.0.1')
+    parser.add_argument('--opensearch-port', type=int)
+    parser.add_argument('--mode', choices=['legacy', 'streaming'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        return run_mode(args)
+
+    fake = None
+    if args.opensearch_port is None:
+        sys.path.insert(0, BACKEND_DIR)
+        from tests.fake_opensearch import FakeOpenSearch
+        fake = FakeOpenSearch()
+        args.opensearch_port = fake.port
+
+    create_benchmark_app()
+    from app import db
+    documents, _ = korean_corpus(args.documents, words=args.words)
+    insert_documents(documents)
+    db.session.remove()
+
+    rows = []
+    for mode, workers in (('legacy', 1), ('streaming', 1), ('streaming', args.workers)):
+        command = [sys.executable, __file__, '--mode', mode, '--workers', str(workers),
+                   '--batch-size', str(args.batch_size), '--opensearch-host', args.opensearch_host,
+                   '--opensearch-port', str(args.opensearch_port)]
+        output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+        rows.append(json.loads(output.strip().splitlines()[-1]))
+        if fake:
+            fake.indices.clear()
+
+    print_table(f'Full reindex, {args.documents} documents x {args.words} words', rows)
+
+    db.drop_all()
+    if fake:
+        fake.close()
+
+
+if __name__ == '__main__':
+    main()
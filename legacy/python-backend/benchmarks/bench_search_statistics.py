@@ -0,0 +1,117 @@
+"""
+Cluster load from dashboards polling search statistics and tag suggestions,
+with every request aggregating on the cluster (before) against cached
+aggregations keyed by index generation (after).
+
+Each round every dashboard polls statistics once and types a few tag-suggestion
+prefixes; every --change-every rounds the index changes and the generation is
+bumped, as the outbox indexer does. Reports aggregation queries that reached the
+cluster, cluster CPU seconds and request latency. The OpenSearch endpoint is the
+test fake in its own process, which reports its own CPU time.
+
+    python benchmarks/bench_search_statistics.py --documents 5000 --dashboards 20 --rounds 30
+"""
+import argparse
+import multiprocessing
+import random
+import sys
+import time
+
+from _common import BACKEND_DIR, create_benchmark_app, print_table, summarize
+
+
+def serve_fake(conn):
+    sys.path.insert(0, BACKEND_DIR)
+    from tests.fake_opensearch import FakeOpenSearch
+    fake = FakeOpenSearch()
+    conn.send(fake.port)
+    # Answer usage requests until the parent hangs up
+    while conn.recv() == 'usage':
+        searches = sum(1 for _, path in fake.requests if path.endswith('/_search'))
+        conn.send((time.process_time(), searches))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--documents', type=int, default=5000)
+    parser.add_argument('--tags', type=int, default=500, help='distinct tags in the corpus')
+    parser.add_argument('--dashboards', type=int, default=20)
+    parser.add_argument('--rounds', type=int, default=30)
+    parser.add_argument('--keystrokes', type=int, default=3, help='tag-suggestion requests per dashboard per round')
+    parser.add_argument('--change-every', type=int, default=5, help='rounds between index changes')
+    parser.add_argument('--max-age', type=int, default=60)
+    args = parser.parse_args()
+
+    conn, child_conn = multiprocessing.Pipe()
+    fake = multiprocessing.Process(target=serve_fake, args=(child_conn,), daemon=True)
+    fake.start()
+    port = conn.recv()
+
+    create_benchmark_app()
+    from opensearchpy.helpers import bulk
+    from app.services.opensearch_service import OpenSearchService
+    from app.services.search_statistics import SearchStatistics, bump_generation
+
+    rng = random.Random(7)
+    tags = [f'태그{i}' for i in range(args.tags)]
+    service = OpenSearchService(host='127.0.0.1', port=port)
+    service.create_document_index()
+
+    def index_documents(start, count):
+        bulk(service.client, ({'_index': service.document_index, '_id': i, '_source': {
+            'id': i, 'title': f'문서 {i}', 'language': 'korean', 'author': f'user{i % 30}', 'is_public': True,
+            'tags': rng.sample(tags, 3), 'created_at': f'2024-{i % 12 + 1:02d}-01T00:00:00'
+        }} for i in range(start, start + count)), chunk_size=1000, refresh=True)
+
+    index_documents(1, args.documents)
+    prefixes = [tag[:length] for tag in rng.sample(tags, 50) for length in (2, 3, 4)]
+
+    def usage():
+        conn.send('usage')
+        return conn.recv()
+
+    def run(statistics_of, suggest):
+        cpu_before, searches_before = usage()
+        durations = []
+        next_id = args.documents + 1
+        for round_number in range(args.rounds):
+            if round_number and round_number % args.change_every == 0:
+                index_documents(next_id, 10)
+                next_id += 10
+                bump_generation()
+            for _ in range(args.dashboards):
+                started = time.perf_counter()
+                statistics_of()
+                durations.append((time.perf_counter() - started) * 1000)
+                for _ in range(args.keystrokes):
+                    started = time.perf_counter()
+                    suggest(rng.choice(prefixes))
+                    durations.append((time.perf_counter() - started) * 1000)
+        cpu_after, searches_after = usage()
+        return durations, searches_after - searches_before, cpu_after - cpu_before
+
+    statistics = SearchStatistics(service=service)
+    phases = {
+        'before (aggregate per request)': (service.get_document_statistics,
+                                           lambda query: service.suggest_tags(query, 10)),
+        f'after (cached, max_age {args.max_age}s)': (
+            lambda: statistics.get_statistics(max_age=args.max_age),
+            lambda query: statistics.suggest_tags(query, 10, max_age=args.max_age)),
+        'after (cached, max_age 0)': (lambda: statistics.get_statistics(max_age=0),
+                                      lambda query: statistics.suggest_tags(query, 10, max_age=0)),
+    }
+    rows = []
+    for phase, (statistics_of, suggest) in phases.items():
+        durations, aggregations, cpu = run(statistics_of, suggest)
+        rows.append({'phase': phase, 'requests': len(durations), 'cluster_aggregations': aggregations,
+                     'cluster_cpu_s': round(cpu, 2), **summarize(durations)})
+
+    print_table(f'Dashboard polling, {args.documents} documents, {args.dashboards} dashboards x '
+                f'{args.rounds} rounds, index change every {args.change_every} rounds', rows)
+
+    conn.send('stop')
+    fake.join(5)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Full-text search latency with a to_tsvector() computed per row versus the stored search_vector.
+
+Both variants get a GIN index (the computed one on the exact expression) and run
+the /documents/search query shape: match, rank, first page, total count.
+Requires PostgreSQL:
+
+    BENCH_DATABASE_URL=postgresql+psycopg2://localhost/bench \
+        python benchmarks/bench_search_vector.py --documents 100000
+"""
+import argparse
+import os
+import sys
+
+from _common import create_benchmark_app, insert_documents, measure, print_table, summarize, synthetic_documents
+
+QUERIES = ['postgres', 'garlic tomato', 'shard relevance', 'python decorator generator', 'passport']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--documents', type=int, default=100000)
+    parser.add_argument('--requests', type=int, default=20, help='runs per query')
+    parser.add_argument('--per-page', type=int, default=10)
+    args = parser.parse_args()
+
+    if not os.getenv('BENCH_DATABASE_URL', '').startswith('postgresql'):
+        sys.exit('Set BENCH_DATABASE_URL to a PostgreSQL database')
+
+    create_benchmark_app()
+    from sqlalchemy import func, text
+    from app import db
+    from app.models.document import Document
+
+    insert_documents(synthetic_documents(args.documents))
+    computed_vector = func.to_tsvector(
+        'english', func.coalesce(Document.title, '') + ' ' + func.coalesce(Document.markdown_content, '')
+    )
+    db.session.execute(text("""
+        CREATE INDEX IF NOT EXISTS bench_documents_search_expression ON documents
+        USING gin(to_tsvector('english', coalesce(title, '') || ' ' || coalesce(markdown_content, '')))
+    """))
+    db.session.execute(text('ANALYZE documents'))
+    db.session.commit()
+
+    def computed_search(query_text):
+        tsquery = func.plainto_tsquery('english', query_text)
+        rank = func.ts_rank(computed_vector, tsquery).label('relevance_score')
+        query = Document.query.filter(Document.is_public == True, computed_vector.op('@@')(tsquery))
+        query.add_columns(rank).order_by(rank.desc(), Document.id).limit(args.per_page).all()
+        return query.count()
+
+    def stored_search(query_text):
+        match, rank = Document.fulltext_match(query_text)
+        rank = rank.label('relevance_score')
+        query = Document.query.filter(Document.is_public == True, match)
+        query.add_columns(rank).order_by(rank.desc(), Document.id).limit(args.per_page).all()
+        return query.count()
+
+    rows = []
+    for query_text in QUERIES:
+        matches = stored_search(query_text)
+        assert computed_search(query_text) == matches
+        for mode, search in (('computed to_tsvector', computed_search), ('stored search_vector', stored_search)):
+            durations = measure(lambda: search(query_text), args.requests)
+            rows.append({'query': query_text, 'matches': matches, 'mode': mode, **summarize(durations)})
+
+    print_table(f'/documents/search query shape, {args.documents} documents, '
+                f'{args.requests} runs per query', rows)
+
+    db.session.execute(text('DROP INDEX IF EXISTS bench_documents_search_expression'))
+    db.session.commit()
+    db.session.remove()
+    db.drop_all()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Collaborative edit throughput by document size: keystroke-sized inserts and
+deletes at random positions applied by slicing the whole string (the previous
+_apply_operation) versus the session rope buffer, plus the cost of
+materializing the rope for an autosave.
+
+    python benchmarks/bench_text_buffer.py --ops 20000
+"""
+import argparse
+import random
+import time
+
+from _common import print_table
+
+SIZES = {'10KB': 10_000, '100KB': 100_000, '1MB': 1_000_000}
+
+
+def keystrokes(length: int, count: int, seed: int = 7):
+    """Typing with occasional backspaces, clustered around a few cursors like real editors"""
+    rng = random.Random(seed)
+    cursors = [rng.randint(0, length) for _ in range(5)]
+    operations = []
+    for _ in range(count):
+        index = rng.randrange(len(cursors))
+        position = min(cursors[index], length)
+        if rng.random() < 0.2 and position > 0:
+            operations.append({'type': 'delete', 'position': position - 1, 'length': 1})
+            cursors[index] = position - 1
+            length -= 1
+        else:
+            operations.append({'type': 'insert', 'position': position, 'text': rng.choice('abcde \n')})
+            cursors[index] = position + 1
+            length += 1
+    return operations
+
+
+def apply_to_string(content: str, operation) -> str:
+    position = operation['position']
+    if operation['type'] == 'insert':
+        return content[:position] + operation['text'] + content[position:]
+    return content[:position] + content[position + operation['length']:]
+
+
+def ops_per_second(run, operations) -> float:
+    started = time.perf_counter()
+    run(operations)
+    return len(operations) / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--ops', type=int, default=20000, help='operations per document size')
+    args = parser.parse_args()
+
+    from app.services.text_buffer import TextBuffer
+
+    rows = []
+    for label, size in SIZES.items():
+        initial = ('All work and no play makes Jack a dull boy.\n' * (size // 43 + 1))[:size]
+        operations = keystrokes(size, args.ops)
+
+        def slicing(ops):
+            content = initial
+            for operation in ops:
+                content = apply_to_string(content, operation)
+            return content
+
+        buffer = TextBuffer(initial)
+
+        def rope(ops):
+            for operation in ops:
+                buffer.apply(operation)
+
+        string_rate = ops_per_second(slicing, operations)
+        rope_rate = ops_per_second(rope, operations)
+        started = time.perf_counter()
+        materialized = buffer.text
+        materialize_ms = (time.perf_counter() - started) * 1000
+        assert materialized == slicing(operations)
+        rows.append({
+            'size': label,
+            'string ops/s': round(string_rate),
+            'rope ops/s': round(rope_rate),
+            'speedup': f'{rope_rate / string_rate:.1f}x',
+            'materialize_ms': round(materialize_ms, 2),
+        })
+
+    print_table(f'Collaborative edit throughput, {args.ops} keystrokes per size', rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""Add pg_trgm GIN indexes for document substring search
+
+Revision ID: a7d3f1c9e2b4
+Revises: e5b9c7f2a8d3
+Create Date: 2026-10-16
+
+Document.search_documents filters title and body with ILIKE '%q%'; trigram
+GIN indexes let PostgreSQL answer that without a sequential scan and back the
+fuzzy (word_similarity) title search. The indexes are built CONCURRENTLY so
+writes continue while they build. PostgreSQL only, and skipped when the server
+does not ship the pg_trgm contrib extension (search then keeps working through
+sequential scans).
+
+"""
+import logging
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7d3f1c9e2b4'
+down_revision = 'e5b9c7f2a8d3'
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger('alembic.runtime.migration')
+
+TRIGRAM_INDEXES = {
+    'idx_documents_title_trgm': 'title',
+    'idx_documents_markdown_content_trgm': 'markdown_content',
+}
+
+
+def upgrade():
+    connection = op.get_bind()
+    if connection.dialect.name != 'postgresql':
+        return
+    available = connection.execute(sa.text(
+        "SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'"
+    )).first()
+    if available is None:
+        logger.warning("pg_trgm is not available on this server; skipping trigram search indexes")
+        return
+
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    with op.get_context().autocommit_block():
+        for name, column in TRIGRAM_INDEXES.items():
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} "
+                       f"ON documents USING gin ({column} gin_trgm_ops)")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    with op.get_context().autocommit_block():
+        for name in TRIGRAM_INDEXES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+    # The extension is left installed: other objects may depend on it
@@ -0,0 +1,45 @@
+"""Add MinHash/LSH duplicate index tables
+
+Revision ID: a7d4e2b9c3f1
+Revises: f3a9c1d2e4b5
+Create Date: 2026-10-16
+
+Existing documents are indexed by POST /api/clustering/duplicate-index/rebuild;
+new writes are indexed as they are saved.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7d4e2b9c3f1'
+down_revision = 'f3a9c1d2e4b5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('document_minhashes',
+        sa.Column('document_id', sa.Integer(), nullable=False),
+        sa.Column('content_hash', sa.String(length=64), nullable=False),
+        sa.Column('signature', sa.JSON(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['document_id'], ['documents.id'], ),
+        sa.PrimaryKeyConstraint('document_id')
+    )
+
+    op.create_table('document_lsh_bands',
+        sa.Column('document_id', sa.Integer(), nullable=False),
+        sa.Column('band', sa.SmallInteger(), nullable=False),
+        sa.Column('bucket', sa.BigInteger(), nullable=False),
+        sa.ForeignKeyConstraint(['document_id'], ['documents.id'], ),
+        sa.PrimaryKeyConstraint('document_id', 'band')
+    )
+    op.create_index('idx_document_lsh_bands_bucket', 'document_lsh_bands', ['band', 'bucket'], unique=False)
+
+
+def downgrade():
+    op.drop_index('idx_document_lsh_bands_bucket', table_name='document_lsh_bands')
+    op.drop_table('document_lsh_bands')
+    op.drop_table('document_minhashes')
@@ -0,0 +1,45 @@
+"""Add denormalized comment, version and rating counters to documents
+
+Revision ID: b3e8d5a1f6c7
+Revises: a7d3f1c9e2b4
+Create Date: 2026-10-16
+
+Existing documents are backfilled from the child tables here; afterwards the
+counters are maintained by app.services.document_counters, and
+`flask repair-document-counters` recomputes them if they ever drift.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3e8d5a1f6c7'
+down_revision = 'a7d3f1c9e2b4'
+branch_labels = None
+depends_on = None
+
+COUNTERS = ('comment_count', 'version_count', 'latest_version_number', 'rating_count', 'rating_sum')
+
+
+def upgrade():
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        for name in COUNTERS:
+            batch_op.add_column(sa.Column(name, sa.Integer(), nullable=False, server_default='0'))
+
+    op.execute("""
+        UPDATE documents SET
+            comment_count = (SELECT count(*) FROM comments c
+                             WHERE c.document_id = documents.id AND c.is_deleted = false),
+            version_count = (SELECT count(*) FROM document_versions v WHERE v.document_id = documents.id),
+            latest_version_number = (SELECT coalesce(max(v.version_number), 0) FROM document_versions v
+                                     WHERE v.document_id = documents.id),
+            rating_count = (SELECT count(*) FROM ratings r WHERE r.document_id = documents.id),
+            rating_sum = (SELECT coalesce(sum(r.rating), 0) FROM ratings r WHERE r.document_id = documents.id)
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        for name in reversed(COUNTERS):
+            batch_op.drop_column(name)
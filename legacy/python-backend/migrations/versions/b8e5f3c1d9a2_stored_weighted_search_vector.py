@@ -0,0 +1,127 @@
+"""Store a weighted tsvector in documents.search_vector
+
+Revision ID: b8e5f3c1d9a2
+Revises: a7d4e2b9c3f1
+Create Date: 2026-10-16
+
+Turns the unused text column into a tsvector (title A, tags B, body C) kept
+current by triggers, backfills existing rows in id batches and replaces the
+to_tsvector() expression index with a GIN index on the column.
+PostgreSQL only; other databases keep the plain text column.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8e5f3c1d9a2'
+down_revision = 'a7d4e2b9c3f1'
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_SIZE = 5000
+
+# Frozen copy of app.models.document.SEARCH_VECTOR_DDL at this revision
+SEARCH_VECTOR_DDL = """
+CREATE OR REPLACE FUNCTION documents_search_vector(doc_id integer, doc_title text, doc_body text)
+RETURNS tsvector AS $$
+    SELECT setweight(to_tsvector('english', coalesce(doc_title, '')), 'A')
+        || setweight(to_tsvector('english', coalesce((
+               SELECT string_agg(t.name, ' ')
+               FROM document_tags dt JOIN tags t ON t.id = dt.tag_id
+               WHERE dt.document_id = doc_id), '')), 'B')
+        || setweight(to_tsvector('english', coalesce(doc_body, '')), 'C')
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION documents_search_vector_trigger() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := documents_search_vector(NEW.id, NEW.title, NEW.markdown_content);
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION document_tags_search_vector_trigger() RETURNS trigger AS $$
+BEGIN
+    UPDATE documents SET search_vector = documents_search_vector(id, title, markdown_content)
+    WHERE id = CASE WHEN TG_OP = 'DELETE' THEN OLD.document_id ELSE NEW.document_id END;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION tags_search_vector_trigger() RETURNS trigger AS $$
+BEGIN
+    UPDATE documents d SET search_vector = documents_search_vector(d.id, d.title, d.markdown_content)
+    FROM document_tags dt
+    WHERE dt.document_id = d.id AND dt.tag_id = NEW.id;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS documents_search_vector_update ON documents;
+CREATE TRIGGER documents_search_vector_update
+    BEFORE INSERT OR UPDATE OF title, markdown_content ON documents
+    FOR EACH ROW EXECUTE FUNCTION documents_search_vector_trigger();
+
+DROP TRIGGER IF EXISTS document_tags_search_vector_update ON document_tags;
+CREATE TRIGGER document_tags_search_vector_update
+    AFTER INSERT OR DELETE ON document_tags
+    FOR EACH ROW EXECUTE FUNCTION document_tags_search_vector_trigger();
+
+DROP TRIGGER IF EXISTS tags_search_vector_update ON tags;
+CREATE TRIGGER tags_search_vector_update
+    AFTER UPDATE OF name ON tags
+    FOR EACH ROW EXECUTE FUNCTION tags_search_vector_trigger();
+"""
+
+
+def index_exists(table_name, index_name):
+    """Check if an index exists on a table."""
+    connection = op.get_bind()
+    inspector = inspect(connection)
+    indexes = inspector.get_indexes(table_name)
+    return any(idx['name'] == index_name for idx in indexes)
+
+
+def upgrade():
+    connection = op.get_bind()
+    if connection.dialect.name != 'postgresql':
+        return
+
+    op.execute("DROP INDEX IF EXISTS idx_documents_search")
+    op.execute("ALTER TABLE documents ALTER COLUMN search_vector TYPE tsvector USING NULL::tsvector")
+    op.execute(SEARCH_VECTOR_DDL)
+
+    # Backfill in id ranges, each committed on its own so no single statement
+    # rewrites (and locks) the whole table
+    max_id = connection.execute(sa.text("SELECT coalesce(max(id), 0) FROM documents")).scalar()
+    with op.get_context().autocommit_block():
+        for start in range(0, max_id, BACKFILL_BATCH_SIZE):
+            connection.execute(sa.text("""
+                UPDATE documents
+                SET search_vector = documents_search_vector(id, title, markdown_content)
+                WHERE id > :start AND id <= :end
+            """), {'start': start, 'end': start + BACKFILL_BATCH_SIZE})
+
+    if not index_exists('documents', 'idx_documents_search_vector'):
+        op.create_index('idx_documents_search_vector', 'documents', ['search_vector'],
+                        unique=False, postgresql_using='gin')
+
+
+def downgrade():
+    connection = op.get_bind()
+    if connection.dialect.name != 'postgresql':
+        return
+
+    if index_exists('documents', 'idx_documents_search_vector'):
+        op.drop_index('idx_documents_search_vector', table_name='documents')
+
+    op.execute("DROP TRIGGER IF EXISTS tags_search_vector_update ON tags")
+    op.execute("DROP TRIGGER IF EXISTS document_tags_search_vector_update ON document_tags")
+    op.execute("DROP TRIGGER IF EXISTS documents_search_vector_update ON documents")
+    op.execute("DROP FUNCTION IF EXISTS tags_search_vector_trigger()")
+    op.execute("DROP FUNCTION IF EXISTS document_tags_search_vector_trigger()")
+    op.execute("DROP FUNCTION IF EXISTS documents_search_vector_trigger()")
+    op.execute("DROP FUNCTION IF EXISTS documents_search_vector(integer, text, text)")
+    op.execute("ALTER TABLE documents ALTER COLUMN search_vector TYPE text USING NULL")
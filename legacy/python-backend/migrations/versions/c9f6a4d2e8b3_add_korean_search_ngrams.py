@@ -0,0 +1,38 @@
+"""Add Korean n-gram search vector to documents
+
+Revision ID: c9f6a4d2e8b3
+Revises: b8e5f3c1d9a2
+Create Date: 2026-10-16
+
+The bigram tokens are produced in Python, so existing documents are filled by
+POST /api/search/korean/index/rebuild after upgrading.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'c9f6a4d2e8b3'
+down_revision = 'b8e5f3c1d9a2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('search_ngrams', sa.Text().with_variant(postgresql.TSVECTOR(), 'postgresql'),
+                                      nullable=True))
+
+    if op.get_bind().dialect.name == 'postgresql':
+        op.create_index('idx_documents_search_ngrams', 'documents', ['search_ngrams'],
+                        unique=False, postgresql_using='gin')
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('idx_documents_search_ngrams', table_name='documents')
+
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        batch_op.drop_column('search_ngrams')
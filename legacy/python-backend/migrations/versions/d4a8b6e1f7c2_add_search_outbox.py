@@ -0,0 +1,40 @@
+"""Add search outbox for background OpenSearch indexing
+
+Revision ID: d4a8b6e1f7c2
+Revises: c9f6a4d2e8b3
+Create Date: 2026-10-16
+
+Rows are written with each document change when SEARCH_OUTBOX_ENABLED is set
+and drained by the background search indexer (SEARCH_INDEXER_ENABLED).
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4a8b6e1f7c2'
+down_revision = 'c9f6a4d2e8b3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('search_outbox',
+        sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), nullable=False),
+        sa.Column('document_id', sa.Integer(), nullable=False),
+        sa.Column('operation', sa.String(length=10), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('available_at', sa.DateTime(), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_search_outbox_available', 'search_outbox', ['available_at', 'id'], unique=False)
+    op.create_index('idx_search_outbox_document_id', 'search_outbox', ['document_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('idx_search_outbox_document_id', table_name='search_outbox')
+    op.drop_index('idx_search_outbox_available', table_name='search_outbox')
+    op.drop_table('search_outbox')
@@ -0,0 +1,36 @@
+"""Add search reindex checkpoints
+
+Revision ID: e5b9c7f2a8d3
+Revises: d4a8b6e1f7c2
+Create Date: 2026-10-16
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b9c7f2a8d3'
+down_revision = 'd4a8b6e1f7c2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('search_reindex_checkpoints',
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('index_name', sa.String(length=255), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('last_document_id', sa.Integer(), nullable=False),
+        sa.Column('documents_indexed', sa.Integer(), nullable=False),
+        sa.Column('documents_failed', sa.Integer(), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.Column('completed_at', sa.DateTime(), nullable=True),
+        sa.Column('report', sa.JSON(), nullable=True),
+        sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('search_reindex_checkpoints')
@@ -0,0 +1,51 @@
+"""Add TF-IDF feature store tables
+
+Revision ID: f3a9c1d2e4b5
+Revises: e82c3fec2746
+Create Date: 2026-10-16
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a9c1d2e4b5'
+down_revision = 'e82c3fec2746'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('tfidf_model_versions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('vocabulary', sa.JSON(), nullable=False),
+        sa.Column('idf', sa.JSON(), nullable=False),
+        sa.Column('params', sa.JSON(), nullable=False),
+        sa.Column('document_count', sa.Integer(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('version')
+    )
+    op.create_index('idx_tfidf_model_versions_active', 'tfidf_model_versions', ['is_active'], unique=False)
+
+    op.create_table('document_feature_vectors',
+        sa.Column('document_id', sa.Integer(), nullable=False),
+        sa.Column('model_version', sa.Integer(), nullable=False),
+        sa.Column('content_hash', sa.String(length=64), nullable=False),
+        sa.Column('indices', sa.JSON(), nullable=False),
+        sa.Column('values', sa.JSON(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['document_id'], ['documents.id'], ),
+        sa.PrimaryKeyConstraint('document_id')
+    )
+    op.create_index('idx_document_feature_vectors_version', 'document_feature_vectors', ['model_version'], unique=False)
+
+
+def downgrade():
+    op.drop_index('idx_document_feature_vectors_version', table_name='document_feature_vectors')
+    op.drop_table('document_feature_vectors')
+    op.drop_index('idx_tfidf_model_versions_active', table_name='tfidf_model_versions')
+    op.drop_table('tfidf_model_versions')
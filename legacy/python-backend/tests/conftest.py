@@ -18,6 +18,7 @@ from app import create_app, db
 from app.models.document import Document
 from app.models.user import User
 from app.models.tag import Tag
+from tests.fake_opensearch import FakeOpenSearch
 
 
 @pytest.fixture(scope='function')
@@ -35,6 +36,51 @@ def app():
         db.drop_all()
 
 
+@pytest.fixture
+def postgres_app(monkeypatch):
+    """App bound to the PostgreSQL database in TEST_POSTGRES_URL; skipped when unset.
+
+    For behaviour SQLite cannot exercise (tsvector, ts_headline, triggers).
+    """
+    url = os.getenv('TEST_POSTGRES_URL')
+    if not url:
+        pytest.skip('TEST_POSTGRES_URL not set')
+    monkeypatch.setenv('DATABASE_URL', url)
+
+    app = create_app()
+    app.config['TESTING'] = True
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def query_counter():
+    """Record SQL statements run on the current app's engine inside `with query_counter() as statements:`."""
+    from contextlib import contextmanager
+    from sqlalchemy import event
+
+    @contextmanager
+    def counter():
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        engine = db.engine
+        event.listen(engine, 'before_cursor_execute', record)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, 'before_cursor_execute', record)
+
+    return counter
+
+
 @pytest.fixture
 def client(app):
     """A test client for the app."""
@@ -101,6 +147,25 @@ def auth_token(app, sample_user):
         return create_access_token(identity=str(sample_user))
 
 
+@pytest.fixture
+def admin_headers(app, sample_user):
+    """Authentication headers for sample_user promoted to admin."""
+    with app.app_context():
+        from flask_jwt_extended import create_access_token
+        user = db.session.get(User, sample_user)
+        user.is_admin = True
+        db.session.commit()
+        return {'Authorization': f'Bearer {create_access_token(identity=str(sample_user))}'}
+
+
+@pytest.fixture
+def fake_opensearch():
+    """A FakeOpenSearch server on a random localhost port, no network needed."""
+    fake = FakeOpenSearch()
+    yield fake
+    fake.close()
+
+
 @pytest.fixture
 def sample_document_data():
     """Sample document data for creating documents."""
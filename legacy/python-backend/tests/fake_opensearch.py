@@ -0,0 +1,362 @@
+"""
+In-process fake OpenSearch HTTP endpoint for tests and benchmarks (no network access).
+"""
+import collections
+import fnmatch
+import functools
+import heapq
+import itertools
+import json
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeOpenSearch:
+    """Minimal OpenSearch HTTP endpoint on localhost.
+
+    Supports info, index create/exists/get/delete, aliases (_alias, _aliases with
+    add/remove/remove_index), _bulk with external versioning, _doc, _mget,
+    _count, _refresh, point-in-time contexts and a match_all-style _search with
+    sort, from/size, search_after and terms/value_count/date_histogram
+    aggregations.
+
+    Documents are kept in `indices[index][id]` and every bulk item is logged in
+    `operations`. Set `unavailable` to answer 503 to everything, `delay` to
+    answer every request that many seconds late, or add ids to `fail_ids` to
+    make their bulk items fail with `fail_status` (500).
+    """
+
+    MAX_RESULT_WINDOW = 10000
+
+    def __init__(self):
+        self.indices = {}
+        self.mappings = {}
+        self.aliases = {}  # alias -> {index: {'is_write_index': bool}}
+        self.versions = {}  # (index, id) -> external version, kept for deletes too
+        self.fail_ids = set()
+        self.fail_status = 500
+        self.operations = []
+        self.unavailable = False
+        self.delay = 0.0
+        self.requests = []
+        self.pits = {}
+        self._pit_ids = itertools.count(1)
+        self.lock = threading.RLock()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keep-alive, so client connection pooling can be observed
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body=None):
+                payload = json.dumps(body if body is not None else {}).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                if self.command != 'HEAD':
+                    self.wfile.write(payload)
+
+            def _handle(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length).decode() if length else ''
+                path = self.path.split('?')[0]
+                fake.requests.append((self.command, path))
+                if fake.delay:
+                    time.sleep(fake.delay)
+                if fake.unavailable:
+                    return self._send(503, {'error': 'unavailable', 'status': 503})
+                with fake.lock:
+                    status, response = fake.route(self.command, [p for p in path.split('/') if p], body)
+                return self._send(status, response)
+
+            do_GET = do_POST = do_PUT = do_DELETE = do_HEAD = _handle
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    # -- name resolution -------------------------------------------------
+
+    def resolve(self, name):
+        """Concrete indices behind an index name, alias or wildcard pattern"""
+        if name in self.aliases:
+            return list(self.aliases[name])
+        if '*' in name:
+            return sorted(index for index in self.indices if fnmatch.fnmatch(index, name))
+        return [name] if name in self.indices else []
+
+    def write_index(self, name):
+        if name not in self.aliases:
+            return name
+        targets = self.aliases[name]
+        writers = [index for index, options in targets.items() if options.get('is_write_index')]
+        if writers:
+            return writers[0]
+        if len(targets) == 1:
+            return next(iter(targets))
+        raise ValueError(f'alias [{name}] has more than one index and no write index')
+
+    def documents(self, name):
+        """Documents readable through `name` (index or alias)"""
+        docs = {}
+        for index in self.resolve(name):
+            docs.update(self.indices[index])
+        return docs
+
+    # -- request routing -------------------------------------------------
+
+    def route(self, method, parts, body):
+        if not parts:
+            return 200, {'version': {'number': '2.11.0', 'distribution': 'opensearch'}}
+        if parts[-1] == '_bulk':
+            return 200, self.bulk(body, parts[0] if len(parts) > 1 else None)
+        if parts[0] == '_aliases':
+            return self.update_aliases(json.loads(body)['actions'])
+        if parts[0] == '_alias':
+            return self.get_alias(parts[1])
+        if parts[0] == '_search':
+            return self.pit_request(method, parts, body)
+
+        name = parts[0]
+        if len(parts) == 1:
+            return self.index_request(method, name, body)
+
+        targets = self.resolve(name)
+        endpoint = parts[1]
+        if endpoint == '_refresh':
+            return 200, {'_shards': {'failed': 0}}
+        if endpoint == '_count':
+            return 200, {'count': len(self.documents(name))}
+        if endpoint == '_search' and parts[2:] == ['point_in_time']:
+            return self.create_pit(targets)
+        if endpoint == '_search' and not targets and '*' not in name:
+            return 404, {'error': {'type': 'index_not_found_exception'}, 'status': 404}
+        if endpoint == '_search':
+            return self.search(((index, doc_id, source) for index in targets
+                                for doc_id, source in self.indices[index].items()), body)
+        if endpoint == '_mget':
+            docs = self.documents(name)
+            return 200, {'docs': [{'_id': str(doc_id), 'found': str(doc_id) in docs,
+                                   '_source': docs.get(str(doc_id))} for doc_id in json.loads(body)['ids']]}
+        if endpoint == '_doc' and len(parts) == 3:
+            docs = self.documents(name)
+            if parts[2] not in docs:
+                return 404, {'found': False}
+            return 200, {'_id': parts[2], 'found': True, '_source': docs[parts[2]]}
+        return 404, {'error': f"unsupported path /{'/'.join(parts)}"}
+
+    # -- search --------------------------------------------------------
+
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def _date_millis(value):
+        try:  # dates sort (and come back in `sort`) as epoch milliseconds, like the real thing
+            parsed = datetime.fromisoformat(value)
+            return int(parsed.replace(tzinfo=parsed.tzinfo or timezone.utc).timestamp() * 1000)
+        except ValueError:
+            return value
+
+    def _sort_value(self, field, source):
+        if field == '_score':
+            return 1.0
+        value = source.get(field)
+        return self._date_millis(value) if isinstance(value, str) else value
+
+    @staticmethod
+    def _sort_key(orders, values):
+        # Missing values sort last in either direction
+        return tuple((1, 0) if value is None else (0, -value if order == 'desc' else value)
+                     for order, value in zip(orders, values))
+
+    def search(self, documents, body):
+        """Sorted search over (index, id, source) triples with from/size or search_after.
+
+        The query itself is ignored (everything matches with score 1.0). Like a shard,
+        from/size keeps a priority queue of from + size hits and refuses to go past
+        max_result_window, while search_after only keeps size hits.
+        """
+        query = json.loads(body) if body else {}
+        start, size = query.get('from', 0), query.get('size', 10)
+        if start + size > self.MAX_RESULT_WINDOW:
+            return 400, {'error': {'type': 'illegal_argument_exception',
+                                   'reason': f'Result window is too large, from + size must be less than or '
+                                             f'equal to: [{self.MAX_RESULT_WINDOW}]'}, 'status': 400}
+        sort = [next(iter(spec.items())) if isinstance(spec, dict) else (spec, {}) for spec in query.get('sort', [])]
+        fields = [field for field, _ in sort]
+        orders = [options.get('order', 'asc') if isinstance(options, dict) else options for _, options in sort]
+
+        total = 0
+        candidates = []
+        after = self._sort_key(orders, query['search_after']) if 'search_after' in query else None
+        for index, doc_id, source in documents:
+            total += 1
+            values = [self._sort_value(field, source) for field in fields]
+            key = self._sort_key(orders, values)
+            if after is None or key > after:
+                candidates.append((key, index, doc_id, source, values))
+        top = heapq.nsmallest(start + size, candidates, key=lambda candidate: candidate[0])[start:]
+        response = {'took': 1, 'hits': {
+            'total': {'value': total, 'relation': 'eq'},
+            'hits': [{'_index': index, '_id': doc_id, '_score': 1.0, '_source': dict(source), 'sort': values}
+                     for _, index, doc_id, source, values in top]}}
+        if 'aggs' in query:
+            response['aggregations'] = self.aggregate(query['aggs'], [source for _, _, _, source, _ in candidates])
+        return 200, response
+
+    def aggregate(self, aggs, sources):
+        """terms (with include and size), value_count and monthly date_histogram aggregations"""
+        results = {}
+        for name, spec in aggs.items():
+            kind, options = next(iter(spec.items()))
+            field = options['field'].removesuffix('.keyword')
+            values = [source.get(field) for source in sources]
+            if kind == 'value_count':
+                results[name] = {'value': sum(value is not None for value in values)}
+            elif kind == 'terms':
+                include = re.compile(options['include']) if 'include' in options else None
+                counts = collections.Counter(term for value in values if value is not None
+                                             for term in (value if isinstance(value, list) else [value])
+                                             if include is None or include.fullmatch(str(term)))
+                buckets = sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+                size = options.get('size', 10)
+                results[name] = {'sum_other_doc_count': sum(count for _, count in buckets[size:]),
+                                 'buckets': [{'key': key, 'doc_count': count} for key, count in buckets[:size]]}
+            elif kind == 'date_histogram':
+                months = collections.Counter(value[:7] for value in values if isinstance(value, str))
+                results[name] = {'buckets': [
+                    {'key_as_string': f'{month}-01T00:00:00.000Z', 'key': self._date_millis(f'{month}-01'),
+                     'doc_count': count} for month, count in sorted(months.items())]}
+        return results
+
+    def create_pit(self, targets):
+        pit_id = f'pit-{next(self._pit_ids)}'
+        # Snapshot: later writes to the index are not visible through the PIT
+        self.pits[pit_id] = [(index, doc_id, source) for index in targets
+                             for doc_id, source in self.indices[index].items()]
+        return 200, {'pit_id': pit_id, 'creation_time': 0}
+
+    def pit_request(self, method, parts, body):
+        if method == 'DELETE':
+            pit_ids = json.loads(body).get('pit_id', [])
+            return 200, {'pits': [{'pit_id': pit_id, 'successful': self.pits.pop(pit_id, None) is not None}
+                                  for pit_id in pit_ids]}
+        pit_id = (json.loads(body).get('pit') or {}).get('id') if body else None
+        if pit_id not in self.pits:
+            return 404, {'error': {'type': 'search_context_missing_exception',
+                                   'reason': f'No search context found for id [{pit_id}]'}, 'status': 404}
+        return self.search(iter(self.pits[pit_id]), body)
+
+    def index_request(self, method, name, body):
+        if method == 'PUT':
+            if name in self.indices or name in self.aliases:
+                return 400, {'error': {'type': 'resource_already_exists_exception'}, 'status': 400}
+            self.indices[name] = {}
+            settings = json.loads(body) if body else {}
+            self.mappings[name] = settings
+            for alias, options in settings.get('aliases', {}).items():
+                self.aliases.setdefault(alias, {})[name] = dict(options)
+            return 200, {'acknowledged': True, 'index': name}
+        targets = self.resolve(name)
+        if method == 'DELETE':
+            if not targets:
+                return 404, {'error': {'type': 'index_not_found_exception'}, 'status': 404}
+            for index in targets:
+                self._drop_index(index)
+            return 200, {'acknowledged': True}
+        if not targets:
+            # Like the real cluster, a wildcard that matches nothing is an empty result
+            return (200, {}) if '*' in name else (404, {'error': {'type': 'index_not_found_exception'}, 'status': 404})
+        return 200, {index: {**self.mappings.get(index, {}),
+                             'aliases': {alias: options[index] for alias, options in self.aliases.items()
+                                         if index in options}} for index in targets}
+
+    def _drop_index(self, index):
+        self.indices.pop(index, None)
+        self.mappings.pop(index, None)
+        for alias in list(self.aliases):
+            self.aliases[alias].pop(index, None)
+            if not self.aliases[alias]:
+                del self.aliases[alias]
+
+    def get_alias(self, name):
+        if name not in self.aliases:
+            return 404, {'error': f'alias [{name}] missing', 'status': 404}
+        return 200, {index: {'aliases': {name: options}} for index, options in self.aliases[name].items()}
+
+    def update_aliases(self, actions):
+        """Apply all actions or none, like the real endpoint"""
+        aliases = {alias: {index: dict(options) for index, options in targets.items()}
+                   for alias, targets in self.aliases.items()}
+        removed = [spec['index'] for action in actions for op, spec in action.items() if op == 'remove_index']
+        for action in actions:
+            op, spec = next(iter(action.items()))
+            if op == 'remove_index':
+                if spec['index'] not in self.indices:
+                    return 404, {'error': {'type': 'index_not_found_exception'}, 'status': 404}
+            elif op == 'add':
+                if spec['index'] not in self.indices or spec['alias'] in self.indices and spec['alias'] not in removed:
+                    return 400, {'error': {'type': 'invalid_alias_name_exception'}, 'status': 400}
+                options = {'is_write_index': spec['is_write_index']} if 'is_write_index' in spec else {}
+                aliases.setdefault(spec['alias'], {})[spec['index']] = options
+            elif op == 'remove':
+                if spec['index'] not in aliases.get(spec['alias'], {}):
+                    return 404, {'error': {'type': 'aliases_not_found_exception'}, 'status': 404}
+                del aliases[spec['alias']][spec['index']]
+                if not aliases[spec['alias']]:
+                    del aliases[spec['alias']]
+        self.aliases = aliases
+        for index in removed:
+            self._drop_index(index)
+        return 200, {'acknowledged': True}
+
+    def bulk(self, body, default_index=None):
+        lines = [json.loads(line) for line in body.splitlines() if line.strip()]
+        items = []
+        i = 0
+        with self.lock:
+            while i < len(lines):
+                op_type, meta = next(iter(lines[i].items()))
+                i += 1
+                source = None
+                if op_type in ('index', 'create', 'update'):
+                    source = lines[i]
+                    i += 1
+                index_name = self.write_index(meta.get('_index', default_index))
+                doc_id = str(meta['_id'])
+                index = self.indices.setdefault(index_name, {})
+                self.operations.append((op_type, doc_id))
+                result = {'_index': index_name, '_id': doc_id}
+                version = meta.get('version')
+                current = self.versions.get((index_name, doc_id))
+                if doc_id in self.fail_ids:
+                    result.update(status=self.fail_status, error={'type': 'fake_failure', 'reason': 'injected'})
+                elif version is not None and current is not None and version < current:
+                    result.update(status=409, error={'type': 'version_conflict_engine_exception'})
+                elif op_type == 'delete':
+                    found = index.pop(doc_id, None) is not None
+                    result.update(status=200 if found else 404, result='deleted' if found else 'not_found')
+                else:
+                    created = doc_id not in index
+                    index[doc_id] = source
+                    result.update(status=201 if created else 200, result='created' if created else 'updated')
+                if version is not None and (result['status'] < 300 or result['status'] == 404):
+                    self.versions[(index_name, doc_id)] = version
+                items.append({op_type: result})
+        return {'took': 1, 'errors': any(not 200 <= next(iter(item.values()))['status'] < 300 for item in items),
+                'items': items}
+
+    def service(self, **kwargs):
+        from app.services.opensearch_service import OpenSearchService
+        return OpenSearchService(host='127.0.0.1', port=self.port, **kwargs)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,104 @@
+"""
+Tests for the single-pass /clustering/batch-similarity endpoint.
+"""
+import json
+import numpy as np
+import pytest
+from app import db
+from app.models.document import Document
+from app.services.document_clustering_service import document_clustering_service, DocumentClusteringService
+from app.services.tfidf_feature_store import tfidf_feature_store
+
+
+CONTENTS = [
+    'python programming language tutorial with functions and classes',
+    'python programming guide covering functions, classes and modules',
+    'cooking pasta recipe with tomato sauce and garlic',
+    'baking bread recipe with flour yeast and water',
+]
+
+
+@pytest.fixture(autouse=True)
+def fresh_store():
+    tfidf_feature_store.invalidate()
+    yield
+    tfidf_feature_store.invalidate()
+
+
+@pytest.fixture
+def document_ids(app):
+    documents = [Document(title=f'Doc {i}', markdown_content=content, is_public=True)
+                 for i, content in enumerate(CONTENTS)]
+    db.session.add_all(documents)
+    db.session.commit()
+    return [doc.id for doc in documents]
+
+
+@pytest.fixture
+def no_pairwise_refits(monkeypatch):
+    """The matrix must come from one vectorization, never per-pair similarity calls."""
+    def fail(*args, **kwargs):
+        raise AssertionError('find_similar_documents called while building the matrix')
+    monkeypatch.setattr(document_clustering_service, 'find_similar_documents', fail)
+
+
+def test_dense_matrix(client, document_ids, no_pairwise_refits):
+    response = client.post('/api/clustering/batch-similarity', json={'document_ids': document_ids})
+
+    assert response.status_code == 200
+    result = response.get_json()['batch_similarity']
+    matrix = result['similarity_matrix']
+    assert len(matrix) == len(CONTENTS)
+    assert all(len(row) == len(CONTENTS) for row in matrix)
+    assert matrix[0][0]['is_self'] is True
+
+    scores = np.array([[cell['similarity_score'] for cell in row] for row in matrix])
+    assert np.allclose(scores, scores.T)
+    assert scores[0][1] > scores[0][2]
+
+
+def test_top_k_output(client, document_ids, no_pairwise_refits):
+    response = client.post('/api/clustering/batch-similarity', json={
+        'document_ids': document_ids, 'output': 'top_k', 'top_k': 1, 'threshold': 0.0
+    })
+
+    assert response.status_code == 200
+    rows = response.get_json()['batch_similarity']['similarity_matrix']
+    assert [row['document_id'] for row in rows] == document_ids
+    assert all(len(row['neighbors']) == 1 for row in rows)
+    assert rows[0]['neighbors'][0]['document_id'] == document_ids[1]
+
+
+def test_streamed_rows(client, document_ids, no_pairwise_refits):
+    response = client.post('/api/clustering/batch-similarity', json={
+        'document_ids': document_ids, 'output': 'top_k', 'stream': True
+    })
+
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert lines[0]['type'] == 'header'
+    assert lines[-1]['type'] == 'end'
+    rows = [row for line in lines if line['type'] == 'rows' for row in line['rows']]
+    assert len(rows) == len(CONTENTS)
+
+
+def test_invalid_output_mode(client, document_ids):
+    response = client.post('/api/clustering/batch-similarity', json={
+        'document_ids': document_ids, 'output': 'matrix'
+    })
+
+    assert response.status_code == 400
+
+
+def test_blocks_cover_the_full_matrix(app, document_ids):
+    from sklearn.metrics.pairwise import cosine_similarity
+
+    documents = Document.query.filter(Document.id.in_(document_ids)).order_by(Document.id).all()
+    service = DocumentClusteringService(use_feature_store=False)
+
+    blocks = list(service.pairwise_similarity_blocks(documents, block_size=3))
+    tfidf_matrix, _, _ = service._vectorize_documents(documents)
+
+    assert [offset for offset, _ in blocks] == [0, 3]
+    assert np.allclose(np.vstack([block for _, block in blocks]), cosine_similarity(tfidf_matrix))
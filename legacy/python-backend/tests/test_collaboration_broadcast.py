@@ -0,0 +1,136 @@
+"""
+Tests for frame-based collaboration broadcasts: typing runs are merged, only
+the latest cursor per socket is sent, and frames still apply cleanly on top
+of a client's joined snapshot.
+"""
+import pytest
+from flask_jwt_extended import create_access_token
+
+from app import db, socketio
+from app.models.document import Document
+from app.models.user import User
+from app.services import collaboration_service as collaboration
+from app.services.collaboration_broadcast import BroadcastScheduler
+
+
+class RecordingSocketIO:
+    def __init__(self):
+        self.emitted = []
+
+    def emit(self, event, data, room=None, namespace=None, skip_sid=None):
+        self.emitted.append((event, data, room, skip_sid))
+
+
+def insert(position, text):
+    return [{'type': 'insert', 'position': position, 'text': text}]
+
+
+def delete(position, length):
+    return [{'type': 'delete', 'position': position, 'length': length}]
+
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    scheduler = BroadcastScheduler(RecordingSocketIO(), frame_interval=0.05)
+    # Frames are flushed by hand instead of by the background task
+    monkeypatch.setattr(scheduler, '_schedule', lambda room: None)
+    return scheduler
+
+
+def test_typing_and_backspacing_runs_are_merged(scheduler):
+    for revision, char in enumerate('hello', start=1):
+        scheduler.queue_operation('room', 'sid-a', 'a', 1, revision, insert(10 + revision - 1, char))
+    scheduler.queue_operation('room', 'sid-a', 'a', 1, 6, delete(14, 1))
+    scheduler.queue_operation('room', 'sid-a', 'a', 1, 7, delete(13, 1))
+    scheduler.flush()
+
+    [(event, frame, room, skip_sid)] = scheduler.socketio.emitted
+    assert (event, room, skip_sid) == ('collaboration_frame', 'room', 'sid-a')
+    assert [(entry['base_revision'], entry['revision'], entry['operations']) for entry in frame['operations']] == [
+        (0, 5, insert(10, 'hello')),
+        (5, 7, delete(13, 2)),
+    ]
+
+
+def test_other_users_and_jumps_break_a_run(scheduler):
+    scheduler.queue_operation('room', 'sid-a', 'a', 1, 1, insert(0, 'x'))
+    scheduler.queue_operation('room', 'sid-b', 'b', 2, 2, insert(1, 'y'))
+    scheduler.queue_operation('room', 'sid-a', 'a', 1, 3, insert(2, 'z'))
+    scheduler.queue_operation('room', 'sid-a', 'a', 1, 4, insert(0, 'w'))
+    scheduler.flush()
+
+    [(_, frame, _, skip_sid)] = scheduler.socketio.emitted
+    assert [entry['revision'] for entry in frame['operations']] == [1, 2, 3, 4]
+    # Both sockets have entries in the frame, so neither is skipped
+    assert skip_sid is None
+
+
+def test_only_the_latest_cursor_per_socket_is_sent(scheduler):
+    cursors = [{'user_id': 1, 'username': 'a', 'position': position, 'selection_start': None,
+                'selection_end': None} for position in range(5)]
+    for cursor in cursors:
+        scheduler.queue_cursor('room', 'sid-a', 'a', cursor)
+    scheduler.queue_cursor('room', 'sid-b', 'b', {'user_id': 2, 'username': 'b', 'position': 7,
+                                                  'selection_start': 7, 'selection_end': 9})
+    # Operations shift stored cursors in place before the frame goes out
+    cursors[-1]['position'] = 40
+    scheduler.flush()
+    scheduler.flush()
+
+    [(_, frame, _, _)] = scheduler.socketio.emitted
+    assert frame['operations'] == []
+    assert [(cursor['origin'], cursor['cursor_data']['position']) for cursor in frame['cursors']] == \
+        [('a', 40), ('b', 7)]
+
+
+def test_frames_apply_on_top_of_joined_snapshot(app, sample_user, monkeypatch):
+    service = collaboration.get_collaboration_service()
+    service.OPERATION_RATE_LIMIT = 10_000
+    service.CURSOR_UPDATE_THROTTLE_MS = 0
+    monkeypatch.setattr(service.broadcasts, '_schedule', lambda room: None)
+
+    reader = User(username='reader', email='reader@example.com', password='TestPassword123!')
+    db.session.add(reader)
+    document = Document(title='Shared', markdown_content='hello', user_id=sample_user, is_public=True)
+    db.session.add(document)
+    db.session.commit()
+
+    writer_socket = socketio.test_client(app, headers={
+        'Authorization': f'Bearer {create_access_token(identity=str(sample_user))}'})
+    reader_socket = socketio.test_client(app, headers={
+        'Authorization': f'Bearer {create_access_token(identity=str(reader.id))}'})
+    try:
+        writer_socket.emit('join_document', {'document_id': document.id})
+        reader_socket.emit('join_document', {'document_id': document.id})
+        joined = reader_socket.get_received()[0]['args'][0]
+        writer_socket.get_received()
+
+        for offset, char in enumerate(' world'):
+            writer_socket.emit('text_operation', {
+                'document_id': document.id,
+                'operation': {'type': 'insert', 'position': 5 + offset, 'text': char},
+                'revision': offset
+            })
+            writer_socket.emit('cursor_update', {'document_id': document.id,
+                                                 'cursor_data': {'position': 6 + offset}})
+        assert reader_socket.get_received() == []
+        service.broadcasts.flush()
+
+        [message] = reader_socket.get_received()
+        assert message['name'] == 'collaboration_frame'
+        frame = message['args'][0]
+        [entry] = frame['operations']
+        assert (entry['base_revision'], entry['revision']) == (joined['revision'], 6)
+        assert entry['operations'] == insert(5, ' world')
+        [cursor] = frame['cursors']
+        assert cursor['cursor_data']['position'] == 11
+
+        content = joined['content']
+        for step in entry['operations']:
+            content = content[:step['position']] + step['text'] + content[step['position']:]
+        assert content == service.active_sessions[str(document.id)]['buffer'].text == 'hello world'
+        # The writer was the only sender in this frame, so it gets its acks and no echo
+        assert [m['name'] for m in writer_socket.get_received()] == ['operation_ack'] * 6
+    finally:
+        writer_socket.disconnect()
+        reader_socket.disconnect()
@@ -0,0 +1,113 @@
+"""
+Tests for the per-socket identity and permission cache in collaborative
+editing: a typing editor costs no database queries or JWT verifications per
+operation, and access changes still take effect on the next operation.
+"""
+import pytest
+
+from app import db, socketio
+from app.models.document import Document
+from app.models.user import User
+from app.routes import websocket_events
+from app.services import collaboration_service as collaboration
+
+
+@pytest.fixture
+def shared_document(app, sample_user):
+    document = Document(title='Shared', markdown_content='hello', user_id=sample_user)
+    db.session.add(document)
+    db.session.commit()
+    return document.id
+
+
+@pytest.fixture
+def editor(app, auth_headers, shared_document):
+    """A socket joined to the shared document, with rate limiting out of the way"""
+    service = collaboration.get_collaboration_service()
+    service.OPERATION_RATE_LIMIT = 10_000
+    socket = socketio.test_client(app, headers=auth_headers)
+    socket.emit('join_document', {'document_id': shared_document})
+    assert socket.get_received()[0]['name'] == 'document_joined'
+    yield socket
+    socket.disconnect()
+
+
+def type_text(socket, document_id, text, revision):
+    for offset, char in enumerate(text):
+        socket.emit('text_operation', {
+            'document_id': document_id,
+            'operation': {'type': 'insert', 'position': revision + offset, 'text': char},
+            'revision': revision + offset
+        })
+    # Broadcast frames go to the whole room; only the replies to this socket matter here
+    return [message['name'] for message in socket.get_received() if message['name'] != 'collaboration_frame']
+
+
+def test_typing_runs_no_queries_per_operation(editor, shared_document, query_counter, monkeypatch):
+    verifications = []
+    verify = websocket_events.verify_jwt_in_request
+    monkeypatch.setattr(websocket_events, 'verify_jwt_in_request', lambda: verifications.append(1) or verify())
+
+    with query_counter() as statements:
+        received = type_text(editor, shared_document, 'x' * 50, 0)
+
+    assert received == ['operation_ack'] * 50
+    assert statements == []
+    assert verifications == []
+    session = collaboration.get_collaboration_service().active_sessions[str(shared_document)]
+    assert session['buffer'].text == 'x' * 50 + 'hello'
+
+
+def test_ownership_change_takes_effect_on_next_operation(editor, shared_document, query_counter):
+    other = User(username='newowner', email='newowner@example.com', password='TestPassword123!')
+    db.session.add(other)
+    db.session.flush()
+    db.session.get(Document, shared_document).user_id = other.id
+    db.session.commit()
+
+    with query_counter() as statements:
+        received = type_text(editor, shared_document, 'xy', 0)
+
+    # Each denied batch is followed by a resync so the client drops its unacknowledged edits
+    assert received == ['error', 'document_resync'] * 2
+    # One lookup re-resolves the permission; the second operation uses the cached denial
+    assert len(statements) == 1
+
+
+def test_unrelated_document_writes_keep_the_cache(editor, shared_document, query_counter):
+    db.session.get(Document, shared_document).title = 'Renamed'
+    db.session.commit()
+
+    with query_counter() as statements:
+        assert type_text(editor, shared_document, 'x', 0) == ['operation_ack']
+    assert statements == []
+
+
+def test_permission_cache_expires(editor, shared_document, query_counter, monkeypatch):
+    monkeypatch.setattr(collaboration.get_collaboration_service(), 'ACCESS_CACHE_TTL', 0)
+
+    with query_counter() as statements:
+        assert type_text(editor, shared_document, 'xyz', 0) == ['operation_ack'] * 3
+    assert len(statements) == 3
+
+
+def test_logout_revokes_cached_identity(app, editor, shared_document, auth_headers, client):
+    assert client.post('/api/auth/logout', headers=auth_headers).status_code == 200
+
+    assert type_text(editor, shared_document, 'x', 0) == ['error']
+
+
+def test_rate_limit_is_a_token_bucket(app, monkeypatch):
+    service = collaboration.CollaborationService(socketio=None)
+    service.OPERATION_RATE_LIMIT = 60
+    now = [1000.0]
+    monkeypatch.setattr(collaboration.time, 'monotonic', lambda: now[0])
+
+    assert all(service._check_rate_limit(1) for _ in range(60))
+    assert not service._check_rate_limit(1)
+    assert service._check_rate_limit(2)
+    now[0] += 1  # one token per second at 60 per minute
+    assert service._check_rate_limit(1)
+    assert not service._check_rate_limit(1)
+    now[0] += 3600
+    assert sum(service._check_rate_limit(1) for _ in range(100)) == 60
@@ -0,0 +1,183 @@
+"""
+Tests for the shared collaboration state backends and for sharding documents
+across workers: both backends behave the same, commands for a document reach
+its owner in order, and a new owner picks up where the last one stopped. The
+Redis backend runs against an in-process fakeredis server.
+"""
+import fakeredis
+import pytest
+
+from app import db
+from app.models.document import Document
+from app.services.collaboration_service import CollaborationService
+from app.services.collaboration_state import InMemoryStateBackend, RedisStateBackend, shard_for
+
+
+class RecordingSocketIO:
+    """Stands in for the Socket.IO server of one worker"""
+
+    def __init__(self):
+        self.emitted = []
+        self.server = self
+
+    def emit(self, event, data, to=None, room=None, namespace=None, skip_sid=None):
+        self.emitted.append((event, data, to or room))
+
+    def enter_room(self, sid, room, namespace=None):
+        pass
+
+    def leave_room(self, sid, room, namespace=None):
+        pass
+
+    def received(self, sid, event):
+        return [data for name, data, to in self.emitted if name == event and to == sid]
+
+
+@pytest.fixture(params=['memory', 'redis'])
+def state(request):
+    if request.param == 'memory':
+        return InMemoryStateBackend(history_size=3)
+    return RedisStateBackend(fakeredis.FakeRedis(decode_responses=True), history_size=3)
+
+
+def test_log_appends_only_at_the_expected_revision(state):
+    assert state.open_session('1', 'abc')
+    assert not state.open_session('1', 'ignored')
+    assert state.snapshot('1') == ('abc', 0)
+
+    for revision in range(5):
+        assert state.append_operation('1', revision, {'revision': revision + 1})
+    assert not state.append_operation('1', 3, {'revision': 4})
+
+    assert state.revision('1') == 5
+    assert state.operations_since('1', 5) == []
+    assert [entry['revision'] for entry in state.operations_since('1', 2)] == [3, 4, 5]
+    # Trimmed to the last three entries
+    assert state.operations_since('1', 1) is None
+
+    state.store_snapshot('1', 'abcde', 5, saved_at='2026-01-01T00:00:00+00:00')
+    assert state.snapshot('1') == ('abcde', 5)
+    assert state.session('1') == {'revision': 5, 'last_save': '2026-01-01T00:00:00+00:00'}
+
+
+def test_presence_connections_and_commands(state):
+    state.open_session('1', '')
+    state.add_member('1', 'sid-a', {'user_id': 1, 'username': 'a'})
+    state.add_member('1', 'sid-b', {'user_id': 2, 'username': 'b'})
+    assert state.members('1') == {'sid-a': {'user_id': 1, 'username': 'a'}, 'sid-b': {'user_id': 2, 'username': 'b'}}
+    assert state.remove_member('1', 'sid-a') == 1
+
+    assert state.adjust_connections(1, 1) == 1
+    assert state.adjust_connections(1, 1) == 2
+    assert state.adjust_connections(1, -2) == 0
+    assert state.connection_count(1) == 0
+
+    state.push_command(1, {'kind': 'leave', 'sid': 'x'})
+    state.push_command(1, {'kind': 'leave', 'sid': 'y'})
+    assert state.pop_command(0) is None
+    assert [state.pop_command(1)['sid'], state.pop_command(1)['sid'], state.pop_command(1)] == ['x', 'y', None]
+
+    assert state.session_count() == 1
+    state.close_session('1')
+    assert state.session('1') is None and state.members('1') == {} and state.session_count() == 0
+
+
+@pytest.fixture
+def workers(app):
+    """Two workers sharing one fake Redis server"""
+    server = fakeredis.FakeServer()
+    return [
+        CollaborationService(RecordingSocketIO(),
+                             state=RedisStateBackend(fakeredis.FakeRedis(server=server, decode_responses=True)),
+                             worker_index=index, worker_count=2)
+        for index in range(2)
+    ]
+
+
+@pytest.fixture
+def shared_document(app, sample_user):
+    document = Document(title='Shared', markdown_content='hello', user_id=sample_user)
+    db.session.add(document)
+    db.session.commit()
+    return str(document.id)
+
+
+def type_text(worker, sid, document_id, user_id, text, position):
+    for offset, char in enumerate(text):
+        worker.handle_text_operation(document_id, [{'type': 'insert', 'position': position + offset, 'text': char}],
+                                     user_id, sid)
+
+
+def test_commands_are_forwarded_to_the_owning_worker(workers, shared_document, sample_user):
+    owner = workers[shard_for(shared_document, 2)]
+    other = workers[1 - shard_for(shared_document, 2)]
+    assert owner.owns(shared_document) and not other.owns(shared_document)
+
+    other.join_document_session(shared_document, sample_user, 'remote', verified_user_id=sample_user)
+    owner.join_document_session(shared_document, sample_user, 'local', verified_user_id=sample_user)
+    type_text(other, 'remote', shared_document, sample_user, 'abc', 0)
+    type_text(owner, 'local', shared_document, sample_user, '!', 5)
+    type_text(other, 'remote', shared_document, sample_user, 'd', 3)
+
+    # The owner ran its own socket's commands inline; the other worker only forwarded
+    assert other.active_sessions == {}
+    session = owner.active_sessions[shared_document]
+    assert session['buffer'].text == 'hello!'
+    assert owner.process_commands() == 5
+    assert owner.process_commands() == 0
+
+    # Forwarded commands keep their order: the remote join is followed by abc, then d
+    assert session['buffer'].text == 'abcdhello!'
+    assert session['revision'] == owner.state.revision(shared_document) == 5
+    assert owner.socketio.received('remote', 'document_joined')[0]['content'] == 'hello!'
+    assert [ack['revision'] for ack in owner.socketio.received('remote', 'operation_ack')] == [2, 3, 4, 5]
+
+    # Presence is shared: any worker can report who is in the session
+    info = other.get_session_info(shared_document, requesting_user_id=sample_user)
+    assert info['revision'] == 5
+    assert len(info['active_users']) == 2
+
+    other.handle_disconnect('remote')
+    owner.process_commands()
+    assert list(session['users']) == ['local']
+    assert list(owner.state.members(shared_document)) == ['local']
+
+
+def test_new_owner_resumes_from_shared_state(app, shared_document, sample_user):
+    server = fakeredis.FakeServer()
+
+    def start_worker():
+        return CollaborationService(RecordingSocketIO(), state=RedisStateBackend(
+            fakeredis.FakeRedis(server=server, decode_responses=True), history_size=8))
+
+    first = start_worker()
+    first.SNAPSHOT_INTERVAL = 4
+    first.join_document_session(shared_document, sample_user, 'sid', verified_user_id=sample_user)
+    type_text(first, 'sid', shared_document, sample_user, 'abcdef', 0)
+
+    # The worker restarts; its replacement knows only the socket's membership, not the session
+    second = start_worker()
+    second.socket_documents['sid'] = {shared_document}
+    type_text(second, 'sid', shared_document, sample_user, 'g', 6)
+
+    session = second.active_sessions[shared_document]
+    assert session['buffer'].text == 'abcdefghello'
+    assert session['revision'] == 7
+    assert [entry['revision'] for entry in second.operation_queue[shared_document]] == [5, 6, 7]
+    assert second.socketio.received('sid', 'operation_ack') == [{'revision': 7}]
+
+
+def test_stale_owner_rebases_after_losing_the_race(app, shared_document, sample_user):
+    state = InMemoryStateBackend()
+    first, second = CollaborationService(RecordingSocketIO(), state=state), \
+        CollaborationService(RecordingSocketIO(), state=state)
+    first._load_session(shared_document, 'hello')
+    second._load_session(shared_document, 'hello')
+
+    assert first._commit_operation(shared_document, [{'type': 'insert', 'position': 0, 'text': 'ab'}], 0, 1) == \
+        (1, [{'type': 'insert', 'position': 0, 'text': 'ab'}])
+    # second still holds revision 0: its append is refused, so it catches up and rebases over revision 1
+    assert second._commit_operation(shared_document, [{'type': 'insert', 'position': 5, 'text': '!'}], 0, 2) == \
+        (2, [{'type': 'insert', 'position': 7, 'text': '!'}])
+    assert second.active_sessions[shared_document]['buffer'].text == 'abhello!'
+    assert state.revision(shared_document) == 2
@@ -0,0 +1,82 @@
+"""
+Tests for Document.to_dict_batch: page serialization with a fixed number of
+queries instead of a set of stat queries per document.
+"""
+import pytest
+
+from app import db
+from app.models.category import Category
+from app.models.comment import Comment, Rating
+from app.models.document import Document
+from app.models.user import User
+
+
+@pytest.fixture
+def populated_documents(app):
+    """30 documents with an owner, a category, comments, ratings and versions on some of them"""
+    owner = User(username='owner', email='owner@example.com', password='TestPassword123!')
+    raters = [User(username=f'rater{i}', email=f'rater{i}@example.com', password='TestPassword123!')
+              for i in range(3)]
+    category = Category(name='Notes')
+    db.session.add_all([owner, category, *raters])
+    db.session.flush()
+
+    documents = []
+    for i in range(30):
+        doc = Document(title=f'Doc {i}', markdown_content=f'body {i}', user_id=owner.id if i % 2 else None)
+        doc.category_id = category.id if i % 3 else None
+        doc.add_tags([f'tag{i % 4}'])
+        documents.append(doc)
+    db.session.add_all(documents)
+    db.session.flush()
+
+    for i, doc in enumerate(documents):
+        for n in range(i % 3):
+            db.session.add(Comment(f'comment {n}', doc.id, owner.id))
+        if i % 5 == 0:
+            deleted = Comment('deleted', doc.id, owner.id)
+            deleted.is_deleted = True
+            db.session.add(deleted)
+        for rater in raters[:i % 4]:
+            db.session.add(Rating(doc.id, rater.id, 1 + (i + rater.id) % 5))
+        for _ in range(i % 3):
+            doc.create_version()
+            db.session.flush()
+    db.session.commit()
+    return [doc.id for doc in documents]
+
+
+def load(ids):
+    db.session.expire_all()
+    return Document.query.filter(Document.id.in_(ids)).order_by(Document.id).all()
+
+
+def test_batch_matches_per_document_serialization(populated_documents):
+    expected = [doc.to_dict() for doc in load(populated_documents)]
+
+    assert Document.to_dict_batch(load(populated_documents)) == expected
+    assert Document.to_dict_batch([]) == []
+
+
+def test_statement_count_does_not_grow_with_page_size(populated_documents, query_counter):
+    counts = []
+    for size in (5, 30):
+        documents = load(populated_documents[:size])
+        with query_counter() as statements:
+            Document.to_dict_batch(documents)
+        counts.append(len(statements))
+
+    # owners and categories; stats come from the document counters
+    assert counts == [2, 2]
+
+
+def test_timeline_page_runs_constant_statements(client, populated_documents, query_counter):
+    year = db.session.get(Document, populated_documents[0]).created_at.year
+    counts = []
+    for per_page in (5, 25):
+        with query_counter() as statements:
+            response = client.get(f'/api/documents/by-date?date_key={year}&per_page={per_page}')
+        assert len(response.get_json()['documents']) == per_page
+        counts.append(len(statements))
+
+    assert counts[0] == counts[1]
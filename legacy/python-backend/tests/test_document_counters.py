@@ -0,0 +1,141 @@
+"""
+Tests for the denormalized comment, version and rating counters on documents.
+"""
+import threading
+
+import pytest
+
+from app import db
+from app.models.comment import Comment, Rating
+from app.models.document import Document
+from app.models.user import User
+from app.services import document_counters
+
+
+@pytest.fixture
+def document_and_users(app):
+    users = [User(username=f'user{i}', email=f'user{i}@example.com', password='TestPassword123!') for i in range(3)]
+    document = Document(title='Counted', markdown_content='body')
+    db.session.add_all([document, *users])
+    db.session.commit()
+    return document, users
+
+
+def counters(document):
+    return {name: getattr(document, name) for name in document_counters.COUNTER_COLUMNS}
+
+
+def test_comment_counter_follows_inserts_soft_and_hard_deletes(document_and_users):
+    document, (user, *_) = document_and_users
+    comments = [Comment(f'comment {i}', document.id, user.id) for i in range(3)]
+    db.session.add_all(comments)
+    db.session.flush()
+    # Fresh within the transaction, before commit
+    assert document.comment_count == 3
+
+    comments[0].is_deleted = True
+    db.session.commit()
+    assert document.comment_count == 2
+
+    db.session.delete(comments[0])  # already soft-deleted: no change
+    db.session.delete(comments[1])
+    db.session.commit()
+    assert document.get_comment_count() == 1
+
+
+def test_rating_counters_follow_inserts_updates_and_deletes(document_and_users):
+    document, users = document_and_users
+    ratings = [Rating(document.id, user.id, value) for user, value in zip(users, (5, 4, 1))]
+    db.session.add_all(ratings)
+    db.session.commit()
+    assert (document.rating_count, document.rating_sum) == (3, 10)
+
+    ratings[2].rating = 3
+    db.session.commit()
+    assert document.get_rating_stats() == {'average_rating': 4.0, 'total_ratings': 3}
+
+    db.session.delete(ratings[0])
+    db.session.commit()
+    assert (document.rating_count, document.rating_sum) == (2, 7)
+
+
+def test_version_counters_follow_creates_and_deletes(document_and_users):
+    document, _ = document_and_users
+    versions = []
+    for _ in range(3):
+        versions.append(document.create_version())
+        db.session.flush()
+    db.session.commit()
+    assert (document.version_count, document.latest_version_number) == (3, 3)
+
+    db.session.delete(versions[-1])
+    db.session.commit()
+    assert (document.get_version_count(), document.get_latest_version_number()) == (2, 2)
+
+
+def test_serialization_reads_counters_without_aggregating(document_and_users, query_counter):
+    document, (user, *_) = document_and_users
+    db.session.add_all([Comment('hello', document.id, user.id), Rating(document.id, user.id, 4)])
+    document.create_version()
+    db.session.commit()
+    document = db.session.get(Document, document.id)
+    document.owner, document.category  # loaded outside the measured block
+
+    with query_counter() as statements:
+        data = document.to_dict()
+    assert (data['comment_count'], data['version_count'], data['latest_version']) == (1, 1, 1)
+    assert data['rating_stats'] == {'average_rating': 4.0, 'total_ratings': 1}
+    assert not any(table in statement for statement in statements
+                   for table in ('FROM comments', 'FROM ratings', 'FROM document_versions'))
+
+
+def test_repair_reports_and_fixes_drift(document_and_users):
+    document, (user, *_) = document_and_users
+    db.session.add_all([Comment('hello', document.id, user.id), Rating(document.id, user.id, 4)])
+    db.session.commit()
+    db.session.execute(Document.__table__.update().values(comment_count=7, rating_sum=0))
+    db.session.commit()
+
+    report = document_counters.repair(dry_run=True)
+    assert report['documents_scanned'] == 1 and report['documents_drifted'] == 1
+    assert report['drift_by_counter'] == {'comment_count': 1, 'version_count': 0, 'latest_version_number': 0,
+                                          'rating_count': 0, 'rating_sum': 1}
+    assert report['examples'] == [{'document_id': document.id, 'comment_count': {'stored': 7, 'actual': 1},
+                                   'rating_sum': {'stored': 0, 'actual': 4}}]
+    db.session.expire_all()
+    assert document.comment_count == 7
+
+    assert document_counters.repair(batch_size=1)['documents_drifted'] == 1
+    db.session.expire_all()
+    assert counters(document) == {'comment_count': 1, 'version_count': 0, 'latest_version_number': 0,
+                                  'rating_count': 1, 'rating_sum': 4}
+    assert document_counters.repair()['documents_drifted'] == 0
+
+
+def test_repair_endpoint(client, admin_headers):
+    response = client.post('/api/admin/documents/counters/repair', json={'dry_run': True}, headers=admin_headers)
+    assert response.status_code == 200 and response.get_json()['repair']['dry_run'] is True
+
+
+def test_concurrent_writers_do_not_lose_increments(postgres_app):
+    user = User(username='writer', email='writer@example.com', password='TestPassword123!')
+    document = Document(title='Busy', markdown_content='body')
+    db.session.add_all([user, document])
+    db.session.commit()
+    document_id, user_id = document.id, user.id
+
+    def write_comments():
+        with postgres_app.app_context():
+            for i in range(10):
+                db.session.add(Comment(f'comment {i}', document_id, user_id))
+                db.session.commit()
+            db.session.remove()
+
+    writers = [threading.Thread(target=write_comments) for _ in range(4)]
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join()
+
+    db.session.expire_all()
+    assert db.session.get(Document, document_id).comment_count == 40
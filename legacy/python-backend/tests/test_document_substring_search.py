@@ -0,0 +1,105 @@
+"""
+Tests for Document.search_documents: set-based tag filtering, trigram-indexed
+substring search and fuzzy "did you mean" suggestions.
+"""
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app import db
+from app.models.document import Document, trigram_supported
+
+
+@pytest.fixture
+def tagged_documents():
+    """Documents in the database of the app fixture requested before this one"""
+    documents = {
+        'both': Document(title='Garlic pasta', markdown_content='garlic and tomato'),
+        'garlic': Document(title='Garlic bread', markdown_content='garlic and butter'),
+        'tomato': Document(title='Tomato soup', markdown_content='tomato and basil'),
+        'private': Document(title='Garlic secret', markdown_content='garlic and tomato', is_public=False),
+    }
+    documents['both'].add_tags(['garlic', 'tomato'])
+    documents['garlic'].add_tags(['garlic'])
+    documents['tomato'].add_tags(['tomato'])
+    documents['private'].add_tags(['garlic', 'tomato'])
+    db.session.add_all(documents.values())
+    db.session.commit()
+    return {name: doc.id for name, doc in documents.items()}
+
+
+@pytest.fixture
+def trigram_app(postgres_app):
+    if not trigram_supported():
+        pytest.skip('pg_trgm is not available on this PostgreSQL server')
+    return postgres_app
+
+
+def ids(pagination):
+    return sorted(doc.id for doc in pagination.items)
+
+
+def test_tag_filter_requires_every_tag(app, tagged_documents):
+    assert ids(Document.search_documents('', tags=['garlic', 'tomato'])) == [tagged_documents['both']]
+    assert ids(Document.search_documents('', tags=['garlic'])) == sorted(
+        [tagged_documents['both'], tagged_documents['garlic']])
+    assert ids(Document.search_documents('pasta', tags='garlic')) == [tagged_documents['both']]
+
+
+def test_unknown_tags_are_ignored(app, tagged_documents):
+    assert ids(Document.search_documents('', tags=['garlic', 'tomato', 'no-such-tag'])) == \
+        [tagged_documents['both']]
+
+
+def test_tag_filter_is_one_grouped_subquery(app, tagged_documents):
+    query = Document.search_query('', tags=['garlic', 'tomato'])
+    sql = str(query.statement.compile(dialect=postgresql.dialect()))
+
+    assert sql.count('FROM document_tags') == 1
+    assert 'GROUP BY document_tags.document_id \nHAVING count(*) =' in sql
+    assert 'EXISTS' not in sql  # no per-tag subquery
+
+
+def test_fuzzy_without_pg_trgm_keeps_substring_search(app, tagged_documents):
+    assert not trigram_supported()
+    assert ids(Document.search_documents('garlc', fuzzy=True)) == []
+    assert ids(Document.search_documents('bread', fuzzy=True)) == [tagged_documents['garlic']]
+    assert Document.did_you_mean('garlc') == []
+
+
+def test_list_route_reports_suggestions(client, tagged_documents):
+    found = client.get('/api/documents?search=bread').get_json()
+    missed = client.get('/api/documents?search=garlc&fuzzy=true').get_json()
+
+    assert found['pagination']['total'] == 1 and found['did_you_mean'] == []
+    assert missed['pagination']['total'] == 0 and missed['did_you_mean'] == []
+
+
+def test_substring_search_uses_trigram_indexes(trigram_app):
+    query = Document.query.filter(db.or_(Document.title.ilike('%garlic%'),
+                                         Document.markdown_content.ilike('%garlic%')))
+    compiled = query.statement.compile(dialect=db.engine.dialect)
+
+    connection = db.session.connection()
+    connection.exec_driver_sql('SET LOCAL enable_seqscan = off')
+    plan = '\n'.join(row[0] for row in connection.exec_driver_sql(f'EXPLAIN {compiled}', compiled.params))
+    assert 'idx_documents_title_trgm' in plan
+    assert 'idx_documents_markdown_content_trgm' in plan
+
+
+def test_fuzzy_title_search_uses_the_title_index(trigram_app):
+    compiled = Document.search_query('garlc', fuzzy=True).statement.compile(dialect=db.engine.dialect)
+
+    connection = db.session.connection()
+    connection.exec_driver_sql('SET LOCAL enable_seqscan = off')
+    plan = '\n'.join(row[0] for row in connection.exec_driver_sql(f'EXPLAIN {compiled}', compiled.params))
+    assert 'idx_documents_title_trgm' in plan
+
+
+def test_fuzzy_search_and_did_you_mean_tolerate_typos(trigram_app, tagged_documents):
+    fuzzy = Document.search_documents('garlc bred', fuzzy=True)
+
+    assert ids(Document.search_documents('garlc bred')) == []
+    assert fuzzy.items[0].id == tagged_documents['garlic']
+    assert Document.did_you_mean('garlc bred')[0] == 'Garlic bread'
+    # Private titles are only suggested to their owner's visibility scope
+    assert 'Garlic secret' not in Document.did_you_mean('garlic secrt')
@@ -0,0 +1,74 @@
+"""
+Tests for /documents/search paging and bulk headline generation.
+"""
+import pytest
+from sqlalchemy.dialects import postgresql
+from werkzeug.datastructures import MultiDict
+from app import db
+from app.models.document import Document
+from app.routes.documents_search import _build_search_query, _headline_options, _search_page_query
+
+
+def test_headlines_are_computed_over_the_ranked_page(app):
+    filtered_query, rank = _build_search_query('postgres', None, False)
+    page_query = _search_page_query(filtered_query, rank, 'postgres', 2, 10, _headline_options(MultiDict()))
+    sql = str(page_query.statement.compile(dialect=postgresql.dialect()))
+
+    assert sql.startswith('WITH ranked AS')
+    assert sql.count('ts_headline(') == 1
+    assert 'LIMIT' in sql.split('ts_headline(')[0]
+    assert 'left(coalesce(documents.markdown_content' in sql
+
+
+def test_headline_options_are_clamped():
+    options = _headline_options(MultiDict({
+        'headline_max_words': '1000', 'headline_min_words': '500', 'headline_fragments': '3'
+    }))
+
+    assert options.startswith('MaxWords=200, MinWords=199, MaxFragments=3,')
+    assert _headline_options(MultiDict()).startswith('MaxWords=50, MinWords=20, MaxFragments=0,')
+
+
+def test_statement_count_does_not_grow_with_page_size(postgres_app, query_counter):
+    db.session.add_all([
+        Document(title=f'Postgres note {i}', markdown_content=f'postgres vacuum planner notes {i} ' * 40)
+        for i in range(30)
+    ])
+    db.session.commit()
+    client = postgres_app.test_client()
+
+    counts = []
+    for per_page in (5, 25):
+        with query_counter() as statements:
+            response = client.get(f'/api/documents/search?q=postgres&per_page={per_page}')
+        assert response.status_code == 200
+        documents = response.get_json()['documents']
+        assert len(documents) == per_page
+        assert all('<mark>' in doc['highlight'] for doc in documents)
+        counts.append(len(statements))
+
+    # count, ranked page with headlines, tag batch load
+    assert counts == [3, 3]
+
+
+def test_search_pagination_metadata(postgres_app):
+    db.session.add_all([
+        Document(title=f'Garlic recipe {i}', markdown_content='garlic and tomato') for i in range(7)
+    ])
+    db.session.commit()
+
+    response = postgres_app.test_client().get('/api/documents/search?q=garlic&per_page=5&page=2&highlight=false')
+
+    body = response.get_json()
+    assert response.status_code == 200
+    assert len(body['documents']) == 2
+    assert 'highlight' not in body['documents'][0]
+    assert body['pagination'] == {
+        'page': 2, 'per_page': 5, 'total': 7, 'pages': 2, 'has_next': False, 'has_prev': True
+    }
+
+
+@pytest.mark.parametrize('query', ['', 'x' * 501])
+def test_invalid_queries_are_rejected(client, query):
+    response = client.get('/api/documents/search', query_string={'q': query})
+    assert response.status_code == 400
@@ -0,0 +1,135 @@
+"""
+Tests for the persistent TF-IDF feature store used by document clustering.
+"""
+import numpy as np
+import pytest
+from app import db
+from app.models.document import Document
+from app.models.feature_store import TfidfModelVersion, DocumentFeatureVector
+from app.services.tfidf_feature_store import tfidf_feature_store, content_hash
+from app.services.document_clustering_service import DocumentClusteringService
+
+
+CORPUS = [
+    ('Python basics', 'python programming language tutorial with functions and classes'),
+    ('Python advanced', 'python programming decorators generators and classes in depth'),
+    ('Python testing', 'python testing with pytest fixtures and functions'),
+    ('Cooking pasta', 'cooking pasta recipe with tomato sauce and garlic'),
+    ('Cooking soup', 'cooking soup recipe with garlic onion and tomato'),
+    ('Baking bread', 'baking bread recipe with flour yeast and water'),
+]
+
+
+@pytest.fixture(autouse=True)
+def fresh_store():
+    """The store caches the active model per process; start every test clean."""
+    tfidf_feature_store.invalidate()
+    yield
+    tfidf_feature_store.invalidate()
+
+
+@pytest.fixture
+def corpus(app):
+    documents = [Document(title=title, markdown_content=content) for title, content in CORPUS]
+    db.session.add_all(documents)
+    db.session.commit()
+    return documents
+
+
+def test_rebuild_creates_active_version_with_vectors(app, corpus):
+    result = tfidf_feature_store.rebuild(batch_size=4)
+
+    assert result['version'] == 1
+    assert result['documents_indexed'] == len(CORPUS)
+    assert DocumentFeatureVector.query.filter_by(model_version=1).count() == len(CORPUS)
+
+    status = tfidf_feature_store.get_status()
+    assert status['available'] is True
+    assert status['active_version'] == 1
+    assert status['coverage'] == 1.0
+
+
+def test_stored_vectors_match_a_full_refit(app, corpus):
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    tfidf_feature_store.rebuild()
+    features = tfidf_feature_store.get_matrix(corpus)
+
+    params = tfidf_feature_store.params
+    reference = TfidfVectorizer(
+        max_features=params['max_features'],
+        stop_words=params['stop_words'],
+        ngram_range=tuple(params['ngram_range']),
+        min_df=params['min_df'],
+        max_df=params['max_df']
+    ).fit_transform([content for _, content in CORPUS])
+
+    assert features.stored_count == len(CORPUS)
+    assert features.computed_count == 0
+    assert np.allclose(features.matrix.toarray(), reference.toarray(), atol=1e-5)
+
+
+def test_writes_update_vectors_incrementally(app, corpus):
+    tfidf_feature_store.rebuild()
+
+    # Update: the vector follows the new content hash in the same commit
+    doc = corpus[0]
+    doc.markdown_content = 'cooking recipe with garlic and tomato'
+    db.session.commit()
+    vector = db.session.get(DocumentFeatureVector, doc.id)
+    assert vector.content_hash == content_hash(doc.markdown_content)
+
+    # Create: a new document gets a vector without a rebuild
+    new_doc = Document(title='More python', markdown_content='python functions and classes')
+    db.session.add(new_doc)
+    db.session.commit()
+    assert db.session.get(DocumentFeatureVector, new_doc.id) is not None
+
+    # Delete: the vector is removed with the document
+    new_doc_id = new_doc.id
+    db.session.delete(new_doc)
+    db.session.commit()
+    assert db.session.get(DocumentFeatureVector, new_doc_id) is None
+
+    # No refit happened along the way
+    assert TfidfModelVersion.query.count() == 1
+
+
+def test_stale_vectors_are_transformed_on_read(app, corpus):
+    tfidf_feature_store.rebuild()
+    DocumentFeatureVector.query.filter_by(document_id=corpus[1].id).delete()
+    db.session.commit()
+
+    features = tfidf_feature_store.get_matrix(corpus)
+
+    assert features.computed_count == 1
+    assert features.matrix.shape[0] == len(CORPUS)
+
+
+def test_rebuild_is_versioned(app, corpus):
+    tfidf_feature_store.rebuild()
+    result = tfidf_feature_store.rebuild()
+
+    assert result['version'] == 2
+    active = TfidfModelVersion.query.filter_by(is_active=True).all()
+    assert [v.version for v in active] == [2]
+    assert DocumentFeatureVector.query.filter_by(model_version=1).count() == 0
+
+
+def test_similarity_uses_feature_store(app, corpus):
+    tfidf_feature_store.rebuild()
+    service = DocumentClusteringService()
+
+    results = service.find_similar_documents(corpus[0], corpus[1:], similarity_threshold=0.01)
+
+    assert results['feature_store_version'] == 1
+    assert results['similar_documents'][0]['title'].startswith('Python')
+
+
+def test_similarity_falls_back_without_model(app, corpus):
+    service = DocumentClusteringService()
+
+    results = service.find_similar_documents(corpus[0], corpus[1:], similarity_threshold=0.0)
+
+    assert 'error' not in results
+    assert results['feature_store_version'] is None
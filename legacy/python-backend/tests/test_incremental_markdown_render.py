@@ -0,0 +1,147 @@
+"""
+Tests for block-level incremental markdown rendering: output must match a full
+render byte for byte, for random documents and random single-line edits.
+"""
+import random
+
+import bleach
+import markdown
+import pytest
+
+from app.models.document import Document, ALLOWED_TAGS, ALLOWED_ATTRIBUTES, MARKDOWN_EXTENSIONS
+from app.services import markdown_renderer
+from app.services.markdown_renderer import split_blocks
+
+WORDS = ['alpha', 'beta', 'gamma', 'delta', 'note', 'query', 'index', '한국어', 'café', 'x']
+INLINE = ['*em*', '**strong**', '`code`', '[link](https://example.com/a)', '![img](/i.png "t")',
+          'a < b', 'AT&T', '\\*not em\\*', '_under_', 'foo_bar_baz', '[ref][r1]', '[^1]', '~~s~~']
+EDIT_LINES = ['', '    ', 'plain words', '- new item', '1. numbered', '> quoted', '    indented',
+              '```', '```python', '# Heading', '---', '===', '| c | d |', 'Term', '  - nested', '<b>bold']
+
+
+def words(rng, low=1, high=8):
+    return ' '.join(rng.choice(WORDS + INLINE) if rng.random() < 0.3 else rng.choice(WORDS)
+                    for _ in range(rng.randint(low, high)))
+
+
+def random_block(rng):
+    kind = rng.choice(['paragraph', 'paragraph', 'heading', 'setext', 'list', 'olist', 'loose_list', 'nested_list',
+                       'quote', 'fence', 'fence_blank', 'indented', 'table', 'hr', 'rare'])
+    if kind == 'paragraph':
+        return '\n'.join(words(rng) + rng.choice(['', '  ']) for _ in range(rng.randint(1, 3)))
+    if kind == 'heading':
+        return '#' * rng.randint(1, 6) + ' ' + words(rng, 1, 4)
+    if kind == 'setext':
+        return words(rng, 1, 3) + '\n' + rng.choice(['===', '---'])
+    if kind == 'list':
+        return '\n'.join(f'{rng.choice("*+-")} {words(rng)}' for _ in range(rng.randint(1, 4)))
+    if kind == 'olist':
+        return '\n'.join(f'{i + 1}. {words(rng)}' for i in range(rng.randint(1, 4)))
+    if kind == 'loose_list':
+        return '\n\n'.join(f'- {words(rng)}' + rng.choice(['', f'\n\n    {words(rng)}'])
+                           for _ in range(rng.randint(2, 3)))
+    if kind == 'nested_list':
+        return f'- {words(rng)}\n    - {words(rng)}\n    - {words(rng)}\n- {words(rng)}'
+    if kind == 'quote':
+        return '\n'.join(rng.choice(['> ', '> > ', '']) + words(rng) for _ in range(rng.randint(1, 3)))
+    if kind == 'fence':
+        fence = rng.choice(['```', '~~~', '````'])
+        return f'{fence}{rng.choice(["", "python", "js"])}\n' + '\n'.join(
+            rng.choice(['x = 1', 'def f():', '    return <b>', 'print("a & b")']) for _ in range(rng.randint(1, 4))
+        ) + f'\n{fence}'
+    if kind == 'fence_blank':
+        return '```\nfirst\n\n\nsecond\n\n```'
+    if kind == 'indented':
+        return '\n'.join(rng.choice(['    ', '\t']) + words(rng) for _ in range(rng.randint(1, 3)))
+    if kind == 'table':
+        return '| a | b |\n|---|:-:|\n' + '\n'.join(f'| {words(rng, 1, 2)} | {words(rng, 1, 2)} |'
+                                                   for _ in range(rng.randint(1, 3)))
+    if kind == 'hr':
+        return rng.choice(['---', '* * *', '___', '- - -'])
+    return rng.choice([
+        '[r1]: https://example.com/ref "Ref"',
+        'Text with a footnote[^1].\n\n[^1]: The note.',
+        '<div>\nraw *html*\n</div>',
+        '<https://example.com/autolink>',
+        'line one\r\nline two',
+        '   \n',
+    ])
+
+
+def random_document(rng):
+    blocks = [random_block(rng) for _ in range(rng.randint(1, 12))]
+    document = blocks[0]
+    for block in blocks[1:]:
+        document += rng.choice(['\n\n', '\n\n', '\n\n\n', '\n\n\n\n', '\n', '\n \n', '\n\t\n']) + block
+    return document + rng.choice(['', '\n', '\n\n'])
+
+
+def random_edit(rng, document):
+    lines = document.split('\n')
+    index = rng.randrange(len(lines))
+    action = rng.choice(['replace', 'insert', 'delete', 'append'])
+    if action == 'replace':
+        lines[index] = rng.choice(EDIT_LINES + [words(rng)])
+    elif action == 'insert':
+        lines.insert(index, rng.choice(EDIT_LINES + [words(rng)]))
+    elif action == 'delete' and len(lines) > 1:
+        del lines[index]
+    else:
+        lines[index] += ' ' + words(rng, 1, 2)
+    return '\n'.join(lines)
+
+
+def full_render(content):
+    raw_html = markdown.markdown(content, extensions=MARKDOWN_EXTENSIONS)
+    return bleach.clean(raw_html, tags=ALLOWED_TAGS, attributes=ALLOWED_ATTRIBUTES, strip=True)
+
+
+def incremental_render(content):
+    return markdown_renderer.render_markdown(content, MARKDOWN_EXTENSIONS, ALLOWED_TAGS, ALLOWED_ATTRIBUTES,
+                                             incremental=True)
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_incremental_render_matches_full_render(app, seed):
+    rng = random.Random(seed)
+    for _ in range(30):
+        content = random_document(rng)
+        # Each edit renders against the block cache left by the previous version
+        for _ in range(4):
+            assert incremental_render(content) == full_render(content), content
+            content = random_edit(rng, content)
+
+
+def test_single_line_edit_renders_only_the_changed_block(app, monkeypatch):
+    sections = [f'## Section {i}\n\nParagraph {i} with `code`.\n\n```python\nvalue = {i}\n```' for i in range(50)]
+    content = '\n\n'.join(sections)
+    incremental_render(content)
+
+    rendered = []
+    render_block = markdown_renderer._render_block
+
+    def tracking_render_block(block, *args):
+        rendered.append(block)
+        return render_block(block, *args)
+
+    monkeypatch.setattr(markdown_renderer, '_render_block', tracking_render_block)
+    edited = content.replace('Paragraph 17 with', 'Paragraph 17, edited, with')
+
+    assert incremental_render(edited) == full_render(edited)
+    assert rendered == ['Paragraph 17, edited, with `code`.']
+
+
+def test_documents_with_definitions_render_whole():
+    assert split_blocks('See [the docs][d].\n\n[d]: https://example.com') is None
+    assert split_blocks('A claim[^1].\n\n[^1]: Source.') is None
+    assert split_blocks('<div>\n\ninside\n\n</div>') is None
+    assert split_blocks('```html\n<div>\n\ninside\n```') == ['```html\n<div>\n\ninside\n```']
+    assert split_blocks('- one\n\n- two\n\n    more\n\nafter') == ['- one\n\n- two\n\n    more', 'after']
+
+
+def test_document_saves_render_incrementally(app):
+    content = '\n\n'.join(f'Paragraph {i}' for i in range(20))
+    document = Document(title='Blocks', markdown_content=content)
+    document.update_content(markdown_content=content + '\n\nOne more', create_version=False)
+
+    assert document.html_content == full_render(content + '\n\nOne more')
@@ -0,0 +1,152 @@
+"""
+Tests for cursor (keyset) pagination and count modes in build_pagination_response
+and the list endpoints built on it.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from app.models.document import Document
+from app.utils.responses import build_pagination_response, encode_cursor, InvalidCursorError
+
+
+@pytest.fixture
+def dated_documents():
+    """Seven public documents; two pairs share updated_at to exercise the id tie-breaker"""
+    start = datetime(2026, 1, 1, 12, 0, 0)
+    offsets = [0, 1, 1, 2, 3, 3, 4]
+    documents = [Document(title=f'Doc {i}', markdown_content=f'body {i}') for i in range(len(offsets))]
+    db.session.add_all(documents)
+    db.session.flush()
+    for document, offset in zip(documents, offsets):
+        document.updated_at = start + timedelta(hours=offset)
+    db.session.commit()
+    # Newest first, ties broken by higher id
+    return [doc.id for doc in sorted(documents, key=lambda d: (d.updated_at, d.id), reverse=True)]
+
+
+def page(cursor=None, page_number=1, count=None, per_page=3):
+    return build_pagination_response(
+        Document.query, page_number, per_page, serializer_func=lambda d: d.id,
+        sort_column=Document.updated_at, cursor=cursor, count=count
+    )
+
+
+def test_cursor_walk_matches_page_numbers(app, dated_documents):
+    walked, cursor = [], None
+    while True:
+        response = page(cursor)
+        walked.extend(response['items'])
+        cursor = response['next_cursor']
+        assert response['has_next'] == (cursor is not None)
+        if cursor is None:
+            break
+
+    numbered = page(page_number=1)['items'] + page(page_number=2)['items'] + page(page_number=3)['items']
+    assert walked == numbered == dated_documents
+
+
+def test_page_mode_keeps_exact_totals_and_links_to_cursor(app, dated_documents):
+    first = page()
+
+    assert (first['page'], first['total'], first['pages']) == (1, 7, 3)
+    assert first['has_next'] and not first['has_prev']
+    assert page(cursor=first['next_cursor'])['items'] == page(page_number=2)['items']
+
+    last = page(page_number=3)
+    assert last['items'] == dated_documents[6:] and not last['has_next'] and last['next_cursor'] is None
+
+
+def test_cursor_pages_skip_count_unless_asked(app, dated_documents, query_counter):
+    cursor = page()['next_cursor']
+
+    with query_counter() as statements:
+        response = page(cursor)
+    assert response['total'] is None and response['page'] is None and response['has_prev']
+    assert not any('count(' in statement.lower() for statement in statements)
+
+    assert page(cursor, count='exact')['total'] == 7
+    estimated = page(cursor, count='approx')
+    assert estimated['total'] == 7 and estimated['total_estimated']
+
+
+def test_invalid_cursors_are_rejected(app, dated_documents):
+    for cursor in ('not a cursor', encode_cursor(Document.created_at, ['2026-01-01T12:00:00', 1]),
+                   encode_cursor(Document.updated_at, ['yesterday', 1])):
+        with pytest.raises(InvalidCursorError):
+            page(cursor)
+    with pytest.raises(InvalidCursorError):
+        build_pagination_response(Document.query, 1, 3, lambda d: d.id, cursor=page()['next_cursor'])
+
+
+def test_list_endpoints_accept_cursors(client, dated_documents):
+    first = client.get('/api/documents?per_page=4').get_json()
+    second = client.get(f"/api/documents?per_page=4&cursor={first['pagination']['next_cursor']}").get_json()
+
+    assert [d['id'] for d in first['documents'] + second['documents']] == dated_documents
+    assert first['pagination']['total'] == 7 and second['pagination']['total'] is None
+    assert client.get('/api/documents?cursor=garbage').status_code == 400
+
+    comments = client.get(f'/api/documents/{dated_documents[0]}/comments?cursor=garbage')
+    assert comments.status_code == 400
+
+
+def test_approximate_total_comes_from_planner_statistics(postgres_app, query_counter):
+    db.session.add_all(Document(title=f'Doc {i}', markdown_content='body') for i in range(5))
+    db.session.commit()
+    db.session.execute(db.text('ANALYZE documents'))
+
+    with query_counter() as statements:
+        response = page(count='approx')
+    assert response['total'] == 5 and response['total_estimated']
+    assert any(statement.startswith('EXPLAIN (FORMAT JSON)') for statement in statements)
+    assert not any('count(' in statement.lower() for statement in statements)
+    assert page(response['next_cursor'])['items'] == page(page_number=2)['items']
+
+
+def add_undated_documents(count=3):
+    """Documents whose updated_at is NULL (the column is nullable), in id order"""
+    documents = [Document(title=f'Undated {i}', markdown_content='body') for i in range(count)]
+    db.session.add_all(documents)
+    db.session.flush()
+    ids = [doc.id for doc in documents]
+    db.session.execute(db.update(Document).where(Document.id.in_(ids)).values(updated_at=None))
+    db.session.commit()
+    return ids
+
+
+def walk_with_nulls(dated_ids, undated_ids):
+    for descending, expected in ((True, undated_ids[::-1] + dated_ids), (False, dated_ids[::-1] + undated_ids)):
+        def listing(**kwargs):
+            return build_pagination_response(Document.query, kwargs.pop('page_number', 1), 2,
+                                             serializer_func=lambda d: d.id, sort_column=Document.updated_at,
+                                             descending=descending, **kwargs)
+
+        walked, cursor = [], None
+        while True:
+            # Pages of two end on NULL keys in both directions
+            response = listing(cursor=cursor)
+            walked.extend(response['items'])
+            cursor = response['next_cursor']
+            if cursor is None:
+                break
+        numbered = [doc_id for number in range(1, 6) for doc_id in listing(page_number=number)['items']]
+        assert walked == numbered == expected
+
+
+def test_cursor_walk_includes_null_sort_keys(app, dated_documents):
+    walk_with_nulls(dated_documents, add_undated_documents())
+
+
+def test_cursor_walk_includes_null_sort_keys_on_postgresql(postgres_app):
+    start = datetime(2026, 1, 1, 12, 0, 0)
+    documents = [Document(title=f'Doc {i}', markdown_content='body') for i in range(4)]
+    db.session.add_all(documents)
+    db.session.flush()
+    for offset, document in enumerate(documents):
+        document.updated_at = start + timedelta(hours=offset // 2)
+    db.session.commit()
+    dated = [doc.id for doc in sorted(documents, key=lambda d: (d.updated_at, d.id), reverse=True)]
+
+    walk_with_nulls(dated, add_undated_documents())
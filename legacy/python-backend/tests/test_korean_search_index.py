@@ -0,0 +1,77 @@
+"""
+Tests for the character-bigram index behind Korean search.
+"""
+from sqlalchemy import text
+from app import db
+from app.models.document import Document
+from app.services import korean_search_index
+from app.utils.korean_text import korean_processor
+
+
+def search(client, query, **params):
+    response = client.post('/api/search/korean', json={'query': query, **params})
+    assert response.status_code == 200
+    return response.get_json()
+
+
+class TestNgramTokens:
+    def test_hangul_runs_become_bigrams(self):
+        assert korean_processor.ngram_tokens('검색엔진') == ['검색', '색엔', '엔진']
+
+    def test_other_runs_stay_whole_words(self):
+        assert korean_processor.ngram_tokens('API를 Postgres 2024') == ['api', '를', 'postgres', '2024']
+
+    def test_empty_text(self):
+        assert korean_processor.ngram_tokens('') == []
+        assert korean_search_index.ngram_vector('English title', 'English only') is None
+
+
+def test_sqlite_keeps_ilike_search(client):
+    db.session.add(Document(title='한국어 문서', markdown_content='형태소 분석기 사용법', is_public=True))
+    db.session.commit()
+
+    assert not korean_search_index.is_supported()
+    assert search(client, '형태소 분석기')['pagination']['total'] == 1
+
+
+def test_ngram_search_ranks_in_sql(postgres_app):
+    db.session.add_all([
+        Document(title='검색엔진 구축', markdown_content='한국어 검색엔진을 만드는 방법', is_public=True),
+        Document(title='요리 노트', markdown_content='김치찌개와 검색엔진 이야기', is_public=True),
+        Document(title='요리 노트 2', markdown_content='된장찌개 끓이는 법', is_public=True),
+        Document(title='English note', markdown_content='search engine basics', is_public=True),
+    ])
+    db.session.commit()
+
+    results = search(postgres_app.test_client(), '검색엔진')
+
+    titles = [doc['title'] for doc in results['documents']]
+    assert titles == ['검색엔진 구축', '요리 노트']
+    assert db.session.execute(text(
+        "SELECT count(*) FROM documents WHERE search_ngrams IS NULL"
+    )).scalar() == 1
+
+
+def test_ngram_search_uses_gin_index(postgres_app):
+    match, _ = korean_search_index.ngram_match(['검색엔진'])
+    compiled = Document.query.filter(match).statement.compile(dialect=db.engine.dialect)
+
+    connection = db.session.connection()
+    connection.exec_driver_sql('SET LOCAL enable_seqscan = off')
+    plan = '\n'.join(row[0] for row in connection.exec_driver_sql(f'EXPLAIN {compiled}', compiled.params))
+    assert 'idx_documents_search_ngrams' in plan
+    assert '~~*' not in plan  # no ILIKE filter
+
+
+def test_rebuild_fills_rows_written_without_the_hook(postgres_app):
+    db.session.execute(Document.__table__.insert(), [
+        {'title': '벌크 문서', 'markdown_content': '형태소 분석', 'is_public': True},
+        {'title': 'Bulk document', 'markdown_content': 'english only', 'is_public': True},
+    ])
+    db.session.commit()
+
+    result = korean_search_index.rebuild(batch_size=1)
+
+    assert result['documents_scanned'] == 2
+    assert result['documents_indexed'] == 1
+    assert search(postgres_app.test_client(), '분석')['pagination']['total'] == 1
@@ -0,0 +1,118 @@
+"""
+Tests for single-pass and batch Korean document processing.
+"""
+import threading
+from collections import OrderedDict
+
+import pytest
+from app.utils import korean_text
+from app.utils.korean_text import KoreanTextProcessor, process_korean_documents
+
+
+class CountingAnalyzer:
+    """Deterministic stand-in for a konlpy tagger that counts pos() calls"""
+    TAGS = {'검색': 'NNG', '엔진': 'NNG', '데이터': 'NNP', '분석': 'NNG', '빠르': 'VA', '이': 'JKS', '를': 'JKO'}
+
+    def __init__(self):
+        self.calls = 0
+
+    def pos(self, text):
+        self.calls += 1
+        return [(word, self.TAGS.get(word, 'SL')) for word in text.split()]
+
+    def morphs(self, text):
+        return [word for word, _ in self.pos(text)]
+
+
+@pytest.fixture
+def processor():
+    processor = KoreanTextProcessor()
+    processor.analyzer = CountingAnalyzer()
+    return processor
+
+
+TITLE = '검색 엔진 분석'
+CONTENT = '검색 엔진 이 데이터 를 분석 검색 엔진 빠르 데이터 123'
+
+
+def test_analyze_matches_individual_methods(processor):
+    result = processor.analyze(TITLE, CONTENT)
+
+    assert result['title_tokens'] == processor.tokenize(TITLE)
+    assert result['content_tokens'] == processor.tokenize(CONTENT)
+    assert result['keywords'] == processor.extract_keywords(CONTENT)
+    assert result['auto_tags'] == processor.extract_tags_from_korean_text(CONTENT)
+    assert result['search_vector'] == processor.create_search_vector(TITLE, CONTENT)
+    assert result['auto_tags'] == ['검색', '엔진', '데이터']
+
+
+def test_analyze_runs_one_pass_per_text_and_caches_by_content(processor):
+    processor.analyze(TITLE, CONTENT)
+    assert processor.analyzer.calls == 2
+
+    processor.analyze(TITLE, CONTENT)
+    processor.tokenize(CONTENT)
+    assert processor.analyzer.calls == 2
+
+
+def test_morpheme_cache_is_bounded(processor, monkeypatch):
+    monkeypatch.setattr(korean_text, 'MORPHEME_CACHE_SIZE', 2)
+    for text in ('가나', '다라', '마바'):
+        processor.tokenize(text)
+
+    assert len(processor._morpheme_cache) == 2
+    processor.tokenize('가나')
+    assert processor.analyzer.calls == 4
+
+
+
+class PausingCache(OrderedDict):
+    """Gives another thread a chance to run between the first cache hit and its move_to_end"""
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.hit = threading.Event()
+        self.evicted = threading.Event()
+
+    def get(self, key, default=None):
+        value = super().get(key, default)
+        if value is not None and not self.hit.is_set():
+            self.hit.set()
+            self.evicted.wait(0.2)
+        return value
+
+
+def test_eviction_cannot_interleave_with_a_cache_hit(processor, monkeypatch):
+    monkeypatch.setattr(korean_text, 'MORPHEME_CACHE_SIZE', 1)
+    processor.tokenize('가나')
+    processor._morpheme_cache = cache = PausingCache(processor._morpheme_cache)
+
+    def evict():
+        cache.hit.wait()
+        processor.tokenize('다라')
+        cache.evicted.set()
+
+    other = threading.Thread(target=evict)
+    other.start()
+    assert processor.tokenize('가나') == ['가나']
+    other.join()
+    assert list(cache.values()) == [(('다라', 'SL'),)]
+
+
+def test_stopwords_are_filtered(processor):
+    assert processor.tokenize('그리고 검색') == ['검색']
+
+
+def test_batch_keeps_input_order(processor, monkeypatch):
+    monkeypatch.setattr(korean_text, 'korean_processor', processor)
+    documents = [(f'문서 {i}', f'검색 엔진 {i}') for i in range(5)]
+
+    results = process_korean_documents(documents, workers=1)
+
+    assert [r['title_tokens'] for r in results] == [processor.tokenize(title) for title, _ in documents]
+
+
+def test_batch_process_pool_matches_serial():
+    documents = [(f'제목 {i}', f'한국어 문서 내용 {i} 검색 엔진') for i in range(korean_text.PARALLEL_BATCH_THRESHOLD)]
+
+    assert process_korean_documents(documents, workers=2) == process_korean_documents(documents, workers=1)
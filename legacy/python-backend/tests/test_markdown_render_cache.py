@@ -0,0 +1,189 @@
+"""
+Tests for the content-hash render cache behind Document.convert_markdown_to_html,
+exports and version restores, and the worker pool for oversized documents.
+"""
+import time
+
+import bleach
+import markdown
+import pytest
+from prometheus_client import REGISTRY
+
+from app import db
+from app.models import document as document_model
+from app.models.document import Document, ALLOWED_TAGS, ALLOWED_ATTRIBUTES, MARKDOWN_EXTENSIONS
+from app.services import markdown_renderer
+from app.utils.exporters import DocumentExporter
+
+CONTENT = '# Notes\n\n```python\nprint("hi")\n```\n\n| a | b |\n|---|---|\n| 1 | 2 |\n\n<script>alert(1)</script>'
+
+
+@pytest.fixture
+def render_calls(app, monkeypatch):
+    """Count renders that actually run markdown in this process"""
+    calls = []
+    render = markdown_renderer._render
+
+    def counting_render(text, *args):
+        calls.append(text)
+        return render(text, *args)
+
+    monkeypatch.setattr(markdown_renderer, '_render', counting_render)
+    return calls
+
+
+@pytest.fixture
+def offload_everything(app):
+    app.config['MARKDOWN_RENDER_OFFLOAD_CHARS'] = 1
+    yield app
+    markdown_renderer.shutdown_pool()
+
+
+def direct_render(content):
+    raw_html = markdown.markdown(content, extensions=MARKDOWN_EXTENSIONS)
+    return bleach.clean(raw_html, tags=ALLOWED_TAGS, attributes=ALLOWED_ATTRIBUTES, strip=True)
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def wait_for(condition, seconds=10):
+    deadline = time.monotonic() + seconds
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out waiting for the render worker'
+        time.sleep(0.02)
+
+
+def test_identical_content_renders_once(render_calls):
+    hits = sample('minky_markdown_render_requests_total', result='hit')
+
+    first = Document(title='One', markdown_content=CONTENT)
+    second = Document(title='Two', markdown_content=CONTENT)
+    second.update_content(markdown_content=CONTENT + '\n\nmore', create_version=False)
+    second.update_content(markdown_content=CONTENT, create_version=False)
+
+    assert first.html_content == second.html_content == direct_render(CONTENT)
+    assert '<script>' not in first.html_content
+    assert render_calls == [CONTENT, CONTENT + '\n\nmore']
+    assert sample('minky_markdown_render_requests_total', result='hit') == hits + 2
+    assert sample('minky_markdown_render_seconds_count', mode='inline') > 0
+
+
+def test_key_covers_renderer_configuration(monkeypatch):
+    key = markdown_renderer.cache_key(CONTENT, MARKDOWN_EXTENSIONS, ALLOWED_TAGS, ALLOWED_ATTRIBUTES)
+
+    assert key == markdown_renderer.cache_key(CONTENT, MARKDOWN_EXTENSIONS, reversed(ALLOWED_TAGS),
+                                              ALLOWED_ATTRIBUTES)
+    assert key != markdown_renderer.cache_key(CONTENT + ' ', MARKDOWN_EXTENSIONS, ALLOWED_TAGS, ALLOWED_ATTRIBUTES)
+    assert key != markdown_renderer.cache_key(CONTENT, ['tables'], ALLOWED_TAGS, ALLOWED_ATTRIBUTES)
+    assert key != markdown_renderer.cache_key(CONTENT, MARKDOWN_EXTENSIONS, ALLOWED_TAGS[:-1], ALLOWED_ATTRIBUTES)
+    monkeypatch.setattr(markdown_renderer, 'RENDERER_VERSION', markdown_renderer.RENDERER_VERSION + 1)
+    assert key != markdown_renderer.cache_key(CONTENT, MARKDOWN_EXTENSIONS, ALLOWED_TAGS, ALLOWED_ATTRIBUTES)
+
+
+def test_export_and_restore_reuse_the_cache(app, render_calls, sample_user):
+    document = Document(title='Doc', markdown_content=CONTENT, user_id=sample_user)
+    db.session.add(document)
+    db.session.commit()
+    document.update_content(markdown_content='changed', updated_by=sample_user)
+    db.session.commit()
+
+    version = document.versions[0]
+    version.restore_to_document(sample_user)
+    assert document.html_content == direct_render(CONTENT)
+
+    exporter = DocumentExporter(document)
+    try:
+        exported = exporter._convert_markdown_to_html()
+        assert exporter._convert_markdown_to_html() == exported
+    finally:
+        exporter.cleanup()
+    # Document render, the edit, and the export's own configuration (toc); restore and re-export are hits
+    assert len(render_calls) == 3 and render_calls[0] == render_calls[2] == CONTENT
+
+
+def test_oversized_documents_render_in_worker_pool(offload_everything, render_calls):
+    worker_renders = sample('minky_markdown_render_seconds_count', mode='worker')
+
+    document = Document(title='Big', markdown_content=CONTENT)
+
+    assert document.html_content == direct_render(CONTENT)
+    assert render_calls == []
+    wait_for(lambda: sample('minky_markdown_render_seconds_count', mode='worker') == worker_renders + 1)
+    assert Document(title='Again', markdown_content=CONTENT).html_content == document.html_content
+
+
+def test_render_timeout_serves_pending_output_until_worker_finishes(offload_everything):
+    offload_everything.config['MARKDOWN_RENDER_TIMEOUT'] = 0
+    content = CONTENT + '\n\ntimeout case'
+
+    document = Document(title='Slow', markdown_content=content)
+
+    assert markdown_renderer.is_pending(document.html_content)
+    assert '&lt;script&gt;' in document.html_content
+    wait_for(lambda: markdown_renderer.cached_render(content, MARKDOWN_EXTENSIONS, ALLOWED_TAGS,
+                                                     ALLOWED_ATTRIBUTES) is not None)
+    assert document.to_dict(include_stats=False)['html_content'] == direct_render(content)
+    assert Document(title='Saved later', markdown_content=content).html_content == direct_render(content)
+
+
+
+def stored_html(document_id):
+    return db.session.execute(db.select(Document.html_content).where(Document.id == document_id)).scalar_one()
+
+
+def test_finished_render_replaces_the_stored_placeholder(postgres_app):
+    # Needs PostgreSQL: the worker writes on its own connection while the test reads
+    postgres_app.config.update(MARKDOWN_RENDER_OFFLOAD_CHARS=1, MARKDOWN_RENDER_TIMEOUT=0)
+    content = CONTENT + '\n\nstored placeholder case'
+    try:
+        document = Document(title='Slow', markdown_content=content)
+        db.session.add(document)
+        db.session.commit()
+
+        wait_for(lambda: not markdown_renderer.is_pending(stored_html(document.id)))
+        assert stored_html(document.id) == direct_render(content)
+    finally:
+        markdown_renderer.shutdown_pool()
+
+
+def test_render_finished_before_commit_is_stored_after_it(app):
+    content = CONTENT + '\n\nbefore commit case'
+    document = Document(title='Slow', markdown_content='placeholder')
+    document.markdown_content, document.html_content = content, markdown_renderer.pending_html(content)
+    db.session.add(document)
+    db.session.flush()
+
+    # The worker finishes after the flush; its own write cannot see the uncommitted row
+    markdown_renderer.render_markdown(content, MARKDOWN_EXTENSIONS, ALLOWED_TAGS, ALLOWED_ATTRIBUTES)
+    db.session.commit()
+
+    assert stored_html(document.id) == direct_render(content)
+
+
+def test_finished_render_leaves_a_newer_save_alone(app):
+    document = Document(title='Edited', markdown_content='second')
+    db.session.add(document)
+    db.session.commit()
+    # The newer save is still rendering too
+    db.session.execute(db.update(Document).where(Document.id == document.id)
+                       .values(html_content=markdown_renderer.pending_html('second')))
+    db.session.commit()
+
+    # The worker for the earlier save finishes last
+    document_model._store_finished_render(None, 'first', '<p>first</p>')
+    assert stored_html(document.id) == markdown_renderer.pending_html('second')
+
+
+def test_versions_store_the_finished_render(app):
+    content = CONTENT + '\n\nversion case'
+    document = Document(title='Slow', markdown_content='placeholder')
+    db.session.add(document)
+    db.session.flush()
+    # Saved while the render was pending, which has since dropped out of the cache
+    document.markdown_content, document.html_content = content, markdown_renderer.pending_html(content)
+
+    version = document.create_version()
+
+    assert version.html_content == direct_render(content)
@@ -0,0 +1,141 @@
+"""
+Tests for the MinHash/LSH index behind duplicate detection.
+"""
+import random
+import pytest
+from app import db
+from app.models.document import Document
+from app.models.duplicate_index import DocumentMinHash, DocumentLshBand
+from app.services.minhash_index import minhash_index, shingles, jaccard
+from app.services.document_clustering_service import document_clustering_service
+
+
+WORDS = ['python', 'garlic', 'shard', 'museum', 'planner', 'flour', 'token', 'train',
+         'vacuum', 'pasta', 'module', 'beach', 'replica', 'oven', 'alias', 'hotel']
+
+
+def random_text(seed, words=150):
+    rng = random.Random(seed)
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+def edited(text, edits, seed):
+    rng = random.Random(seed)
+    tokens = text.split()
+    for _ in range(edits):
+        tokens[rng.randrange(len(tokens))] = rng.choice(WORDS)
+    return ' '.join(tokens)
+
+
+@pytest.fixture
+def corpus(app):
+    original = random_text(1)
+    documents = [
+        Document(title='Original', markdown_content=original, is_public=True),
+        Document(title='Light edit', markdown_content=edited(original, 3, seed=2), is_public=True),
+        Document(title='Unrelated', markdown_content=random_text(3), is_public=True),
+        Document(title='Private copy', markdown_content=original, is_public=False),
+    ]
+    db.session.add_all(documents)
+    db.session.commit()
+    return documents
+
+
+def test_signature_estimates_jaccard(app):
+    first = shingles(random_text(10))
+    second = shingles(edited(random_text(10), 15, seed=11))
+
+    sig1 = minhash_index.signature(first)
+    sig2 = minhash_index.signature(second)
+
+    estimate = float((sig1 == sig2).mean())
+    assert abs(estimate - jaccard(first, second)) < 0.15
+    assert minhash_index.signature(set()) is None
+    assert minhash_index.band_buckets(sig1) == minhash_index.band_buckets(minhash_index.signature(first))
+
+
+def test_writes_update_signatures_incrementally(app, corpus):
+    doc = corpus[0]
+    assert db.session.get(DocumentMinHash, doc.id) is not None
+    assert DocumentLshBand.query.filter_by(document_id=doc.id).count() == minhash_index.bands
+
+    before = [row.bucket for row in DocumentLshBand.query.filter_by(document_id=doc.id).order_by(DocumentLshBand.band)]
+    doc.markdown_content = random_text(99)
+    db.session.commit()
+    after = [row.bucket for row in DocumentLshBand.query.filter_by(document_id=doc.id).order_by(DocumentLshBand.band)]
+    assert before != after
+    assert len(after) == minhash_index.bands
+
+    doc.markdown_content = ''
+    db.session.commit()
+    assert db.session.get(DocumentMinHash, doc.id).signature == []
+    assert DocumentLshBand.query.filter_by(document_id=doc.id).count() == 0
+
+
+def test_find_duplicates_verifies_candidates(app, corpus):
+    results = minhash_index.find_duplicates(similarity_threshold=0.7)
+
+    pairs = {(first['title'], second['title']) for first, second, _ in results['pairs']}
+    assert ('Original', 'Light edit') in pairs
+    assert ('Original', 'Private copy') in pairs
+    assert not any('Unrelated' in pair for pair in pairs)
+    assert all(score >= 0.7 for _, _, score in results['pairs'])
+    assert results['documents_indexed'] == len(corpus)
+
+
+def test_find_duplicates_respects_query_scope(app, corpus):
+    results = minhash_index.find_duplicates(Document.query.filter(Document.is_public == True), 0.7)
+
+    titles = {doc['title'] for pair in results['pairs'] for doc in pair[:2]}
+    assert 'Private copy' not in titles
+    assert results['documents_indexed'] == 3
+
+
+def test_rebuild_backfills_bulk_inserted_documents(app):
+    db.session.bulk_insert_mappings(Document, [
+        {'title': f'Bulk {i}', 'markdown_content': random_text(i % 2), 'html_content': ''}
+        for i in range(4)
+    ])
+    db.session.commit()
+    assert not minhash_index.is_complete()
+
+    result = minhash_index.rebuild(batch_size=3)
+
+    assert result['documents_scanned'] == 4
+    assert result['documents_updated'] == 4
+    assert minhash_index.is_complete()
+    assert minhash_index.rebuild()['documents_updated'] == 0
+
+    duplicates = document_clustering_service.detect_document_duplicates(
+        similarity_threshold=0.9, document_query=Document.query
+    )
+    assert duplicates['method'] == 'minhash_lsh'
+    assert duplicates['duplicate_stats']['total_duplicates'] == 2
+
+
+def test_documents_without_shingles_count_as_indexed(app, corpus):
+    blank = Document(title='Blank', markdown_content='   \n\t ', is_public=True)
+    db.session.add(blank)
+    db.session.bulk_insert_mappings(Document, [{'title': 'Rule', 'markdown_content': '---', 'html_content': ''}])
+    db.session.commit()
+    assert db.session.get(DocumentMinHash, blank.id).signature == []
+    assert not minhash_index.is_complete()
+
+    assert minhash_index.rebuild()['documents_updated'] == 1
+
+    assert minhash_index.is_complete()
+    assert minhash_index.rebuild()['documents_updated'] == 0
+    duplicates = document_clustering_service.detect_document_duplicates(
+        similarity_threshold=0.7, document_query=Document.query
+    )
+    assert duplicates['method'] == 'minhash_lsh'
+
+
+def test_duplicates_endpoint_uses_index(client, corpus):
+    response = client.post('/api/clustering/duplicates', json={'scope': 'public', 'threshold': 0.7})
+
+    assert response.status_code == 200
+    results = response.get_json()['duplicates']
+    assert results['method'] == 'minhash_lsh'
+    assert results['duplicate_stats']['total_duplicates'] == 1
+    assert results['duplicates'][0]['duplicate_type'] in ('author_near_duplicate', 'exact_duplicate')
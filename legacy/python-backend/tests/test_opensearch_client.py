@@ -0,0 +1,159 @@
+"""
+Tests for the pooled OpenSearch client: lazy connect, per-operation timeouts,
+the circuit breaker and the PostgreSQL fallback while it is open.
+"""
+import pytest
+from opensearchpy.exceptions import SerializationError
+
+from app import db
+from app.models.document import Document
+from app.services import opensearch_service as opensearch_module
+from app.services.opensearch_client import CircuitBreaker, CircuitOpenError, operation_for
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def service(fake_opensearch, clock):
+    return fake_opensearch.service(breaker=CircuitBreaker(failure_threshold=3, reset_timeout=30, clock=clock))
+
+
+def test_creating_the_service_makes_no_requests(fake_opensearch):
+    fake_opensearch.unavailable = True
+
+    service = fake_opensearch.service()
+
+    assert fake_opensearch.requests == []
+    assert service.is_available()
+
+
+def test_requests_reuse_pooled_keep_alive_connections(service, fake_opensearch):
+    fake_opensearch.indices['minky_documents'] = {'1': {'id': 1, 'title': '문서'}}
+
+    for _ in range(20):
+        service.search_documents('문서')
+
+    pool = service.get_client_metrics()['pool']
+    assert pool['connections_created'] == 1
+    assert pool['requests'] == 20
+    assert pool['in_use'] == 0
+
+
+def test_operations_get_their_own_timeouts(fake_opensearch):
+    service = fake_opensearch.service(timeouts={'search': 0.2})
+    fake_opensearch.indices['minky_documents'] = {}
+    fake_opensearch.delay = 0.5
+
+    result = service.search_documents('문서')
+
+    assert result['error'] and not result.get('error_code')
+    assert service.get_client_metrics()['requests']['search']['timeouts'] == 1
+    # Index administration keeps its longer timeout
+    assert service.client.indices.create(index='minky_documents_v2')['acknowledged']
+
+
+def test_breaker_opens_after_consecutive_failures_and_fails_fast(service, fake_opensearch):
+    fake_opensearch.unavailable = True
+    for _ in range(3):
+        service.search_documents('문서')
+    sent = len(fake_opensearch.requests)
+
+    assert service.breaker.state == CircuitBreaker.OPEN
+    assert not service.is_available()
+    with pytest.raises(CircuitOpenError):
+        service.client.count(index='minky_documents')
+    assert len(fake_opensearch.requests) == sent
+    assert service.get_client_metrics()['breaker']['rejected'] == 1
+
+
+def test_half_open_probe_closes_or_reopens_the_breaker(service, fake_opensearch, clock):
+    fake_opensearch.unavailable = True
+    for _ in range(3):
+        service.search_documents('문서')
+
+    clock.now += 30
+    assert service.breaker.state == CircuitBreaker.HALF_OPEN
+    service.search_documents('문서')  # the probe fails
+    assert service.breaker.state == CircuitBreaker.OPEN
+
+    fake_opensearch.unavailable = False
+    fake_opensearch.indices['minky_documents'] = {}
+    clock.now += 30
+    assert service.breaker.allow()
+    assert not service.breaker.allow()  # one probe at a time
+    service.breaker.record_success()
+    assert service.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_probe_failing_outside_the_transport_releases_the_breaker(service, fake_opensearch, clock):
+    fake_opensearch.unavailable = True
+    for _ in range(3):
+        service.search_documents('문서')
+    fake_opensearch.unavailable = False
+    fake_opensearch.indices['minky_documents'] = {}
+
+    clock.now += 30
+    with pytest.raises(SerializationError):
+        service.client.count(index='minky_documents', body={'query': object()})  # the probe's body cannot be encoded
+    assert service.breaker.state == CircuitBreaker.OPEN
+
+    clock.now += 30
+    assert service.client.count(index='minky_documents')['count'] == 0
+    assert service.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_client_errors_do_not_trip_the_breaker(service):
+    for _ in range(5):
+        assert service.get_document_statistics() == {}  # missing index: 404
+
+    assert service.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_search_falls_back_to_postgresql_while_the_breaker_is_open(client, app, service, fake_opensearch,
+                                                                    monkeypatch):
+    monkeypatch.setattr(opensearch_module, 'opensearch_service', service)
+    db.session.add(Document(title='한국어 문서', markdown_content='검색 내용', is_public=True))
+    db.session.commit()
+    fake_opensearch.unavailable = True
+
+    responses = [client.post('/api/search/korean', json={'query': '문서', 'use_opensearch': True})
+                 for _ in range(5)]
+
+    assert all(response.status_code == 200 for response in responses)
+    assert all(response.get_json()['search_engine'] == 'postgresql' for response in responses)
+    assert all(response.get_json()['pagination']['total'] == 1 for response in responses)
+    # Three failed searches (each retried once) opened the breaker; the last two never reached the cluster
+    assert len(fake_opensearch.requests) == 6
+
+
+def test_metrics_endpoint_reports_pool_requests_and_breaker(client, service, fake_opensearch, admin_headers,
+                                                            monkeypatch):
+    monkeypatch.setattr(opensearch_module, 'opensearch_service', service)
+    fake_opensearch.indices['minky_documents'] = {}
+    service.search_documents('문서')
+
+    metrics = client.get('/api/search/opensearch/metrics', headers=admin_headers).get_json()['metrics']
+
+    assert metrics['breaker']['state'] == 'closed'
+    assert metrics['requests']['search']['requests'] == 1
+    assert metrics['requests']['search']['latency_ms']['p50'] is not None
+    assert metrics['timeouts']['search'] == 5.0
+
+
+def test_operation_classes():
+    assert operation_for('POST', '/minky_documents/_search') == 'search'
+    assert operation_for('POST', '/_bulk?refresh=true') == 'bulk'
+    assert operation_for('PUT', '/minky_documents/_doc/1') == 'index'
+    assert operation_for('GET', '/minky_documents/_doc/1') == 'search'
+    assert operation_for('PUT', '/minky_documents_v2') == 'admin'
@@ -0,0 +1,133 @@
+"""
+Tests for cursor (point-in-time + search_after) pagination and export in OpenSearchService.
+"""
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services import opensearch_service as opensearch_module
+
+BASE_TIME = datetime(2024, 1, 1)
+
+
+@pytest.fixture
+def search_index(fake_opensearch):
+    """25 documents; pairs share updated_at so the id tiebreaker matters"""
+    fake_opensearch.indices['minky_documents'] = {
+        str(i): {'id': i, 'title': f'문서 {i}', 'is_public': True,
+                 'updated_at': (BASE_TIME + timedelta(minutes=i // 2)).isoformat()}
+        for i in range(1, 26)
+    }
+    return fake_opensearch
+
+
+@pytest.fixture
+def service(search_index):
+    return search_index.service()
+
+
+def expected_order():
+    return sorted(range(1, 26), key=lambda i: (i // 2, i), reverse=True)
+
+
+def walk(service, per_page=10, **kwargs):
+    result = service.search_documents('문서', per_page=per_page, **kwargs)
+    pages = [result]
+    while result['next_cursor']:
+        result = service.search_documents('문서', per_page=per_page, cursor=result['next_cursor'], **kwargs)
+        pages.append(result)
+    return pages
+
+
+def ids(pages):
+    return [doc['id'] for page in pages for doc in page['documents']]
+
+
+def test_cursor_walk_returns_every_document_once_in_sort_order(service, search_index):
+    pages = walk(service)
+
+    assert ids(pages) == expected_order()
+    assert [len(page['documents']) for page in pages] == [10, 10, 5]
+    assert pages[0]['page'] == 1 and pages[1]['page'] is None
+    assert pages[-1]['next_cursor'] is None
+    assert search_index.pits == {}  # closed after the last page
+
+
+def test_shallow_page_numbers_still_work(service):
+    page_two = service.search_documents('문서', page=2, per_page=10)
+
+    assert [doc['id'] for doc in page_two['documents']] == expected_order()[10:20]
+    assert page_two['total'] == 25 and page_two['pages'] == 3
+
+
+def test_deep_page_numbers_are_refused(service):
+    result = service.search_documents('문서', page=600, per_page=20)
+
+    assert result['error_code'] == 'page_too_deep'
+    assert result['documents'] == []
+
+
+def test_cursor_sees_a_consistent_snapshot(service, search_index):
+    first = service.search_documents('문서', per_page=10)
+    second = service.search_documents('문서', per_page=10, cursor=first['next_cursor'])
+    # Written after the point in time was opened: a newer document sorting first
+    search_index.indices['minky_documents']['99'] = {'id': 99, 'updated_at': '2030-01-01T00:00:00'}
+    rest = walk(service, per_page=10, cursor=second['next_cursor']) if second['next_cursor'] else []
+
+    assert ids([first, second] + rest) == expected_order()
+
+
+def test_cursor_is_bound_to_its_query(service):
+    cursor = service.search_documents('문서', per_page=10)['next_cursor']
+
+    assert service.search_documents('다른 검색어', per_page=10, cursor=cursor)['error_code'] == 'invalid_cursor'
+    assert service.search_documents('문서', per_page=10, cursor=cursor, user_id=7)['error_code'] == 'invalid_cursor'
+    assert service.search_documents('문서', per_page=10, cursor='not-a-cursor')['error_code'] == 'invalid_cursor'
+
+
+def test_expired_point_in_time_is_reopened_at_the_cursor_position(service, search_index):
+    first = service.search_documents('문서', per_page=10)
+    second = service.search_documents('문서', per_page=10, cursor=first['next_cursor'])
+    search_index.pits.clear()  # keep_alive ran out
+
+    third = service.search_documents('문서', per_page=10, cursor=second['next_cursor'])
+
+    assert ids([first, second, third]) == expected_order()
+
+
+def test_export_iterates_the_whole_result_set(service, search_index):
+    exported = [doc['id'] for doc in service.iter_search_results('문서', batch_size=4)]
+
+    assert exported == expected_order()
+    assert search_index.pits == {}
+
+
+def test_abandoned_export_closes_its_point_in_time(service, search_index):
+    results = service.iter_search_results('문서', batch_size=4)
+    next(results)
+    assert len(search_index.pits) == 1
+
+    results.close()
+
+    assert search_index.pits == {}
+
+
+def test_search_routes_use_cursors_and_stream_exports(client, service, monkeypatch):
+    monkeypatch.setattr(opensearch_module, 'opensearch_service', service)
+
+    first = client.post('/api/search/korean', json={'query': '문서', 'use_opensearch': True, 'per_page': 20})
+    cursor = first.get_json()['pagination']['next_cursor']
+    second = client.post('/api/search/korean', json={'query': '문서', 'use_opensearch': True, 'per_page': 20,
+                                                     'cursor': cursor})
+    tampered = client.post('/api/search/korean', json={'query': '다른', 'use_opensearch': True, 'per_page': 20,
+                                                       'cursor': cursor})
+    export = client.post('/api/search/korean/export', json={'query': '문서'})
+
+    assert [doc['id'] for doc in second.get_json()['documents']] == expected_order()[20:]
+    assert second.get_json()['pagination']['next_cursor'] is None
+    assert tampered.status_code == 400
+    lines = [json.loads(line) for line in export.get_data(as_text=True).splitlines()]
+    assert export.mimetype == 'application/x-ndjson'
+    assert lines[0]['type'] == 'header' and lines[-1] == {'type': 'end', 'count': 25}
+    assert [line['document']['id'] for line in lines[1:-1]] == expected_order()
@@ -0,0 +1,212 @@
+"""
+Tests for operational transform in collaborative sessions: concurrent edits
+from many simulated clients, delivered in any order, must leave every client
+with the server's text.
+"""
+import random
+from collections import deque
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from app import db, socketio
+from app.models.document import Document
+from app.models.user import User
+from app.services import collaboration_service as collaboration
+from app.services.collaboration_service import CollaborationService, StaleRevisionError
+from app.services.operational_transform import fits, to_primitives, transform
+
+ALPHABET = 'ab \n한'
+
+
+def random_operation(rng, text):
+    position = rng.randint(0, len(text))
+    kind = rng.choice(['insert', 'insert', 'delete', 'replace'])
+    if kind == 'insert' or position == len(text):
+        return {'type': 'insert', 'position': position,
+                'text': ''.join(rng.choice(ALPHABET) for _ in range(rng.choice([1, 1, 3])))}
+    operation = {'type': kind, 'position': position, 'length': rng.randint(1, min(4, len(text) - position))}
+    if kind == 'replace':
+        operation['text'] = rng.choice(['', 'x', 'yz'])
+    return operation
+
+
+def apply_steps(text, steps):
+    assert fits(steps, len(text))
+    for step in steps:
+        position = step['position']
+        if step['type'] == 'insert':
+            text = text[:position] + step['text'] + text[position:]
+        else:
+            text = text[:position] + text[position + step['length']:]
+    return text
+
+
+def random_steps(rng, text, edits):
+    steps = []
+    for _ in range(edits):
+        operation_steps = to_primitives(random_operation(rng, text))
+        text = apply_steps(text, operation_steps)
+        steps += operation_steps
+    return steps
+
+
+class SimulatedClient:
+    """An editor with at most one batch of edits awaiting acknowledgement, like the web client"""
+
+    def __init__(self, name, text):
+        self.name = name
+        self.text = text
+        self.revision = 0
+        self.inflight = None
+        self.buffer = []
+        self.outbox = deque()
+        self.delivered = {}
+
+    def edit(self, rng):
+        steps = to_primitives(random_operation(rng, self.text))
+        self.text = apply_steps(self.text, steps)
+        if self.inflight is None:
+            self.inflight = steps
+            self.outbox.append((steps, self.revision))
+        else:
+            self.buffer += steps
+
+    def receive(self, revision, steps):
+        """steps is None for an acknowledgement of this client's own batch"""
+        self.delivered[revision] = steps
+        while self.revision + 1 in self.delivered:
+            self.revision += 1
+            steps = self.delivered.pop(self.revision)
+            if steps is None:
+                self.inflight = None
+                if self.buffer:
+                    self.inflight, self.buffer = self.buffer, []
+                    self.outbox.append((self.inflight, self.revision))
+                continue
+            if self.inflight:
+                self.inflight, steps = transform(self.inflight, steps)
+            if self.buffer:
+                self.buffer, steps = transform(self.buffer, steps)
+            self.text = apply_steps(self.text, steps)
+
+
+@pytest.mark.parametrize('seed', range(40))
+def test_transform_satisfies_convergence_property(seed):
+    rng = random.Random(seed)
+    text = ''.join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 12)))
+    for _ in range(50):
+        a = random_steps(rng, text, rng.randint(1, 3))
+        b = random_steps(rng, text, rng.randint(1, 3))
+        a_rebased, b_rebased = transform(a, b)
+        assert apply_steps(apply_steps(text, a), b_rebased) == apply_steps(apply_steps(text, b), a_rebased)
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_concurrent_clients_converge(seed):
+    rng = random.Random(seed)
+    service = CollaborationService(socketio=None)
+    initial = 'shared notes\n' * 3
+    service._load_session('1', initial)
+    clients = [SimulatedClient(i, initial) for i in range(rng.randint(2, 8))]
+    in_transit = {client.name: [] for client in clients}
+
+    def server_step(client):
+        steps, revision = client.outbox.popleft()
+        new_revision, applied = service._commit_operation('1', steps, revision, user_id=client.name)
+        for other in clients:
+            in_transit[other.name].append((new_revision, None if other is client else applied))
+
+    def deliver(client):
+        # Messages may arrive in any order; clients apply them by revision
+        pending = in_transit[client.name]
+        client.receive(*pending.pop(rng.randrange(len(pending))))
+
+    for _ in range(600):
+        client = rng.choice(clients)
+        action = rng.random()
+        if action < 0.4:
+            client.edit(rng)
+        elif action < 0.7 and client.outbox:
+            server_step(client)
+        elif in_transit[client.name]:
+            deliver(client)
+
+    while any(client.outbox or in_transit[client.name] for client in clients):
+        for client in clients:
+            while client.outbox:
+                server_step(client)
+            while in_transit[client.name]:
+                deliver(client)
+
+    session = service.active_sessions['1']
+    assert session['revision'] > 0
+    for client in clients:
+        assert client.revision == session['revision']
+        assert client.text == session['buffer'].text
+
+
+def test_stale_revisions_must_resync():
+    service = CollaborationService(socketio=None)
+    service.MAX_OPERATION_QUEUE_SIZE = 5
+    service._load_session('1', 'abc')
+    for _ in range(6):
+        service._commit_operation('1', [{'type': 'insert', 'position': 0, 'text': 'x'}], None, user_id=1)
+
+    with pytest.raises(StaleRevisionError):
+        service._commit_operation('1', [{'type': 'delete', 'position': 0, 'length': 1}], 0, user_id=2)
+    # Revision 1 is still rebasable: its delete of the first 'x' is transformed past five inserts
+    assert service._commit_operation('1', [{'type': 'delete', 'position': 0, 'length': 1}], 1, user_id=2) == \
+        (7, [{'type': 'delete', 'position': 5, 'length': 1}])
+    assert service._snapshot('1') == {'document_id': '1', 'content': 'xxxxxabc', 'revision': 7}
+    assert service._commit_operation('1', [{'type': 'insert', 'position': 0, 'text': 'x'}], 8, user_id=2) is None
+
+
+def insert_at(document_id, position, text, revision):
+    return {'document_id': document_id, 'operation': {'type': 'insert', 'position': position, 'text': text},
+            'revision': revision}
+
+
+def test_rejected_batch_resyncs_and_editing_resumes(app, auth_headers, sample_user, monkeypatch):
+    service = collaboration.get_collaboration_service()
+    monkeypatch.setattr(service, 'OPERATION_RATE_LIMIT', 1)
+    document = Document(title='Shared', markdown_content='hello', user_id=sample_user)
+    db.session.add(document)
+    db.session.commit()
+
+    socket = socketio.test_client(app, headers=auth_headers)
+    try:
+        socket.emit('join_document', {'document_id': document.id})
+        socket.emit('text_operation', insert_at(document.id, 0, 'a', 0))
+        # The client applied 'b' locally and holds it in flight; the rate limit drops it
+        socket.emit('text_operation', insert_at(document.id, 1, 'b', 1))
+        received = [(m['name'], m['args'][0]) for m in socket.get_received() if m['name'] != 'collaboration_frame']
+        assert [name for name, _ in received] == ['document_joined', 'operation_ack', 'error', 'document_resync']
+        assert received[-1][1] == {'document_id': str(document.id), 'content': 'ahello', 'revision': 1}
+
+        # A minute later the bucket has refilled
+        service.user_rate_buckets.pop(sample_user)
+        socket.emit('text_operation', insert_at(document.id, 1, 'c', 1))
+        assert [m['args'][0] for m in socket.get_received() if m['name'] == 'operation_ack'] == [{'revision': 2}]
+        assert service.active_sessions[str(document.id)]['buffer'].text == 'achello'
+    finally:
+        socket.disconnect()
+
+
+def test_denied_batch_resyncs_the_reader(app, sample_user):
+    reader = User(username='reader', email='reader@example.com', password='TestPassword123!')
+    db.session.add(reader)
+    document = Document(title='Public', markdown_content='hello', user_id=sample_user, is_public=True)
+    db.session.add(document)
+    db.session.commit()
+
+    socket = socketio.test_client(app, headers={
+        'Authorization': f'Bearer {create_access_token(identity=str(reader.id))}'})
+    try:
+        socket.emit('join_document', {'document_id': document.id})
+        socket.emit('text_operation', insert_at(document.id, 0, 'x', 0))
+        received = [(m['name'], m['args'][0]) for m in socket.get_received()]
+        assert [name for name, _ in received] == ['document_joined', 'error', 'document_resync']
+        assert received[-1][1]['content'] == 'hello'
+    finally:
+        socket.disconnect()
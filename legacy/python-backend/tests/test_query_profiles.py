@@ -0,0 +1,133 @@
+"""
+Tests for Document query profiles: list pages load only the columns and
+relationships their serializer reads, measured in statements and in bytes the
+database returns.
+"""
+import pytest
+from sqlalchemy import event
+
+from app import db
+from app.models.category import Category
+from app.models.document import Document, PREVIEW_CHARS
+from app.models.user import User
+
+BODY_CHARS = 20_000
+
+
+@pytest.fixture
+def large_documents(app):
+    """30 public documents with 20KB bodies, an owner, a category and tags"""
+    owner = User(username='writer', email='writer@example.com', password='TestPassword123!')
+    category = Category(name='Runbooks')
+    db.session.add_all([owner, category])
+    db.session.flush()
+
+    documents = []
+    for i in range(30):
+        body = f'# Runbook {i}\n\n' + ('All work and no play. ' * (BODY_CHARS // 22))
+        doc = Document(title=f'Runbook {i}', markdown_content=body, user_id=owner.id)
+        doc.category_id = category.id
+        doc.add_tags([f'ops{i % 3}'])
+        documents.append(doc)
+    db.session.add_all(documents)
+    db.session.commit()
+    return [doc.id for doc in documents]
+
+
+@pytest.fixture
+def fetched():
+    """Record statements with their parameters; .bytes() re-runs them and sizes the rows returned"""
+    class Fetched:
+        def __init__(self):
+            self.statements = []
+
+        def record(self, conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith('SELECT'):
+                self.statements.append((statement, parameters))
+
+        def bytes(self):
+            total = 0
+            connection = db.session.connection()
+            for statement, parameters in self.statements:
+                for row in connection.exec_driver_sql(statement, parameters):
+                    total += sum(len(str(value).encode('utf-8')) for value in row if value is not None)
+            return total
+
+        def __enter__(self):
+            event.listen(db.engine, 'before_cursor_execute', self.record)
+            return self
+
+        def __exit__(self, *exc):
+            event.remove(db.engine, 'before_cursor_execute', self.record)
+
+    return Fetched
+
+
+def load_page(profile, ids):
+    db.session.expire_all()
+    query = Document.query.options(*Document.profile_options(profile)).filter(Document.id.in_(ids))
+    return Document.profile_serializer(profile)(query.order_by(Document.id))
+
+
+@pytest.mark.parametrize('profile, statements, max_bytes', [
+    ('list', 2, 5_000),    # documents, tags
+    ('card', 2, 25_000),   # documents joined with owners and categories, tags
+])
+def test_list_profiles_never_fetch_bodies(large_documents, fetched, profile, statements, max_bytes):
+    for size in (5, 20):
+        with fetched() as run:
+            page = load_page(profile, large_documents[:size])
+        assert len(page) == size
+        assert len(run.statements) == statements
+        # Well under one body, let alone 20 (markdown and rendered HTML each)
+        assert run.bytes() < max_bytes * size / 20
+
+
+def test_full_profile_loads_everything_in_fixed_statements(large_documents, fetched):
+    with fetched() as run:
+        page = load_page('full', large_documents[:20])
+
+    assert len(run.statements) == 2
+    assert run.bytes() > 20 * 2 * BODY_CHARS
+    assert page[0]['markdown_content'].startswith('# Runbook 0')
+
+
+def test_profile_serializers_agree_with_full_serialization(large_documents):
+    full = {doc['id']: doc for doc in load_page('full', large_documents)}
+
+    for lite in load_page('list', large_documents):
+        assert lite == {key: full[lite['id']][key] for key in lite}
+    for card in load_page('card', large_documents):
+        expected = full[card['id']]
+        assert card['preview'] == expected['markdown_content'][:PREVIEW_CHARS]
+        assert {key: value for key, value in card.items() if key != 'preview'} == \
+            {key: expected[key] for key in card if key != 'preview'}
+
+
+def test_by_date_cards_carry_tag_chips(client, large_documents):
+    year = db.session.get(Document, large_documents[0]).created_at.year
+
+    response = client.get(f'/api/documents/by-date?date_key={year}&per_page=5')
+
+    assert response.status_code == 200
+    documents = response.get_json()['documents']
+    assert documents
+    for card in documents:
+        [tag] = card['tags']
+        assert set(tag) == {'id', 'name', 'slug', 'color'}
+        assert card['tag_names'] == [tag['name']]
+
+
+def test_list_endpoints_transfer_no_bodies(client, admin_headers, large_documents, fetched):
+    year = db.session.get(Document, large_documents[0]).created_at.year
+    category_id = db.session.get(Document, large_documents[0]).category_id
+    for url, headers in [
+        ('/api/documents?per_page=20', None),
+        (f'/api/documents/by-date?date_key={year}&per_page=20', None),
+        (f'/api/categories/{category_id}/documents?per_page=20', None),
+        ('/api/admin/documents?per_page=20', admin_headers),
+    ]:
+        with fetched() as run:
+            response = client.get(url, headers=headers)
+        assert response.status_code == 200, url
+        assert run.bytes() < 40_000, url
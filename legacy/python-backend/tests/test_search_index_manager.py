@@ -0,0 +1,161 @@
+"""
+Tests for zero-downtime search index rebuilds behind read/write aliases.
+"""
+import pytest
+from sqlalchemy import text
+
+from app import db
+from app.models.document import Document
+from app.services.search_index_manager import SearchIndexManager
+from app.services.search_indexer import SearchIndexer
+from app.services.search_reindexer import SearchReindexer
+
+
+@pytest.fixture
+def documents(app):
+    docs = [Document(title=f'문서 {i}', markdown_content=f'한국어 검색 내용 {i}') for i in range(5)]
+    db.session.add_all(docs)
+    db.session.commit()
+    return [doc.id for doc in docs]
+
+
+@pytest.fixture
+def service(fake_opensearch):
+    service = fake_opensearch.service()
+    assert service.create_document_index()
+    return service
+
+
+@pytest.fixture
+def manager(service):
+    return SearchIndexManager(service=service, sample_size=10)
+
+
+def live_index(fake_opensearch):
+    return fake_opensearch.resolve('minky_documents')
+
+
+def test_first_index_is_a_version_behind_both_aliases(service, fake_opensearch):
+    assert live_index(fake_opensearch) == ['minky_documents_v1']
+    assert fake_opensearch.aliases['minky_documents_write'] == {'minky_documents_v1': {'is_write_index': True}}
+    assert service.get_document_write_indices() == ['minky_documents_v1']
+
+
+def test_rebuild_swaps_aliases_and_keeps_previous_version(documents, manager, fake_opensearch):
+    report = manager.rebuild(workers=1)
+
+    assert report['status'] == 'completed'
+    assert report['verification']['ok'] is True
+    assert report['verification']['sampled'] == 5
+    assert report['replaced_indices'] == ['minky_documents_v1']
+    assert live_index(fake_opensearch) == ['minky_documents_v2']
+    assert fake_opensearch.aliases['minky_documents_write'] == {'minky_documents_v2': {'is_write_index': True}}
+    assert sorted(int(doc_id) for doc_id in fake_opensearch.documents('minky_documents')) == documents
+    # Previous version kept for rollback, no longer written to
+    assert 'minky_documents_v1' in fake_opensearch.indices
+
+    versions = manager.list_versions()['versions']
+    assert [(v['version'], v['read'], v['documents']) for v in versions] == [(2, True, 5), (1, False, 0)]
+
+
+def test_retention_drops_versions_beyond_the_limit(documents, manager, fake_opensearch):
+    manager.rebuild(workers=1)
+    report = manager.rebuild(workers=1)
+
+    assert report['deleted_indices'] == ['minky_documents_v1']
+    assert sorted(fake_opensearch.indices) == ['minky_documents_v2', 'minky_documents_v3']
+
+
+def test_rebuild_replaces_a_legacy_concrete_index(documents, fake_opensearch):
+    service = fake_opensearch.service()
+    service.client.indices.create(index='minky_documents')
+    fake_opensearch.indices['minky_documents']['999'] = {'title': 'stale'}
+    assert service.get_document_write_indices() == ['minky_documents']
+
+    report = SearchIndexManager(service=service).rebuild(workers=1)
+
+    assert report['status'] == 'completed'
+    assert report['replaced_indices'] == ['minky_documents']
+    assert live_index(fake_opensearch) == ['minky_documents_v1']
+    assert '999' not in fake_opensearch.documents('minky_documents')
+
+
+def test_live_changes_reach_both_indices_during_a_rebuild(documents, manager, service, fake_opensearch, app):
+    app.config['SEARCH_OUTBOX_ENABLED'] = True
+    new_index = manager.prepare(service)
+    assert service.get_document_write_indices() == ['minky_documents_v1', new_index]
+
+    document = db.session.get(Document, documents[0])
+    document.title = '수정된 제목'
+    doomed = db.session.get(Document, documents[1])
+    db.session.delete(doomed)
+    db.session.commit()
+    SearchIndexer(service=service).drain()
+
+    for index in ('minky_documents_v1', new_index):
+        assert fake_opensearch.indices[index][str(documents[0])]['title'] == '수정된 제목'
+        assert str(documents[1]) not in fake_opensearch.indices[index]
+
+
+def test_stale_rebuild_writes_lose_to_newer_live_writes(documents, manager, service, fake_opensearch, app):
+    app.config['SEARCH_OUTBOX_ENABLED'] = True
+    new_index = manager.prepare(service)
+    reindexer = SearchReindexer(service=service, workers=1)
+    # The rebuild read these before the live changes below were indexed
+    stale = [payload for batch in reindexer._read_batches(0) for payload in batch][:2]
+
+    document = db.session.get(Document, documents[0])
+    document.title = '최신 제목'
+    db.session.delete(db.session.get(Document, documents[1]))
+    db.session.commit()
+    SearchIndexer(service=service).drain()
+
+    _, failed = reindexer._index_batch(service, new_index, stale)
+
+    assert failed == []  # version conflicts are not failures
+    assert fake_opensearch.indices[new_index][str(documents[0])]['title'] == '최신 제목'
+    assert str(documents[1]) not in fake_opensearch.indices[new_index]
+
+
+def test_searches_keep_using_the_live_index_until_the_swap(documents, manager, service, fake_opensearch, monkeypatch):
+    SearchReindexer(service=service, workers=1).run()
+    seen = []
+    index_batch = SearchReindexer._index_batch
+
+    def index_batch_and_search(self, *args):
+        result = index_batch(self, *args)
+        seen.append((service.search_documents('문서')['total'], live_index(fake_opensearch)))
+        return result
+
+    monkeypatch.setattr(SearchReindexer, '_index_batch', index_batch_and_search)
+    manager.rebuild(batch_size=2, workers=1)
+
+    assert seen == [(5, ['minky_documents_v1'])] * 3
+    assert service.search_documents('문서')['total'] == 5
+    assert live_index(fake_opensearch) == ['minky_documents_v2']
+
+
+def test_failed_verification_keeps_the_live_index(documents, manager, fake_opensearch, monkeypatch):
+    run = SearchReindexer.run
+
+    def run_then_diverge(self, *args, **kwargs):
+        report = run(self, *args, **kwargs)
+        # A change that bypassed the outbox: the new index no longer matches the database
+        db.session.execute(text('UPDATE documents SET title = :title WHERE id = :id'),
+                           {'title': 'changed', 'id': documents[0]})
+        db.session.commit()
+        return report
+
+    monkeypatch.setattr(SearchReindexer, 'run', run_then_diverge)
+    report = manager.rebuild(workers=1)
+
+    assert report['status'] == 'verification_failed'
+    assert report['verification']['mismatches'] == [{'id': documents[0], 'fields': ['title']}]
+    assert live_index(fake_opensearch) == ['minky_documents_v1']
+    assert sorted(fake_opensearch.indices) == ['minky_documents_v1']
+    assert fake_opensearch.aliases['minky_documents_write'] == {'minky_documents_v1': {'is_write_index': True}}
+
+
+def test_version_endpoints_need_opensearch(client, admin_headers):
+    assert client.get('/api/search/index/versions', headers=admin_headers).status_code == 503
+    assert client.post('/api/search/index/versions', headers=admin_headers, json={}).status_code == 503
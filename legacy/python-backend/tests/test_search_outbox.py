@@ -0,0 +1,157 @@
+"""
+Tests for the search outbox and the background OpenSearch bulk indexer.
+"""
+from datetime import timedelta
+
+import pytest
+from app import db
+from app.models.document import Document
+from app.models.search_outbox import SearchOutbox
+from app.services.search_indexer import SearchIndexer
+from app.utils.datetime_utils import utc_now
+
+
+@pytest.fixture
+def outbox_app(app):
+    app.config['SEARCH_OUTBOX_ENABLED'] = True
+    return app
+
+
+@pytest.fixture
+def indexer(fake_opensearch):
+    return SearchIndexer(service=fake_opensearch.service())
+
+
+def outbox_rows():
+    return [(row.document_id, row.operation) for row in SearchOutbox.query.order_by(SearchOutbox.id)]
+
+
+def test_outbox_is_off_by_default(app):
+    db.session.add(Document(title='Draft', markdown_content='body'))
+    db.session.commit()
+
+    assert outbox_rows() == []
+
+
+def test_document_writes_record_outbox_rows_in_their_transaction(outbox_app):
+    document = Document(title='Draft', markdown_content='body')
+    db.session.add(document)
+    db.session.commit()
+    doc_id = document.id
+
+    document.title = 'Renamed'
+    db.session.commit()
+    db.session.delete(document)
+    db.session.commit()
+
+    assert outbox_rows() == [(doc_id, 'upsert'), (doc_id, 'upsert'), (doc_id, 'delete')]
+
+    db.session.add(Document(title='Rolled back', markdown_content='body'))
+    db.session.flush()
+    db.session.rollback()
+    assert len(outbox_rows()) == 3
+
+
+def test_indexer_coalesces_repeated_updates(outbox_app, indexer, fake_opensearch):
+    document = Document(title='v1', markdown_content='한국어 검색 문서')
+    db.session.add(document)
+    db.session.commit()
+    for version in ('v2', 'v3', 'v4'):
+        document.title = version
+        db.session.commit()
+
+    result = indexer.drain_once()
+
+    assert result == {'changes': 4, 'documents': 1, 'failed': 0, 'duration_seconds': result['duration_seconds']}
+    assert fake_opensearch.requests.count(('POST', '/_bulk')) == 1
+    indexed = fake_opensearch.indices['minky_documents'][str(document.id)]
+    assert indexed['title'] == 'v4'
+    assert indexed['language'] == 'korean'
+    assert outbox_rows() == []
+
+    metrics = indexer.get_metrics()
+    assert metrics['changes_coalesced'] == 3
+    assert metrics['documents_indexed'] == 1
+    assert metrics['lag_seconds']['samples'] == 1
+
+
+def test_deletes_are_applied_and_missing_documents_ignored(outbox_app, indexer, fake_opensearch):
+    kept = Document(title='Kept', markdown_content='body')
+    removed = Document(title='Removed', markdown_content='body')
+    db.session.add_all([kept, removed])
+    db.session.commit()
+    indexer.drain_once()
+
+    db.session.delete(removed)
+    db.session.commit()
+    # A delete for a document the index never saw is not a failure
+    db.session.add(SearchOutbox(document_id=9999, operation='delete'))
+    db.session.commit()
+
+    result = indexer.drain_once()
+
+    assert result['failed'] == 0
+    assert set(fake_opensearch.indices['minky_documents']) == {str(kept.id)}
+    assert outbox_rows() == []
+
+
+def test_failed_documents_back_off_and_retry(outbox_app, indexer, fake_opensearch):
+    good = Document(title='Good', markdown_content='body')
+    bad = Document(title='Bad', markdown_content='body')
+    db.session.add_all([good, bad])
+    db.session.commit()
+    fake_opensearch.fail_ids.add(str(bad.id))
+
+    assert indexer.drain_once()['failed'] == 1
+
+    row = SearchOutbox.query.one()
+    assert row.document_id == bad.id
+    assert row.attempts == 1
+    assert 'fake_failure' in row.last_error
+    assert indexer.drain_once()['changes'] == 0  # still backing off
+
+    fake_opensearch.fail_ids.clear()
+    row.available_at = utc_now() - timedelta(seconds=1)
+    db.session.commit()
+    assert indexer.drain_once()['failed'] == 0
+    assert set(fake_opensearch.indices['minky_documents']) == {str(good.id), str(bad.id)}
+
+
+def test_unavailable_cluster_never_blocks_writes(outbox_app, indexer, fake_opensearch):
+    fake_opensearch.unavailable = True
+    db.session.add(Document(title='Written', markdown_content='body'))
+    db.session.commit()
+
+    result = indexer.drain_once()
+
+    assert result['failed'] == 1
+    assert SearchOutbox.query.one().attempts == 1
+
+
+def test_rows_past_max_attempts_are_reported_not_retried(outbox_app, indexer):
+    db.session.add(SearchOutbox(document_id=1, operation='upsert', attempts=SearchIndexer.MAX_ATTEMPTS))
+    db.session.commit()
+
+    assert indexer.drain_once()['changes'] == 0
+    backlog = indexer.get_backlog()
+    assert backlog['pending_changes'] == 0
+    assert backlog['failed_changes'] == 1
+
+
+def test_backlog_endpoint_reports_oldest_pending_change(outbox_app, client, admin_headers):
+    db.session.add(SearchOutbox(document_id=1, operation='upsert', created_at=utc_now() - timedelta(minutes=5)))
+    db.session.add(SearchOutbox(document_id=1, operation='upsert'))
+    db.session.commit()
+
+    response = client.get('/api/search/index/backlog', headers=admin_headers)
+
+    assert response.status_code == 200
+    backlog = response.get_json()['backlog']
+    assert backlog['pending_changes'] == 2
+    assert backlog['pending_documents'] == 1
+    assert backlog['oldest_pending_age_seconds'] >= 300
+    assert backlog['outbox_enabled'] is True
+
+
+def test_backlog_endpoint_requires_admin(client, auth_headers):
+    assert client.get('/api/search/index/backlog', headers=auth_headers).status_code == 403
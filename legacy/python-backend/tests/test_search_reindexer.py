@@ -0,0 +1,102 @@
+"""
+Tests for the streaming, checkpointed OpenSearch reindexer.
+"""
+import pytest
+from app import db
+from app.models.document import Document
+from app.models.search_outbox import SearchOutbox, SearchReindexCheckpoint
+from app.services.search_reindexer import SearchReindexer
+
+
+@pytest.fixture
+def documents(app):
+    docs = [Document(title=f'문서 {i}', markdown_content=f'한국어 검색 내용 {i}') for i in range(5)]
+    db.session.add_all(docs)
+    db.session.commit()
+    return [doc.id for doc in docs]
+
+
+def indexed_ids(fake_opensearch):
+    return sorted(int(doc_id) for doc_id in fake_opensearch.indices.get('minky_documents', {}))
+
+
+def test_full_run_indexes_everything_and_reports(documents, fake_opensearch):
+    reindexer = SearchReindexer(service=fake_opensearch.service(), batch_size=2, workers=1)
+
+    report = reindexer.run()
+
+    assert indexed_ids(fake_opensearch) == documents
+    assert report['completed'] is True
+    assert report['batches'] == 3
+    assert report['documents_indexed'] == 5
+    assert report['bytes_sent'] > 0
+    assert report['peak_rss_mb'] >= report['rss_start_mb'] > 0
+    assert fake_opensearch.indices['minky_documents'][str(documents[0])]['language'] == 'korean'
+
+    checkpoint = db.session.get(SearchReindexCheckpoint, 'documents')
+    assert checkpoint.status == 'completed'
+    assert checkpoint.report['documents_indexed'] == 5
+
+
+def test_interrupted_run_resumes_after_checkpoint(documents, fake_opensearch):
+    SearchReindexer(service=fake_opensearch.service(), batch_size=2, workers=1).run(max_batches=1)
+    checkpoint = db.session.get(SearchReindexCheckpoint, 'documents')
+    assert checkpoint.status == 'running'
+    assert checkpoint.last_document_id == documents[1]
+
+    report = SearchReindexer(service=fake_opensearch.service(), batch_size=2, workers=1).run()
+
+    assert report['resumed_from_document_id'] == documents[1]
+    assert report['documents_indexed'] == 3
+    assert sorted(int(doc_id) for _, doc_id in fake_opensearch.operations) == documents  # each sent once
+    assert db.session.get(SearchReindexCheckpoint, 'documents').documents_indexed == 5
+
+
+def test_completed_run_starts_over(documents, fake_opensearch):
+    SearchReindexer(service=fake_opensearch.service(), workers=1).run()
+
+    report = SearchReindexer(service=fake_opensearch.service(), workers=1).run(resume=True)
+
+    assert report['resumed_from_document_id'] == 0
+    assert report['documents_indexed'] == 5
+
+
+def test_throttled_documents_shrink_chunks_and_go_to_outbox(documents, fake_opensearch):
+    fake_opensearch.fail_ids.add(str(documents[2]))
+    fake_opensearch.fail_status = 429
+    reindexer = SearchReindexer(service=fake_opensearch.service(), workers=1)
+    initial_target = reindexer.target_chunk_bytes
+
+    report = reindexer.run()
+
+    assert report['documents_failed'] == 1
+    assert reindexer.target_chunk_bytes == initial_target // 2
+    # Retried once after the throttle, then handed to the incremental indexer
+    assert [op for op in fake_opensearch.operations if op[1] == str(documents[2])] == [('index', str(documents[2]))] * 2
+    assert [(row.document_id, row.operation) for row in SearchOutbox.query] == [(documents[2], 'upsert')]
+
+
+def test_process_pool_analysis_matches_serial(documents, fake_opensearch):
+    SearchReindexer(service=fake_opensearch.service(), batch_size=2, workers=1).run()
+    serial = dict(fake_opensearch.indices['minky_documents'])
+    fake_opensearch.indices.clear()
+
+    SearchReindexer(service=fake_opensearch.service(), batch_size=2, workers=2).run(resume=False)
+
+    assert fake_opensearch.indices['minky_documents'] == serial
+
+
+def test_bulk_index_documents_streams_in_batches(app, fake_opensearch, monkeypatch):
+    service = fake_opensearch.service()
+    monkeypatch.setattr(service, 'BULK_ANALYSIS_BATCH', 2)
+    docs = [{'id': i, 'title': f'문서 {i}', 'content': '한국어 내용'} for i in range(5)]
+
+    result = service.bulk_index_documents(docs)
+
+    assert result == {'success_count': 5, 'failed_count': 0, 'failed_items': []}
+    assert fake_opensearch.indices['minky_documents']['4']['language'] == 'korean'
+
+
+def test_reindex_endpoint_needs_opensearch(client, admin_headers):
+    assert client.post('/api/search/index/reindex', headers=admin_headers, json={}).status_code == 503
+    assert client.get('/api/search/index/reindex', headers=admin_headers).get_json()['status'] is None
@@ -0,0 +1,173 @@
+"""
+Tests for cached search statistics and tag suggestions keyed by index generation.
+"""
+import threading
+
+import pytest
+
+from app import db
+from app.models.document import Document
+from app.services import opensearch_service as opensearch_module
+from app.services import search_statistics as statistics_module
+from app.services.search_indexer import SearchIndexer
+from app.services.search_statistics import SearchStatistics, bump_generation, current_generation
+
+TAGS = ['파이썬', '파이썬 웹', '자바', '자바스크립트', '검색', '검색엔진', 'python', 'flask']
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def service(app, fake_opensearch):
+    # Ids well above the database's, so documents indexed by a test add to these
+    fake_opensearch.indices['minky_documents'] = {
+        str(100 + i): {'id': 100 + i, 'title': f'문서 {i}', 'language': 'korean', 'author': 'admin', 'is_public': True,
+                 'tags': TAGS[:i % len(TAGS) + 1], 'created_at': f'2024-0{i % 3 + 1}-15T00:00:00'}
+        for i in range(1, 21)
+    }
+    return fake_opensearch.service()
+
+
+@pytest.fixture
+def statistics(service, clock):
+    return SearchStatistics(service=service, clock=clock)
+
+
+def aggregations(fake_opensearch):
+    return sum(1 for method, path in fake_opensearch.requests if path.endswith('/_search'))
+
+
+def test_statistics_are_computed_once_per_generation(statistics, fake_opensearch):
+    first = statistics.get_statistics()
+    for _ in range(10):
+        assert statistics.get_statistics()['total_documents'] == first['total_documents'] == 20
+
+    assert aggregations(fake_opensearch) == 1
+    assert first['cache'] == {'generation': 0, 'current_generation': 0, 'age_seconds': 0.0}
+    assert statistics.get_metrics()['hits'] == 10
+
+
+def test_max_age_decides_whether_an_older_generation_is_served(statistics, fake_opensearch, clock):
+    statistics.get_statistics()
+    fake_opensearch.indices['minky_documents']['999'] = {'id': 999, 'is_public': True}
+    bump_generation()
+    clock.now += 30
+
+    stale = statistics.get_statistics(max_age=60)
+    fresh = statistics.get_statistics(max_age=10)
+
+    assert stale['total_documents'] == 20
+    assert stale['cache'] == {'generation': 0, 'current_generation': 1, 'age_seconds': 30.0}
+    assert fresh['total_documents'] == 21 and fresh['cache']['generation'] == 1
+    assert aggregations(fake_opensearch) == 2
+
+
+def test_statistics_are_cached_per_access_scope(statistics, fake_opensearch):
+    statistics.get_statistics()
+    statistics.get_statistics(user_id=7)
+    statistics.get_statistics(user_id=7)
+
+    assert aggregations(fake_opensearch) == 2
+
+
+def test_indexing_starts_a_new_generation(app, statistics, service, fake_opensearch):
+    app.config['SEARCH_OUTBOX_ENABLED'] = True
+    statistics.get_statistics()
+
+    db.session.add(Document(title='새 문서', markdown_content='내용', is_public=True))
+    db.session.commit()
+    SearchIndexer(service=service).drain()
+
+    assert current_generation() == 1
+    assert statistics.get_statistics(max_age=0)['total_documents'] == 21
+
+
+def test_failed_recomputation_keeps_serving_the_previous_result(statistics, fake_opensearch):
+    statistics.get_statistics()
+    bump_generation()
+    fake_opensearch.unavailable = True
+
+    result = statistics.get_statistics(max_age=0)
+
+    assert result['total_documents'] == 20 and result['cache']['generation'] == 0
+    assert statistics.get_metrics()['failures'] == 1
+
+
+def test_concurrent_callers_share_one_computation(statistics, service, fake_opensearch, app, monkeypatch):
+    started, release = threading.Event(), threading.Event()
+    compute = service.get_document_statistics
+
+    def slow_statistics(**kwargs):
+        started.set()
+        release.wait(5)
+        return compute(**kwargs)
+
+    monkeypatch.setattr(service, 'get_document_statistics', slow_statistics)
+    results = []
+
+    def poll():
+        with app.app_context():
+            results.append(statistics.get_statistics()['total_documents'])
+
+    threads = [threading.Thread(target=poll) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    started.wait(5)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == [20] * 5
+    assert aggregations(fake_opensearch) == 1
+
+
+@pytest.mark.parametrize('query', ['파이썬', '자바', '검색', 'py', '없는태그', '스크립트'])
+def test_tag_suggestions_from_the_vocabulary_match_the_live_aggregation(statistics, service, query):
+    assert statistics.suggest_tags(query, limit=3) == service.suggest_tags(query, limit=3)
+
+
+def test_tag_suggestions_aggregate_once(statistics, fake_opensearch):
+    for query in ('파', '파이', '파이썬', '자', '자바'):
+        statistics.suggest_tags(query)
+
+    assert aggregations(fake_opensearch) == 1
+
+
+def test_truncated_vocabulary_falls_back_to_the_live_aggregation(statistics, service, fake_opensearch, monkeypatch):
+    monkeypatch.setattr(statistics_module, 'TAG_VOCABULARY_SIZE', 2)
+
+    suggestions = statistics.suggest_tags('자바', limit=2)
+
+    assert suggestions == service.suggest_tags('자바', limit=2) == ['자바', '자바스크립트']
+    assert aggregations(fake_opensearch) == 3  # vocabulary, fallback, and the comparison above
+
+
+def test_routes_serve_cached_results_and_admins_refresh(client, service, fake_opensearch, admin_headers,
+                                                        monkeypatch):
+    monkeypatch.setattr(opensearch_module, 'opensearch_service', service)
+
+    for _ in range(3):
+        stats = client.get('/api/search/statistics').get_json()['statistics']
+        tags = client.get('/api/search/suggest-tags?q=검색').get_json()
+    assert stats['source'] == 'opensearch' and stats['total_documents'] == 20
+    assert tags == {'suggestions': ['검색', '검색엔진'], 'source': 'opensearch'}
+    assert aggregations(fake_opensearch) == 2
+
+    assert client.post('/api/search/statistics/refresh').status_code == 401
+    refreshed = client.post('/api/search/statistics/refresh', headers=admin_headers).get_json()
+
+    assert refreshed['refresh'] == {'generation': 1, 'statistics': True, 'tag_vocabulary': True}
+    assert aggregations(fake_opensearch) == 4
+    assert client.get('/api/search/statistics?max_age=0').get_json()['statistics']['cache']['generation'] == 1
+    assert aggregations(fake_opensearch) == 4
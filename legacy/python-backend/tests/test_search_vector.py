@@ -0,0 +1,35 @@
+"""
+Tests for the stored, weighted documents.search_vector used by full-text search.
+"""
+from sqlalchemy.dialects import postgresql
+from app import db
+from app.models.document import Document
+from app.routes.documents_search import _build_search_query
+
+
+def compile_postgresql(query):
+    return str(query.statement.compile(dialect=postgresql.dialect()))
+
+
+def test_search_matches_and_ranks_on_stored_vector(app):
+    filtered_query, rank = _build_search_query('postgres tuning', None, False)
+    sql = compile_postgresql(filtered_query.add_columns(rank))
+
+    assert 'to_tsvector' not in sql
+    assert 'documents.search_vector @@ plainto_tsquery' in sql
+    assert 'ts_rank(documents.search_vector, plainto_tsquery' in sql
+
+
+def test_search_vector_column_is_tsvector_on_postgresql(app):
+    column_type = Document.__table__.c.search_vector.type
+    assert isinstance(column_type.dialect_impl(postgresql.dialect()), postgresql.TSVECTOR)
+
+    index = next(i for i in Document.__table__.indexes if i.name == 'idx_documents_search_vector')
+    assert index.dialect_options['postgresql']['using'] == 'gin'
+
+
+def test_search_vector_is_not_loaded_with_documents(app, sample_document):
+    db.session.expire_all()
+    document = db.session.get(Document, sample_document)
+
+    assert 'search_vector' not in document.__dict__
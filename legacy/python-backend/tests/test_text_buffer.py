@@ -0,0 +1,106 @@
+"""
+Tests for the rope buffer behind collaborative sessions: random edit sequences
+must match plain string slicing, and cursors must follow the text they sit in.
+"""
+import random
+
+import pytest
+
+from app.services import text_buffer
+from app.services.collaboration_service import CollaborationService
+from app.services.text_buffer import TextBuffer, map_position
+
+ALPHABET = 'abc \n한글é'
+
+
+def random_text(rng, high):
+    return ''.join(rng.choice(ALPHABET) for _ in range(rng.randint(0, high)))
+
+
+def random_operation(rng, length):
+    kind = rng.choice(['insert', 'insert', 'delete', 'replace'])
+    position = rng.randint(0, length)
+    if kind == 'insert' or position == length:
+        # Mostly keystrokes, sometimes pastes larger than a chunk
+        text = random_text(rng, rng.choice([1, 1, 1, 20, 300]))
+        return {'type': 'insert', 'position': position, 'text': text or 'x'}
+    operation = {'type': kind, 'position': position,
+                 'length': rng.randint(1, min(length - position, rng.choice([1, 5, 400])))}
+    if kind == 'replace':
+        operation['text'] = random_text(rng, 10)
+    return operation
+
+
+def naive_apply(content, operation):
+    position = operation['position']
+    end = position + operation.get('length', 0) if operation['type'] != 'insert' else position
+    return content[:position] + operation.get('text', '') + content[end:]
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    # Small chunks exercise splits, merges and chunk-spanning deletes on short texts
+    monkeypatch.setattr(text_buffer, 'MAX_CHUNK', 16)
+
+
+@pytest.mark.parametrize('seed', range(6))
+def test_random_edits_match_string_slicing(small_chunks, seed):
+    rng = random.Random(seed)
+    expected = random_text(rng, 200)
+    buffer = TextBuffer(expected)
+    for step in range(1500):
+        operation = random_operation(rng, len(expected))
+        assert buffer.apply(operation)
+        expected = naive_apply(expected, operation)
+        assert len(buffer) == len(expected)
+        if step % 50 == 0:
+            assert buffer.text == expected
+    assert str(buffer) == expected
+
+
+def test_out_of_range_operations_leave_text_untouched():
+    buffer = TextBuffer('hello')
+
+    assert not buffer.apply({'type': 'insert', 'position': 6, 'text': 'x'})
+    assert not buffer.apply({'type': 'delete', 'position': 3, 'length': 3})
+    assert not buffer.apply({'type': 'replace', 'position': 5, 'length': 1, 'text': 'x'})
+    assert buffer.text == 'hello'
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_mapped_positions_keep_pointing_at_the_same_character(seed):
+    rng = random.Random(seed)
+    content = random_text(rng, 100) + 'z'
+    for _ in range(500):
+        operation = random_operation(rng, len(content))
+        edited = naive_apply(content, operation)
+        start = operation['position']
+        end = start + (operation.get('length', 0) if operation['type'] != 'insert' else 0)
+        for position in range(len(content) + 1):
+            mapped = map_position(position, operation)
+            assert 0 <= mapped <= len(edited)
+            if position < start or (position >= end and position != start):
+                assert edited[mapped:mapped + 1] == content[position:position + 1]
+            elif start < position < end:
+                assert mapped == start
+        content = edited or 'z'
+
+
+def test_session_operations_move_other_cursors(app):
+    service = CollaborationService(socketio=None)
+    service._load_session('1', 'hello world')
+    service.user_cursors['1'] = {'a': {'position': 0, 'selection_start': None, 'selection_end': None},
+                                 'b': {'position': 6, 'selection_start': 6, 'selection_end': 11}}
+
+    operations = [{'type': 'insert', 'position': 0, 'text': 'Oh, '}]
+    assert service._apply_operation(service.active_sessions['1']['buffer'], operations)
+    service._map_cursors('1', operations)
+
+    assert service.active_sessions['1']['buffer'].text == 'Oh, hello world'
+    assert service.user_cursors['1']['a'] == {'position': 0, 'selection_start': None, 'selection_end': None}
+    assert service.user_cursors['1']['b'] == {'position': 10, 'selection_start': 10, 'selection_end': 15}
+    # All or nothing: a later step out of range leaves earlier ones unapplied
+    assert not service._apply_operation(service.active_sessions['1']['buffer'],
+                                        [{'type': 'delete', 'position': 0, 'length': 4},
+                                         {'type': 'delete', 'position': 10, 'length': 99}])
+    assert service.active_sessions['1']['buffer'].text == 'Oh, hello world'